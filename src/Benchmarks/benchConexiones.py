@@ -0,0 +1,78 @@
+import argparse
+import os
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import cloudscraper
+
+# =========================================================
+# BENCHMARK: POOL DE CONEXIONES CON MUCHOS HILOS
+# =========================================================
+# Compara, contra el servidor local, la sesión cloudscraper
+# única que usaban Géant y Tienda (pool por defecto de 10
+# conexiones por host) con una SesionPool de Comun/sesiones.py
+# dimensionada según los hilos.
+#
+# Cada hilo espera un rato entre requests (como el
+# DELAY_DETALLE de Tienda Inglesa o el parseo del HTML): las
+# conexiones quedan ociosas en el pool y, si no entran, se
+# cierran y el próximo request abre otra (handshake nuevo).
+#
+# Uso:
+#   python benchConexiones.py --hilos 30 --requests 3000 --latencia 30 --pausa 60
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.abspath(os.path.join(BASE_DIR, ".."))
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+from Benchmarks.servidorLocal import CatalogoSintetico, Fallas, iniciar_servidor
+from Comun.sesiones import crear_sesion
+
+
+def medir(nombre, sesion, servidor, hilos, cantidad, pausa_ms):
+    url = f"{servidor.url_base}/almacen-producto-1/p"
+    azar = random.Random(1)
+    pausas = [azar.uniform(0, 2 * pausa_ms) / 1000 for _ in range(cantidad)]
+
+    def pedir(i):
+        time.sleep(pausas[i])
+        return sesion.get(url, timeout=30).status_code
+
+    servidor.reiniciar_estadisticas()
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=hilos) as executor:
+        estados = list(executor.map(pedir, range(cantidad)))
+    segundos = time.perf_counter() - inicio
+
+    conexiones = servidor.estadisticas.get("conexiones", 0)
+    print(
+        f"{nombre:<26}{segundos:>8.2f}{conexiones:>12}{1 - conexiones / cantidad:>9.1%}"
+        f"{conexiones / segundos:>12.1f}{sum(e == 200 for e in estados):>8}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del pool de conexiones")
+    parser.add_argument("--hilos", type=int, default=30)
+    parser.add_argument("--requests", type=int, default=3000)
+    parser.add_argument("--latencia", type=float, default=30, help="Latencia del servidor en ms")
+    parser.add_argument("--pausa", type=float, default=60, help="Pausa media entre requests de un hilo (ms)")
+    args = parser.parse_args()
+
+    servidor = iniciar_servidor(0, CatalogoSintetico(), Fallas(args.latencia))
+    print(f"🛰️ Servidor local en {servidor.url_base} | {args.hilos} hilos, {args.requests} requests")
+    print(f"\n{'sesión':<26}{'seg':>8}{'conexiones':>12}{'reuso':>9}{'conex/s':>12}{'ok':>8}")
+
+    medir("cloudscraper compartida", cloudscraper.create_scraper(), servidor,
+          args.hilos, args.requests, args.pausa)
+    medir(f"SesionPool ({args.hilos})", crear_sesion(args.hilos, nombre="bench"), servidor,
+          args.hilos, args.requests, args.pausa)
+
+    servidor.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# =========================================================
+# BENCHMARK: IMPORTACIÓN DESDE CLOUD STORAGE
+# =========================================================
+# Prueba el modo consumidor de Procesos/PostProducts.py contra
+# el GCS local (servidorGcsLocal.py) y una API de importación
+# local que solo cuenta lo que recibe:
+# - sube N objetos .ndjson.gz (como el job de Devoto), uno en
+#   el formato viejo (.json con una lista) y uno corrupto
+# - corre consumir_bucket con varias descargas a la vez
+# - verifica que la API recibió todos los productos válidos y
+#   que los objetos quedaron en procesados/ y fallidos/
+#
+# Uso:
+#   python benchConsumidorGcs.py --objetos 12 --productos 2000 --descargas 4
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.abspath(os.path.join(BASE_DIR, ".."))
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+from Benchmarks.benchSubidaGcs import producto_sintetico
+from Benchmarks.servidorGcsLocal import iniciar_servidor_gcs
+
+BUCKET = "bucket-local"
+
+
+class ApiLocal(ThreadingHTTPServer):
+    """
+    Imita el endpoint /api/products/import: responde 200 y
+    cuenta los productos (por idWeb) que le llegan.
+    """
+    daemon_threads = True
+
+    def __init__(self, latencia=0):
+        super().__init__(("127.0.0.1", 0), ManejadorApi)
+        self.latencia = latencia
+        self.lock = threading.Lock()
+        self.ids = []
+        self.requests = 0
+
+    @property
+    def url(self):
+        host, puerto = self.server_address[:2]
+        return f"http://{host}:{puerto}/api/products/import"
+
+
+class ManejadorApi(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, formato, *args):
+        pass
+
+    def do_POST(self):
+        largo = int(self.headers.get("Content-Length") or 0)
+        batch = json.loads(self.rfile.read(largo))
+        time.sleep(self.server.latencia)
+        with self.server.lock:
+            self.server.ids.extend(p["idWeb"] for p in batch)
+            self.server.requests += 1
+        self.send_response(200)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"ok")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del consumidor de Cloud Storage")
+    parser.add_argument("--objetos", type=int, default=12)
+    parser.add_argument("--productos", type=int, default=2000, help="Productos por objeto")
+    parser.add_argument("--descargas", type=int, default=4)
+    parser.add_argument("--latencia", type=float, default=20, help="Latencia de la API en ms")
+    args = parser.parse_args()
+
+    gcs = iniciar_servidor_gcs()
+    os.environ["STORAGE_EMULATOR_HOST"] = gcs.url_base
+    api = ApiLocal(args.latencia / 1000)
+    threading.Thread(target=api.serve_forever, daemon=True).start()
+
+    from Comun.almacenamiento import cliente_gcs, subir_ndjson_gz
+    from Procesos import PostProducts
+
+    PostProducts.API_URL = api.url
+    PostProducts.SLEEP_SECONDS = 0
+    PostProducts.BATCH_DIR = tempfile.mkdtemp(prefix="bench_batches_")
+
+    # Objetos de entrada
+    esperados = []
+    for o in range(args.objetos):
+        productos = [producto_sintetico(o * args.productos + i, f"cat{o}") for i in range(args.productos)]
+        esperados.extend(p["idWeb"] for p in productos)
+        if o == 0:
+            # Formato viejo: una lista JSON
+            cliente_gcs().bucket(BUCKET).blob(f"pendientes/viejo_{o}.json").upload_from_string(
+                json.dumps(productos), content_type="application/json"
+            )
+        else:
+            subir_ndjson_gz(BUCKET, f"pendientes/job_{o}.ndjson.gz", productos)
+    cliente_gcs().bucket(BUCKET).blob("pendientes/corrupto.ndjson.gz").upload_from_string(b"no es gzip")
+
+    inicio = time.perf_counter()
+    PostProducts.limpiar_carpeta(PostProducts.BATCH_DIR)
+    PostProducts.consumir_bucket(BUCKET, descargas=args.descargas)
+    segundos = time.perf_counter() - inicio
+
+    nombres = [n for (b, n) in gcs.almacen.objetos if b == BUCKET]
+    pendientes = [n for n in nombres if n.startswith("pendientes/")]
+    procesados = [n for n in nombres if n.startswith("procesados/")]
+    fallidos = [n for n in nombres if n.startswith("fallidos/")]
+
+    print(f"\n⏱️ {len(esperados)} productos importados en {segundos:.2f}s con {args.descargas} descargas a la vez")
+    print(f"   API: {api.requests} batches | pendientes/: {len(pendientes)} | "
+          f"procesados/: {len(procesados)} | fallidos/: {fallidos}")
+
+    ok = (
+        sorted(api.ids) == sorted(esperados)
+        and not pendientes
+        and len(procesados) == args.objetos
+        and fallidos == ["fallidos/corrupto.ndjson.gz"]
+    )
+    print(f"{'✅' if ok else '❌'} Verificación del consumidor")
+    gcs.shutdown()
+    api.shutdown()
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# =========================================================
+# BENCHMARK: DESCUBRIMIENTO DE TIENDA INGLESA CON Y SIN LOCK
+# =========================================================
+# Graba los listados de Tienda Inglesa del servidor local
+# (Comun/grabacion.py) y los reproduce desde disco, sin red,
+# para medir el recorrido de categorías con N hilos:
+# - "con lock": mapa global y map_lock alrededor del parseo de
+#               cada página (como estaba ScrapperTienda)
+# - "sin lock": scrape_category_products actual (mapa propio
+#               por categoría y fusión en el hilo principal)
+#
+# Para "con lock" reporta además los segundos que los hilos
+# pasaron esperando el lock (sumados). Verifica que las dos
+# variantes descubran las mismas URLs con las mismas categorías.
+#
+# Uso:
+#   python benchDescubrimientoTienda.py --productos 2000 --hilos 1,10
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.abspath(os.path.join(BASE_DIR, ".."))
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+from Benchmarks.servidorLocal import CatalogoSintetico, iniciar_servidor
+from Comun.grabacion import envolver_sesion
+from Comun.scrapers import cargar_scraper
+from Comun.sesiones import crear_sesion
+
+REPETICIONES = 3
+
+
+def descubrir_con_lock(modulo, cat, mapa, lock, esperas):
+    """
+    Recorrido de una categoría como estaba antes: cada página
+    se procesa con el lock global tomado.
+    """
+    url_parts = cat["url"].split('/')
+    category_id = url_parts[-1].split('?')[0]
+    api_path = (
+        f"{modulo.BASE_URL}/supermercado/categoria/{url_parts[-2]}/"
+        f"busqueda?0,0,*%3A*,{category_id},0,0,,,false,,,,"
+    )
+    page = 0
+    while True:
+        soup = modulo.parsear(modulo.scraper.get(f"{api_path}{page}", timeout=20).text)
+        inicio, fin, total = modulo.obtener_estado_paginacion(soup)
+        product_links = soup.select(modulo.SELECTOR_NOMBRE_PRODUCTO)
+        if not product_links:
+            return
+
+        espera = time.perf_counter()
+        with lock:
+            esperas.append(time.perf_counter() - espera)
+            for span in product_links:
+                link_tag = span.padre('a')
+                if not link_tag or not link_tag.attr("href"):
+                    continue
+                url_limpia = modulo.limpiar_url_producto(modulo.BASE_URL + link_tag.attr("href"))
+                nombre_lista = span.texto(strip=True)
+                if url_limpia not in mapa:
+                    mapa[url_limpia] = {"nombre_lista": nombre_lista, "categorias": {cat["nombre"]}}
+                else:
+                    mapa[url_limpia]["categorias"].add(cat["nombre"])
+
+        if fin >= total or total == 0:
+            return
+        page += 1
+
+
+def con_lock(modulo, categorias, hilos):
+    mapa, lock, esperas = {}, threading.Lock(), []
+    with ThreadPoolExecutor(max_workers=hilos) as executor:
+        list(executor.map(lambda cat: descubrir_con_lock(modulo, cat, mapa, lock, esperas), categorias))
+    return mapa, sum(esperas)
+
+
+def sin_lock(modulo, categorias, hilos):
+    mapa = {}
+    with ThreadPoolExecutor(max_workers=hilos) as executor:
+        for encontrados in executor.map(modulo.scrape_category_products, categorias):
+            modulo.fusionar_productos(mapa, encontrados)
+    return mapa, 0.0
+
+
+def medir(funcion, modulo, categorias, hilos):
+    """
+    Mejor tiempo de REPETICIONES corridas, con el mapa y la
+    espera en el lock de esa corrida.
+    """
+    mejor = None
+    for _ in range(REPETICIONES):
+        inicio = time.perf_counter()
+        mapa, espera = funcion(modulo, categorias, hilos)
+        segundos = time.perf_counter() - inicio
+        if mejor is None or segundos < mejor[0]:
+            mejor = (segundos, mapa, espera)
+    return mejor
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del descubrimiento de Tienda Inglesa")
+    parser.add_argument("--productos", type=int, default=2000, help="Productos por departamento")
+    parser.add_argument("--hilos", default="1,10")
+    args = parser.parse_args()
+
+    modulo = cargar_scraper("tienda")
+
+    with tempfile.TemporaryDirectory() as carpeta:
+        # Grabación: una pasada contra el servidor local
+        servidor = iniciar_servidor(0, CatalogoSintetico(args.productos))
+        modulo.BASE_URL = servidor.url_base
+        modulo.scraper = envolver_sesion(crear_sesion(10, nombre="grabacion"), "grabar", carpeta)
+        categorias = modulo.get_categories()
+        sin_lock(modulo, categorias, 10)
+        paginas = modulo.scraper.estadisticas["grabadas"] - 1
+        servidor.shutdown()
+
+        modulo.scraper = envolver_sesion(crear_sesion(1), "reproducir", carpeta)
+        print(f"🎞️ {paginas} páginas de {len(categorias)} categorías reproducidas desde disco")
+        print(f"\n{'hilos':>6}  {'variante':<12}{'seg':>8}{'páginas/s':>12}{'speedup':>10}{'espera lock':>14}")
+
+        for hilos in (int(h) for h in args.hilos.split(",")):
+            segundos_lock, mapa_lock, espera = medir(con_lock, modulo, categorias, hilos)
+            segundos, mapa, _ = medir(sin_lock, modulo, categorias, hilos)
+            print(f"{hilos:>6}  {'con lock':<12}{segundos_lock:>8.2f}{paginas / segundos_lock:>12.0f}{1:>9.2f}x"
+                  f"{espera:>13.2f}s")
+            print(f"{hilos:>6}  {'sin lock':<12}{segundos:>8.2f}{paginas / segundos:>12.0f}"
+                  f"{segundos_lock / segundos:>9.2f}x{0:>13.2f}s")
+            if mapa != mapa_lock:
+                print("❌ Los mapas no coinciden")
+                return
+            compartidos = sum(1 for info in mapa.values() if len(info["categorias"]) > 1)
+            print(f"        ✅ {len(mapa)} URLs iguales ({compartidos} en más de una categoría)")
+
+
+if __name__ == "__main__":
+    main()
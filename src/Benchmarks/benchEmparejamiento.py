@@ -0,0 +1,202 @@
+import argparse
+import os
+import random
+import sys
+import time
+import unicodedata
+from collections import Counter
+
+# =========================================================
+# BENCHMARK: EMPAREJAMIENTO ENTRE TIENDAS
+# =========================================================
+# Genera un catálogo base sintético y lo publica en 5 tiendas
+# con las diferencias de nombre que se ven en los sitios reales
+# (mayúsculas, tildes, orden de palabras, "1 L" / "1000 ml",
+# palabras de más o de menos). Géant y Tata traen el GTIN como
+# idWeb, Tienda Inglesa un id del sitio y el GTIN en "gtin", y
+# Disco y Devoto solo el id del sitio.
+# Mide Comun/emparejamiento.emparejar y lo compara contra la
+# verdad (el producto base) por pares entre tiendas:
+# - precisión: pares emparejados que son el mismo producto
+# - recall: pares del mismo producto que se emparejaron
+# También estima cuánto tardaría comparar todos contra todos
+# por nombre (midiendo una muestra).
+#
+# Uso:
+#   python benchEmparejamiento.py --productos 30000
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.abspath(os.path.join(BASE_DIR, ".."))
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+from Comun.emparejamiento import emparejar, resumen_grupos, tokens_nombre
+
+# RUTs de las cinco tiendas (Géant, Tata, Tienda Inglesa, Disco, Devoto)
+TIENDAS = [213458920015, 210003270017, 210094030014, 210274130017, 210297450018]
+# Tiendas con el GTIN como idWeb
+TIENDAS_CON_GTIN = {213458920015, 210003270017}
+# Tiendas con el GTIN en el campo "gtin"
+TIENDAS_CAMPO_GTIN = {210094030014}
+
+# Parte del catálogo base que tiene cada tienda
+COBERTURA = 0.8
+
+TIPOS = [
+    "Leche", "Yogur", "Queso", "Manteca", "Galletas", "Fideos", "Arroz", "Aceite", "Vino", "Cerveza",
+    "Refresco", "Agua", "Jugo", "Café", "Té", "Yerba", "Azúcar", "Harina", "Mermelada", "Chocolate",
+    "Shampoo", "Acondicionador", "Jabón", "Detergente", "Suavizante", "Lavandina", "Desodorante",
+    "Papel higiénico", "Servilletas", "Helado", "Salsa", "Atún", "Arvejas", "Lentejas", "Porotos",
+    "Caramelos", "Chicles", "Cereal", "Pan", "Tostadas"
+]
+VARIANTES = [
+    "entera", "descremada", "light", "clásico", "original", "integral", "natural", "frutilla", "vainilla",
+    "chocolate", "limón", "naranja", "durazno", "manzana", "menta", "coco", "tannat", "merlot", "rubia",
+    "negra", "sin azúcar", "sin sal", "premium", "extra", "suave", "intenso", "orgánico", "lavanda",
+    "floral", "citrus", "tropical", "cremoso", "crocante", "relleno", "dulce", "picante", "ahumado",
+    "tradicional", "familiar", "mini"
+]
+MARCAS = [f"{a}{b}" for a in ("Co", "La", "Don", "San", "El", "Mar", "Pro", "Bio") for b in (
+    "naprole", "serenísima", "sol", "roble", "prado", "campo", "valle", "monte", "río", "lago",
+    "sierra", "costa", "puerto", "estrella", "luna", "nube"
+)]
+MEDIDAS = [("g", [100, 200, 250, 400, 500]), ("kg", [1, 2, 5]), ("ml", [250, 350, 500, 750]),
+           ("L", [1, 1.5, 2, 3]), ("un", [6, 12, 24, 30])]
+EQUIVALENCIAS = {"kg": ("g", 1000), "L": ("ml", 1000), "ml": ("cc", 1), "g": ("gr", 1), "un": ("u", 1)}
+EXTRAS = ["Pack", "Oferta", "Botella", "Doy pack", "Caja", "Bolsa", "Pote"]
+
+
+def gtin13(base):
+    digitos = f"{base:012d}"
+    suma = sum(int(d) * (1 if i % 2 == 0 else 3) for i, d in enumerate(digitos))
+    return int(digitos + str((10 - suma % 10) % 10))
+
+
+def catalogo_base(cantidad, azar):
+    productos = []
+    vistos = set()
+    while len(productos) < cantidad:
+        tipo = azar.choice(TIPOS)
+        variante = " ".join(azar.sample(VARIANTES, azar.choice((1, 1, 2))))
+        marca = azar.choice(MARCAS)
+        unidad, valores = azar.choice(MEDIDAS)
+        valor = azar.choice(valores)
+        clave = (tipo, variante, marca, unidad, valor)
+        if clave in vistos:
+            continue
+        vistos.add(clave)
+        productos.append({
+            "base": len(productos), "tipo": tipo, "variante": variante, "marca": marca,
+            "unidad": unidad, "valor": valor, "gtin": gtin13(773000000000 + len(productos))
+        })
+    return productos
+
+
+def sin_tildes(texto):
+    return "".join(c for c in unicodedata.normalize("NFKD", texto) if not unicodedata.combining(c))
+
+
+def nombre_en_tienda(base, azar):
+    """
+    El nombre de un producto base como lo publicaría una tienda.
+    """
+    unidad, valor = base["unidad"], base["valor"]
+    if azar.random() < 0.3 and unidad in EQUIVALENCIAS:
+        unidad, factor = EQUIVALENCIAS[unidad]
+        valor = valor * factor
+    medida = f"{valor:g}{'' if azar.random() < 0.3 else ' '}{unidad}"
+
+    marca = base["marca"].upper() if azar.random() < 0.5 else base["marca"]
+    partes = [base["tipo"], base["variante"], marca]
+    if azar.random() < 0.5:
+        partes = [base["tipo"], marca, base["variante"]]
+    if azar.random() < 0.2:
+        partes.insert(0, azar.choice(EXTRAS))
+    nombre = " ".join(partes + [medida])
+
+    if azar.random() < 0.5:
+        nombre = nombre.title()
+    if azar.random() < 0.3:
+        nombre = sin_tildes(nombre)
+    return nombre
+
+
+def catalogos(cantidad, azar):
+    """
+    Productos de las 5 tiendas y la verdad (índice → producto base).
+    """
+    base = catalogo_base(int(cantidad / COBERTURA), azar)
+    productos, verdad = [], []
+    for rut in TIENDAS:
+        for b in azar.sample(base, cantidad):
+            con_gtin = rut in TIENDAS_CON_GTIN
+            producto = {
+                "idWeb": b["gtin"] if con_gtin else azar.randrange(10 ** 6),
+                "productName": nombre_en_tienda(b, azar),
+                "productBrand": b["marca"] if azar.random() < 0.9 else "",
+                "productPrice": round(azar.uniform(30, 900), 2),
+                "moneda": "UYU",
+                "storeRut": rut
+            }
+            if rut in TIENDAS_CAMPO_GTIN:
+                producto["gtin"] = str(b["gtin"])
+            productos.append(producto)
+            verdad.append(b["base"])
+    return productos, verdad
+
+
+def evaluar(filas, verdad):
+    """
+    Precisión y recall por pares entre tiendas.
+    """
+    def pares(conteo):
+        return sum(n * (n - 1) // 2 for n in conteo.values())
+
+    reales = pares(Counter(verdad))
+    predichos = pares(Counter(f["grupo"] for f in filas))
+    correctos = pares(Counter((f["grupo"], b) for f, b in zip(filas, verdad)))
+    return correctos / max(predichos, 1), correctos / max(reales, 1), predichos, reales
+
+
+def estimar_cuadratico(productos, muestra=200):
+    """
+    Tiempo estimado de comparar por nombre cada producto contra
+    todos los de las otras tiendas (Jaccard en Python puro).
+    """
+    tokens = [tokens_nombre(p["productName"], p["productBrand"])[0] for p in productos]
+    inicio = time.perf_counter()
+    for i in range(muestra):
+        a = tokens[i]
+        for b in tokens:
+            len(a & b) / (len(a | b) or 1)
+    por_comparacion = (time.perf_counter() - inicio) / (muestra * len(tokens))
+    comparaciones = len(productos) ** 2 * (1 - 1 / len(TIENDAS)) / 2
+    return por_comparacion * comparaciones
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del emparejamiento entre tiendas")
+    parser.add_argument("--productos", type=int, default=30000, help="Productos por tienda")
+    parser.add_argument("--semilla", type=int, default=1)
+    args = parser.parse_args()
+
+    azar = random.Random(args.semilla)
+    productos, verdad = catalogos(args.productos, azar)
+    print(f"🧪 {len(productos)} productos sintéticos ({len(TIENDAS)} tiendas × {args.productos})")
+
+    inicio = time.perf_counter()
+    filas = emparejar(productos)
+    segundos = time.perf_counter() - inicio
+
+    resumen = resumen_grupos(filas)
+    precision, recall, predichos, reales = evaluar(filas, verdad)
+    print(f"⏱️ Emparejamiento: {segundos:.1f}s → {resumen['grupos']} grupos | por método: {resumen['por_metodo']}")
+    print(f"🎯 Pares entre tiendas: precisión {precision:.3f} | recall {recall:.3f} "
+          f"({predichos} emparejados, {reales} reales)")
+
+    estimado = estimar_cuadratico(productos)
+    print(f"🐢 Todos contra todos por nombre (estimado): {estimado / 3600:.1f} h")
+
+
+if __name__ == "__main__":
+    main()
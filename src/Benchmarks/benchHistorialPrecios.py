@@ -0,0 +1,121 @@
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+# =========================================================
+# BENCHMARK: CONSULTAS AL HISTORIAL DE PRECIOS
+# =========================================================
+# Llena un historial sintético (Comun/historial_precios.py) con
+# millones de filas y mide:
+# - la carga de una corrida nueva (30.000 productos, solo se
+#   escriben los que cambiaron)
+# - último precio, precio a una fecha y cambio desde una fecha
+#   para productos al azar
+# - todos los cambios de una tienda desde una fecha
+#
+# Uso:
+#   python benchHistorialPrecios.py --filas 20000000
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.abspath(os.path.join(BASE_DIR, ".."))
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+from Comun.historial_precios import HistorialPrecios
+
+# RUTs de las cinco tiendas
+TIENDAS = [213458920015, 210003270017, 210094030014, 210274130017, 210297450018]
+
+# Productos por tienda
+PRODUCTOS = 30000
+
+# Fecha del primer precio sintético y segundos entre cambios
+INICIO = 1_600_000_000
+PASO = 86400
+
+# Consultas al azar de cada tipo
+CONSULTAS = 10000
+
+
+def llenar(historial, filas):
+    """
+    Carga filas sintéticas directo en las tablas (en el orden de
+    la clave primaria, como quedarían después de años de corridas).
+    """
+    cambios_por_producto = max(1, filas // (len(TIENDAS) * PRODUCTOS))
+    db = historial._db
+
+    def generar():
+        for rut in TIENDAS:
+            for id_web in range(PRODUCTOS):
+                precio = 100.0 + id_web % 500
+                for c in range(cambios_por_producto):
+                    yield rut, id_web, INICIO + c * PASO + id_web % 3600, precio + c % 7, "UYU"
+
+    with db:
+        db.execute("DROP INDEX precios_por_fecha")
+        db.executemany("INSERT INTO precios VALUES (?, ?, ?, ?, ?)", generar())
+        db.execute("CREATE INDEX precios_por_fecha ON precios (store_rut, ts)")
+        db.execute(
+            "INSERT INTO ultimos SELECT store_rut, id_web, MAX(ts), precio, moneda "
+            "FROM precios GROUP BY store_rut, id_web"
+        )
+    return cambios_por_producto
+
+
+def medir(nombre, funcion, repeticiones=1):
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        resultado = funcion()
+    segundos = time.perf_counter() - inicio
+    por_consulta = segundos / repeticiones * 1e6
+    print(f"{nombre:<34}{segundos:>10.3f}s{por_consulta:>12.1f} µs/op")
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del historial de precios")
+    parser.add_argument("--filas", type=int, default=5_000_000)
+    parser.add_argument("--ruta", help="SQLite a usar (por defecto uno temporal)")
+    args = parser.parse_args()
+
+    carpeta = tempfile.mkdtemp()
+    historial = HistorialPrecios(args.ruta or os.path.join(carpeta, "precios.sqlite"))
+
+    inicio = time.perf_counter()
+    cambios = llenar(historial, args.filas)
+    total = historial._db.execute("SELECT COUNT(*) FROM precios").fetchone()[0]
+    print(f"🧪 {total:,} filas ({cambios} cambios por producto) cargadas en {time.perf_counter() - inicio:.1f}s")
+    print(f"💾 {os.path.getsize(historial.ruta) / 1024 / 1024:.0f} MB en {historial.ruta}\n")
+
+    ultimo_ts = INICIO + cambios * PASO
+    medio_ts = INICIO + cambios * PASO // 2
+    azar = random.Random(1)
+
+    def al_azar():
+        return azar.choice(TIENDAS), azar.randrange(PRODUCTOS)
+
+    # Corrida nueva: el 10% de los productos de una tienda cambió de precio
+    corrida = [
+        {"storeRut": TIENDAS[0], "idWeb": i, "moneda": "UYU",
+         "productPrice": historial.ultimo_precio(TIENDAS[0], i)[1] + (1 if i % 10 == 0 else 0)}
+        for i in range(PRODUCTOS)
+    ]
+    nuevas = medir("registrar (30k productos)", lambda: historial.registrar(corrida, ultimo_ts + PASO))
+    print(f"{'':<34}→ {nuevas} filas nuevas")
+
+    medir("ultimo_precio", lambda: historial.ultimo_precio(*al_azar()), CONSULTAS)
+    medir("precio_en", lambda: historial.precio_en(*al_azar(), medio_ts), CONSULTAS)
+    medir("cambio_desde", lambda: historial.cambio_desde(*al_azar(), medio_ts), CONSULTAS)
+    filas = medir("cambios_desde (tienda, último paso)", lambda: historial.cambios_desde(TIENDAS[0], ultimo_ts))
+    print(f"{'':<34}→ {len(filas)} productos cambiaron")
+    historial.cerrar()
+    shutil.rmtree(carpeta)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+import argparse
+import json
+import os
+import ssl
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+# =========================================================
+# BENCHMARK: HTTP/1.1 KEEP-ALIVE VS HTTP/2
+# =========================================================
+# Pide páginas de detalle al servidor HTTP/2 local
+# (servidorHttp2.py, sobre TLS, en otro proceso) con N hilos
+# simultáneos y compara:
+# - SesionPool con 15 conexiones (HTTP/1.1, como el pool de
+#   detalle de los scrapers)
+# - SesionPool con N conexiones (HTTP/1.1, una por hilo)
+# - SesionHttp2 (streams multiplexados en pocas conexiones)
+# - SesionHttp2 contra un servidor que no ofrece h2 (cae a
+#   HTTP/1.1 por ALPN)
+#
+# Mide requests/s, latencia p50/p95 vista por el hilo (incluye
+# la espera por una conexión libre) y conexiones TLS nuevas
+# durante la medición (después de una vuelta de calentamiento).
+#
+# Uso:
+#   python benchHttp2.py --concurrencias 15,50,200 --requests 3000 --latencia 30
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.abspath(os.path.join(BASE_DIR, ".."))
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+from Benchmarks.servidorHttp2 import PREFIJO_LISTO, RUTA_ESTADISTICAS
+from Benchmarks.servidorLocal import CatalogoSintetico
+from Comun.sesiones import SesionHttp2, crear_sesion, http2_disponible
+
+
+class ServidorExterno:
+    """
+    servidorHttp2.py corriendo en un subproceso.
+    """
+
+    def __init__(self, latencia, jitter, solo_http1=False):
+        comando = [sys.executable, os.path.join(BASE_DIR, "servidorHttp2.py"), "--puerto", "0", "--anunciar",
+                   "--latencia", str(latencia), "--jitter", str(jitter)]
+        if solo_http1:
+            comando.append("--solo-http1")
+        self.proceso = subprocess.Popen(comando, stdout=subprocess.PIPE, text=True)
+        linea = self.proceso.stdout.readline()
+        datos = json.loads(linea[len(PREFIJO_LISTO):])
+        self.url_base, self.cert = datos["url"], datos["cert"]
+        self.catalogo = CatalogoSintetico()
+        # Keep-alive: las consultas de estadísticas no abren conexiones nuevas
+        self._control = requests.Session()
+
+    def estadisticas(self):
+        return self._control.get(self.url_base + RUTA_ESTADISTICAS, verify=self.cert, timeout=10).json()
+
+    def detener(self):
+        self.proceso.terminate()
+        self.proceso.wait()
+
+
+def percentil(valores, p):
+    valores = sorted(valores)
+    return valores[min(len(valores) - 1, int(len(valores) * p))]
+
+
+def medir(nombre, sesion, servidor, concurrencia, cantidad, verify=None):
+    """
+    `cantidad` requests de detalle con `concurrencia` hilos.
+    """
+    productos = servidor.catalogo.productos("Almacen")
+    urls = [f"{servidor.url_base}/{productos[i % len(productos)]['slug']}/p" for i in range(cantidad)]
+    extra = {"verify": verify} if verify else {}
+    latencias = [0.0] * cantidad
+    errores = []
+    lock = threading.Lock()
+
+    def pedir(i):
+        inicio = time.perf_counter()
+        try:
+            respuesta = sesion.get(urls[i], timeout=60, **extra)
+            respuesta.raise_for_status()
+        except Exception as e:
+            with lock:
+                errores.append(e)
+        latencias[i] = time.perf_counter() - inicio
+
+    # Una vuelta corta para abrir las conexiones antes de medir
+    with ThreadPoolExecutor(max_workers=concurrencia) as executor:
+        list(executor.map(pedir, range(min(concurrencia, cantidad))))
+
+    servidor.estadisticas()
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrencia) as executor:
+        list(executor.map(pedir, range(cantidad)))
+    segundos = time.perf_counter() - inicio
+
+    estadisticas = servidor.estadisticas()
+    conexiones = sum(v for k, v in estadisticas.items() if k.startswith("conexiones:"))
+    protocolos = {k.split(":", 1)[1]: v for k, v in estadisticas.items() if k.startswith("requests:")}
+    print(
+        f"{concurrencia:>6}  {nombre:<30}{cantidad / segundos:>9.0f}{percentil(latencias, 0.5) * 1000:>9.0f}"
+        f"{percentil(latencias, 0.95) * 1000:>9.0f}{conexiones:>8}{len(errores):>8}   {protocolos}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark HTTP/1.1 vs HTTP/2")
+    parser.add_argument("--concurrencias", default="15,50,200")
+    parser.add_argument("--requests", type=int, default=3000)
+    parser.add_argument("--latencia", type=float, default=30, help="Latencia del servidor en ms")
+    parser.add_argument("--jitter", type=float, default=10, help="Jitter en ms")
+    args = parser.parse_args()
+
+    if not http2_disponible():
+        print("❌ Falta httpx[http2]: pip install \"httpx[http2]\"")
+        return
+
+    servidor = ServidorExterno(args.latencia, args.jitter)
+    servidor_http1 = ServidorExterno(args.latencia, args.jitter, solo_http1=True)
+    contexto = ssl.create_default_context(cafile=servidor.cert)
+    contexto_http1 = ssl.create_default_context(cafile=servidor_http1.cert)
+    print(f"🛰️ Servidor HTTP/2 en {servidor.url_base} | latencia {args.latencia} ms ± {args.jitter}")
+
+    print(f"\n{'hilos':>6}  {'sesión':<30}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'nuevas':>8}{'errores':>8}   protocolo")
+    for concurrencia in (int(c) for c in args.concurrencias.split(",")):
+        sesion = crear_sesion(15, nombre="http1-15")
+        medir("HTTP/1.1, 15 conexiones", sesion, servidor, concurrencia, args.requests, servidor.cert)
+        sesion.cerrar()
+
+        sesion = crear_sesion(concurrencia, nombre="http1-n")
+        medir(f"HTTP/1.1, {concurrencia} conexiones", sesion, servidor, concurrencia, args.requests, servidor.cert)
+        sesion.cerrar()
+
+        sesion = SesionHttp2(15, nombre="http2", ssl_context=contexto)
+        medir("HTTP/2", sesion, servidor, concurrencia, args.requests)
+        sesion.cerrar()
+
+        sesion = SesionHttp2(15, nombre="http2-fallback", ssl_context=contexto_http1)
+        medir("HTTP/2 → servidor solo HTTP/1.1", sesion, servidor_http1, concurrencia, args.requests)
+        sesion.cerrar()
+        print()
+
+    servidor.detener()
+    servidor_http1.detener()
+
+
+if __name__ == "__main__":
+    main()
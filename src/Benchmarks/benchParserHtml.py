@@ -0,0 +1,192 @@
+import argparse
+import os
+import sys
+import time
+
+from bs4 import BeautifulSoup
+
+# =========================================================
+# BENCHMARK: PARSEO DE PÁGINAS DE LISTADO
+# =========================================================
+# Compara el parseo + selección de tarjetas de los listados
+# de Tienda Inglesa y Disco/Devoto:
+# - "original":  BeautifulSoup + html.parser con selectores
+#                en texto (como estaban los scrapers)
+# - cada motor de Comun/parser_html.py con selectores compilados
+#
+# Reporta milisegundos por cada 1.000 tarjetas y verifica que
+# todos los motores extraigan exactamente lo mismo.
+#
+# Uso:
+#   python benchParserHtml.py                        (páginas sintéticas)
+#   python benchParserHtml.py --paginas DIR --tipo disco
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.abspath(os.path.join(BASE_DIR, ".."))
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+from Benchmarks.servidorLocal import CatalogoSintetico, DEPARTAMENTOS, responder_tienda
+from Comun.parser_html import Selector, backends_disponibles, parsear
+
+# Selectores compilados
+SEL_NOMBRE_TIENDA = Selector("span.card-product-name")
+SEL_ITEM_DISCO = Selector("div.product-item")
+SEL_LINK_DISCO = Selector("h3 a")
+SEL_PRECIO_DISCO = Selector("span.val")
+SEL_MARCA_DISCO = Selector("div.prod-cats a")
+SEL_IMAGEN_DISCO = Selector("figure img")
+
+REPETICIONES = 3
+
+
+# =========================================================
+# EXTRACTORES
+# =========================================================
+def tienda_original(html):
+    soup = BeautifulSoup(html, "html.parser")
+    salida = []
+    for span in soup.select("span.card-product-name"):
+        link = span.find_parent("a")
+        salida.append((link.get("href") if link else None, span.get_text(strip=True)))
+    return salida
+
+
+def tienda_adaptador(html, backend):
+    doc = parsear(html, backend)
+    salida = []
+    for span in doc.select(SEL_NOMBRE_TIENDA):
+        link = span.padre("a")
+        salida.append((link.attr("href") if link else None, span.texto(strip=True)))
+    return salida
+
+
+def disco_original(html):
+    soup = BeautifulSoup(html, "html.parser")
+    salida = []
+    for item in soup.select("div.product-item"):
+        link = item.select_one("h3 a")
+        marca = item.select_one("div.prod-cats a")
+        img = item.select_one("figure img")
+        salida.append((
+            link["href"],
+            link.text.strip(),
+            item.select_one("span.val").text.strip(),
+            marca.text.strip() if marca else None,
+            img["src"] if img else None
+        ))
+    return salida
+
+
+def disco_adaptador(html, backend):
+    doc = parsear(html, backend)
+    salida = []
+    for item in doc.select(SEL_ITEM_DISCO):
+        link = item.select_one(SEL_LINK_DISCO)
+        marca = item.select_one(SEL_MARCA_DISCO)
+        img = item.select_one(SEL_IMAGEN_DISCO)
+        salida.append((
+            link.attr("href"),
+            link.texto(strip=False).strip(),
+            item.select_one(SEL_PRECIO_DISCO).texto(strip=False).strip(),
+            marca.texto(strip=False).strip() if marca else None,
+            img.attr("src") if img else None
+        ))
+    return salida
+
+
+EXTRACTORES = {
+    "tienda": (tienda_original, tienda_adaptador),
+    "disco": (disco_original, disco_adaptador)
+}
+
+
+# =========================================================
+# PÁGINAS SINTÉTICAS
+# =========================================================
+def paginas_sinteticas(tipo, productos):
+    catalogo = CatalogoSintetico(productos)
+    paginas = []
+
+    if tipo == "tienda":
+        for i, depto in enumerate(DEPARTAMENTOS[:3]):
+            for pagina in range(productos // 24 + 1):
+                _, _, html = responder_tienda(
+                    catalogo,
+                    f"/supermercado/categoria/{depto.lower()}/busqueda",
+                    f"0,0,*%3A*,{1000 + i},0,0,,,false,,,,{pagina}"
+                )
+                paginas.append(html)
+        return paginas
+
+    # Disco/Devoto: una página por categoría con todas las
+    # tarjetas ya cargadas (como queda después del scroll)
+    for depto in DEPARTAMENTOS[:3]:
+        tarjetas = "".join(
+            '<div class="product-item"><div class="prod-cats">'
+            f'<a href="/marca">{p["marca"]}</a></div>'
+            f'<figure><img src="https://img.local/{p["slug"]}.jpg"></figure>'
+            f'<h3><a href="/product/{p["slug"]}/{p["id"]}"> {p["nombre"]} </a></h3>'
+            f'<div class="price"><span class="sym">$</span><span class="val">{p["precio"]:.2f}</span></div>'
+            "</div>"
+            for p in catalogo.productos(depto)
+        )
+        paginas.append(
+            "<html><head><script>var x = 1;</script></head><body>"
+            + ("<nav><ul>" + "<li><a href='#'>menu</a></li>" * 80 + "</ul></nav>")
+            + f"<div class='grid'>{tarjetas}</div></body></html>"
+        )
+    return paginas
+
+
+def medir(funcion, paginas):
+    """
+    Devuelve (segundos del mejor intento, tarjetas, resultados).
+    """
+    mejor = float("inf")
+    resultados = None
+    for _ in range(REPETICIONES):
+        inicio = time.perf_counter()
+        resultados = [funcion(html) for html in paginas]
+        mejor = min(mejor, time.perf_counter() - inicio)
+    tarjetas = sum(len(r) for r in resultados)
+    return mejor, tarjetas, resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de parseo de listados")
+    parser.add_argument("--tipo", choices=list(EXTRACTORES), default="tienda")
+    parser.add_argument("--paginas", help="Carpeta con páginas de listado guardadas (.html)")
+    parser.add_argument("--productos", type=int, default=300, help="Productos por categoría (sintético)")
+    args = parser.parse_args()
+
+    if args.paginas:
+        paginas = []
+        for archivo in sorted(os.listdir(args.paginas)):
+            if archivo.endswith(".html"):
+                with open(os.path.join(args.paginas, archivo), "r", encoding="utf-8") as f:
+                    paginas.append(f.read())
+    else:
+        paginas = paginas_sinteticas(args.tipo, args.productos)
+
+    original, adaptador = EXTRACTORES[args.tipo]
+
+    seg_base, tarjetas, esperado = medir(original, paginas)
+    if not tarjetas:
+        print("❌ Las páginas no tienen tarjetas")
+        return
+
+    print(f"📊 {args.tipo}: {len(paginas)} páginas, {tarjetas} tarjetas (ms cada 1.000 tarjetas)")
+    print(f"{'motor':<22}{'ms/1000':>12}{'vs original':>14}{'igual':>8}")
+    print(f"{'original':<22}{seg_base * 1000 * 1000 / tarjetas:>12.1f}{'1.00x':>14}{'-':>8}")
+
+    for backend in backends_disponibles():
+        seg, _, resultado = medir(lambda html: adaptador(html, backend), paginas)
+        print(
+            f"{backend + ' (compilado)':<22}{seg * 1000 * 1000 / tarjetas:>12.1f}"
+            f"{seg_base / seg:>13.2f}x{'sí' if resultado == esperado else 'NO':>8}"
+        )
+
+
+if __name__ == "__main__":
+    main()
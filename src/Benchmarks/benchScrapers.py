@@ -0,0 +1,388 @@
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+# =========================================================
+# BENCHMARK OFFLINE DE LOS SCRAPERS
+# =========================================================
+# Corre cada scraper contra el servidor local (servidorLocal.py)
+# en lugar de los sitios reales y mide, por scraper y por fase:
+# - productos/s y requests/s
+# - tiempo de CPU
+# - pico de memoria (RSS)
+#
+# Cada scraper corre en un subproceso propio, así su CPU y su
+# memoria no se mezclan con las del servidor ni con las de
+# otros scrapers.
+#
+# Uso:
+#   python benchScrapers.py --scrapers geant,tata,tienda --productos 500 --latencia 20 --jitter 5
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.abspath(os.path.join(BASE_DIR, ".."))
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+from Benchmarks.servidorLocal import (
+    CatalogoSintetico, Fallas, cargar_fixtures, cargar_grabaciones, iniciar_servidor, parsear_caida
+)
+from Comun.scrapers import cargar_scraper, funcion_principal
+
+# Prefijo de la línea con el resultado que imprime el subproceso
+PREFIJO_RESULTADO = "RESULTADO_BENCH "
+
+# Fases de cada scraper:
+# key   → nombre de la fase
+# value → funciones del módulo que pertenecen a esa fase.
+#         Las funciones marcadas con "*" no producen productos
+#         (solo cuentan tiempo y requests).
+FASES = {
+    "geant": {
+        "descubrimiento": ["obtener_todas_las_urls", "*planificar_categoria"],
+        "detalle": ["extraer_detalle_producto"]
+    },
+    "tata": {
+        "categorias": ["*obtener_shards"],
+        "listado": ["consultar_pagina"]
+    },
+    "tienda": {
+        "categorias": ["*get_categories"],
+        "listado": ["*scrape_category_products", "*leer_pagina_categoria"],
+        "detalle": ["extract_product_detail"]
+    }
+}
+
+# Fases cuyos productos no salen de lo que devuelven las
+# funciones sino del estado del módulo al terminar
+PRODUCTOS_AL_FINAL = {
+    ("tienda", "listado"): lambda modulo: len(modulo.productos_map)
+}
+
+# Objetos de sesión HTTP de cada scraper (para contar requests).
+# scraper_detalle es el mismo objeto que scraper salvo con
+# SCRAPER_HTTP2=1
+SESIONES = {
+    "geant": ("scraper", "scraper_detalle"),
+    "tata": ("sesion",),
+    "tienda": ("scraper", "scraper_detalle")
+}
+
+
+# =========================================================
+# AJUSTE DE CADA SCRAPER PARA APUNTAR AL SERVIDOR LOCAL
+# =========================================================
+def apuntar_a_servidor(nombre, modulo, url_base, salida):
+    """
+    Cambia los endpoints y archivos de salida del scraper
+    para que use el servidor local y no pise datos reales.
+    """
+    modulo.OUTPUT_JSON = os.path.join(salida, f"productos_{nombre}.json")
+
+    if nombre == "geant":
+        modulo.BASE_URL = url_base
+    elif nombre == "tata":
+        modulo.GRAPHQL_URL = f"{url_base}/api/graphql"
+        modulo.FACETS_URL = f"{url_base}/api/io/_v/api/intelligent-search/facets"
+        modulo.CACHE_CATEGORIAS = os.path.join(salida, "cache_categorias_tata.json")
+    elif nombre == "tienda":
+        modulo.BASE_URL = url_base
+        modulo.DELAY_DETALLE = (0, 0)
+
+
+# =========================================================
+# MEDICIÓN POR FASE (DENTRO DEL SUBPROCESO)
+# =========================================================
+class MedidorFases:
+    """
+    Envuelve las funciones de cada fase para acumular:
+    llamadas, productos, requests, tiempo de CPU (suma de
+    todos los hilos) y el RSS máximo mientras la fase corre.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.fases = {}
+        self._activas = {}
+
+    def _fase(self, nombre):
+        return self.fases.setdefault(nombre, {
+            "llamadas": 0, "productos": 0, "requests": 0,
+            "cpu_s": 0.0, "inicio": None, "fin": None, "rss_max_kb": 0
+        })
+
+    def envolver(self, modulo, nombre_funcion, fase):
+        cuenta_productos = not nombre_funcion.startswith("*")
+        nombre_funcion = nombre_funcion.lstrip("*")
+        original = getattr(modulo, nombre_funcion)
+        medidor = self
+
+        def envuelta(*args, **kwargs):
+            anterior = getattr(medidor._local, "fase", None)
+            medidor._local.fase = fase
+            with medidor._lock:
+                datos = medidor._fase(fase)
+                datos["inicio"] = datos["inicio"] or time.perf_counter()
+                medidor._activas[fase] = medidor._activas.get(fase, 0) + 1
+
+            cpu = time.thread_time()
+            try:
+                resultado = original(*args, **kwargs)
+            finally:
+                cpu = time.thread_time() - cpu
+                medidor._local.fase = anterior
+                with medidor._lock:
+                    datos["llamadas"] += 1
+                    datos["cpu_s"] += cpu
+                    datos["fin"] = time.perf_counter()
+                    medidor._activas[fase] -= 1
+
+            if cuenta_productos:
+                with medidor._lock:
+                    datos["productos"] += contar_productos(resultado)
+            return resultado
+
+        setattr(modulo, nombre_funcion, envuelta)
+
+    def envolver_sesion(self, sesion):
+        """
+        Cuenta cada request en la fase del hilo que lo hace.
+        """
+        get_original = sesion.get
+        medidor = self
+
+        def get(*args, **kwargs):
+            fase = getattr(medidor._local, "fase", None) or "otros"
+            with medidor._lock:
+                medidor._fase(fase)["requests"] += 1
+            return get_original(*args, **kwargs)
+
+        sesion.get = get
+
+    def muestrear_rss(self, intervalo=0.05):
+        """
+        Hilo que mide el RSS actual y lo asigna a las fases activas.
+        """
+        def bucle():
+            while True:
+                rss = rss_actual_kb()
+                with self._lock:
+                    for fase, activas in self._activas.items():
+                        if activas > 0:
+                            datos = self.fases[fase]
+                            datos["rss_max_kb"] = max(datos["rss_max_kb"], rss)
+                time.sleep(intervalo)
+
+        threading.Thread(target=bucle, daemon=True).start()
+
+
+def contar_productos(resultado):
+    """
+    Cuántos productos produjo una llamada, según lo que devuelve.
+    """
+    if resultado is None:
+        return 0
+    if isinstance(resultado, dict):
+        return 1
+    if isinstance(resultado, tuple) and resultado and isinstance(resultado[0], list):
+        return len(resultado[0])
+    if isinstance(resultado, list):
+        return len(resultado)
+    return 0
+
+
+def rss_actual_kb():
+    """
+    RSS actual del proceso en KB (Linux). 0 si no se puede leer.
+    """
+    try:
+        with open("/proc/self/status", "r") as f:
+            for linea in f:
+                if linea.startswith("VmRSS:"):
+                    return int(linea.split()[1])
+    except OSError:
+        pass
+    return 0
+
+
+def correr_hijo(nombre, url_base, salida):
+    """
+    Se ejecuta dentro del subproceso: carga el scraper, lo
+    apunta al servidor local, lo corre y devuelve las métricas.
+    """
+    modulo = cargar_scraper(nombre)
+    apuntar_a_servidor(nombre, modulo, url_base, salida)
+
+    medidor = MedidorFases()
+    for fase, funciones in FASES.get(nombre, {}).items():
+        for funcion in funciones:
+            medidor.envolver(modulo, funcion, fase)
+    sesiones = {id(getattr(modulo, atributo)): getattr(modulo, atributo) for atributo in SESIONES.get(nombre, ())}
+    for sesion in sesiones.values():
+        medidor.envolver_sesion(sesion)
+    medidor.muestrear_rss()
+
+    cpu_inicio = time.process_time()
+    inicio = time.perf_counter()
+    funcion_principal(nombre)()
+    duracion = time.perf_counter() - inicio
+    cpu = time.process_time() - cpu_inicio
+
+    with open(modulo.OUTPUT_JSON, "r", encoding="utf-8") as f:
+        guardados = len(json.load(f))
+
+    for (scraper, fase), calcular in PRODUCTOS_AL_FINAL.items():
+        if scraper == nombre and fase in medidor.fases:
+            medidor.fases[fase]["productos"] = calcular(modulo)
+
+    fases = {}
+    for fase, datos in medidor.fases.items():
+        pared = (datos["fin"] - datos["inicio"]) if datos["inicio"] and datos["fin"] else 0
+        fases[fase] = {
+            "segundos": round(pared, 3),
+            "llamadas": datos["llamadas"],
+            "productos": datos["productos"],
+            "requests": datos["requests"],
+            "productos_s": round(datos["productos"] / pared, 1) if pared else 0,
+            "requests_s": round(datos["requests"] / pared, 1) if pared else 0,
+            "cpu_s": round(datos["cpu_s"], 3),
+            "rss_max_mb": round(datos["rss_max_kb"] / 1024, 1)
+        }
+
+    total_requests = sum(d["requests"] for d in medidor.fases.values())
+    return {
+        "scraper": nombre,
+        "segundos": round(duracion, 3),
+        "productos": guardados,
+        "requests": total_requests,
+        "productos_s": round(guardados / duracion, 1) if duracion else 0,
+        "requests_s": round(total_requests / duracion, 1) if duracion else 0,
+        "cpu_s": round(cpu, 3),
+        "rss_pico_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "fases": fases
+    }
+
+
+# =========================================================
+# PROCESO PRINCIPAL
+# =========================================================
+def correr_scraper(nombre, url_base, salida, verbose=False):
+    """
+    Lanza el subproceso de un scraper y devuelve sus métricas.
+    """
+    resultado = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--hijo", nombre,
+         "--url", url_base, "--salida", salida],
+        stdout=subprocess.PIPE,
+        stderr=None if verbose else subprocess.DEVNULL,
+        text=True
+    )
+
+    metricas = None
+    for linea in resultado.stdout.splitlines():
+        if linea.startswith(PREFIJO_RESULTADO):
+            metricas = json.loads(linea[len(PREFIJO_RESULTADO):])
+        elif verbose:
+            print(linea)
+
+    if metricas is None:
+        print(f"❌ {nombre} no devolvió resultados (code={resultado.returncode})")
+    return metricas
+
+
+def imprimir_tabla(resultados):
+    print(f"\n{'scraper / fase':<28}{'seg':>9}{'prod':>8}{'req':>8}{'prod/s':>10}{'req/s':>10}{'cpu s':>9}{'rss MB':>9}")
+    for r in resultados:
+        print(
+            f"{r['scraper']:<28}{r['segundos']:>9.2f}{r['productos']:>8}{r['requests']:>8}"
+            f"{r['productos_s']:>10.1f}{r['requests_s']:>10.1f}{r['cpu_s']:>9.2f}{r['rss_pico_mb']:>9.1f}"
+        )
+        for fase, f in r["fases"].items():
+            print(
+                f"{'  · ' + fase:<28}{f['segundos']:>9.2f}{f['productos']:>8}{f['requests']:>8}"
+                f"{f['productos_s']:>10.1f}{f['requests_s']:>10.1f}{f['cpu_s']:>9.2f}{f['rss_max_mb']:>9.1f}"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark offline de los scrapers")
+    parser.add_argument("--scrapers", default="geant,tata,tienda")
+    parser.add_argument("--productos", type=int, default=200, help="Productos por departamento")
+    parser.add_argument("--fixtures", help="Carpeta con respuestas grabadas")
+    parser.add_argument("--grabaciones", help="Carpeta de grabaciones de Comun/grabacion.py")
+    parser.add_argument("--latencia", type=float, default=0, help="Latencia en ms")
+    parser.add_argument("--jitter", type=float, default=0, help="Jitter en ms")
+    parser.add_argument("--errores", type=float, default=0, help="Probabilidad de 503")
+    parser.add_argument("--timeouts", type=float, default=0, help="Probabilidad de timeout")
+    parser.add_argument("--cortes", type=float, default=0, help="Probabilidad de cortar la conexión")
+    parser.add_argument("--capacidad", type=int, default=0, help="Requests simultáneos sin demora extra")
+    parser.add_argument("--caida", type=parsear_caida,
+                        help="INICIO:DURACION en segundos (desde que arranca el servidor) con todo en 503")
+    parser.add_argument("--clearance", type=float, default=0, help="Segundos que dura la cookie cf_clearance")
+    parser.add_argument("--json", help="Guardar los resultados en este archivo")
+    parser.add_argument("--verbose", action="store_true", help="Mostrar la salida de los scrapers")
+    parser.add_argument("--hijo", help=argparse.SUPPRESS)
+    parser.add_argument("--url", help=argparse.SUPPRESS)
+    parser.add_argument("--salida", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    # Modo subproceso: corre un solo scraper y devuelve métricas
+    if args.hijo:
+        metricas = correr_hijo(args.hijo, args.url, args.salida)
+        print(PREFIJO_RESULTADO + json.dumps(metricas), flush=True)
+        return
+
+    servidor = iniciar_servidor(
+        0,
+        CatalogoSintetico(args.productos),
+        Fallas(args.latencia, args.jitter, args.errores, args.timeouts, args.cortes,
+               segundos_timeout=25, capacidad=args.capacidad, caida=args.caida,
+               clearance=args.clearance),
+        {**cargar_grabaciones(args.grabaciones), **cargar_fixtures(args.fixtures)}
+    )
+    print(f"🛰️ Servidor local en {servidor.url_base}")
+
+    resultados = []
+    with tempfile.TemporaryDirectory() as salida:
+        # Los reportes de Comun/metricas.py, la historia del
+        # planificador y el historial de precios de los scrapers
+        # medidos no se mezclan con los de las corridas reales
+        os.environ.setdefault("SCRAPER_METRICAS_DIR", os.path.join(salida, "Metricas"))
+        os.environ.setdefault("SCRAPER_PLANIFICACION_DIR", os.path.join(salida, "Planificacion"))
+        os.environ.setdefault("SCRAPER_HISTORIAL_DIR", os.path.join(salida, "Historial"))
+        os.environ.setdefault("SCRAPER_CLEARANCE_DIR", os.path.join(salida, "Clearance"))
+
+        for nombre in args.scrapers.split(","):
+            nombre = nombre.strip()
+            print(f"⏱️ Midiendo {nombre}...")
+            servidor.reiniciar_estadisticas()
+            metricas = correr_scraper(nombre, servidor.url_base, salida, args.verbose)
+            if metricas:
+                metricas["bytes_servidor"] = servidor.bytes_enviados
+                metricas["desafios_servidor"] = servidor.estadisticas.get("falla:desafio", 0)
+                metricas["clearances_emitidas"] = servidor.estadisticas.get("clearance:emitido", 0)
+                metricas["conexiones_servidor"] = servidor.estadisticas.get("conexiones", 0)
+                print(f"🔌 {nombre}: {metricas['conexiones_servidor']} conexiones TCP para "
+                      f"{sum(v for k, v in servidor.estadisticas.items() if k.startswith('/'))} requests")
+                if args.clearance:
+                    print(f"🔑 {nombre}: {metricas['clearances_emitidas']} clearances emitidas, "
+                          f"{metricas['desafios_servidor']} desafíos respondidos")
+                resultados.append(metricas)
+
+    servidor.shutdown()
+    imprimir_tabla(resultados)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(resultados, f, ensure_ascii=False, indent=4)
+        print(f"\n📄 Resultados guardados en {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+import argparse
+import gzip
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+# =========================================================
+# BENCHMARK: SUBIDA DEL CATÁLOGO A CLOUD STORAGE
+# =========================================================
+# Compara, contra el GCS local (servidorGcsLocal.py), la subida
+# anterior del job de Devoto (un storage.Client por llamada y
+# todo el catálogo como un string JSON con indent=4) con la de
+# Comun/almacenamiento.py (NDJSON + gzip en streaming sobre una
+# subida resumable, un objeto por categoría).
+#
+# Mide tiempo, pico de memoria de la subida (tracemalloc) y
+# bytes subidos, y verifica que lo subido se lea igual.
+#
+# Uso:
+#   python benchSubidaGcs.py --productos 50000 --categorias 6 --fallas 0.1
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.abspath(os.path.join(BASE_DIR, ".."))
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+from Benchmarks.servidorGcsLocal import iniciar_servidor_gcs
+
+BUCKET = "bucket-local"
+
+# Chunk chico para que la subida resumable use varios chunks
+# (y las fallas simuladas caigan en el medio)
+CHUNK_BENCH = 256 * 1024
+
+
+def producto_sintetico(i, categoria):
+    # Misma forma que los productos de extraer_productos_categoria
+    return {
+        "idWeb": 100000 + i,
+        "productName": f"Producto sintético número {i} de {categoria}",
+        "productDescription": "",
+        "productBrand": f"Marca {i % 97}",
+        "productPrice": round(10 + (i * 7.31) % 900, 2),
+        "moneda": "UYU",
+        "storeRut": 210297450018,
+        "urlProduct": f"https://www.devoto.com.uy/products/{categoria}/producto-{i}/{100000 + i}",
+        "productImageUrl": f"https://www.devoto.com.uy/imagenes/{100000 + i}.jpg",
+        "categoryName": categoria.capitalize()
+    }
+
+
+def medir(funcion):
+    """
+    Devuelve (resultado, segundos, pico de memoria en MB).
+    """
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    resultado = funcion()
+    segundos = time.perf_counter() - inicio
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return resultado, segundos, pico / 1024 / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de subida a GCS")
+    parser.add_argument("--productos", type=int, default=30000, help="Productos en total")
+    parser.add_argument("--categorias", type=int, default=6)
+    parser.add_argument("--fallas", type=float, default=0, help="Probabilidad de 503 por chunk resumable")
+    args = parser.parse_args()
+
+    servidor = iniciar_servidor_gcs(prob_falla=args.fallas)
+    os.environ["STORAGE_EMULATOR_HOST"] = servidor.url_base
+
+    from google.cloud import storage
+    from Comun.almacenamiento import SubidaNdjsonGz
+
+    nombres = [f"categoria{c}" for c in range(args.categorias)]
+    por_categoria = args.productos // args.categorias
+    categorias = {
+        nombre: [producto_sintetico(c * por_categoria + i, nombre) for i in range(por_categoria)]
+        for c, nombre in enumerate(nombres)
+    }
+    todos = [p for productos in categorias.values() for p in productos]
+
+    # Subida anterior: todo junto al final, un cliente por llamada
+    def anterior():
+        client = storage.Client()
+        blob = client.bucket(BUCKET).blob("pendientes/productos_devoto.json")
+        blob.upload_from_string(
+            data=json.dumps(todos, ensure_ascii=False, indent=4),
+            content_type="application/json"
+        )
+        return int(blob.size or 0)
+
+    # Subida nueva: un objeto .ndjson.gz por categoría
+    def streaming():
+        subidos = 0
+        for nombre, productos in categorias.items():
+            with SubidaNdjsonGz(BUCKET, f"pendientes/productos_devoto_bench_{nombre}.ndjson.gz",
+                                chunk_size=CHUNK_BENCH) as subida:
+                for producto in productos:
+                    subida.escribir(producto)
+            subidos += int(servidor.almacen.leer(BUCKET, subida.ruta)[1]["size"])
+        return subidos
+
+    print(f"🧪 {len(todos)} productos en {args.categorias} categorías (GCS local en {servidor.url_base})")
+    bytes_anterior, seg_anterior, pico_anterior = medir(anterior)
+    bytes_streaming, seg_streaming, pico_streaming = medir(streaming)
+
+    print(f"\n{'Subida':<12}{'Segundos':>10}{'Pico MB':>10}{'MB subidos':>12}")
+    print(f"{'anterior':<12}{seg_anterior:>10.2f}{pico_anterior:>10.1f}{bytes_anterior / 1024 / 1024:>12.2f}")
+    print(f"{'streaming':<12}{seg_streaming:>10.2f}{pico_streaming:>10.1f}{bytes_streaming / 1024 / 1024:>12.2f}")
+    if args.fallas:
+        print(f"\n⚠️ Chunks rechazados por el servidor (y reenviados): {servidor.fallas}")
+
+    # Verificación: lo subido se lee igual que lo generado
+    leidos = []
+    for nombre in nombres:
+        contenido, _ = servidor.almacen.leer(BUCKET, f"pendientes/productos_devoto_bench_{nombre}.ndjson.gz")
+        leidos.extend(json.loads(linea) for linea in gzip.decompress(contenido).splitlines())
+    ok = leidos == todos
+    print(f"\n{'✅' if ok else '❌'} Verificación: {len(leidos)} productos leídos de los objetos .ndjson.gz")
+    servidor.shutdown()
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+import argparse
+import gzip
+import json
+import os
+import sys
+import time
+
+# =========================================================
+# BENCHMARK: TAMAÑO Y DECODIFICACIÓN DE PÁGINAS DE TATA
+# =========================================================
+# Compara, sobre respuestas de ProductsQuery grabadas en disco,
+# la respuesta completa contra la selección mínima de campos
+# (QUERY_MINIMA del scraper).
+#
+# Mide por cada 1.000 productos:
+# - bytes sin comprimir
+# - bytes con gzip (lo que viaja con compresión)
+# - tiempo de json.loads
+#
+# Uso:
+#   python benchTataPayload.py --respuestas DIR
+#   python benchTataPayload.py --respuestas DIR --grabar 5   (graba 5 páginas reales)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.abspath(os.path.join(BASE_DIR, ".."))
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+from Comun.scrapers import cargar_scraper
+
+# Campos que lee nodo_a_producto (misma forma que QUERY_MINIMA)
+CAMPOS_NODO = {
+    "slug": None,
+    "name": None,
+    "gtin": None,
+    "brand": {"name": None},
+    "image": {"url": None},
+    "offers": {"priceCurrency": None, "offers": {"price": None}}
+}
+
+# Cantidad de repeticiones para medir json.loads
+REPETICIONES = 20
+
+
+def proyectar(valor, campos):
+    """
+    Deja en `valor` solo los campos de `campos`.
+    Las listas se proyectan elemento por elemento.
+    """
+    if campos is None:
+        return valor
+    if isinstance(valor, list):
+        return [proyectar(v, campos) for v in valor]
+    if not isinstance(valor, dict):
+        return valor
+    return {k: proyectar(valor[k], sub) for k, sub in campos.items() if k in valor}
+
+
+def recortar_respuesta(data):
+    """
+    Devuelve la respuesta como quedaría con la selección mínima.
+    """
+    products = data.get("data", {}).get("search", {}).get("products", {})
+    return {"data": {"search": {"products": {
+        "pageInfo": {"totalCount": products.get("pageInfo", {}).get("totalCount")},
+        "edges": [
+            {"node": proyectar(e.get("node", {}), CAMPOS_NODO)}
+            for e in products.get("edges", [])
+        ]
+    }}}}
+
+
+def medir(texto):
+    """
+    Devuelve (bytes, bytes_gzip, segundos de json.loads).
+    """
+    crudo = texto.encode("utf-8")
+    comprimido = gzip.compress(crudo, compresslevel=6)
+
+    mejor = float("inf")
+    for _ in range(REPETICIONES):
+        inicio = time.perf_counter()
+        json.loads(texto)
+        mejor = min(mejor, time.perf_counter() - inicio)
+
+    return len(crudo), len(comprimido), mejor
+
+
+def grabar_paginas(directorio, cantidad, categoria):
+    """
+    Descarga `cantidad` páginas reales de ProductsQuery (modo completo)
+    y las guarda como archivos JSON en `directorio`.
+    """
+    tata = cargar_scraper("tata")
+    os.makedirs(directorio, exist_ok=True)
+
+    for n in range(cantidad):
+        variables = tata.armar_variables(categoria, None, n * tata.PAGE_SIZE)
+        params = {
+            "operationName": "ProductsQuery",
+            "variables": json.dumps(variables)
+        }
+        res = tata.sesion.get(tata.GRAPHQL_URL, params=params)
+        ruta = os.path.join(directorio, f"tata_{categoria}_{n:03d}.json")
+        with open(ruta, "w", encoding="utf-8") as f:
+            f.write(res.text)
+        print(f"💾 Grabada {ruta} ({len(res.content)} bytes)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de payload de Tata")
+    parser.add_argument("--respuestas", required=True, help="Carpeta con respuestas grabadas")
+    parser.add_argument("--grabar", type=int, default=0, help="Páginas reales a grabar antes de medir")
+    parser.add_argument("--categoria", default="Almacen")
+    args = parser.parse_args()
+
+    if args.grabar:
+        grabar_paginas(args.respuestas, args.grabar, args.categoria)
+
+    archivos = sorted(
+        os.path.join(args.respuestas, f)
+        for f in os.listdir(args.respuestas)
+        if f.endswith(".json")
+    )
+    if not archivos:
+        print("❌ No hay respuestas grabadas")
+        return
+
+    totales = {
+        "completa": [0, 0, 0.0],
+        "minima": [0, 0, 0.0]
+    }
+    productos = 0
+
+    for ruta in archivos:
+        with open(ruta, "r", encoding="utf-8") as f:
+            texto = f.read()
+
+        data = json.loads(texto)
+        productos += len(
+            data.get("data", {}).get("search", {}).get("products", {}).get("edges", [])
+        )
+
+        recortado = json.dumps(recortar_respuesta(data), ensure_ascii=False, separators=(",", ":"))
+
+        for modo, contenido in (("completa", texto), ("minima", recortado)):
+            b, bz, seg = medir(contenido)
+            totales[modo][0] += b
+            totales[modo][1] += bz
+            totales[modo][2] += seg
+
+    if not productos:
+        print("❌ Las respuestas no tienen productos")
+        return
+
+    factor = 1000 / productos
+
+    print(f"📊 {len(archivos)} páginas, {productos} productos (valores cada 1.000 productos)")
+    print(f"{'modo':<10}{'KB':>12}{'KB gzip':>12}{'decode ms':>12}")
+    for modo, (b, bz, seg) in totales.items():
+        print(f"{modo:<10}{b * factor / 1024:>12.1f}{bz * factor / 1024:>12.1f}{seg * factor * 1000:>12.2f}")
+
+    completa, minima = totales["completa"], totales["minima"]
+    print(f"\n📉 Ahorro de bytes gzip: {100 * (1 - minima[1] / completa[1]):.1f}%")
+    print(f"⚡ Ahorro en decode: {100 * (1 - minima[2] / completa[2]):.1f}%")
+
+
+if __name__ == "__main__":
+    main()
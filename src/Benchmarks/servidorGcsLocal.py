@@ -0,0 +1,354 @@
+import argparse
+import base64
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, quote, unquote, urlsplit
+
+# Viene con google-cloud-storage (el cliente valida crc32c)
+import google_crc32c
+
+# =========================================================
+# SERVIDOR LOCAL QUE IMITA A GOOGLE CLOUD STORAGE
+# =========================================================
+# Implementa la parte de la API JSON de GCS que usan los jobs
+# (subidas simples, multipart y resumables, listado, descarga
+# con Range, copia/rewrite y borrado con precondiciones de
+# generación), con los objetos en memoria. El cliente oficial lo usa con:
+#
+#   STORAGE_EMULATOR_HOST=http://127.0.0.1:4443
+#
+# Con --fallas se devuelve 503 a una parte de los chunks de
+# las subidas resumables, para probar que se retoman.
+#
+# Uso:
+#   python servidorGcsLocal.py --puerto 4443 --fallas 0.1
+
+RUTA_UPLOAD = re.compile(r"^/upload/storage/v1/b/([^/]+)/o$")
+RUTA_LISTADO = re.compile(r"^/storage/v1/b/([^/]+)/o$")
+RUTA_OBJETO = re.compile(r"^(?:/download)?/storage/v1/b/([^/]+)/o/([^/]+)$")
+RUTA_COPIA = re.compile(r"^/storage/v1/b/([^/]+)/o/([^/]+)/(copyTo|rewriteTo)/b/([^/]+)/o/([^/]+)$")
+RUTA_BUCKET = re.compile(r"^/storage/v1/b/([^/]+)$")
+CONTENT_RANGE = re.compile(r"bytes (?:(\d+)-(\d+)|\*)/(\d+|\*)")
+
+
+class AlmacenGcs:
+    """
+    Objetos y sesiones de subida en memoria, seguro entre hilos.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # (bucket, nombre) → (contenido, metadata)
+        self.objetos = {}
+        # upload_id → {"bucket", "metadata", "datos"}
+        self.sesiones = {}
+        self._generacion = 0
+
+    def guardar(self, bucket, nombre, contenido, metadata=None):
+        with self._lock:
+            self._generacion += 1
+            ahora = time.strftime("%Y-%m-%dT%H:%M:%S.000Z", time.gmtime())
+            recurso = {
+                "kind": "storage#object",
+                "id": f"{bucket}/{nombre}/{self._generacion}",
+                "bucket": bucket,
+                "name": nombre,
+                "size": str(len(contenido)),
+                "contentType": (metadata or {}).get("contentType", "application/octet-stream"),
+                "generation": str(self._generacion),
+                "metageneration": "1",
+                "md5Hash": base64.b64encode(hashlib.md5(contenido).digest()).decode(),
+                "crc32c": base64.b64encode(google_crc32c.value(contenido).to_bytes(4, "big")).decode(),
+                "timeCreated": ahora,
+                "updated": ahora
+            }
+            self.objetos[(bucket, nombre)] = (contenido, recurso)
+            return recurso
+
+    def leer(self, bucket, nombre):
+        with self._lock:
+            return self.objetos.get((bucket, nombre))
+
+    def borrar(self, bucket, nombre):
+        with self._lock:
+            return self.objetos.pop((bucket, nombre), None) is not None
+
+    def listar(self, bucket, prefijo=""):
+        with self._lock:
+            return sorted(
+                (recurso for (b, n), (_, recurso) in self.objetos.items()
+                 if b == bucket and n.startswith(prefijo)),
+                key=lambda r: r["name"]
+            )
+
+    def abrir_sesion(self, bucket, metadata):
+        upload_id = "%032x" % random.getrandbits(128)
+        with self._lock:
+            self.sesiones[upload_id] = {"bucket": bucket, "metadata": metadata, "datos": bytearray()}
+        return upload_id
+
+
+class ManejadorGcs(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, formato, *args):
+        pass
+
+    # -----------------------------------------------------
+    # RESPUESTAS
+    # -----------------------------------------------------
+    def enviar(self, status, cuerpo=b"", headers=None):
+        if isinstance(cuerpo, (dict, list)):
+            cuerpo = json.dumps(cuerpo).encode("utf-8")
+            headers = {"Content-Type": "application/json", **(headers or {})}
+        self.send_response(status)
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.send_header("Content-Length", str(len(cuerpo)))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(cuerpo)
+
+    def error(self, status, mensaje):
+        self.enviar(status, {"error": {"code": status, "message": mensaje}})
+
+    def leer_cuerpo(self):
+        largo = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(largo) if largo else b""
+
+    def partes(self):
+        partes = urlsplit(self.path)
+        query = {k: v[0] for k, v in parse_qs(partes.query).items()}
+        return partes.path, query
+
+    # -----------------------------------------------------
+    # MÉTODOS
+    # -----------------------------------------------------
+    def do_GET(self):
+        path, query = self.partes()
+        almacen = self.server.almacen
+
+        m = RUTA_LISTADO.match(path)
+        if m:
+            items = almacen.listar(m.group(1), query.get("prefix", ""))
+            # Paginado simple: pageToken es el índice de inicio
+            inicio = int(query.get("pageToken") or 0)
+            cantidad = int(query.get("maxResults") or 1000)
+            respuesta = {"kind": "storage#objects", "items": items[inicio:inicio + cantidad]}
+            if inicio + cantidad < len(items):
+                respuesta["nextPageToken"] = str(inicio + cantidad)
+            self.enviar(200, respuesta)
+            return
+
+        m = RUTA_OBJETO.match(path)
+        if m:
+            objeto = almacen.leer(m.group(1), unquote(m.group(2)))
+            if objeto is None:
+                self.error(404, "No such object")
+                return
+            contenido, recurso = objeto
+            if query.get("alt") != "media":
+                self.enviar(200, recurso)
+                return
+            self.enviar_contenido(contenido, recurso)
+            return
+
+        m = RUTA_BUCKET.match(path)
+        if m:
+            self.enviar(200, {"kind": "storage#bucket", "name": m.group(1), "id": m.group(1)})
+            return
+
+        self.error(404, "Not found")
+
+    def enviar_contenido(self, contenido, recurso):
+        headers = {
+            "Content-Type": recurso["contentType"],
+            "X-Goog-Generation": recurso["generation"]
+        }
+        rango = re.match(r"bytes=(\d+)-(\d*)", self.headers.get("Range") or "")
+        if rango:
+            inicio = int(rango.group(1))
+            fin = min(int(rango.group(2)) if rango.group(2) else len(contenido) - 1, len(contenido) - 1)
+            if inicio >= len(contenido):
+                self.enviar(416, b"", {"Content-Range": f"bytes */{len(contenido)}"})
+                return
+            headers["Content-Range"] = f"bytes {inicio}-{fin}/{len(contenido)}"
+            self.enviar(206, contenido[inicio:fin + 1], headers)
+            return
+        headers["X-Goog-Hash"] = f"crc32c={recurso['crc32c']},md5={recurso['md5Hash']}"
+        self.enviar(200, contenido, headers)
+
+    def do_POST(self):
+        path, query = self.partes()
+        cuerpo = self.leer_cuerpo()
+        almacen = self.server.almacen
+
+        m = RUTA_UPLOAD.match(path)
+        if m:
+            self.subida(m.group(1), query, cuerpo)
+            return
+
+        m = RUTA_COPIA.match(path)
+        if m:
+            origen, nombre, operacion, destino, nombre_destino = m.groups()
+            objeto = almacen.leer(origen, unquote(nombre))
+            if objeto is None:
+                self.error(404, "No such object")
+                return
+            contenido, recurso = objeto
+            if not self.precondicion(query.get("ifSourceGenerationMatch"), recurso):
+                return
+            nuevo = almacen.guardar(destino, unquote(nombre_destino), contenido, recurso)
+            if operacion == "copyTo":
+                self.enviar(200, nuevo)
+            else:
+                self.enviar(200, {
+                    "kind": "storage#rewriteResponse",
+                    "totalBytesRewritten": nuevo["size"],
+                    "objectSize": nuevo["size"],
+                    "done": True,
+                    "resource": nuevo
+                })
+            return
+
+        self.error(404, "Not found")
+
+    def subida(self, bucket, query, cuerpo):
+        almacen = self.server.almacen
+        tipo = query.get("uploadType")
+
+        if tipo == "media":
+            recurso = almacen.guardar(bucket, query["name"], cuerpo, {"contentType": self.headers.get("Content-Type")})
+            self.enviar(200, recurso)
+            return
+
+        if tipo == "multipart":
+            frontera = re.search(r'boundary="?([^";]+)"?', self.headers.get("Content-Type", "")).group(1)
+            partes = cuerpo.split(b"--" + frontera.encode())
+            # partes[1] = metadata JSON, partes[2] = contenido
+            _, metadata = partes[1].split(b"\r\n\r\n", 1)
+            _, contenido = partes[2].split(b"\r\n\r\n", 1)
+            metadata = json.loads(metadata)
+            recurso = almacen.guardar(bucket, metadata.get("name") or query["name"], contenido[:-2], metadata)
+            self.enviar(200, recurso)
+            return
+
+        if tipo == "resumable":
+            metadata = json.loads(cuerpo or b"{}")
+            metadata.setdefault("name", query.get("name"))
+            metadata.setdefault("contentType", self.headers.get("X-Upload-Content-Type"))
+            upload_id = almacen.abrir_sesion(bucket, metadata)
+            ubicacion = f"{self.server.url_base}/upload/storage/v1/b/{quote(bucket)}/o?uploadType=resumable&upload_id={upload_id}"
+            self.enviar(200, b"", {"Location": ubicacion})
+            return
+
+        self.error(400, f"uploadType no soportado: {tipo}")
+
+    def do_PUT(self):
+        path, query = self.partes()
+        cuerpo = self.leer_cuerpo()
+        almacen = self.server.almacen
+
+        sesion = almacen.sesiones.get(query.get("upload_id"))
+        if not RUTA_UPLOAD.match(path) or sesion is None:
+            self.error(404, "No such upload")
+            return
+
+        # Falla simulada: el chunk no se guarda y el cliente
+        # tiene que consultar el estado y reenviarlo
+        if cuerpo and random.random() < self.server.prob_falla:
+            self.server.fallas += 1
+            self.error(503, "Falla simulada")
+            return
+
+        m = CONTENT_RANGE.match(self.headers.get("Content-Range") or "bytes */*")
+        datos = sesion["datos"]
+        if m and m.group(1) is not None:
+            inicio = int(m.group(1))
+            if inicio > len(datos):
+                self.error(400, "Chunk fuera de orden")
+                return
+            del datos[inicio:]
+            datos.extend(cuerpo)
+
+        total = m.group(3) if m else "*"
+        if total != "*" and len(datos) == int(total):
+            almacen.sesiones.pop(query["upload_id"], None)
+            metadata = sesion["metadata"]
+            self.enviar(200, almacen.guardar(sesion["bucket"], metadata["name"], bytes(datos), metadata))
+            return
+
+        headers = {"Range": f"bytes=0-{len(datos) - 1}"} if datos else {}
+        self.enviar(308, b"", headers)
+
+    def do_DELETE(self):
+        path, query = self.partes()
+        m = RUTA_OBJETO.match(path)
+        objeto = self.server.almacen.leer(m.group(1), unquote(m.group(2))) if m else None
+        if objeto is None:
+            self.error(404, "No such object")
+            return
+        if not self.precondicion(query.get("ifGenerationMatch"), objeto[1]):
+            return
+        self.server.almacen.borrar(m.group(1), unquote(m.group(2)))
+        self.enviar(204)
+
+    def precondicion(self, generacion, recurso):
+        """
+        ifGenerationMatch / ifSourceGenerationMatch: si no
+        coincide la generación responde 412 y devuelve False.
+        """
+        if generacion is not None and generacion != recurso["generation"]:
+            self.error(412, "Precondition Failed")
+            return False
+        return True
+
+
+class ServidorGcsLocal(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, direccion, prob_falla=0):
+        super().__init__(direccion, ManejadorGcs)
+        self.almacen = AlmacenGcs()
+        self.prob_falla = prob_falla
+        self.fallas = 0
+
+    @property
+    def url_base(self):
+        host, puerto = self.server_address[:2]
+        return f"http://{host}:{puerto}"
+
+
+def iniciar_servidor_gcs(puerto=0, prob_falla=0):
+    """
+    Levanta el servidor en un hilo de fondo y lo devuelve.
+    Con puerto=0 se elige un puerto libre (ver servidor.url_base).
+    """
+    servidor = ServidorGcsLocal(("127.0.0.1", puerto), prob_falla)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor local que imita a Google Cloud Storage")
+    parser.add_argument("--puerto", type=int, default=4443)
+    parser.add_argument("--fallas", type=float, default=0, help="Probabilidad de 503 por chunk resumable")
+    args = parser.parse_args()
+
+    servidor = iniciar_servidor_gcs(args.puerto, args.fallas)
+    print(f"🪣 GCS local escuchando en {servidor.url_base} (STORAGE_EMULATOR_HOST={servidor.url_base})")
+
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        servidor.shutdown()
+
+
+if __name__ == "__main__":
+    main()
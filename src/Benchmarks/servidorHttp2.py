@@ -0,0 +1,297 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import ssl
+import subprocess
+import sys
+import tempfile
+import threading
+from urllib.parse import urlsplit
+
+from h2.config import H2Configuration
+from h2.connection import H2Connection
+from h2.events import ConnectionTerminated, DataReceived, RequestReceived, StreamEnded, StreamReset, WindowUpdated
+from h2.exceptions import ProtocolError, StreamClosedError
+from h2.settings import SettingCodes
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.abspath(os.path.join(BASE_DIR, ".."))
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+from Benchmarks.servidorLocal import RESPONDEDORES, CatalogoSintetico
+
+# =========================================================
+# SERVIDOR LOCAL CON HTTP/2
+# =========================================================
+# Variante de servidorLocal.py que habla HTTP/2 (y HTTP/1.1
+# keep-alive) sobre TLS, con el mismo catálogo sintético.
+# El protocolo se negocia por ALPN, como en un sitio real:
+# con --solo-http1 el servidor no ofrece "h2" y los clientes
+# HTTP/2 tienen que caer a HTTP/1.1.
+#
+# El certificado es autofirmado (lo genera openssl en una
+# carpeta temporal); los clientes lo usan como CA.
+#
+# GET /__estadisticas devuelve (y reinicia) los contadores de
+# conexiones y requests por protocolo, para medirlo desde
+# otro proceso (benchHttp2.py lo corre aparte, así el cliente
+# y el servidor no comparten el GIL).
+#
+# Requiere: pip install h2
+#
+# Uso:
+#   python servidorHttp2.py --puerto 8443 --latencia 30
+
+# Streams simultáneos que acepta cada conexión HTTP/2
+# (nginx y Cloudflare anuncian entre 100 y 256)
+MAX_STREAMS = 128
+
+# Ventana de control de flujo que se le da al cliente
+VENTANA_INICIAL = 1 << 20
+
+# Contadores del servidor (no cuenta como request)
+RUTA_ESTADISTICAS = "/__estadisticas"
+
+# Línea que imprime al arrancar con --anunciar
+PREFIJO_LISTO = "LISTO "
+
+
+def generar_certificado(carpeta):
+    """
+    Certificado autofirmado para 127.0.0.1. Devuelve (cert, clave).
+    """
+    cert, clave = os.path.join(carpeta, "cert.pem"), os.path.join(carpeta, "clave.pem")
+    subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+         "-subj", "/CN=127.0.0.1", "-addext", "subjectAltName=IP:127.0.0.1",
+         "-keyout", clave, "-out", cert],
+        check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    return cert, clave
+
+
+class ServidorHttp2:
+    """
+    Servidor asyncio en un hilo de fondo. Cuenta conexiones y
+    requests por protocolo en `estadisticas`.
+    """
+
+    def __init__(self, catalogo=None, latencia_ms=0, jitter_ms=0, solo_http1=False, puerto=0):
+        self.catalogo = catalogo or CatalogoSintetico()
+        self.latencia_ms = latencia_ms
+        self.jitter_ms = jitter_ms
+        self.solo_http1 = solo_http1
+        self.puerto = puerto
+        self._carpeta = tempfile.TemporaryDirectory()
+        self.cert, self.clave = generar_certificado(self._carpeta.name)
+        self.estadisticas = {}
+        self._loop = None
+        self._servidor = None
+        self._listo = threading.Event()
+
+    # -----------------------------------------------------
+    # ARRANQUE
+    # -----------------------------------------------------
+    def iniciar(self):
+        threading.Thread(target=self._correr, daemon=True).start()
+        self._listo.wait()
+        return self
+
+    def _correr(self):
+        self._loop = asyncio.new_event_loop()
+        contexto = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+        contexto.load_cert_chain(self.cert, self.clave)
+        contexto.set_alpn_protocols(["http/1.1"] if self.solo_http1 else ["h2", "http/1.1"])
+
+        async def arrancar():
+            self._servidor = await asyncio.start_server(
+                self._atender, "127.0.0.1", self.puerto, ssl=contexto, backlog=512
+            )
+            self.puerto = self._servidor.sockets[0].getsockname()[1]
+            self._listo.set()
+
+        self._loop.run_until_complete(arrancar())
+        self._loop.run_forever()
+
+    def detener(self):
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._servidor.close)
+            self._loop.call_soon_threadsafe(self._loop.stop)
+        self._carpeta.cleanup()
+
+    @property
+    def url_base(self):
+        return f"https://127.0.0.1:{self.puerto}"
+
+    def contar(self, clave):
+        self.estadisticas[clave] = self.estadisticas.get(clave, 0) + 1
+
+    def reiniciar_estadisticas(self):
+        self.estadisticas = {}
+
+    # -----------------------------------------------------
+    # RESPUESTAS
+    # -----------------------------------------------------
+    async def _respuesta(self, path):
+        if path == RUTA_ESTADISTICAS:
+            estadisticas, self.estadisticas = self.estadisticas, {}
+            return 200, {"Content-Type": "application/json"}, json.dumps(estadisticas).encode("utf-8")
+        demora = max(0.0, self.latencia_ms + random.uniform(-self.jitter_ms, self.jitter_ms)) / 1000
+        if demora:
+            await asyncio.sleep(demora)
+        partes = urlsplit(path)
+        for respondedor in RESPONDEDORES:
+            respuesta = respondedor(self.catalogo, partes.path, partes.query)
+            if respuesta:
+                status, headers, body = respuesta
+                return status, headers, body.encode("utf-8") if isinstance(body, str) else body
+        return 404, {"Content-Type": "text/plain"}, b"no encontrada"
+
+    async def _atender(self, reader, writer):
+        protocolo = writer.get_extra_info("ssl_object").selected_alpn_protocol()
+        self.contar(f"conexiones:{protocolo or 'http/1.1'}")
+        try:
+            if protocolo == "h2":
+                await _ConexionH2(self, reader, writer).atender()
+            else:
+                await self._atender_http1(reader, writer)
+        except (ConnectionError, asyncio.IncompleteReadError, ssl.SSLError):
+            pass
+        finally:
+            writer.close()
+
+    async def _atender_http1(self, reader, writer):
+        """
+        HTTP/1.1 keep-alive mínimo: un request por vez.
+        """
+        while True:
+            try:
+                cabecera = await reader.readuntil(b"\r\n\r\n")
+            except asyncio.IncompleteReadError:
+                return
+            lineas = cabecera.decode("latin-1").split("\r\n")
+            _, path, _ = lineas[0].split(" ", 2)
+            headers = dict(linea.split(": ", 1) for linea in lineas[1:] if ": " in linea)
+            largo = int(headers.get("Content-Length") or headers.get("content-length") or 0)
+            if largo:
+                await reader.readexactly(largo)
+
+            if path != RUTA_ESTADISTICAS:
+                self.contar("requests:HTTP/1.1")
+            status, extra, body = await self._respuesta(path)
+            salida = [f"HTTP/1.1 {status} OK", f"Content-Length: {len(body)}"]
+            salida += [f"{k}: {v}" for k, v in extra.items() if k.lower() != "content-length"]
+            writer.write(("\r\n".join(salida) + "\r\n\r\n").encode("latin-1") + body)
+            await writer.drain()
+
+
+class _ConexionH2:
+    """
+    Una conexión HTTP/2: cada stream se atiende en su propia
+    tarea y los DATA respetan el control de flujo.
+    """
+
+    def __init__(self, servidor, reader, writer):
+        self.servidor = servidor
+        self.reader = reader
+        self.writer = writer
+        self.conexion = H2Connection(config=H2Configuration(client_side=False, header_encoding="utf-8"))
+        self._ventana = asyncio.Event()
+
+    async def atender(self):
+        self.conexion.initiate_connection()
+        self.conexion.update_settings({
+            SettingCodes.MAX_CONCURRENT_STREAMS: MAX_STREAMS,
+            SettingCodes.INITIAL_WINDOW_SIZE: VENTANA_INICIAL
+        })
+        await self._enviar()
+
+        tareas = set()
+        while True:
+            datos = await self.reader.read(65536)
+            if not datos:
+                break
+            try:
+                eventos = self.conexion.receive_data(datos)
+            except ProtocolError:
+                break
+            for evento in eventos:
+                if isinstance(evento, RequestReceived):
+                    headers = dict(evento.headers)
+                    tarea = asyncio.ensure_future(self._responder(evento.stream_id, headers[":path"]))
+                    tareas.add(tarea)
+                    tarea.add_done_callback(tareas.discard)
+                elif isinstance(evento, DataReceived):
+                    self.conexion.acknowledge_received_data(evento.flow_controlled_length, evento.stream_id)
+                elif isinstance(evento, (WindowUpdated, StreamReset)):
+                    self._ventana.set()
+                elif isinstance(evento, ConnectionTerminated):
+                    return
+                elif isinstance(evento, StreamEnded):
+                    pass
+            await self._enviar()
+
+        for tarea in tareas:
+            tarea.cancel()
+
+    async def _responder(self, stream_id, path):
+        if path != RUTA_ESTADISTICAS:
+            self.servidor.contar("requests:HTTP/2")
+        status, extra, body = await self.servidor._respuesta(path)
+        headers = [(":status", str(status)), ("content-length", str(len(body)))]
+        headers += [(k.lower(), v) for k, v in extra.items() if k.lower() != "content-length"]
+        try:
+            self.conexion.send_headers(stream_id, headers)
+            while body:
+                ventana = min(
+                    self.conexion.local_flow_control_window(stream_id),
+                    self.conexion.max_outbound_frame_size
+                )
+                if ventana <= 0:
+                    self._ventana.clear()
+                    await self._enviar()
+                    await self._ventana.wait()
+                    continue
+                self.conexion.send_data(stream_id, body[:ventana])
+                body = body[ventana:]
+            self.conexion.end_stream(stream_id)
+        except (StreamClosedError, ProtocolError):
+            # El cliente cerró el stream o la conexión
+            return
+        await self._enviar()
+
+    async def _enviar(self):
+        datos = self.conexion.data_to_send()
+        if datos:
+            self.writer.write(datos)
+            await self.writer.drain()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor local HTTP/2 que imita a las tiendas")
+    parser.add_argument("--puerto", type=int, default=8443)
+    parser.add_argument("--productos", type=int, default=200, help="Productos por departamento")
+    parser.add_argument("--latencia", type=float, default=0, help="Latencia en ms")
+    parser.add_argument("--jitter", type=float, default=0, help="Jitter en ms")
+    parser.add_argument("--solo-http1", action="store_true", help="No ofrecer h2 por ALPN")
+    parser.add_argument("--anunciar", help=argparse.SUPPRESS, action="store_true")
+    args = parser.parse_args()
+
+    servidor = ServidorHttp2(
+        CatalogoSintetico(args.productos), args.latencia, args.jitter, args.solo_http1, args.puerto
+    ).iniciar()
+    if args.anunciar:
+        print(PREFIJO_LISTO + json.dumps({"url": servidor.url_base, "cert": servidor.cert}), flush=True)
+    else:
+        print(f"🛰️ Servidor HTTP/2 escuchando en {servidor.url_base} (CA: {servidor.cert})")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        servidor.detener()
+
+
+if __name__ == "__main__":
+    main()
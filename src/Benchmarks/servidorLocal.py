@@ -0,0 +1,759 @@
+import argparse
+import gzip
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, parse_qsl, unquote, urlencode, urlsplit
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.abspath(os.path.join(BASE_DIR, ".."))
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+from Comun.grabacion import AlmacenGrabaciones
+
+# =========================================================
+# SERVIDOR HTTP LOCAL QUE REEMPLAZA A LAS TIENDAS
+# =========================================================
+# Imita los endpoints que usan los scrapers de Géant (VTEX),
+# Tata (GraphQL + facetas) y Tienda Inglesa (HTML), para poder
+# medirlos sin salir a internet.
+#
+# Las respuestas salen de:
+# 1. Fixtures o grabaciones (Comun/grabacion.py) en disco
+# 2. Un catálogo sintético determinístico (si no hay fixture)
+#
+# Se le puede agregar latencia, jitter y fallas (errores 503 o
+# 429, timeouts y conexiones cortadas) para simular un sitio real.
+# Con --capacidad el servidor se comporta como un sitio con
+# límite: por encima de esa cantidad de requests simultáneos
+# la latencia crece en proporción, y por encima de
+# EXCESO_BLOQUEO × capacidad responde desafíos de Cloudflare.
+#
+# Uso:
+#   python servidorLocal.py --puerto 8765 --latencia 30 --jitter 10 --errores 0.02
+#   python servidorLocal.py --latencia 50 --capacidad 12
+#   python servidorLocal.py --errores 0.05 --caida 5:20
+#   python servidorLocal.py --errores 0.1 --status-error 429
+#   python servidorLocal.py --clearance 60
+#
+# Con --clearance SEGUNDOS imita un sitio detrás de un desafío
+# de Cloudflare: pedir "/" equivale a resolverlo (entrega una
+# cookie cf_clearance que dura SEGUNDOS) y cualquier otro
+# request sin una cookie vigente recibe el desafío.
+
+# Departamentos que existen en el catálogo sintético
+DEPARTAMENTOS = [
+    "Almacen",
+    "Frescos",
+    "Congelados",
+    "Limpieza",
+    "Bebidas",
+    "Perfumeria",
+    "Bebes",
+    "Papeleria",
+    "Ferreteria"
+]
+
+# Subcategorías sintéticas por departamento
+SUBCATEGORIAS = ["sub-a", "sub-b", "sub-c", "sub-d"]
+
+# Máximo offset que devuelve la búsqueda de VTEX
+LIMITE_OFFSET_VTEX = 2500
+
+# Productos por página en los listados de Tienda Inglesa
+PRODUCTOS_POR_PAGINA_TIENDA = 24
+
+# Con capacidad: requests simultáneos (× capacidad) desde los
+# que se responde un desafío en lugar del contenido
+EXCESO_BLOQUEO = 2
+
+# Página de desafío que devuelve un sitio detrás de Cloudflare
+PAGINA_DESAFIO = "<html><head><title>Just a moment...</title></head><body>challenge-platform</body></html>"
+
+
+# =========================================================
+# CATÁLOGO SINTÉTICO
+# =========================================================
+class CatalogoSintetico:
+    """
+    Genera productos falsos pero estables: la misma semilla
+    devuelve siempre los mismos productos, precios y GTINs.
+    """
+
+    def __init__(self, productos_por_categoria=200, semilla=1):
+        self.productos_por_categoria = productos_por_categoria
+        self.semilla = semilla
+
+    @lru_cache(maxsize=None)
+    def productos(self, departamento):
+        """
+        Devuelve la lista de productos de un departamento.
+        Cada producto pertenece a una subcategoría.
+        """
+        depto = departamento.lower()
+        rnd = random.Random(f"{self.semilla}-{depto}")
+        base_id = 1000 + DEPARTAMENTOS.index(departamento) * 100000
+
+        productos = []
+        for i in range(self.productos_por_categoria):
+            productos.append({
+                "id": base_id + i,
+                "slug": f"{depto}-producto-{i}",
+                "nombre": f"{departamento} Producto {i}",
+                "marca": f"Marca {rnd.randint(1, 40)}",
+                "sub": SUBCATEGORIAS[i % len(SUBCATEGORIAS)],
+                "precio": round(rnd.uniform(10, 5000), 2),
+                "gtin": str(7730000000000 + base_id + i)
+            })
+
+        return productos
+
+    def departamento(self, nombre):
+        """
+        Busca un departamento por nombre o slug (sin importar mayúsculas).
+        """
+        for depto in DEPARTAMENTOS:
+            if depto.lower() == (nombre or "").lower():
+                return depto
+        return None
+
+    def compartidos(self, departamento):
+        """
+        Productos del departamento anterior que también se listan
+        en este (para probar la deduplicación entre categorías).
+        """
+        i = DEPARTAMENTOS.index(departamento)
+        if i == 0:
+            return []
+        return self.productos(DEPARTAMENTOS[i - 1])[:5]
+
+    def listado(self, departamento, sub=None):
+        productos = self.productos(departamento) + self.compartidos(departamento)
+        if sub:
+            productos = [p for p in productos if p["sub"] == sub]
+        return productos
+
+    def por_slug(self, slug):
+        for depto in DEPARTAMENTOS:
+            if slug.startswith(depto.lower() + "-"):
+                for p in self.productos(depto):
+                    if p["slug"] == slug:
+                        return p
+        return None
+
+    def por_id(self, producto_id):
+        for depto in DEPARTAMENTOS:
+            productos = self.productos(depto)
+            inicio = productos[0]["id"] if productos else 0
+            if inicio <= producto_id < inicio + len(productos):
+                return productos[producto_id - inicio]
+        return None
+
+
+def json_ld(producto, tienda):
+    """
+    Arma el bloque Schema.org de la página de detalle.
+    """
+    data = {
+        "@context": "https://schema.org",
+        "@type": "Product",
+        "name": producto["nombre"],
+        "description": f"Descripción de {producto['nombre']}",
+        "brand": {"@type": "Brand", "name": producto["marca"]},
+        "image": [f"https://img.local/{producto['slug']}.jpg"],
+        "gtin": producto["gtin"],
+        "gtin13": producto["gtin"],
+        "productId": str(producto["id"]),
+        "offers": {
+            "@type": "AggregateOffer" if tienda == "geant" else "Offer",
+            "lowPrice": producto["precio"],
+            "price": producto["precio"],
+            "priceCurrency": "UYU"
+        }
+    }
+    return (
+        "<html><head><title>" + producto["nombre"] + "</title>"
+        '<script type="application/ld+json">' + json.dumps(data, ensure_ascii=False) + "</script>"
+        "</head><body>" + ("<div class='relleno'>texto</div>" * 200) + "</body></html>"
+    )
+
+
+# =========================================================
+# FALLAS INYECTADAS
+# =========================================================
+class Fallas:
+    """
+    Configuración de latencia y fallas del servidor.
+
+    - latencia_ms / jitter_ms: demora de cada respuesta
+    - p_error:   probabilidad de responder `status_error` (con Retry-After)
+    - status_error: status de esos errores (503, o 429 para
+                 imitar un rate limit)
+    - p_timeout: probabilidad de demorar `segundos_timeout`
+    - p_corte:   probabilidad de cerrar la conexión sin responder
+    - capacidad: requests simultáneos que el sitio atiende sin
+                 demorarse más (0 = sin límite)
+    - caida:     (inicio, duración) en segundos desde que se crea:
+                 en esa ventana TODO responde `status_error`
+    - clearance: segundos que dura la cookie cf_clearance que
+                 se entrega en "/" (0 = sin desafío)
+    """
+
+    def __init__(self, latencia_ms=0, jitter_ms=0, p_error=0.0, p_timeout=0.0,
+                 p_corte=0.0, segundos_timeout=30, retry_after=1, semilla=None, capacidad=0, caida=None,
+                 clearance=0, status_error=503):
+        self.capacidad = capacidad
+        self.clearance = clearance
+        self.caida = caida
+        self._inicio = time.monotonic()
+        self.latencia_ms = latencia_ms
+        self.jitter_ms = jitter_ms
+        self.p_error = p_error
+        self.p_timeout = p_timeout
+        self.p_corte = p_corte
+        self.segundos_timeout = segundos_timeout
+        self.retry_after = retry_after
+        self.status_error = status_error
+        self._rnd = random.Random(semilla)
+        self._lock = threading.Lock()
+
+    def sortear(self):
+        """
+        Devuelve (demora_segundos, falla) donde falla es
+        None, "error", "timeout" o "corte".
+        """
+        with self._lock:
+            demora = max(0.0, self.latencia_ms + self._rnd.uniform(-self.jitter_ms, self.jitter_ms)) / 1000
+            dado = self._rnd.random()
+
+        if self.caida:
+            desde, duracion = self.caida
+            if desde <= time.monotonic() - self._inicio < desde + duracion:
+                return demora, "error"
+        if dado < self.p_corte:
+            return demora, "corte"
+        if dado < self.p_corte + self.p_timeout:
+            return demora, "timeout"
+        if dado < self.p_corte + self.p_timeout + self.p_error:
+            return demora, "error"
+        return demora, None
+
+
+# =========================================================
+# FIXTURES GRABADAS
+# =========================================================
+def clave_request(metodo, path, query):
+    """
+    Clave canónica de un request: mismo método, path y
+    parámetros (en cualquier orden) → misma clave.
+    """
+    params = sorted(parse_qsl(query, keep_blank_values=True))
+    return f"{metodo.upper()} {path}?{urlencode(params)}"
+
+
+def cargar_fixtures(carpeta):
+    """
+    Lee las fixtures de una carpeta. Cada archivo .json tiene:
+    {"metodo", "url", "status", "headers", "body"}
+    Devuelve {clave_request: fixture}.
+    """
+    fixtures = {}
+    if not carpeta:
+        return fixtures
+
+    for archivo in os.listdir(carpeta):
+        if not archivo.endswith(".json"):
+            continue
+        with open(os.path.join(carpeta, archivo), "r", encoding="utf-8") as f:
+            fixture = json.load(f)
+        partes = urlsplit(fixture["url"])
+        fixtures[clave_request(fixture.get("metodo", "GET"), partes.path, partes.query)] = fixture
+
+    return fixtures
+
+
+def cargar_grabaciones(carpeta):
+    """
+    Convierte las grabaciones de Comun/grabacion.py en fixtures,
+    para servir catálogos reales grabados con SCRAPER_HTTP_MODO=grabar.
+    """
+    fixtures = {}
+    if not carpeta:
+        return fixtures
+
+    for entrada, cuerpo in AlmacenGrabaciones(carpeta).entradas():
+        if entrada["metodo"] == "PAGE":
+            continue
+        partes = urlsplit(entrada["url"])
+        fixtures[clave_request(entrada["metodo"], partes.path, partes.query)] = {
+            "status": entrada["status"],
+            "headers": entrada.get("headers", {}),
+            "body": cuerpo
+        }
+
+    return fixtures
+
+
+# =========================================================
+# RESPUESTAS SINTÉTICAS POR TIENDA
+# =========================================================
+def responder_geant(catalogo, path, query):
+    """
+    Endpoints VTEX usados por scrapperGeant.
+    Devuelve (status, headers, body) o None si no corresponde.
+    """
+    params = parse_qs(query)
+
+    m = re.match(r"^/api/catalog_system/pub/products/search/(.+)$", path)
+    if m:
+        partes = unquote(m.group(1)).strip("/").split("/")
+        depto = catalogo.departamento(partes[0])
+        productos = catalogo.listado(depto, partes[1] if len(partes) > 1 else None) if depto else []
+
+        for fq in params.get("fq", []):
+            rango = re.match(r"^P:\[([\d.]+) TO ([\d.]+|\*)\]$", fq)
+            if rango:
+                desde = float(rango.group(1))
+                hasta = float("inf") if rango.group(2) == "*" else float(rango.group(2))
+                productos = [p for p in productos if desde <= p["precio"] <= hasta]
+
+        desde = int(params.get("_from", ["0"])[0])
+        hasta = int(params.get("_to", ["49"])[0])
+        total = len(productos)
+
+        if desde >= LIMITE_OFFSET_VTEX:
+            return 400, {"resources": f"0-0/{total}"}, json.dumps({"error": "offset"})
+
+        pagina = [
+            {
+                "productId": str(p["id"]),
+                "productName": p["nombre"],
+                "brand": p["marca"],
+                "linkText": p["slug"],
+                "items": [{"ean": p["gtin"], "sellers": [{"commertialOffer": {"Price": p["precio"]}}]}]
+            }
+            for p in productos[desde:hasta + 1]
+        ]
+        return 200, {"resources": f"{desde}-{hasta}/{total}", "Content-Type": "application/json"}, json.dumps(pagina)
+
+    m = re.match(r"^/api/catalog_system/pub/facets/search/(.+)$", path)
+    if m:
+        depto = catalogo.departamento(unquote(m.group(1)).strip("/").split("/")[0])
+        if not depto:
+            return 200, {"Content-Type": "application/json"}, json.dumps({"CategoriesTrees": []})
+        arbol = [{
+            "Name": depto,
+            "Link": f"/{depto.lower()}",
+            "Quantity": len(catalogo.listado(depto)),
+            "Children": [
+                {"Name": sub, "Link": f"/{depto.lower()}/{sub}", "Quantity": len(catalogo.listado(depto, sub)), "Children": []}
+                for sub in SUBCATEGORIAS
+            ]
+        }]
+        return 200, {"Content-Type": "application/json"}, json.dumps({"CategoriesTrees": arbol})
+
+    m = re.match(r"^/([^/]+)/p$", path)
+    if m:
+        producto = catalogo.por_slug(m.group(1))
+        if producto:
+            return 200, {"Content-Type": "text/html; charset=utf-8"}, json_ld(producto, "geant")
+
+    return None
+
+
+def responder_tata(catalogo, path, query):
+    """
+    Endpoints GraphQL y de facetas usados por ScrapperTata.
+    """
+    if path == "/api/graphql":
+        params = parse_qs(query)
+        variables = json.loads(params.get("variables", ["{}"])[0])
+        facetas = {f["key"]: f["value"] for f in variables.get("selectedFacets", [])}
+
+        depto = catalogo.departamento(facetas.get("category-1"))
+        sub = facetas.get("category-2")
+        if depto:
+            productos = catalogo.listado(depto, sub)
+        elif sub:
+            productos = [p for d in DEPARTAMENTOS for p in catalogo.productos(d) if p["sub"] == sub]
+        else:
+            productos = []
+
+        after = int(variables.get("after", "0") or 0)
+        first = int(variables.get("first", 50))
+        edges = [
+            {"node": {
+                "id": str(p["id"]),
+                "slug": p["slug"],
+                "sku": str(p["id"]),
+                "name": p["nombre"],
+                "gtin": p["gtin"],
+                "description": f"Descripción de {p['nombre']}",
+                "brand": {"name": p["marca"], "brandName": p["marca"]},
+                "isVariantOf": {"productGroupID": str(p["id"]), "name": p["nombre"]},
+                "image": [{"url": f"https://img.local/{p['slug']}.jpg", "alternateName": p["nombre"]}],
+                "offers": {
+                    "lowPrice": p["precio"],
+                    "priceCurrency": "UYU",
+                    "offers": [{"price": p["precio"], "listPrice": p["precio"], "availability": "https://schema.org/InStock", "quantity": 1}]
+                },
+                "additionalProperty": []
+            }, "cursor": str(after + i)}
+            for i, p in enumerate(productos[after:after + first])
+        ]
+        data = {"data": {"search": {"products": {
+            "pageInfo": {"totalCount": len(productos)},
+            "edges": edges
+        }}}}
+        return 200, {"Content-Type": "application/json"}, json.dumps(data)
+
+    m = re.match(r"^/api/io/_v/api/intelligent-search/facets/?(.*)$", path)
+    if m:
+        partes = [p for p in unquote(m.group(1)).split("/") if p]
+        filtros = dict(zip(partes[0::2], partes[1::2]))
+        depto = catalogo.departamento(filtros.get("category-1"))
+
+        if not filtros:
+            valores = [
+                {"key": "category-1", "value": d.lower(), "name": d, "quantity": len(catalogo.listado(d))}
+                for d in DEPARTAMENTOS
+            ]
+        elif depto and "category-2" not in filtros:
+            valores = [
+                {"key": "category-2", "value": sub, "name": sub, "quantity": len(catalogo.listado(depto, sub))}
+                for sub in SUBCATEGORIAS
+            ]
+        else:
+            valores = []
+
+        return 200, {"Content-Type": "application/json"}, json.dumps({"facets": [{"name": "Categoría", "type": "TEXT", "values": valores}]})
+
+    return None
+
+
+def responder_tienda(catalogo, path, query):
+    """
+    Páginas HTML usadas por ScrapperTienda.
+    """
+    if path == "/supermercado/":
+        opciones = [
+            {"text": d, "url": f"/supermercado/categoria/{d.lower()}/{1000 + i}"}
+            for i, d in enumerate(DEPARTAMENTOS)
+        ]
+        html = (
+            "<html><body><script>var gx = {"
+            '"W0006W00180002vLEVEL1SDTOPTIONS_DESKTOP":' + json.dumps(opciones) +
+            "};</script></body></html>"
+        )
+        return 200, {"Content-Type": "text/html; charset=utf-8"}, html
+
+    m = re.match(r"^/supermercado/categoria/([^/]+)/busqueda$", path)
+    if m:
+        campos = unquote(query).split(",")
+        try:
+            depto = DEPARTAMENTOS[int(campos[3]) - 1000]
+            pagina = int(campos[-1] or 0)
+        except (IndexError, ValueError):
+            return 404, {}, "no encontrada"
+
+        productos = catalogo.listado(depto)
+        total = len(productos)
+        inicio = pagina * PRODUCTOS_POR_PAGINA_TIENDA
+        fin = min(inicio + PRODUCTOS_POR_PAGINA_TIENDA, total)
+
+        tarjetas = "".join(
+            '<div class="card-product-container"><div class="card-product-section">'
+            f'<a href="/supermercado/{p["slug"]}.producto?{p["id"]},{pagina}">'
+            f'<img src="https://img.local/{p["slug"]}.jpg">'
+            f'<span class="card-product-name">{p["nombre"]}</span></a>'
+            f'<span class="ProductPrice">$ {p["precio"]}</span></div></div>'
+            for p in productos[inicio:fin]
+        )
+        html = (
+            "<html><body>"
+            f'<div id="TXTBREADCRUMB">Supermercado / {depto} ({inicio + 1 if fin else 0} - {fin} de {total})</div>'
+            f"<div class='grid'>{tarjetas}</div>"
+            "</body></html>"
+        )
+        return 200, {"Content-Type": "text/html; charset=utf-8"}, html
+
+    m = re.match(r"^/(?:supermercado/[^/]+\.producto|p\.producto)$", path)
+    if m:
+        try:
+            producto = catalogo.por_id(int(unquote(query).split(",")[0]))
+        except ValueError:
+            producto = None
+        if producto:
+            return 200, {"Content-Type": "text/html; charset=utf-8"}, json_ld(producto, "tienda")
+
+    return None
+
+
+RESPONDEDORES = [responder_geant, responder_tata, responder_tienda]
+
+
+# =========================================================
+# SERVIDOR
+# =========================================================
+class ManejadorLocal(BaseHTTPRequestHandler):
+    """
+    Atiende cada request: fixtures → sintético → 404,
+    aplicando antes la latencia y las fallas configuradas.
+    """
+
+    # Keep-alive, como los sitios reales
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        # Una instancia por conexión TCP: cuenta los handshakes
+        super().setup()
+        self.server.contar("conexiones")
+
+    def log_message(self, formato, *args):
+        # Sin logs por request (ensucian la salida del benchmark)
+        pass
+
+    def do_GET(self):
+        self.responder("GET")
+
+    def do_POST(self):
+        largo = int(self.headers.get("Content-Length") or 0)
+        if largo:
+            self.rfile.read(largo)
+        self.responder("POST")
+
+    def responder(self, metodo):
+        servidor = self.server
+        en_vuelo = servidor.entrar()
+        try:
+            self._responder(metodo, en_vuelo)
+        finally:
+            servidor.salir()
+
+    def _responder(self, metodo, en_vuelo):
+        servidor = self.server
+        partes = urlsplit(self.path)
+        servidor.contar(partes.path)
+
+        if servidor.fallas.clearance and not self._con_clearance(partes.path):
+            return
+
+        demora, falla = servidor.fallas.sortear()
+        capacidad = servidor.fallas.capacidad
+        if capacidad and en_vuelo > capacidad * EXCESO_BLOQUEO:
+            servidor.contar("falla:desafio")
+            if demora:
+                time.sleep(demora)
+            self.enviar(403, {"Content-Type": "text/html", "cf-mitigated": "challenge"}, PAGINA_DESAFIO)
+            return
+        if capacidad and en_vuelo > capacidad:
+            # Sitio saturado: cada request tarda en proporción
+            # a la cola que tiene delante
+            demora *= en_vuelo / capacidad
+        if demora:
+            time.sleep(demora)
+
+        if falla == "corte":
+            servidor.contar("falla:corte")
+            self.close_connection = True
+            self.connection.close()
+            return
+        if falla == "timeout":
+            servidor.contar("falla:timeout")
+            time.sleep(servidor.fallas.segundos_timeout)
+        if falla == "error":
+            servidor.contar("falla:error")
+            self.enviar(
+                servidor.fallas.status_error,
+                {"Retry-After": str(servidor.fallas.retry_after)},
+                "Servicio no disponible"
+            )
+            return
+
+        fixture = servidor.fixtures.get(clave_request(metodo, partes.path, partes.query))
+        if fixture:
+            self.enviar(fixture.get("status", 200), fixture.get("headers", {}), fixture.get("body", ""))
+            return
+
+        for respondedor in RESPONDEDORES:
+            respuesta = respondedor(servidor.catalogo, partes.path, partes.query)
+            if respuesta:
+                self.enviar(*respuesta)
+                return
+
+        self.enviar(404, {"Content-Type": "text/plain"}, "no encontrada")
+
+    def _con_clearance(self, path):
+        """
+        Desafío de Cloudflare simulado. Devuelve True si el
+        request sigue (cookie vigente); si no, ya respondió.
+        """
+        servidor = self.server
+        if path == "/":
+            servidor.contar("clearance:emitido")
+            token = servidor.emitir_clearance(servidor.fallas.clearance)
+            self.enviar(200, {
+                "Content-Type": "text/html",
+                "Set-Cookie": f"cf_clearance={token}; Max-Age={servidor.fallas.clearance:.0f}; Path=/"
+            }, "<html><body>inicio</body></html>")
+            return False
+
+        cookies = dict(
+            c.strip().split("=", 1) for c in (self.headers.get("Cookie") or "").split(";") if "=" in c
+        )
+        if servidor.clearance_vigente(cookies.get("cf_clearance")):
+            return True
+        servidor.contar("falla:desafio")
+        self.enviar(403, {"Content-Type": "text/html", "cf-mitigated": "challenge"}, PAGINA_DESAFIO)
+        return False
+
+    def enviar(self, status, headers, body):
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+
+        headers = {
+            k: v for k, v in (headers or {}).items()
+            if k.lower() not in ("content-length", "content-encoding", "transfer-encoding", "connection")
+        }
+
+        if self.server.comprimir and "gzip" in (self.headers.get("Accept-Encoding") or ""):
+            body = gzip.compress(body, compresslevel=5)
+            headers["Content-Encoding"] = "gzip"
+
+        self.server.sumar_bytes(len(body))
+
+        try:
+            self.send_response(status)
+            for k, v in headers.items():
+                self.send_header(k, v)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+class ServidorLocal(ThreadingHTTPServer):
+    daemon_threads = True
+
+    # Muchos scrapers conectan a la vez
+    request_queue_size = 256
+
+    def __init__(self, direccion, catalogo, fallas, fixtures, comprimir=True):
+        super().__init__(direccion, ManejadorLocal)
+        self.catalogo = catalogo
+        self.fallas = fallas
+        self.fixtures = fixtures
+        self.comprimir = comprimir
+        self._lock = threading.Lock()
+        self.estadisticas = {}
+        self.bytes_enviados = 0
+        self.en_vuelo = 0
+        # cf_clearance emitidas → momento en que vencen
+        self.clearances = {}
+
+    def entrar(self):
+        with self._lock:
+            self.en_vuelo += 1
+            return self.en_vuelo
+
+    def salir(self):
+        with self._lock:
+            self.en_vuelo -= 1
+
+    def contar(self, clave):
+        with self._lock:
+            self.estadisticas[clave] = self.estadisticas.get(clave, 0) + 1
+
+    def emitir_clearance(self, segundos):
+        with self._lock:
+            token = f"tk{len(self.clearances)}-{random.getrandbits(32):08x}"
+            self.clearances[token] = time.time() + segundos
+            return token
+
+    def clearance_vigente(self, token):
+        with self._lock:
+            return time.time() < self.clearances.get(token, 0)
+
+    def sumar_bytes(self, cantidad):
+        with self._lock:
+            self.bytes_enviados += cantidad
+
+    def reiniciar_estadisticas(self):
+        with self._lock:
+            self.estadisticas = {}
+            self.bytes_enviados = 0
+
+    @property
+    def url_base(self):
+        host, puerto = self.server_address[:2]
+        return f"http://{host}:{puerto}"
+
+
+def iniciar_servidor(puerto=0, catalogo=None, fallas=None, fixtures=None, comprimir=True):
+    """
+    Levanta el servidor en un hilo de fondo y lo devuelve.
+    Con puerto=0 se elige un puerto libre (ver servidor.url_base).
+    """
+    servidor = ServidorLocal(
+        ("127.0.0.1", puerto),
+        catalogo or CatalogoSintetico(),
+        fallas or Fallas(),
+        fixtures or {},
+        comprimir=comprimir
+    )
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor
+
+
+def parsear_caida(texto):
+    """
+    "INICIO:DURACION" (segundos) → (inicio, duracion).
+    """
+    inicio, duracion = texto.split(":")
+    return float(inicio), float(duracion)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor local que imita a las tiendas")
+    parser.add_argument("--puerto", type=int, default=8765)
+    parser.add_argument("--productos", type=int, default=200, help="Productos por departamento")
+    parser.add_argument("--fixtures", help="Carpeta con respuestas grabadas")
+    parser.add_argument("--grabaciones", help="Carpeta de grabaciones de Comun/grabacion.py")
+    parser.add_argument("--latencia", type=float, default=0, help="Latencia en ms")
+    parser.add_argument("--jitter", type=float, default=0, help="Jitter en ms")
+    parser.add_argument("--errores", type=float, default=0, help="Probabilidad de 503")
+    parser.add_argument("--timeouts", type=float, default=0, help="Probabilidad de timeout")
+    parser.add_argument("--cortes", type=float, default=0, help="Probabilidad de cortar la conexión")
+    parser.add_argument("--capacidad", type=int, default=0, help="Requests simultáneos sin demora extra")
+    parser.add_argument("--caida", type=parsear_caida, help="INICIO:DURACION en segundos con todo en error")
+    parser.add_argument("--status-error", type=int, default=503, help="Status de los errores (503 o 429)")
+    parser.add_argument("--clearance", type=float, default=0, help="Segundos que dura la cookie cf_clearance")
+    args = parser.parse_args()
+
+    servidor = iniciar_servidor(
+        args.puerto,
+        CatalogoSintetico(args.productos),
+        Fallas(args.latencia, args.jitter, args.errores, args.timeouts, args.cortes,
+               capacidad=args.capacidad, caida=args.caida, clearance=args.clearance,
+               status_error=args.status_error),
+        {**cargar_grabaciones(args.grabaciones), **cargar_fixtures(args.fixtures)}
+    )
+    print(f"🛰️ Servidor local escuchando en {servidor.url_base}")
+
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        servidor.shutdown()
+
+
+if __name__ == "__main__":
+    main()
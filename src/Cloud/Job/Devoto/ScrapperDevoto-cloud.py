@@ -1,11 +1,24 @@
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
-from bs4 import BeautifulSoup
 import time
-import json
 import os
-from google.cloud import storage
+import sys
+
+# SRC_DIR:
+# Carpeta src, para poder importar los módulos compartidos de Comun
+SRC_DIR = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", ".."))
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+from Comun import descartes
+from Comun.almacenamiento import subir_ndjson_gz
+from Comun.checkpoint import Checkpoint
+from Comun.grabacion import obtener_page_source
+from Comun.historial_precios import guardar_historial
+from Comun.metricas import fase, iniciar_metricas, run_id
+from Comun.perfilado import iniciar_perfilado
+from Comun.parser_html import Selector, parsear
 
 # =========================================================
 # CONFIGURACIÓN GENERAL
@@ -25,23 +38,27 @@ CATEGORIAS = {
 # =========================================================
 # GOOGLE CLOUD STORAGE
 # =========================================================
-BUCKET_NAME = "mi-proyecto-scraping-bucket"
+BUCKET_NAME = os.getenv("BUCKET_NAME", "mi-proyecto-scraping-bucket")
 CARPETA_GCS = "pendientes"
-NOMBRE_ARCHIVO = "productos_devoto.json"
-
-def guardar_en_cloud_storage(nombre_archivo, datos_json, carpeta=CARPETA_GCS):
-    client = storage.Client()
-    bucket = client.bucket(BUCKET_NAME)
-
-    ruta_destino = f"{carpeta}/{nombre_archivo}"
-    blob = bucket.blob(ruta_destino)
-
-    blob.upload_from_string(
-        data=json.dumps(datos_json, ensure_ascii=False, indent=4),
-        content_type="application/json"
-    )
-
-    print(f"☁️ Archivo subido a gs://{BUCKET_NAME}/{ruta_destino}")
+PREFIJO_ARCHIVO = "productos_devoto"
+
+def guardar_en_cloud_storage(categoria, productos, carpeta=CARPETA_GCS):
+    """
+    Sube los productos de una categoría apenas termina, como
+    NDJSON comprimido en streaming (ver Comun/almacenamiento.py):
+    gs://<bucket>/pendientes/productos_devoto_<run_id>_<categoria>.ndjson.gz
+    Devuelve la ruta del objeto.
+    """
+    ruta_destino = f"{carpeta}/{PREFIJO_ARCHIVO}_{run_id()}_{categoria}.ndjson.gz"
+    subir_ndjson_gz(BUCKET_NAME, ruta_destino, productos)
+    return ruta_destino
+
+# Selectores CSS de las tarjetas (se compilan una sola vez)
+SELECTOR_ITEM = Selector("div.product-item")
+SELECTOR_LINK = Selector("h3 a")
+SELECTOR_PRECIO = Selector("span.val")
+SELECTOR_MARCA = Selector("div.prod-cats a")
+SELECTOR_IMAGEN = Selector("figure img")
 
 # =========================================================
 # SELENIUM SETUP
@@ -52,7 +69,16 @@ options.add_argument("--window-size=1920,1080")
 options.add_argument("--disable-gpu")
 options.add_argument("--no-sandbox")
 
-driver = webdriver.Chrome(options=options)
+# El navegador se abre recién cuando se necesita:
+# reproduciendo capturas grabadas no hace falta Chrome
+driver = None
+
+
+def obtener_driver():
+    global driver
+    if driver is None:
+        driver = webdriver.Chrome(options=options)
+    return driver
 
 # =========================================================
 # FUNCIÓN: SCROLL INFINITO
@@ -62,12 +88,12 @@ def scroll_hasta_el_final():
     same_count_times = 0
 
     while True:
-        items = driver.find_elements(By.CSS_SELECTOR, "div.product-item")
+        items = obtener_driver().find_elements(By.CSS_SELECTOR, "div.product-item")
         current_count = len(items)
 
         print(f"   ⏳ Productos cargados: {current_count}")
 
-        driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+        obtener_driver().execute_script("window.scrollTo(0, document.body.scrollHeight);")
         time.sleep(1.5)
 
         if current_count == last_count:
@@ -85,34 +111,45 @@ def scroll_hasta_el_final():
 # =========================================================
 def extraer_productos_categoria(nombre_categoria, url):
     print(f"🔍 {nombre_categoria.upper()} – cargando productos...")
-    driver.get(url)
-    time.sleep(3)
 
-    scroll_hasta_el_final()
+    def cargar_pagina():
+        navegador = obtener_driver()
+        navegador.get(url)
+        time.sleep(3)
+
+        scroll_hasta_el_final()
+        return navegador.page_source
 
-    soup = BeautifulSoup(driver.page_source, "html.parser")
+    # Con SCRAPER_HTTP_MODO=grabar/reproducir el HTML final
+    # (ya scrolleado) se guarda o se lee de disco
+    # La fase "carga" es el tiempo del navegador (carga + scroll);
+    # el resto de "listado" es el parseo
+    with fase("carga"):
+        html = obtener_page_source(url, cargar_pagina)
+
+    soup = parsear(html)
     productos = []
 
-    items = soup.select("div.product-item")
+    items = soup.select(SELECTOR_ITEM)
     print(f"📦 {nombre_categoria}: {len(items)} productos encontrados")
 
     for item in items:
         try:
-            link_tag = item.select_one("h3 a")
-            precio_tag = item.select_one("span.val")
+            link_tag = item.select_one(SELECTOR_LINK)
+            precio_tag = item.select_one(SELECTOR_PRECIO)
 
             if not link_tag or not precio_tag:
                 continue
 
-            link = link_tag["href"]
-            nombre = link_tag.text.strip()
-            precio = precio_tag.text.strip()
+            link = link_tag.attr("href")
+            nombre = link_tag.texto(strip=False).strip()
+            precio = precio_tag.texto(strip=False).strip()
 
-            marca_tag = item.select_one("div.prod-cats a")
-            marca = marca_tag.text.strip() if marca_tag else None
+            marca_tag = item.select_one(SELECTOR_MARCA)
+            marca = marca_tag.texto(strip=False).strip() if marca_tag else None
 
-            img_tag = item.select_one("figure img")
-            img = img_tag["src"] if img_tag else None
+            img_tag = item.select_one(SELECTOR_IMAGEN)
+            img = img_tag.attr("src") if img_tag else None
 
             productos.append({
                 "idWeb": int(link.split("/")[-1]),
@@ -128,6 +165,8 @@ def extraer_productos_categoria(nombre_categoria, url):
             })
         except Exception as e:
             print("⚠️ Error procesando producto:", e)
+            # Tarjeta sin link, precio o id legible
+            descartes.descartar(descartes.ERROR_PARSEO, url)
 
     return productos
 
@@ -136,21 +175,49 @@ def extraer_productos_categoria(nombre_categoria, url):
 # =========================================================
 def ejecutar_scraper_disco():
     inicio = time.time()
-    todos = []
+    iniciar_metricas("devoto-cloud")
+    iniciar_perfilado("devoto-cloud")
+    total = 0
+
+    # Checkpoint por categoría: con --resume no se vuelven a
+    # cargar en el navegador (ni a subir) las categorías ya terminadas
+    checkpoint = Checkpoint("devoto-cloud")
 
     for cat, url in CATEGORIAS.items():
-        productos = extraer_productos_categoria(cat, url)
-        todos.extend(productos)
+        subida = checkpoint.leer_estado(f"categoria:{cat}")
+        if subida is not None:
+            print(f"♻️ {cat}: {subida['productos']} productos ya subidos a {subida['objeto']}")
+            total += subida["productos"]
+            continue
+
+        with fase("listado") as f_listado:
+            productos = extraer_productos_categoria(cat, url)
+            f_listado.sumar(len(productos))
+
+        # 🔥 SUBIDA A GOOGLE CLOUD STORAGE (un objeto por categoría)
+        with fase("subida"):
+            objeto = guardar_en_cloud_storage(cat, productos)
+        total += len(productos)
+
+        # Historial de precios (Comun/historial_precios.py), como
+        # en el scraper local. En el contenedor SCRAPER_HISTORIAL_DIR
+        # tiene que apuntar a un volumen persistente: si no, el
+        # SQLite se pierde al terminar el job
+        guardar_historial(productos)
+
+        checkpoint.guardar_estado(f"categoria:{cat}", {"objeto": objeto, "productos": len(productos)})
+        checkpoint.volcar()
 
-    # 🔥 SUBIDA A GOOGLE CLOUD STORAGE
-    guardar_en_cloud_storage(NOMBRE_ARCHIVO, todos)
+    checkpoint.terminar()
 
-    driver.quit()
+    if driver is not None:
+        driver.quit()
 
     duracion = (time.time() - inicio) / 60
     print("\n✅ SCRAPER DEVOTO FINALIZADO")
     print(f"⏱️ Tiempo total: {duracion:.2f} minutos")
-    print(f"📊 Total productos: {len(todos)}")
+    print(f"📊 Total productos: {total}")
+    descartes.imprimir_resumen()
 
 # =========================================================
 # ENTRY POINT
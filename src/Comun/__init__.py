@@ -0,0 +1 @@
+# Módulos compartidos entre los scrapers y los procesos
@@ -0,0 +1,154 @@
+import gzip
+import json
+import threading
+
+# =========================================================
+# SUBIDAS A GOOGLE CLOUD STORAGE
+# =========================================================
+# Los jobs en la nube dejan sus productos en un bucket para
+# que otro proceso los importe. En lugar de armar todo el
+# catálogo como un solo string JSON y subirlo al final:
+# - se reutiliza un único storage.Client por proceso
+# - cada objeto es NDJSON (un producto por línea) comprimido
+#   con gzip, escrito en streaming sobre una subida resumable
+#   (en memoria queda como máximo un chunk comprimido)
+# - el job puede subir un objeto por categoría apenas la
+#   termina
+#
+# Con STORAGE_EMULATOR_HOST=http://127.0.0.1:PUERTO el cliente
+# usa un servidor local (ver Benchmarks/servidorGcsLocal.py).
+
+# Tamaño de cada chunk de la subida resumable
+# (GCS exige múltiplos de 256 KiB)
+CHUNK_SUBIDA = 8 * 1024 * 1024
+
+# Tipo de contenido de los objetos (el nombre termina en .ndjson.gz)
+CONTENT_TYPE_NDJSON = "application/x-ndjson"
+
+_cliente = None
+_cliente_lock = threading.Lock()
+
+
+def cliente_gcs():
+    """
+    Devuelve el storage.Client del proceso (se crea una vez).
+    """
+    global _cliente
+    if _cliente is None:
+        with _cliente_lock:
+            if _cliente is None:
+                # Import diferido: los procesos locales no
+                # necesitan google-cloud-storage instalado
+                from google.cloud import storage
+                _cliente = storage.Client()
+    return _cliente
+
+
+class SubidaNdjsonGz:
+    """
+    Escribe productos de a uno en gs://<bucket>/<ruta> como
+    NDJSON comprimido, sin tener el archivo entero en memoria.
+
+        with SubidaNdjsonGz(BUCKET, "pendientes/devoto-almacen.ndjson.gz") as subida:
+            for producto in productos:
+                subida.escribir(producto)
+
+    Si hay un error dentro del with, la subida no se finaliza
+    y el objeto no llega a existir (nunca queda uno a medias).
+    """
+
+    def __init__(self, bucket, ruta, chunk_size=CHUNK_SUBIDA, cliente=None):
+        self.bucket = bucket
+        self.ruta = ruta
+        self.chunk_size = chunk_size
+        self.cliente = cliente
+        self.productos = 0
+        self._writer = None
+        self._gzip = None
+
+    def __enter__(self):
+        cliente = self.cliente or cliente_gcs()
+        blob = cliente.bucket(self.bucket).blob(self.ruta, chunk_size=self.chunk_size)
+        # ignore_flush: GzipFile puede llamar a flush() y una
+        # subida resumable solo manda chunks completos
+        self._writer = blob.open("wb", content_type=CONTENT_TYPE_NDJSON, ignore_flush=True)
+        self._gzip = gzip.GzipFile(fileobj=self._writer, mode="wb", filename="", mtime=0)
+        return self
+
+    def escribir(self, producto):
+        linea = json.dumps(producto, ensure_ascii=False) + "\n"
+        self._gzip.write(linea.encode("utf-8"))
+        self.productos += 1
+
+    def __exit__(self, tipo, *exc):
+        if tipo is not None:
+            # Sin close() la sesión resumable queda abierta y
+            # GCS la descarta sola
+            return False
+        self._gzip.close()
+        self._writer.close()
+        print(f"☁️ {self.productos} productos subidos a gs://{self.bucket}/{self.ruta}")
+        return False
+
+
+def subir_ndjson_gz(bucket, ruta, productos, cliente=None):
+    """
+    Sube un iterable de productos como un objeto .ndjson.gz.
+    Devuelve la cantidad de productos subidos.
+    """
+    with SubidaNdjsonGz(bucket, ruta, cliente=cliente) as subida:
+        for producto in productos:
+            subida.escribir(producto)
+    return subida.productos
+
+
+
+# =========================================================
+# LECTURA Y MOVIMIENTO DE OBJETOS
+# =========================================================
+def leer_ndjson_gz(flujo):
+    """
+    Itera los productos de un flujo binario .ndjson.gz
+    (por ejemplo blob.open("rb")) sin descomprimirlo entero.
+    """
+    with gzip.GzipFile(fileobj=flujo, mode="rb") as f:
+        for linea in f:
+            if linea.strip():
+                yield json.loads(linea)
+
+
+def iterar_productos(blob):
+    """
+    Itera los productos de un objeto según su extensión:
+    - .ndjson.gz / .ndjson → en streaming, línea por línea
+    - .json → lista JSON (formato viejo, se lee entera)
+    """
+    if blob.name.endswith(".ndjson.gz"):
+        with blob.open("rb") as flujo:
+            yield from leer_ndjson_gz(flujo)
+    elif blob.name.endswith(".ndjson"):
+        with blob.open("rt", encoding="utf-8") as flujo:
+            for linea in flujo:
+                if linea.strip():
+                    yield json.loads(linea)
+    else:
+        with blob.open("rb") as flujo:
+            datos = json.load(flujo)
+        if not isinstance(datos, list):
+            raise ValueError(f"{blob.name} no es una lista de productos")
+        yield from datos
+
+
+def mover_objeto(blob, prefijo_origen, prefijo_destino):
+    """
+    Mueve un objeto de un prefijo a otro (copia + borrado).
+
+    El borrado exige la misma generación que se leyó: si un
+    job volvió a subir el objeto mientras se importaba, la
+    versión nueva no se borra y queda para la próxima pasada.
+    Devuelve el nombre nuevo.
+    """
+    nombre_nuevo = prefijo_destino + blob.name[len(prefijo_origen):]
+    blob.bucket.copy_blob(blob, blob.bucket, nombre_nuevo, if_source_generation_match=blob.generation)
+    blob.delete(if_generation_match=blob.generation)
+    return nombre_nuevo
@@ -0,0 +1,50 @@
+import json
+import os
+import tempfile
+import time
+
+# =========================================================
+# CACHÉ EN DISCO CON VENCIMIENTO (TTL)
+# =========================================================
+# Guarda datos JSON junto con la fecha en que se generaron.
+# Se usa para información que cambia poco entre corridas,
+# como el árbol de categorías de una tienda.
+
+
+def leer_cache(ruta, ttl_segundos):
+    """
+    Devuelve los datos guardados en `ruta` si existen y no
+    vencieron. Devuelve None si no hay caché, está vencida
+    o el archivo está dañado.
+    """
+    try:
+        with open(ruta, "r", encoding="utf-8") as f:
+            contenido = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    generado = contenido.get("generado", 0)
+    if time.time() - generado > ttl_segundos:
+        return None
+
+    return contenido.get("datos")
+
+
+def guardar_cache(ruta, datos):
+    """
+    Guarda `datos` en `ruta` con la fecha actual.
+    Escribe a un archivo temporal y lo renombra, así otro
+    proceso nunca lee un archivo a medio escribir.
+    """
+    carpeta = os.path.dirname(os.path.abspath(ruta))
+    os.makedirs(carpeta, exist_ok=True)
+
+    fd, tmp = tempfile.mkstemp(dir=carpeta, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({"generado": time.time(), "datos": datos}, f, ensure_ascii=False)
+        os.replace(tmp, ruta)
+    except Exception:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
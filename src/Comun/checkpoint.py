@@ -0,0 +1,222 @@
+import argparse
+import atexit
+import json
+import os
+import sqlite3
+import sys
+import threading
+
+# =========================================================
+# CHECKPOINTS DE SCRAPERS LARGOS
+# =========================================================
+# Una corrida de Tienda Inglesa dura horas y los resultados
+# recién llegan a disco en el json.dump final: si el proceso
+# muere se pierde todo. El checkpoint guarda periódicamente
+# en un SQLite local:
+# - la frontera descubierta (URL + categoría + datos del listado)
+# - los cursores de paginación por categoría / shard
+# - los resultados de detalle ya terminados
+#
+# Con --resume (o SCRAPER_REANUDAR=1) el scraper sigue desde
+# el checkpoint sin volver a pedir lo que ya terminó. Sin
+# --resume el checkpoint anterior se descarta. Al terminar
+# bien, el archivo se borra.
+#
+# Las escrituras se acumulan en memoria y se vuelcan cada
+# CHECKPOINT_SEGUNDOS (y al salir), así el camino caliente
+# no toca el disco.
+
+# SRC_DIR:
+# Carpeta src del proyecto
+SRC_DIR = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+SCRAPER_CHECKPOINT_DIR = os.getenv("SCRAPER_CHECKPOINT_DIR", os.path.join(SRC_DIR, "Checkpoints"))
+
+# Segundos entre volcados a disco
+CHECKPOINT_SEGUNDOS = float(os.getenv("SCRAPER_CHECKPOINT_SEGUNDOS", "30"))
+
+# Valor del cursor de una categoría / shard ya terminado
+CURSOR_TERMINADO = "fin"
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS estado (
+    clave TEXT PRIMARY KEY,
+    valor TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS frontera (
+    url TEXT NOT NULL,
+    categoria TEXT NOT NULL,
+    datos TEXT,
+    PRIMARY KEY (url, categoria)
+);
+CREATE TABLE IF NOT EXISTS resultados (
+    url TEXT PRIMARY KEY,
+    producto TEXT NOT NULL
+);
+"""
+
+
+def reanudacion_pedida():
+    """
+    True si se pidió --resume (o SCRAPER_REANUDAR=1).
+    El argumento se pasa a la variable de entorno para que
+    lo hereden los subprocesos (runScrappers, pipeline).
+    """
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument("--resume", "--reanudar", action="store_true", dest="reanudar")
+    args, _ = parser.parse_known_args(sys.argv[1:])
+    if args.reanudar:
+        os.environ["SCRAPER_REANUDAR"] = "1"
+    return os.getenv("SCRAPER_REANUDAR", "0") == "1"
+
+
+class Checkpoint:
+    """
+    Checkpoint de un scraper, seguro entre hilos.
+    """
+
+    def __init__(self, nombre, reanudar=None, directorio=None):
+        directorio = directorio or SCRAPER_CHECKPOINT_DIR
+        os.makedirs(directorio, exist_ok=True)
+        self.ruta = os.path.join(directorio, f"{nombre}.sqlite")
+
+        if reanudar is None:
+            reanudar = reanudacion_pedida()
+
+        if os.path.exists(self.ruta) and not reanudar:
+            print(f"⚠️ Se descarta el checkpoint anterior de {nombre} (usar --resume para continuar)")
+            self._borrar_archivos()
+
+        self._db = sqlite3.connect(self.ruta, check_same_thread=False)
+        self._db.executescript(ESQUEMA)
+        self._db.execute("PRAGMA journal_mode=WAL")
+
+        # Escrituras pendientes de volcar
+        self._lock = threading.Lock()
+        self._estado = {}
+        self._frontera = []
+        self._resultados = []
+
+        # Solo un volcado a la vez
+        self._lock_db = threading.Lock()
+        self._terminado = False
+
+        self.reanudando = reanudar and self._hay_datos()
+        if self.reanudando:
+            print(
+                f"♻️ Reanudando {nombre}: {self._contar('frontera')} URLs en frontera, "
+                f"{self._contar('resultados')} resultados ya guardados"
+            )
+
+        self._parar = threading.Event()
+        threading.Thread(target=self._volcar_periodicamente, daemon=True).start()
+        atexit.register(self.volcar)
+
+    def _contar(self, tabla):
+        with self._lock_db:
+            return self._db.execute(f"SELECT COUNT(*) FROM {tabla}").fetchone()[0]
+
+    def _hay_datos(self):
+        return any(self._contar(t) for t in ("estado", "frontera", "resultados"))
+
+    # -----------------------------------------------------
+    # ESCRITURA (en memoria hasta el próximo volcado)
+    # -----------------------------------------------------
+    def guardar_estado(self, clave, valor):
+        with self._lock:
+            self._estado[clave] = json.dumps(valor, ensure_ascii=False)
+
+    def agregar_frontera(self, url, categoria, datos=None):
+        with self._lock:
+            self._frontera.append((
+                url, categoria or "",
+                json.dumps(datos, ensure_ascii=False) if datos is not None else None
+            ))
+
+    def guardar_resultado(self, url, producto):
+        with self._lock:
+            self._resultados.append((url, json.dumps(producto, ensure_ascii=False)))
+
+    def volcar(self):
+        """
+        Escribe en disco todo lo pendiente en una transacción.
+        """
+        with self._lock:
+            estado, self._estado = self._estado, {}
+            frontera, self._frontera = self._frontera, []
+            resultados, self._resultados = self._resultados, []
+
+        if not (estado or frontera or resultados):
+            return
+
+        with self._lock_db:
+            if self._terminado:
+                return
+            with self._db:
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO estado (clave, valor) VALUES (?, ?)",
+                    estado.items()
+                )
+                self._db.executemany(
+                    "INSERT OR IGNORE INTO frontera (url, categoria, datos) VALUES (?, ?, ?)",
+                    frontera
+                )
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO resultados (url, producto) VALUES (?, ?)",
+                    resultados
+                )
+
+    def _volcar_periodicamente(self):
+        while not self._parar.wait(CHECKPOINT_SEGUNDOS):
+            try:
+                self.volcar()
+            except sqlite3.Error as e:
+                print(f"⚠️ No se pudo guardar el checkpoint: {e}")
+
+    # -----------------------------------------------------
+    # LECTURA (al reanudar)
+    # -----------------------------------------------------
+    def leer_estado(self, clave, defecto=None):
+        with self._lock:
+            if clave in self._estado:
+                return json.loads(self._estado[clave])
+        with self._lock_db:
+            fila = self._db.execute("SELECT valor FROM estado WHERE clave = ?", (clave,)).fetchone()
+        return json.loads(fila[0]) if fila else defecto
+
+    def frontera(self):
+        """
+        Devuelve [(url, categoria, datos)] en el orden en que
+        se descubrieron.
+        """
+        with self._lock_db:
+            filas = self._db.execute(
+                "SELECT url, categoria, datos FROM frontera ORDER BY rowid"
+            ).fetchall()
+        return [(url, cat or None, json.loads(datos) if datos else None) for url, cat, datos in filas]
+
+    def resultados(self):
+        """
+        Devuelve {url: producto} de los detalles ya terminados.
+        """
+        with self._lock_db:
+            filas = self._db.execute("SELECT url, producto FROM resultados").fetchall()
+        return {url: json.loads(producto) for url, producto in filas}
+
+    # -----------------------------------------------------
+    # FIN
+    # -----------------------------------------------------
+    def terminar(self):
+        """
+        La corrida terminó bien: se borra el checkpoint.
+        """
+        self._parar.set()
+        with self._lock_db:
+            self._terminado = True
+            self._db.close()
+        self._borrar_archivos()
+
+    def _borrar_archivos(self):
+        for sufijo in ("", "-wal", "-shm"):
+            if os.path.exists(self.ruta + sufijo):
+                os.remove(self.ruta + sufijo)
@@ -0,0 +1,336 @@
+import os
+import ssl
+import threading
+import time
+from urllib.parse import urlsplit
+
+import cloudscraper
+from requests.structures import CaseInsensitiveDict
+
+from Comun import descartes, metricas
+from Comun.cache import guardar_cache, leer_cache
+from Comun.grabacion import SCRAPER_HTTP_MODO
+from Comun.sesiones import SCRAPER_HTTP2, SesionHttp2, SesionPool, adapter_pool, http2_disponible
+
+# =========================================================
+# CLEARANCE DE CLOUDFLARE PERSISTIDO Y COMPARTIDO
+# =========================================================
+# Cloudflare entrega una cookie (cf_clearance) al resolver
+# el desafío, atada al User-Agent que lo resolvió. Sin
+# guardarla, cada corrida y cada proceso arrancan en frío y
+# el desafío se resuelve de nuevo cuando vence.
+#
+# Clearance arma sesiones cloudscraper que comparten el MISMO
+# frasco de cookies (los headers se copian a los hilos con
+# reemplazar_headers() después de cada renovación o carga):
+# - `sesion`: una SesionPool (Comun/sesiones.py) con una
+#   sesión por hilo sobre un pool de conexiones del tamaño
+#   del scraper. NO resuelve desafíos: si recibe
+#   uno, avisa al renovador y devuelve la respuesta
+#   (Comun/reintentos.py la reintenta más tarde)
+# - la del renovador: un solo hilo que resuelve el desafío
+#   antes de que venza (MARGEN_RENOVACION) o cuando un hilo
+#   avisa que recibió uno
+#
+# Cookies, headers y vencimiento se guardan por host en
+# SCRAPER_CLEARANCE_DIR, así los reusa la próxima corrida y
+# los otros procesos (workers). Entre procesos renueva uno
+# solo: el que crea el archivo .lock; los demás esperan y
+# leen lo que dejó.
+#
+#   SCRAPER_CLEARANCE: "1" (por defecto) / "0" sin renovador
+#   ni persistencia (la sesión resuelve sola, como antes)
+#   SCRAPER_HTTP2=1: las páginas de detalle van por
+#   `sesion_detalle`, una SesionHttp2 con las mismas cookies
+#   y headers; descubrimiento, facetas y listados siguen en
+#   `sesion`. Sin renovador (SCRAPER_CLEARANCE=0 o en modo
+#   "reproducir") no hay HTTP/2: SesionHttp2 no resuelve
+#   desafíos, así que todo va por HTTP/1.1
+
+# SRC_DIR:
+# Carpeta src del proyecto
+SRC_DIR = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+SCRAPER_CLEARANCE_DIR = os.getenv("SCRAPER_CLEARANCE_DIR", os.path.join(SRC_DIR, "Clearance"))
+SCRAPER_CLEARANCE = os.getenv("SCRAPER_CLEARANCE", "1") != "0"
+
+# Vigencia supuesta si cf_clearance no trae vencimiento
+# (Cloudflare usa 30 minutos por defecto)
+TTL_CLEARANCE = 25 * 60
+
+# Se renueva cuando queda esta fracción de la vigencia
+MARGEN_RENOVACION = 0.2
+
+# Mínimo entre dos renovaciones (un sitio que bloquea por
+# exceso de requests no se arregla renovando en loop)
+RENOVACION_MINIMA = 30
+
+# Un .lock más viejo que esto es de un proceso que murió
+LOCK_VENCIDO = 120
+
+# Timeout del request que resuelve el desafío
+TIMEOUT_RENOVACION = 30
+
+# Cookie que entrega Cloudflare al resolver el desafío
+COOKIE_CLEARANCE = "cf_clearance"
+
+
+class Clearance:
+    """
+    Sesión cloudscraper con clearance persistido para un sitio.
+
+        clearance = Clearance("geant", MAX_WORKERS)
+        sesion = clearance.sesion        # se envuelve como siempre
+        detalle = clearance.sesion_detalle   # HTTP/2 o la misma sesion
+        ...
+        clearance.iniciar(BASE_URL)      # al empezar el scraping
+        clearance.detener()              # al terminar
+    """
+
+    def __init__(self, nombre, max_workers, directorio=None):
+        self.nombre = nombre
+        self.directorio = directorio or SCRAPER_CLEARANCE_DIR
+        self.activo = SCRAPER_CLEARANCE and SCRAPER_HTTP_MODO != "reproducir"
+
+        # El renovador resuelve desafíos; las sesiones de los hilos
+        # no, así que alcanza con requests.Session sobre el adapter
+        # (huella TLS) y los headers de cloudscraper. Sin
+        # renovador, cada hilo usa su propio cloudscraper
+        self._renovador = cloudscraper.create_scraper()
+        cifrado = self._renovador.cipherSuite
+        self.sesion = SesionPool(
+            max_workers,
+            headers=self._renovador.headers,
+            nombre=nombre,
+            fabrica=None if self.activo else (lambda: cloudscraper.create_scraper(cipherSuite=cifrado)),
+            adapter=adapter_pool(max_workers, cloudscraper.CipherSuiteAdapter, cipherSuite=cifrado)
+        )
+        if self.activo and SCRAPER_HTTP2 and http2_disponible():
+            contexto = ssl.create_default_context()
+            contexto.set_ciphers(cifrado)
+            self.sesion_detalle = SesionHttp2(
+                max_workers, headers=self.sesion.headers, nombre=f"{nombre}-detalle",
+                ssl_context=contexto, cookies=self.sesion.cookies
+            )
+        else:
+            if SCRAPER_HTTP2:
+                print(f"⚠️ {nombre}: HTTP/2 necesita httpx[http2] y el renovador de clearance, se usa HTTP/1.1")
+            self.sesion_detalle = self.sesion
+        # El renovador tiene sus propios headers (cloudscraper
+        # puede tocarlos mientras resuelve el desafío)
+        self._renovador.cookies = self.sesion.cookies
+        self._renovador.headers = CaseInsensitiveDict(self.sesion.headers)
+        if self.activo:
+            for sesion in self._sesiones():
+                sesion.hooks.append(self._al_responder)
+
+        self.url = None
+        self.host = None
+        self.obtenido = 0.0
+        self.expira = 0.0
+        self._ultima_renovacion = 0.0
+        self._lock = threading.Lock()
+        self._pedido = threading.Event()
+        self._detenido = threading.Event()
+        self._hilo = None
+
+    def _sesiones(self):
+        """
+        Sesiones de los hilos (una sola si no hay HTTP/2).
+        """
+        if self.sesion_detalle is self.sesion:
+            return [self.sesion]
+        return [self.sesion, self.sesion_detalle]
+
+    def _reemplazar_headers(self, headers):
+        for sesion in self._sesiones():
+            sesion.reemplazar_headers(headers)
+
+    # -----------------------------------------------------
+    # CICLO DE VIDA
+    # -----------------------------------------------------
+    def iniciar(self, url):
+        """
+        Carga el clearance guardado o lo renueva, y arranca el
+        hilo renovador.
+        """
+        if not self.activo:
+            return
+        self.url = url
+        self.host = urlsplit(url).netloc.lower()
+
+        if self.cargar():
+            print(f"🔑 Clearance {self.nombre}: reutilizado de disco (vence en {self._restante()})")
+            metricas.contar("clearance", sitio=self.nombre, evento="reutilizado")
+        else:
+            self._renovar_compartido()
+
+        self._hilo = threading.Thread(target=self._ciclo, name=f"clearance-{self.nombre}", daemon=True)
+        self._hilo.start()
+
+    def detener(self):
+        if self._hilo is None:
+            return
+        self._detenido.set()
+        self._pedido.set()
+        self._hilo.join(timeout=5)
+        self._hilo = None
+        # Las cookies que rotan solas (__cf_bm...) quedan para
+        # la próxima corrida
+        self.guardar()
+
+    def _ciclo(self):
+        while not self._detenido.is_set():
+            # Una renovación fallida no se reintenta antes de RENOVACION_MINIMA
+            espera = max(self._renovar_en(), self._ultima_renovacion + RENOVACION_MINIMA) - time.time()
+            pedido = self._pedido.wait(max(0.0, espera))
+            self._pedido.clear()
+            if self._detenido.is_set():
+                break
+            if pedido and time.time() - self._ultima_renovacion < RENOVACION_MINIMA:
+                continue
+            # Otro proceso puede haberlo renovado mientras tanto
+            if not pedido and self.cargar() and time.time() < self._renovar_en():
+                continue
+            self._renovar_compartido()
+
+    def _al_responder(self, respuesta, *args, **kwargs):
+        """
+        Hook de la sesión de los hilos: un desafío despierta al
+        renovador, sin esperarlo.
+        """
+        if descartes.es_cloudflare(respuesta):
+            metricas.contar("clearance", sitio=self.nombre, evento="desafio")
+            self._pedido.set()
+        return respuesta
+
+    # -----------------------------------------------------
+    # RENOVACIÓN
+    # -----------------------------------------------------
+    def _renovar_compartido(self):
+        """
+        Renueva si este proceso consigue el .lock del host; si
+        no, espera a que el otro proceso termine y lee su
+        resultado.
+        """
+        lock = self._ruta() + ".lock"
+        os.makedirs(self.directorio, exist_ok=True)
+        try:
+            if time.time() - os.path.getmtime(lock) > LOCK_VENCIDO:
+                os.remove(lock)
+        except OSError:
+            pass
+
+        try:
+            fd = os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            limite = time.time() + LOCK_VENCIDO
+            while os.path.exists(lock) and time.time() < limite and not self._detenido.is_set():
+                time.sleep(0.5)
+            if self.cargar():
+                print(f"🔑 Clearance {self.nombre}: renovado por otro proceso")
+            return
+
+        try:
+            os.close(fd)
+            self.renovar()
+        finally:
+            try:
+                os.remove(lock)
+            except OSError:
+                pass
+
+    def renovar(self):
+        """
+        Resuelve el desafío pidiendo la página principal con la
+        sesión renovadora y guarda el resultado.
+        """
+        with self._lock:
+            self._ultima_renovacion = time.time()
+            try:
+                respuesta = self._renovador.get(self.url, timeout=TIMEOUT_RENOVACION)
+            except Exception as e:
+                print(f"⚠️ Clearance {self.nombre}: no se pudo renovar ({e})")
+                metricas.contar("clearance", sitio=self.nombre, evento="error")
+                return False
+            if descartes.es_cloudflare(respuesta):
+                print(f"⚠️ Clearance {self.nombre}: el desafío no se resolvió ({respuesta.status_code})")
+                metricas.contar("clearance", sitio=self.nombre, evento="error")
+                return False
+
+            self._reemplazar_headers(self._renovador.headers)
+            self.obtenido = time.time()
+            self.expira = self._vencimiento_cookie() or self.obtenido + TTL_CLEARANCE
+            self._guardar_sin_lock()
+
+        print(f"🔑 Clearance {self.nombre}: renovado (vence en {self._restante()})")
+        metricas.contar("clearance", sitio=self.nombre, evento="renovado")
+        return True
+
+    def _vencimiento_cookie(self):
+        for cookie in self.sesion.cookies:
+            if cookie.name == COOKIE_CLEARANCE and cookie.expires:
+                return float(cookie.expires)
+        return None
+
+    # -----------------------------------------------------
+    # PERSISTENCIA
+    # -----------------------------------------------------
+    def _ruta(self):
+        return os.path.join(self.directorio, f"{self.host.replace(':', '_')}.json")
+
+    def cargar(self):
+        """
+        Lee el clearance guardado del host. Devuelve True si
+        había uno vigente (y lo aplica a las sesiones).
+        """
+        datos = leer_cache(self._ruta(), TTL_CLEARANCE * 4)
+        if not datos or datos.get("expira", 0) <= time.time():
+            return False
+        if datos["obtenido"] <= self.obtenido:
+            return True
+
+        with self._lock:
+            # Diccionarios nuevos: los hilos pueden estar leyendo
+            # los anteriores
+            self._reemplazar_headers(datos["headers"])
+            self._renovador.headers = CaseInsensitiveDict(datos["headers"])
+            for c in datos["cookies"]:
+                self.sesion.cookies.set(
+                    c["nombre"], c["valor"], domain=c["dominio"], path=c["ruta"],
+                    expires=c["expira"], secure=c["segura"]
+                )
+            self.obtenido = datos["obtenido"]
+            self.expira = datos["expira"]
+        return True
+
+    def guardar(self):
+        if self.activo and self.host and self.obtenido:
+            with self._lock:
+                self._guardar_sin_lock()
+
+    def _guardar_sin_lock(self):
+        # No se pisa un clearance más nuevo de otro proceso
+        guardado = leer_cache(self._ruta(), TTL_CLEARANCE * 4)
+        if guardado and guardado.get("obtenido", 0) > self.obtenido:
+            return
+        guardar_cache(self._ruta(), {
+            "url": self.url,
+            "obtenido": self.obtenido,
+            "expira": self.expira,
+            "headers": dict(self.sesion.headers),
+            "cookies": [
+                {
+                    "nombre": c.name, "valor": c.value, "dominio": c.domain, "ruta": c.path,
+                    "expira": c.expires, "segura": c.secure
+                }
+                for c in self.sesion.cookies
+            ]
+        })
+
+    def _renovar_en(self):
+        return self.expira - MARGEN_RENOVACION * (self.expira - self.obtenido)
+
+    def _restante(self):
+        segundos = max(0, self.expira - time.time())
+        return f"{segundos:.0f}s" if segundos < 120 else f"{segundos / 60:.0f} min"
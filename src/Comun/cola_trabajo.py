@@ -0,0 +1,365 @@
+import hmac
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+import requests
+
+# =========================================================
+# COLA DE TRABAJO CON LEASES
+# =========================================================
+# Reparte ítems (URLs de detalle) entre workers que pueden
+# estar en otros procesos o en otras máquinas.
+#
+# Cada worker "toma" un lote con un lease: si no lo completa
+# antes de que venza (porque murió o se colgó), los ítems
+# vuelven a quedar disponibles para otro worker. Después de
+# MAX_INTENTOS leases vencidos o fallidos, el ítem queda
+# como "fallido".
+#
+# Implementaciones (crear_cola elige según la URL):
+# - sqlite:///ruta/cola.sqlite → ColaSQLite, local (varios
+#                                 procesos en la misma máquina)
+# - http://host:puerto         → ColaHttp, cliente de una cola
+#                                 servida con servir_cola()
+# Otros brokers (Redis, Pub/Sub...) se agregan registrando
+# una clase en BROKERS con el esquema de su URL.
+#
+# La cola servida escucha por defecto solo en 127.0.0.1 y
+# exige un secreto compartido en el header HEADER_TOKEN: el
+# servidor y los clientes lo leen de SCRAPER_COLA_TOKEN. Sin
+# él cualquiera en la red podría tomar o cerrar la cola.
+
+# Segundos que dura un lease si el worker no dice otra cosa
+LEASE_SEGUNDOS = 120
+
+# Intentos antes de marcar un ítem como fallido
+MAX_INTENTOS = 3
+
+# Header con el secreto compartido de la cola HTTP
+HEADER_TOKEN = "X-Cola-Token"
+
+# Secreto compartido por defecto (servir_cola y ColaHttp)
+SCRAPER_COLA_TOKEN = os.getenv("SCRAPER_COLA_TOKEN")
+
+PENDIENTE = "pendiente"
+TOMADO = "tomado"
+HECHO = "hecho"
+FALLIDO = "fallido"
+
+
+class ColaTrabajo(ABC):
+    """
+    Interfaz de una cola de trabajo.
+
+    Los ítems son (clave, datos): la clave es única (la URL)
+    y datos es cualquier cosa serializable a JSON.
+    """
+
+    @abstractmethod
+    def encolar(self, items):
+        """
+        Agrega [(clave, datos)]. Las claves repetidas se ignoran.
+        Devuelve cuántas eran nuevas.
+        """
+        ...
+
+    @abstractmethod
+    def tomar(self, worker, cantidad, lease_segundos=LEASE_SEGUNDOS):
+        """
+        Toma hasta `cantidad` ítems pendientes (o con lease
+        vencido) para `worker`. Devuelve [(id, clave, datos)].
+        """
+        ...
+
+    @abstractmethod
+    def completar(self, worker, ids):
+        """
+        Marca ítems como hechos (solo si el lease es de `worker`).
+        """
+        ...
+
+    @abstractmethod
+    def fallar(self, worker, ids, error=""):
+        """
+        Devuelve ítems a la cola, o los marca fallidos si ya
+        usaron MAX_INTENTOS.
+        """
+        ...
+
+    @abstractmethod
+    def resumen(self):
+        """
+        Devuelve {estado: cantidad}.
+        """
+        ...
+
+    @abstractmethod
+    def cerrar(self):
+        """
+        El coordinador avisa que no va a encolar nada más.
+        """
+        ...
+
+    @abstractmethod
+    def cerrada(self):
+        ...
+
+    def terminada(self):
+        """
+        True si la cola está cerrada y no queda nada pendiente
+        ni tomado. Antes de cerrarse puede estar vacía un rato
+        (el descubrimiento sigue encolando).
+        """
+        if not self.cerrada():
+            return False
+        resumen = self.resumen()
+        return not resumen.get(PENDIENTE) and not resumen.get(TOMADO)
+
+
+# =========================================================
+# COLA LOCAL EN SQLITE
+# =========================================================
+class ColaSQLite(ColaTrabajo):
+    """
+    Cola en un archivo SQLite. Varios procesos pueden usarla a
+    la vez: cada operación es una transacción IMMEDIATE, así
+    dos workers nunca toman el mismo ítem.
+    """
+
+    def __init__(self, ruta):
+        carpeta = os.path.dirname(os.path.abspath(ruta))
+        os.makedirs(carpeta, exist_ok=True)
+        self.ruta = ruta
+        self._local = threading.local()
+
+        with self._transaccion() as db:
+            db.execute("""
+                CREATE TABLE IF NOT EXISTS items (
+                    id INTEGER PRIMARY KEY,
+                    clave TEXT NOT NULL UNIQUE,
+                    datos TEXT,
+                    estado TEXT NOT NULL DEFAULT 'pendiente',
+                    worker TEXT,
+                    vence REAL,
+                    intentos INTEGER NOT NULL DEFAULT 0,
+                    error TEXT
+                )
+            """)
+            db.execute("CREATE INDEX IF NOT EXISTS items_estado ON items (estado, vence)")
+            db.execute("CREATE TABLE IF NOT EXISTS meta (clave TEXT PRIMARY KEY, valor TEXT)")
+
+    def _conexion(self):
+        # Una conexión por hilo (sqlite3 no se comparte entre hilos)
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.ruta, timeout=30, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._local.db = db
+        return db
+
+    def _transaccion(self):
+        return _Transaccion(self._conexion())
+
+    def encolar(self, items):
+        filas = [(clave, json.dumps(datos, ensure_ascii=False)) for clave, datos in items]
+        with self._transaccion() as db:
+            antes = db.total_changes
+            db.executemany("INSERT OR IGNORE INTO items (clave, datos) VALUES (?, ?)", filas)
+            return db.total_changes - antes
+
+    def tomar(self, worker, cantidad, lease_segundos=LEASE_SEGUNDOS):
+        ahora = time.time()
+        with self._transaccion() as db:
+            # Los leases vencidos que ya agotaron sus intentos
+            # no se vuelven a entregar
+            db.execute(
+                "UPDATE items SET estado = ?, error = 'lease vencido' "
+                "WHERE estado = ? AND vence < ? AND intentos >= ?",
+                (FALLIDO, TOMADO, ahora, MAX_INTENTOS)
+            )
+            filas = db.execute(
+                "UPDATE items SET estado = ?, worker = ?, vence = ?, intentos = intentos + 1 "
+                "WHERE id IN ("
+                "  SELECT id FROM items "
+                "  WHERE estado = ? OR (estado = ? AND vence < ?) "
+                "  ORDER BY id LIMIT ?"
+                ") RETURNING id, clave, datos",
+                (TOMADO, worker, ahora + lease_segundos, PENDIENTE, TOMADO, ahora, cantidad)
+            ).fetchall()
+        return [(i, clave, json.loads(datos)) for i, clave, datos in sorted(filas)]
+
+    def completar(self, worker, ids):
+        with self._transaccion() as db:
+            db.executemany(
+                "UPDATE items SET estado = ?, vence = NULL WHERE id = ? AND worker = ? AND estado = ?",
+                [(HECHO, i, worker, TOMADO) for i in ids]
+            )
+
+    def fallar(self, worker, ids, error=""):
+        with self._transaccion() as db:
+            db.executemany(
+                "UPDATE items SET estado = CASE WHEN intentos >= ? THEN ? ELSE ? END, "
+                "vence = NULL, error = ? WHERE id = ? AND worker = ? AND estado = ?",
+                [(MAX_INTENTOS, FALLIDO, PENDIENTE, str(error)[:500], i, worker, TOMADO) for i in ids]
+            )
+
+    def resumen(self):
+        with self._transaccion() as db:
+            filas = db.execute("SELECT estado, COUNT(*) FROM items GROUP BY estado").fetchall()
+        return dict(filas)
+
+    def cerrar(self):
+        with self._transaccion() as db:
+            db.execute("INSERT OR REPLACE INTO meta (clave, valor) VALUES ('cerrada', '1')")
+
+    def cerrada(self):
+        with self._transaccion() as db:
+            return db.execute("SELECT 1 FROM meta WHERE clave = 'cerrada'").fetchone() is not None
+
+    def fallidos(self):
+        with self._transaccion() as db:
+            return db.execute(
+                "SELECT clave, error FROM items WHERE estado = ?", (FALLIDO,)
+            ).fetchall()
+
+
+class _Transaccion:
+    """
+    BEGIN IMMEDIATE ... COMMIT (o ROLLBACK si hubo error).
+    """
+
+    def __init__(self, db):
+        self.db = db
+
+    def __enter__(self):
+        self.db.execute("BEGIN IMMEDIATE")
+        return self.db
+
+    def __exit__(self, tipo, *exc):
+        self.db.execute("ROLLBACK" if tipo else "COMMIT")
+        return False
+
+
+# =========================================================
+# COLA EN RED (HTTP)
+# =========================================================
+# El coordinador sirve su cola por HTTP y los workers de
+# otras máquinas la usan con ColaHttp. Cada operación es un
+# POST /<operación> con los argumentos en JSON.
+
+OPERACIONES = ("encolar", "tomar", "completar", "fallar", "resumen", "cerrar", "cerrada")
+
+
+class ColaHttp(ColaTrabajo):
+    """
+    Cliente de una cola servida con servir_cola().
+    """
+
+    def __init__(self, url_base, timeout=30, token=None):
+        self.url_base = url_base.rstrip("/")
+        self.timeout = timeout
+        self.sesion = requests.Session()
+        token = token or SCRAPER_COLA_TOKEN
+        if token:
+            self.sesion.headers[HEADER_TOKEN] = token
+
+    def _llamar(self, operacion, **argumentos):
+        res = self.sesion.post(f"{self.url_base}/{operacion}", json=argumentos, timeout=self.timeout)
+        res.raise_for_status()
+        return res.json()["resultado"]
+
+    def encolar(self, items):
+        return self._llamar("encolar", items=[list(i) for i in items])
+
+    def tomar(self, worker, cantidad, lease_segundos=LEASE_SEGUNDOS):
+        return [tuple(i) for i in self._llamar(
+            "tomar", worker=worker, cantidad=cantidad, lease_segundos=lease_segundos
+        )]
+
+    def completar(self, worker, ids):
+        return self._llamar("completar", worker=worker, ids=list(ids))
+
+    def fallar(self, worker, ids, error=""):
+        return self._llamar("fallar", worker=worker, ids=list(ids), error=str(error))
+
+    def resumen(self):
+        return self._llamar("resumen")
+
+    def cerrar(self):
+        return self._llamar("cerrar")
+
+    def cerrada(self):
+        return self._llamar("cerrada")
+
+
+def servir_cola(cola, puerto, host="127.0.0.1", token=None):
+    """
+    Expone `cola` por HTTP en un hilo de fondo y devuelve el servidor.
+    Solo atiende pedidos con `token` (o SCRAPER_COLA_TOKEN) en el
+    header HEADER_TOKEN; para workers remotos hay que pasar un
+    `host` accesible desde afuera (por ejemplo "0.0.0.0").
+    """
+    token = token or SCRAPER_COLA_TOKEN
+    if not token:
+        raise ValueError("servir_cola necesita un token (SCRAPER_COLA_TOKEN)")
+    esperado = token.encode("utf-8")
+
+    class Manejador(BaseHTTPRequestHandler):
+        def do_POST(self):
+            recibido = self.headers.get(HEADER_TOKEN, "").encode("utf-8")
+            if not hmac.compare_digest(recibido, esperado):
+                self.send_error(401)
+                return
+            operacion = self.path.strip("/")
+            if operacion not in OPERACIONES:
+                self.send_error(404)
+                return
+            largo = int(self.headers.get("Content-Length", 0))
+            argumentos = json.loads(self.rfile.read(largo) or b"{}")
+            try:
+                resultado = getattr(cola, operacion)(**argumentos)
+            except Exception as e:
+                self.send_error(500, str(e))
+                return
+            cuerpo = json.dumps({"resultado": resultado}, ensure_ascii=False).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(cuerpo)))
+            self.end_headers()
+            self.wfile.write(cuerpo)
+
+        def log_message(self, *args):
+            pass
+
+    servidor = ThreadingHTTPServer((host, puerto), Manejador)
+    servidor.daemon_threads = True
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor
+
+
+# =========================================================
+# FÁBRICA
+# =========================================================
+# esquema de la URL → función que crea la cola a partir de la URL
+BROKERS = {
+    "sqlite": lambda url: ColaSQLite(urlsplit(url).path),
+    "http": ColaHttp,
+    "https": ColaHttp
+}
+
+
+def crear_cola(url):
+    """
+    Crea la cola que corresponde a la URL (ver BROKERS).
+    """
+    esquema = urlsplit(url).scheme
+    if esquema not in BROKERS:
+        raise ValueError(f"Broker desconocido: {url} (disponibles: {', '.join(BROKERS)})")
+    return BROKERS[esquema](url)
@@ -0,0 +1,342 @@
+import os
+import threading
+import time
+
+import requests
+
+from Comun import descartes, metricas
+
+# =========================================================
+# CONCURRENCIA ADAPTATIVA DE REQUESTS
+# =========================================================
+# Con una cantidad fija de hilos por scraper, pocos
+# desperdician tiempo y muchos disparan bloqueos. El
+# controlador limita los requests EN VUELO contra un sitio y
+# ajusta ese límite solo, al estilo AIMD/Vegas de TCP:
+#
+# - arranca bajo (CONCURRENCIA_INICIAL de cada scraper), así
+#   la latencia "base" se mide sin cola
+# - cada VENTANA de respuestas estima, como TCP Vegas, cuántos
+#   requests están haciendo cola en el sitio:
+#       cola = límite × (1 - base / latencia mediana)
+#   (base = la mejor latencia mediana vista, sin cola)
+#     - cola < COLA_MINIMA y el límite se estuvo usando
+#       entero → ×2 hasta la mitad del tope o la primera
+#       bajada (arranque lento de TCP), después +1 (suba aditiva)
+#     - cola > COLA_MAXIMA → -1
+#     - latencia > LATENCIA_CRITICA × base → × FACTOR_BAJA
+# - un desafío de Cloudflare, un 429/503 o un timeout baja el
+#   límite enseguida (× FACTOR_BAJA) y frena las subidas
+#   durante VENTANAS_ESPERA ventanas. Solo cuentan las
+#   respuestas a requests que salieron DESPUÉS de la última
+#   bajada: los que ya estaban en vuelo no vuelven a bajar
+#
+# Los hilos de cada pool pasan a ser el TOPE: el controlador
+# decide cuántos requests salen a la vez. Cada cambio se
+# imprime y queda en la sección "concurrencia" del reporte de
+# Comun/metricas.py.
+#
+#   SCRAPER_CONCURRENCIA:
+#     - "adaptativa" (por defecto)
+#     - "fija": el límite queda fijo en el tope (un request
+#       por hilo, sin ajuste)
+
+SCRAPER_CONCURRENCIA = os.getenv("SCRAPER_CONCURRENCIA", "adaptativa")
+
+# Respuestas mínimas por ventana de decisión (o el límite
+# actual, si es más grande)
+VENTANA = 20
+
+# Requests en cola (estimados) entre los que el límite se mantiene
+COLA_MINIMA = 2
+COLA_MAXIMA = 4
+
+# Latencia mediana (× base) desde la que se baja multiplicando
+LATENCIA_CRITICA = 3
+
+# Multiplicador del límite ante bloqueos, timeouts o mucha latencia
+FACTOR_BAJA = 0.7
+
+# Ventanas sin subir después de un bloqueo
+VENTANAS_ESPERA = 2
+
+# La base se "olvida" de a poco (por ventana), por si el
+# sitio se volvió más lento para todos y no por nosotros
+DERIVA_BASE = 0.001
+
+# Fracción de errores de red/HTTP en una ventana que cuenta como congestión
+UMBRAL_ERRORES = 0.1
+
+# Cambios guardados para el reporte
+MAX_HISTORIAL = 200
+
+# Resultados de un request
+OK = "ok"
+BLOQUEO = "bloqueo"
+TIMEOUT = "timeout"
+ERROR = "error"
+
+_controladores = []
+_controladores_lock = threading.Lock()
+
+
+class ControladorConcurrencia:
+    """
+    Semáforo con límite adaptativo. Seguro entre hilos.
+
+        controlador = ControladorConcurrencia("geant", inicial=15, maximo=30)
+        with controlador.turno() as turno:
+            respuesta = sesion.get(url)
+            turno.resultado = OK           # o BLOQUEO / TIMEOUT / ERROR
+    """
+
+    def __init__(self, nombre, inicial, maximo, minimo=1, modo=None):
+        self.nombre = nombre
+        self.minimo = minimo
+        self.maximo = maximo
+        self.adaptativo = (modo or SCRAPER_CONCURRENCIA) != "fija"
+        self.inicial = max(minimo, min(inicial, maximo)) if self.adaptativo else maximo
+        self.limite = float(self.inicial)
+        # Hasta acá el arranque duplica; después suma de a uno
+        self.umbral_arranque = max(self.inicial, maximo // 2)
+
+        self._cond = threading.Condition()
+        self.en_vuelo = 0
+        self._max_en_vuelo = 0
+        self._muestras = []
+        self._errores = 0
+        self._epoca = 0
+        self._espera = 0
+        self._arranque = True
+        self.base = None
+
+        self.inicio = time.time()
+        self.requests = 0
+        self._limite_por_request = 0.0
+        self.ajustes = {"sube": 0, "baja": 0}
+        self.historial = [(0.0, self.inicial, "inicio")]
+
+        with _controladores_lock:
+            _controladores.append(self)
+
+    # -----------------------------------------------------
+    # TURNOS
+    # -----------------------------------------------------
+    def adquirir(self):
+        """
+        Espera un lugar libre. Devuelve la época (cantidad de
+        bajadas hasta ahora), que se pasa a liberar().
+        """
+        with self._cond:
+            while self.en_vuelo >= int(self.limite):
+                self._cond.wait()
+            self.en_vuelo += 1
+            self._max_en_vuelo = max(self._max_en_vuelo, self.en_vuelo)
+            return self._epoca
+
+    def liberar(self, latencia, resultado=OK, epoca=None):
+        with self._cond:
+            self.en_vuelo -= 1
+            self.requests += 1
+            self._limite_por_request += self.limite
+            if self.adaptativo:
+                self._observar(latencia, resultado, self._epoca if epoca is None else epoca)
+            self._cond.notify_all()
+
+    def turno(self):
+        return _Turno(self)
+
+    # -----------------------------------------------------
+    # AJUSTE (siempre con self._cond tomado)
+    # -----------------------------------------------------
+    def _observar(self, latencia, resultado, epoca):
+        if epoca != self._epoca:
+            # Salió antes de la última bajada: no dice nada del
+            # límite actual
+            return
+        if resultado in (BLOQUEO, TIMEOUT):
+            # Congestión explícita: se baja sin esperar la ventana
+            self._espera = VENTANAS_ESPERA
+            self._bajar(self.limite * FACTOR_BAJA, resultado)
+            return
+        if resultado == ERROR:
+            self._errores += 1
+        else:
+            self._muestras.append(latencia)
+
+        if len(self._muestras) + self._errores >= max(VENTANA, int(self.limite)):
+            self._cerrar_ventana()
+
+    def _cerrar_ventana(self):
+        muestras = sorted(self._muestras)
+        errores = self._errores
+        usado = self._max_en_vuelo >= int(self.limite)
+        self._muestras, self._errores = [], 0
+        self._max_en_vuelo = self.en_vuelo
+
+        total = len(muestras) + errores
+        if errores / total > UMBRAL_ERRORES:
+            self._espera = VENTANAS_ESPERA
+            self._bajar(self.limite * FACTOR_BAJA, "errores")
+            return
+        if not muestras:
+            return
+
+        mediana = muestras[len(muestras) // 2]
+        if self.base is None or mediana < self.base:
+            self.base = mediana
+        else:
+            self.base *= 1 + DERIVA_BASE
+        cola = self.limite * (1 - self.base / mediana) if mediana > 0 else 0
+
+        if mediana > LATENCIA_CRITICA * self.base:
+            self._bajar(self.limite * FACTOR_BAJA, "latencia", mediana)
+        elif cola > COLA_MAXIMA:
+            self._bajar(self.limite - 1, "latencia", mediana)
+        elif self._espera > 0:
+            self._espera -= 1
+        elif usado and cola < COLA_MINIMA:
+            if self._arranque and self.limite < self.umbral_arranque:
+                nuevo = min(self.limite * 2, self.umbral_arranque)
+            else:
+                nuevo = self.limite + 1
+            self._ajustar(nuevo, "sube", mediana)
+
+    def _bajar(self, nuevo, motivo, mediana=None):
+        """
+        Baja el límite y empieza una época nueva: la ventana en
+        curso se descarta.
+        """
+        self._epoca += 1
+        self._arranque = False
+        self._muestras, self._errores = [], 0
+        self._max_en_vuelo = self.en_vuelo
+        self._ajustar(nuevo, motivo, mediana)
+
+    def _ajustar(self, nuevo, motivo, mediana=None):
+        nuevo = max(self.minimo, min(self.maximo, nuevo))
+        antes = int(self.limite)
+        self.limite = float(nuevo)
+        if int(nuevo) == antes:
+            return
+
+        direccion = "sube" if nuevo > antes else "baja"
+        self.ajustes[direccion] += 1
+        segundos = round(time.time() - self.inicio, 1)
+        self.historial.append((segundos, int(nuevo), motivo))
+        del self.historial[1:-MAX_HISTORIAL]
+        metricas.contar("concurrencia_ajustes", controlador=self.nombre, motivo=motivo)
+
+        detalle = f", latencia {mediana * 1000:.0f} ms / base {self.base * 1000:.0f} ms" if mediana else ""
+        print(f"🎚️ Concurrencia {self.nombre}: {antes} → {int(nuevo)} ({motivo}{detalle})")
+
+    # -----------------------------------------------------
+    # RESUMEN
+    # -----------------------------------------------------
+    def resumen(self):
+        with self._cond:
+            promedio = self._limite_por_request / self.requests if self.requests else self.limite
+            return {
+                "modo": "adaptativa" if self.adaptativo else "fija",
+                "inicial": self.inicial,
+                "final": int(self.limite),
+                "minimo": self.minimo,
+                "maximo": self.maximo,
+                "promedio": round(promedio, 1),
+                "requests": self.requests,
+                "latencia_base_ms": round(self.base * 1000, 1) if self.base else None,
+                "ajustes": dict(self.ajustes),
+                "historial": [list(h) for h in self.historial]
+            }
+
+    def imprimir_resumen(self):
+        r = self.resumen()
+        print(
+            f"🎚️ Concurrencia {self.nombre} ({r['modo']}): {r['inicial']} → {r['final']} "
+            f"(promedio {r['promedio']}, tope {r['maximo']}) | "
+            f"{r['ajustes']['sube']} subidas, {r['ajustes']['baja']} bajadas en {r['requests']} requests"
+        )
+
+
+class _Turno:
+    __slots__ = ("controlador", "resultado", "_inicio", "_epoca")
+
+    def __init__(self, controlador):
+        self.controlador = controlador
+        self.resultado = OK
+
+    def __enter__(self):
+        self._epoca = self.controlador.adquirir()
+        self._inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, tipo, valor, traza):
+        if valor is not None and self.resultado == OK:
+            self.resultado = resultado_de_excepcion(valor)
+        self.controlador.liberar(time.perf_counter() - self._inicio, self.resultado, self._epoca)
+
+
+# =========================================================
+# CLASIFICACIÓN DE RESPUESTAS
+# =========================================================
+def resultado_de_respuesta(respuesta):
+    if respuesta.status_code == 429 or descartes.es_cloudflare(respuesta):
+        return BLOQUEO
+    if respuesta.status_code >= 500:
+        return BLOQUEO if respuesta.status_code == 503 else ERROR
+    return OK
+
+
+def resultado_de_excepcion(e):
+    if isinstance(e, requests.exceptions.Timeout):
+        return TIMEOUT
+    return ERROR
+
+
+# =========================================================
+# SESIÓN LIMITADA
+# =========================================================
+class SesionLimitada:
+    """
+    Envoltorio de una sesión requests/cloudscraper (o de las
+    envolturas de Comun/grabacion.py y Comun/sesiones.py):
+    get() y post() esperan turno en el controlador y le
+    informan latencia y resultado. Cualquier otro atributo va
+    a la sesión original.
+    """
+
+    def __init__(self, sesion, controlador):
+        self.sesion = sesion
+        self.controlador = controlador
+
+    def __getattr__(self, nombre):
+        return getattr(self.sesion, nombre)
+
+    def get(self, url, **kwargs):
+        return self._pedir(self.sesion.get, url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self._pedir(self.sesion.post, url, **kwargs)
+
+    def _pedir(self, metodo, url, **kwargs):
+        with self.controlador.turno() as turno:
+            respuesta = metodo(url, **kwargs)
+            turno.resultado = resultado_de_respuesta(respuesta)
+        return respuesta
+
+
+def limitar_sesion(sesion, nombre, inicial, maximo, minimo=1):
+    """
+    Devuelve (sesión limitada, controlador).
+    """
+    controlador = ControladorConcurrencia(nombre, inicial, maximo, minimo)
+    return SesionLimitada(sesion, controlador), controlador
+
+
+def resumen():
+    with _controladores_lock:
+        controladores = list(_controladores)
+    return {c.nombre: c.resumen() for c in controladores}
+
+
+metricas.SECCIONES["concurrencia"] = resumen
@@ -0,0 +1,213 @@
+import random
+import threading
+from json import JSONDecodeError
+
+import requests
+
+from Comun import metricas
+
+# =========================================================
+# DESCARTES DE PRODUCTOS Y PÁGINAS
+# =========================================================
+# Cada vez que un scraper tira un producto (o una página de
+# listado) se registra el MOTIVO. Así se ve cuántos requests
+# terminan sin producto y por qué, en lugar de un None mudo.
+#
+# Los contadores son por hilo (sin lock en el camino caliente)
+# y se suman recién al armar el reporte. Por motivo se guarda
+# una muestra aleatoria de URLs de ejemplo.
+#
+# El resultado va al reporte de Comun/metricas.py:
+# - contador "descartes" por motivo (JSON y Prometheus)
+# - sección "descartes" con totales y URLs de ejemplo
+
+# Motivos
+SIN_JSON_LD = "SIN_JSON_LD"
+JSON_INVALIDO = "JSON_INVALIDO"
+SIN_PRECIO = "SIN_PRECIO"
+SIN_GTIN = "SIN_GTIN"
+DATOS_INVALIDOS = "DATOS_INVALIDOS"
+TIMEOUT = "TIMEOUT"
+ERROR_RED = "ERROR_RED"
+ERROR_HTTP = "ERROR_HTTP"
+CLOUDFLARE = "CLOUDFLARE"
+ERROR_PARSEO = "ERROR_PARSEO"
+ERROR_INESPERADO = "ERROR_INESPERADO"
+
+MOTIVOS = (
+    SIN_JSON_LD, JSON_INVALIDO, SIN_PRECIO, SIN_GTIN, DATOS_INVALIDOS,
+    TIMEOUT, ERROR_RED, ERROR_HTTP, CLOUDFLARE, ERROR_PARSEO, ERROR_INESPERADO
+)
+
+# URLs de ejemplo que se guardan por motivo
+MUESTRAS_POR_MOTIVO = 10
+
+# Textos que delatan una página de desafío de Cloudflare
+MARCAS_CLOUDFLARE = ("Just a moment...", "challenge-platform", "cf-browser-verification")
+
+
+class ErrorHttp(Exception):
+    """
+    Respuesta con un status que no trae contenido útil.
+    """
+
+    def __init__(self, motivo, status):
+        super().__init__(f"{motivo} (status {status})")
+        self.motivo = motivo
+        self.status = status
+
+
+# =========================================================
+# REGISTRO POR HILO
+# =========================================================
+class _RegistroHilo:
+    __slots__ = ("conteo", "muestras", "vistos")
+
+    def __init__(self):
+        # clave (motivo, tipo) → cantidad
+        self.conteo = {}
+        # motivo → URLs de ejemplo (reservorio)
+        self.muestras = {}
+        # motivo → cantidad de URLs ofrecidas al reservorio
+        self.vistos = {}
+
+
+_local = threading.local()
+_registros = []
+_registros_lock = threading.Lock()
+
+
+def _registro():
+    registro = getattr(_local, "registro", None)
+    if registro is None:
+        registro = _local.registro = _RegistroHilo()
+        # Solo se toma el lock la primera vez de cada hilo
+        with _registros_lock:
+            _registros.append(registro)
+    return registro
+
+
+def descartar(motivo, url=None, tipo="producto"):
+    """
+    Registra un descarte. `tipo` distingue productos de
+    páginas de listado ("pagina") u otros requests.
+    """
+    registro = _registro()
+    clave = (motivo, tipo)
+    registro.conteo[clave] = registro.conteo.get(clave, 0) + 1
+
+    if url:
+        muestras = registro.muestras.setdefault(motivo, [])
+        vistos = registro.vistos.get(motivo, 0) + 1
+        registro.vistos[motivo] = vistos
+        if len(muestras) < MUESTRAS_POR_MOTIVO:
+            muestras.append(url)
+        else:
+            # Muestreo de reservorio: cada URL tiene la misma
+            # probabilidad de quedar como ejemplo
+            i = random.randrange(vistos)
+            if i < MUESTRAS_POR_MOTIVO:
+                muestras[i] = url
+
+
+# =========================================================
+# CLASIFICACIÓN
+# =========================================================
+def es_cloudflare(respuesta):
+    if respuesta.status_code not in (403, 429, 503):
+        return False
+    if "cf-mitigated" in respuesta.headers:
+        return True
+    inicio = respuesta.text[:5000]
+    return any(marca in inicio for marca in MARCAS_CLOUDFLARE)
+
+
+def verificar_respuesta(respuesta):
+    """
+    Lanza ErrorHttp si la respuesta es un desafío de Cloudflare
+    o un status de error.
+    """
+    if es_cloudflare(respuesta):
+        raise ErrorHttp(CLOUDFLARE, respuesta.status_code)
+    if respuesta.status_code >= 400:
+        raise ErrorHttp(ERROR_HTTP, respuesta.status_code)
+    return respuesta
+
+
+def motivo_de_excepcion(e):
+    """
+    Traduce una excepción al motivo de descarte.
+    """
+    if isinstance(e, ErrorHttp):
+        return e.motivo
+    # Va antes que RequestException: el JSONDecodeError de
+    # requests hereda de las dos
+    if isinstance(e, JSONDecodeError):
+        return JSON_INVALIDO
+    if isinstance(e, requests.exceptions.Timeout):
+        return TIMEOUT
+    if isinstance(e, requests.exceptions.RequestException):
+        return ERROR_RED
+    if isinstance(e, (ValueError, TypeError, KeyError, IndexError, AttributeError)):
+        return DATOS_INVALIDOS
+    return ERROR_INESPERADO
+
+
+def descartar_excepcion(e, url=None, tipo="producto"):
+    motivo = motivo_de_excepcion(e)
+    descartar(motivo, url, tipo)
+    return motivo
+
+
+# =========================================================
+# RESUMEN
+# =========================================================
+def _sumar():
+    conteo = {}
+    muestras = {}
+    with _registros_lock:
+        registros = list(_registros)
+    for registro in registros:
+        for clave, n in list(registro.conteo.items()):
+            conteo[clave] = conteo.get(clave, 0) + n
+        for motivo, urls in list(registro.muestras.items()):
+            muestras.setdefault(motivo, []).extend(urls)
+    return conteo, muestras
+
+
+def resumen():
+    """
+    {"total", "motivos": {motivo: n}, "por_tipo": {...}, "ejemplos": {motivo: [urls]}}
+    """
+    conteo, muestras = _sumar()
+    motivos = {}
+    por_tipo = {}
+    for (motivo, tipo), n in conteo.items():
+        motivos[motivo] = motivos.get(motivo, 0) + n
+        por_tipo.setdefault(tipo, {})[motivo] = n
+    return {
+        "total": sum(motivos.values()),
+        "motivos": dict(sorted(motivos.items(), key=lambda x: -x[1])),
+        "por_tipo": por_tipo,
+        "ejemplos": {
+            m: random.sample(urls, min(len(urls), MUESTRAS_POR_MOTIVO))
+            for m, urls in muestras.items()
+        }
+    }
+
+
+def _contadores():
+    conteo, _ = _sumar()
+    return [("descartes", {"motivo": m, "tipo": t}, n) for (m, t), n in conteo.items()]
+
+
+def imprimir_resumen():
+    datos = resumen()
+    if not datos["total"]:
+        return
+    detalle = ", ".join(f"{m}: {n}" for m, n in datos["motivos"].items())
+    print(f"🗑️ Descartados: {datos['total']} ({detalle})")
+
+
+metricas.FUENTES.append(_contadores)
+metricas.SECCIONES["descartes"] = resumen
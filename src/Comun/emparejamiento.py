@@ -0,0 +1,384 @@
+import re
+import unicodedata
+
+import numpy as np
+
+# =========================================================
+# EMPAREJAMIENTO DE PRODUCTOS ENTRE TIENDAS
+# =========================================================
+# Junta en un mismo "grupo" las publicaciones del mismo
+# producto en distintas tiendas, sin comparar todos contra
+# todos (5 × 30k productos serían ~10^10 comparaciones).
+#
+# 1. Índice por GTIN: Géant y Tata usan el GTIN como idWeb;
+#    Tienda Inglesa lo trae en el campo "gtin". Mismo GTIN
+#    válido → mismo grupo.
+# 2. Índice por nombre + marca normalizados, con MinHash/LSH:
+#    cada producto se reduce a los tokens descriptivos del
+#    nombre (sin tildes, sin la marca) más su marca y su medida
+#    canónica ("1 Lt" = "1000 ml"), se le calcula una firma MinHash (NumPy) y las firmas se parten
+#    en bandas. Solo son candidatos los productos de tiendas
+#    distintas que coinciden en alguna banda.
+# 3. Los candidatos se puntúan en bloque (NumPy): Jaccard
+#    estimado por las firmas, misma medida obligatoria, marca
+#    igual suma y distinta resta.
+# 4. Los pares aceptados unen grupos de mayor a menor puntaje,
+#    sin meter dos productos de la misma tienda en un grupo.
+
+# Tiendas cuyo idWeb es el GTIN del producto
+TIENDAS_IDWEB_GTIN = {213458920015, 210003270017}
+
+# Largo de la firma MinHash y bandas del LSH (filas por banda =
+# NUM_HASHES / BANDAS). Con 32 bandas de 2 filas, un par con
+# Jaccard 0,5 es candidato con probabilidad ~1
+NUM_HASHES = 64
+BANDAS = 32
+
+# Buckets más grandes que esto son tokens genéricos: no se usan
+MAX_BUCKET = 40
+
+# Puntaje mínimo para aceptar un par por nombre
+UMBRAL_NOMBRE = 0.6
+
+# Ajuste del puntaje por marca igual / distinta
+BONO_MARCA = 0.15
+CASTIGO_MARCA = 0.5
+
+# Primo de Mersenne para las funciones hash (a·x + b) mod p
+PRIMO = (1 << 31) - 1
+
+# Tokens que no aportan
+PALABRAS_VACIAS = {
+    "de", "del", "la", "las", "el", "los", "en", "con", "sin", "y", "para", "por",
+    "x", "un", "una", "al", "oferta", "pack", "promo"
+}
+
+# Unidad → (unidad base, factor)
+UNIDADES = {
+    "kg": ("g", 1000), "kgs": ("g", 1000), "kilo": ("g", 1000), "kilos": ("g", 1000),
+    "g": ("g", 1), "gr": ("g", 1), "grs": ("g", 1), "gramos": ("g", 1),
+    "l": ("ml", 1000), "lt": ("ml", 1000), "lts": ("ml", 1000), "litro": ("ml", 1000), "litros": ("ml", 1000),
+    "ml": ("ml", 1), "cc": ("ml", 1), "cm3": ("ml", 1),
+    "u": ("u", 1), "un": ("u", 1), "uni": ("u", 1), "unid": ("u", 1), "unidades": ("u", 1)
+}
+
+RE_MEDIDA = re.compile(r"\b(\d+(?:[.,]\d+)?)\s*(" + "|".join(sorted(UNIDADES, key=len, reverse=True)) + r")\b")
+RE_NO_ALFANUMERICO = re.compile(r"[^a-z0-9.,]+")
+
+
+# =========================================================
+# NORMALIZACIÓN
+# =========================================================
+def normalizar_texto(texto):
+    """
+    Minúsculas, sin tildes ni signos.
+    """
+    texto = unicodedata.normalize("NFKD", texto or "").encode("ascii", "ignore").decode("ascii").lower()
+    return RE_NO_ALFANUMERICO.sub(" ", texto).strip()
+
+
+def _medida(numero, unidad):
+    base, factor = UNIDADES[unidad]
+    valor = float(numero.replace(",", ".")) * factor
+    return f"{valor:g}{base}"
+
+
+def clave_marca(marca):
+    """
+    Marca normalizada y sin espacios ("Mc CAIN" = "McCain").
+    """
+    return normalizar_texto(marca).replace(" ", "").replace(".", "").replace(",", "")
+
+
+def tokens_nombre(nombre, marca=None):
+    """
+    Devuelve (tokens, medida): el conjunto de tokens
+    descriptivos del nombre y la medida canónica ("1000ml") o
+    None. La marca y la medida se comparan aparte, así que no
+    entran en los tokens (salvo que el nombre no tenga otra cosa):
+    si entraran, dos variantes de la misma marca y tamaño
+    ("Lasagna SADIA espinaca 600 g" / "Lasagna SADIA bolognesa
+    600 g") parecerían casi iguales.
+    """
+    texto = normalizar_texto(nombre)
+    medidas = [_medida(n, u) for n, u in RE_MEDIDA.findall(texto)]
+    texto = RE_MEDIDA.sub(" ", texto)
+
+    palabras = {t.strip(".,") for t in texto.split()} - PALABRAS_VACIAS - {""}
+    de_marca = set(normalizar_texto(marca).split()) | {clave_marca(marca)}
+    tokens = palabras - de_marca
+    return (tokens or palabras), (medidas[0] if medidas else None)
+
+
+def gtin_normalizado(valor):
+    """
+    GTIN-8/12/13/14 con dígito verificador válido, llevado a
+    14 dígitos. None si no es un GTIN.
+    """
+    digitos = re.sub(r"\D", "", str(valor or ""))
+    if len(digitos) not in (8, 12, 13, 14):
+        return None
+    digitos = digitos.zfill(14)
+    suma = sum(int(d) * (3 if i % 2 == 0 else 1) for i, d in enumerate(digitos[:13]))
+    if (10 - suma % 10) % 10 != int(digitos[13]):
+        return None
+    return digitos
+
+
+def gtin_de(producto):
+    if producto.get("gtin"):
+        return gtin_normalizado(producto["gtin"])
+    rut = producto.get("storeRut")
+    if rut is not None and int(rut) in TIENDAS_IDWEB_GTIN:
+        return gtin_normalizado(producto.get("idWeb"))
+    return None
+
+
+# =========================================================
+# MINHASH + LSH
+# =========================================================
+def firmas_minhash(conjuntos, num_hashes=NUM_HASHES, semilla=1, tokens_por_bloque=100000):
+    """
+    conjuntos: lista de arrays de ids de token (no vacíos).
+    Devuelve una matriz (n, num_hashes) con la firma de cada uno.
+    """
+    rng = np.random.default_rng(semilla)
+    a = rng.integers(1, PRIMO, num_hashes, dtype=np.int64)
+    b = rng.integers(0, PRIMO, num_hashes, dtype=np.int64)
+
+    largos = np.fromiter((len(c) for c in conjuntos), dtype=np.int64, count=len(conjuntos))
+    planos = np.concatenate(conjuntos).astype(np.int64)
+    inicios = np.concatenate(([0], np.cumsum(largos)[:-1]))
+    firmas = np.empty((len(conjuntos), num_hashes), dtype=np.int64)
+
+    # Por bloques de documentos, para no tener en memoria
+    # todos los tokens × todos los hashes
+    doc = 0
+    while doc < len(conjuntos):
+        fin = int(np.searchsorted(inicios, inicios[doc] + tokens_por_bloque, side="right"))
+        fin = max(fin, doc + 1)
+        desde, hasta = inicios[doc], inicios[fin - 1] + largos[fin - 1]
+        hashes = (planos[desde:hasta, None] * a + b) % PRIMO
+        firmas[doc:fin] = np.minimum.reduceat(hashes, inicios[doc:fin] - desde, axis=0)
+        doc = fin
+    return firmas
+
+
+def _ordenar_buckets(clave):
+    """
+    Devuelve (orden, claves ordenadas, tamaño del bucket de
+    cada elemento en el orden original).
+    """
+    orden = np.argsort(clave, kind="stable")
+    ordenadas = clave[orden]
+    cortes = np.flatnonzero(np.diff(ordenadas)) + 1
+    limites = np.concatenate(([0], cortes, [len(clave)]))
+    tamanos = np.empty(len(clave), dtype=np.int64)
+    tamanos[orden] = np.repeat(np.diff(limites), np.diff(limites))
+    return orden, ordenadas, tamanos
+
+
+def pares_candidatos(firmas, tiendas, subclaves=(), bandas=BANDAS, max_bucket=MAX_BUCKET):
+    """
+    Pares (i, j), i < j, de tiendas distintas que coinciden en
+    al menos una banda de la firma. Devuelve dos arrays.
+
+    subclaves: arrays de enteros (marca, medida; -1 = sin dato)
+    con los que se parten los buckets demasiado grandes ("leche
+    entera" de 30 marcas); lo que sigue siendo más grande que
+    max_bucket se descarta.
+    """
+    n, k = firmas.shape
+    filas = k // bandas
+    todos = []
+
+    for banda in range(bandas):
+        bloque = firmas[:, banda * filas:(banda + 1) * filas].astype(np.uint64)
+        # Clave de la banda (hash polinomial, con overflow)
+        clave = np.zeros(n, dtype=np.uint64)
+        for c in range(filas):
+            clave = clave * np.uint64(1000003) + bloque[:, c]
+
+        orden, ordenadas, tamanos = _ordenar_buckets(clave)
+        for sub in subclaves:
+            grandes = tamanos > max_bucket
+            if not grandes.any():
+                break
+            partida = clave * np.uint64(1000003) + (sub + 1).astype(np.uint64)
+            clave = np.where(grandes, partida, clave)
+            orden, ordenadas, tamanos = _ordenar_buckets(clave)
+
+        validos = tamanos[orden] <= max_bucket
+        orden, ordenadas = orden[validos], ordenadas[validos]
+
+        # Pares dentro de cada bucket: elementos a distancia d
+        # en el orden con la misma clave
+        for d in range(1, max_bucket):
+            if d >= len(ordenadas):
+                break
+            iguales = ordenadas[d:] == ordenadas[:-d]
+            if not iguales.any():
+                break
+            i, j = orden[:-d][iguales], orden[d:][iguales]
+            distinta_tienda = tiendas[i] != tiendas[j]
+            i, j = i[distinta_tienda], j[distinta_tienda]
+            # Par codificado en un entero (menor * n + mayor)
+            todos.append(np.minimum(i, j) * n + np.maximum(i, j))
+
+    if not todos:
+        vacio = np.empty(0, dtype=np.int64)
+        return vacio, vacio
+
+    # Sin repetidos (el mismo par aparece en varias bandas).
+    # Ordenar y comparar con el vecino es mucho más rápido que
+    # np.unique con decenas de millones de enteros
+    pares = np.sort(np.concatenate(todos))
+    pares = pares[np.concatenate(([True], pares[1:] != pares[:-1]))]
+    return pares // n, pares % n
+
+
+def puntuar(firmas, marcas, medidas, i, j, bloque=200000):
+    """
+    Puntaje de cada par candidato (vectorizado):
+    Jaccard estimado + bono/castigo por marca; 0 si las
+    medidas son distintas.
+    """
+    puntajes = np.empty(len(i), dtype=np.float64)
+    for desde in range(0, len(i), bloque):
+        ii, jj = i[desde:desde + bloque], j[desde:desde + bloque]
+        puntajes[desde:desde + bloque] = (firmas[ii] == firmas[jj]).mean(axis=1)
+
+    con_marca = (marcas[i] >= 0) & (marcas[j] >= 0)
+    misma_marca = con_marca & (marcas[i] == marcas[j])
+    puntajes += BONO_MARCA * misma_marca
+    puntajes -= CASTIGO_MARCA * (con_marca & ~misma_marca)
+
+    medida_distinta = (medidas[i] >= 0) & (medidas[j] >= 0) & (medidas[i] != medidas[j])
+    puntajes[medida_distinta] = 0
+    return puntajes
+
+
+# =========================================================
+# GRUPOS
+# =========================================================
+class _Grupos:
+    """
+    Union-find que no junta dos productos de la misma tienda.
+    """
+
+    def __init__(self, tiendas):
+        self.padre = list(range(len(tiendas)))
+        self.tiendas = [{t} for t in tiendas]
+
+    def raiz(self, x):
+        while self.padre[x] != x:
+            self.padre[x] = self.padre[self.padre[x]]
+            x = self.padre[x]
+        return x
+
+    def unir(self, x, y):
+        rx, ry = self.raiz(x), self.raiz(y)
+        if rx == ry or self.tiendas[rx] & self.tiendas[ry]:
+            return False
+        if len(self.tiendas[rx]) < len(self.tiendas[ry]):
+            rx, ry = ry, rx
+        self.padre[ry] = rx
+        self.tiendas[rx] |= self.tiendas[ry]
+        return True
+
+
+def emparejar(productos):
+    """
+    Agrupa productos de distintas tiendas. Devuelve una fila
+    por producto:
+    {"grupo", "storeRut", "idWeb", "productName", "productBrand",
+     "productPrice", "gtin", "metodo", "puntaje"}
+    metodo: "gtin", "nombre" o "unico" (sin pareja).
+    """
+    n = len(productos)
+    tiendas = np.array([int(p.get("storeRut") or 0) for p in productos], dtype=np.int64)
+    grupos = _Grupos(tiendas.tolist())
+    metodo = ["unico"] * n
+    puntaje = [None] * n
+
+    # 1. GTIN
+    gtins = [gtin_de(p) for p in productos]
+    por_gtin = {}
+    for idx, gtin in enumerate(gtins):
+        if gtin:
+            por_gtin.setdefault(gtin, []).append(idx)
+    for indices in por_gtin.values():
+        for otro in indices[1:]:
+            if grupos.unir(indices[0], otro):
+                metodo[indices[0]] = metodo[otro] = "gtin"
+
+    # 2. Nombre + marca
+    vocabulario = {}
+    conjuntos = []
+    con_tokens = []
+    marcas = np.full(n, -1, dtype=np.int64)
+    medidas = np.full(n, -1, dtype=np.int64)
+    ids_marca = {}
+    ids_medida = {}
+    for idx, p in enumerate(productos):
+        tokens, medida = tokens_nombre(p.get("productName"), p.get("productBrand"))
+        marca = clave_marca(p.get("productBrand"))
+        if marca:
+            marcas[idx] = ids_marca.setdefault(marca, len(ids_marca))
+        if medida:
+            medidas[idx] = ids_medida.setdefault(medida, len(ids_medida))
+        if tokens:
+            conjuntos.append(np.array([vocabulario.setdefault(t, len(vocabulario)) for t in tokens]))
+            con_tokens.append(idx)
+
+    if conjuntos:
+        con_tokens = np.array(con_tokens)
+        firmas = firmas_minhash(conjuntos)
+        marcas, medidas = marcas[con_tokens], medidas[con_tokens]
+        i, j = pares_candidatos(firmas, tiendas[con_tokens], subclaves=(marcas, medidas))
+        puntajes = puntuar(firmas, marcas, medidas, i, j)
+
+        aceptados = puntajes >= UMBRAL_NOMBRE
+        i, j, puntajes = con_tokens[i[aceptados]], con_tokens[j[aceptados]], puntajes[aceptados]
+        for k in np.argsort(-puntajes, kind="stable"):
+            a, b = int(i[k]), int(j[k])
+            if grupos.unir(a, b):
+                for x in (a, b):
+                    if metodo[x] == "unico":
+                        metodo[x] = "nombre"
+                        puntaje[x] = round(float(puntajes[k]), 3)
+
+    # Numeración de grupos (en orden de aparición)
+    numeros = {}
+    filas = []
+    for idx, p in enumerate(productos):
+        grupo = numeros.setdefault(grupos.raiz(idx), len(numeros) + 1)
+        filas.append({
+            "grupo": grupo,
+            "storeRut": p.get("storeRut"),
+            "idWeb": p.get("idWeb"),
+            "productName": p.get("productName"),
+            "productBrand": p.get("productBrand"),
+            "productPrice": p.get("productPrice"),
+            "gtin": gtins[idx],
+            "metodo": metodo[idx],
+            "puntaje": puntaje[idx]
+        })
+    return filas
+
+
+def resumen_grupos(filas):
+    """
+    {"productos", "grupos", "grupos_multitienda", "por_metodo": {...}}
+    """
+    tamanos = {}
+    por_metodo = {}
+    for f in filas:
+        tamanos[f["grupo"]] = tamanos.get(f["grupo"], 0) + 1
+        por_metodo[f["metodo"]] = por_metodo.get(f["metodo"], 0) + 1
+    return {
+        "productos": len(filas),
+        "grupos": len(tamanos),
+        "grupos_multitienda": sum(1 for t in tamanos.values() if t > 1),
+        "por_metodo": por_metodo
+    }
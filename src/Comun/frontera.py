@@ -0,0 +1,175 @@
+import queue
+from threading import Lock
+from urllib.parse import urlsplit, urlunsplit
+
+# =========================================================
+# FRONTERA DE URLs
+# =========================================================
+# La frontera recibe las URLs que encuentran las fases de
+# descubrimiento (una por categoría, en paralelo) y entrega
+# cada producto UNA sola vez a la fase de detalle.
+#
+# - Normaliza las URLs antes de compararlas
+# - Guarda todas las categorías en las que aparece cada producto
+# - Cuenta cuántas descargas de detalle se ahorraron
+# - Se puede consumir mientras el descubrimiento sigue corriendo
+
+
+# Marca interna para despertar a los consumidores al cerrar
+_FIN = object()
+
+
+def normalizar_url(url):
+    """
+    Normaliza una URL de producto para poder deduplicarla.
+
+    - Quita espacios, query string y fragmento
+    - Pasa esquema y dominio a minúsculas
+    - Colapsa barras repetidas y quita la barra final
+
+    Funciona tanto con URLs absolutas como relativas
+    (por ejemplo "/leche-conaprole/p").
+    Devuelve None si la URL está vacía.
+    """
+    if not url:
+        return None
+
+    partes = urlsplit(url.strip())
+
+    path = partes.path
+    while "//" in path:
+        path = path.replace("//", "/")
+    if len(path) > 1:
+        path = path.rstrip("/")
+
+    return urlunsplit((
+        partes.scheme.lower(),
+        partes.netloc.lower(),
+        path,
+        "",
+        ""
+    ))
+
+
+class FronteraUrls:
+    """
+    Cola de URLs deduplicada y segura entre hilos.
+
+    Los productores llaman a agregar(url, categoria).
+    El consumidor recorre la frontera con un for, que va
+    devolviendo (url, categorias) a medida que aparecen URLs
+    nuevas y termina cuando se llama a cerrar() y la cola
+    queda vacía.
+    """
+
+    def __init__(self, normalizador=normalizar_url):
+        self._normalizador = normalizador
+        self._lock = Lock()
+        self._cola = queue.Queue()
+
+        # key   → URL normalizada
+        # value → lista de categorías (en orden de aparición)
+        self._categorias = {}
+
+        self._ofrecidas = 0
+        self._cerrada = False
+
+    def agregar(self, url, categoria=None):
+        """
+        Ofrece una URL a la frontera.
+
+        Devuelve True si la URL es nueva (y se encola para
+        la fase de detalle) o False si ya se había visto,
+        en cuyo caso solo se suma la categoría.
+        """
+        clave = self._normalizador(url)
+        if not clave:
+            return False
+
+        with self._lock:
+            if self._cerrada:
+                raise RuntimeError("La frontera ya está cerrada")
+
+            self._ofrecidas += 1
+            categorias = self._categorias.get(clave)
+
+            if categorias is None:
+                self._categorias[clave] = [categoria] if categoria else []
+                self._cola.put(clave)
+                return True
+
+            if categoria and categoria not in categorias:
+                categorias.append(categoria)
+            return False
+
+    def agregar_varias(self, urls, categoria=None):
+        """
+        Ofrece varias URLs de la misma categoría.
+        Devuelve cuántas eran nuevas.
+        """
+        return sum(1 for url in urls if self.agregar(url, categoria))
+
+    def cerrar(self):
+        """
+        Indica que el descubrimiento terminó.
+        El consumidor sale del for cuando vacía la cola.
+        """
+        with self._lock:
+            if self._cerrada:
+                return
+            self._cerrada = True
+        self._cola.put(_FIN)
+
+    def categorias(self, url):
+        """
+        Devuelve todas las categorías conocidas de una URL.
+        """
+        clave = self._normalizador(url)
+        with self._lock:
+            return list(self._categorias.get(clave, []))
+
+    def conteo_por_categoria(self):
+        """
+        Devuelve {categoria: productos únicos en esa categoría}.
+        Un producto en dos categorías suma en las dos.
+        """
+        conteo = {}
+        with self._lock:
+            for categorias in self._categorias.values():
+                for categoria in categorias:
+                    conteo[categoria] = conteo.get(categoria, 0) + 1
+        return conteo
+
+    def __iter__(self):
+        while True:
+            clave = self._cola.get()
+            if clave is _FIN:
+                # Se vuelve a poner por si hay otro consumidor
+                self._cola.put(_FIN)
+                return
+            with self._lock:
+                categorias = list(self._categorias[clave])
+            yield clave, categorias
+
+    def __len__(self):
+        with self._lock:
+            return len(self._categorias)
+
+    def resumen(self):
+        """
+        Devuelve un diccionario con:
+        - ofrecidas:  URLs recibidas (con repetidas)
+        - unicas:     productos distintos
+        - ahorradas:  descargas de detalle evitadas
+        - multi_categoria: productos en más de una categoría
+        """
+        with self._lock:
+            unicas = len(self._categorias)
+            return {
+                "ofrecidas": self._ofrecidas,
+                "unicas": unicas,
+                "ahorradas": self._ofrecidas - unicas,
+                "multi_categoria": sum(
+                    1 for c in self._categorias.values() if len(c) > 1
+                )
+            }
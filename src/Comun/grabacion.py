@@ -0,0 +1,278 @@
+import atexit
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+from threading import Lock
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+# =========================================================
+# GRABACIÓN Y REPRODUCCIÓN DE RESPUESTAS HTTP
+# =========================================================
+# Permite trabajar en el parseo de un scraper sin volver a
+# descargar el catálogo entero cada vez.
+#
+# Modos (variable de entorno SCRAPER_HTTP_MODO):
+# - "directo":    no se graba nada (comportamiento normal)
+# - "grabar":     cada respuesta se guarda en disco
+# - "reproducir": las respuestas salen del disco; si falta
+#                 alguna, el request falla con GrabacionFaltante
+#
+# Estructura en disco (SCRAPER_GRABACIONES_DIR):
+#   requests/ab/abcdef....json   → request → hash del cuerpo
+#   cuerpos/12/123456....gz      → cuerpo comprimido
+# Los cuerpos se guardan por el hash de su contenido, así dos
+# requests con la misma respuesta comparten el archivo.
+
+# SRC_DIR:
+# Carpeta src del proyecto
+SRC_DIR = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+SCRAPER_HTTP_MODO = os.getenv("SCRAPER_HTTP_MODO", "directo")
+SCRAPER_GRABACIONES_DIR = os.getenv(
+    "SCRAPER_GRABACIONES_DIR",
+    os.path.join(SRC_DIR, "Grabaciones")
+)
+
+MODOS = ("directo", "grabar", "reproducir")
+
+
+class GrabacionFaltante(requests.exceptions.RequestException):
+    """
+    En modo "reproducir", el request no está grabado.
+    """
+
+
+# =========================================================
+# ALMACÉN EN DISCO
+# =========================================================
+def _escribir_atomico(ruta, contenido):
+    carpeta = os.path.dirname(ruta)
+    os.makedirs(carpeta, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=carpeta, suffix=".tmp")
+    with os.fdopen(fd, "wb") as f:
+        f.write(contenido)
+    os.replace(tmp, ruta)
+
+
+def canonizar_url(url, params=None):
+    """
+    Devuelve la URL con los parámetros ordenados, para que el
+    mismo request genere siempre la misma clave.
+    """
+    preparada = requests.Request("GET", url, params=params).prepare().url
+    partes = urlsplit(preparada)
+    query = urlencode(sorted(parse_qsl(partes.query, keep_blank_values=True)))
+    return urlunsplit((partes.scheme, partes.netloc.lower(), partes.path, query, ""))
+
+
+def clave_request(metodo, url, cuerpo=b""):
+    """
+    Hash que identifica un request (método + URL canónica + cuerpo).
+    """
+    h = hashlib.sha256()
+    h.update(metodo.upper().encode())
+    h.update(b" ")
+    h.update(url.encode("utf-8"))
+    h.update(b"\n")
+    h.update(cuerpo or b"")
+    return h.hexdigest()
+
+
+class AlmacenGrabaciones:
+    """
+    Guarda y lee respuestas grabadas en una carpeta.
+    """
+
+    def __init__(self, directorio=SCRAPER_GRABACIONES_DIR):
+        self.directorio = directorio
+
+    def _ruta_request(self, clave):
+        return os.path.join(self.directorio, "requests", clave[:2], clave + ".json")
+
+    def _ruta_cuerpo(self, hash_cuerpo):
+        return os.path.join(self.directorio, "cuerpos", hash_cuerpo[:2], hash_cuerpo + ".gz")
+
+    def guardar(self, clave, metodo, url, status, headers, cuerpo):
+        hash_cuerpo = hashlib.sha256(cuerpo).hexdigest()
+        ruta_cuerpo = self._ruta_cuerpo(hash_cuerpo)
+        if not os.path.exists(ruta_cuerpo):
+            _escribir_atomico(ruta_cuerpo, gzip.compress(cuerpo, compresslevel=6))
+
+        entrada = {
+            "metodo": metodo.upper(),
+            "url": url,
+            "status": status,
+            "headers": headers,
+            "cuerpo": hash_cuerpo
+        }
+        _escribir_atomico(
+            self._ruta_request(clave),
+            json.dumps(entrada, ensure_ascii=False).encode("utf-8")
+        )
+
+    def leer(self, clave):
+        """
+        Devuelve (entrada, cuerpo_bytes) o None si no está grabado.
+        """
+        try:
+            with open(self._ruta_request(clave), "r", encoding="utf-8") as f:
+                entrada = json.load(f)
+            with open(self._ruta_cuerpo(entrada["cuerpo"]), "rb") as f:
+                return entrada, gzip.decompress(f.read())
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def entradas(self):
+        """
+        Recorre todas las grabaciones: (entrada, cuerpo_bytes).
+        """
+        carpeta = os.path.join(self.directorio, "requests")
+        if not os.path.isdir(carpeta):
+            return
+        for raiz, _, archivos in os.walk(carpeta):
+            for archivo in archivos:
+                if archivo.endswith(".json"):
+                    resultado = self.leer(archivo[:-5])
+                    if resultado:
+                        yield resultado
+
+
+# =========================================================
+# SESIÓN QUE GRABA / REPRODUCE
+# =========================================================
+class SesionGrabable:
+    """
+    Envoltorio de una sesión requests/cloudscraper (o SesionPool).
+
+    get() y post() pasan por el modo configurado; cualquier otro
+    atributo (headers, cookies, mount...) va a la sesión original.
+    """
+
+    def __init__(self, sesion, modo=None, directorio=None):
+        modo = modo or SCRAPER_HTTP_MODO
+        if modo not in MODOS:
+            raise ValueError(f"Modo HTTP desconocido: {modo}")
+
+        self.sesion = sesion
+        self.modo = modo
+        self.almacen = AlmacenGrabaciones(directorio or SCRAPER_GRABACIONES_DIR)
+        self._lock = Lock()
+        self.estadisticas = {"grabadas": 0, "reproducidas": 0, "faltantes": 0}
+
+        if modo != "directo":
+            atexit.register(self._resumen)
+
+    def __getattr__(self, nombre):
+        return getattr(self.sesion, nombre)
+
+    def _contar(self, clave):
+        with self._lock:
+            self.estadisticas[clave] += 1
+
+    def _resumen(self):
+        print(f"🎞️ HTTP {self.modo}: {self.estadisticas}")
+
+    def get(self, url, params=None, **kwargs):
+        return self.request("GET", url, params=params, **kwargs)
+
+    def post(self, url, data=None, json=None, **kwargs):
+        return self.request("POST", url, data=data, json=json, **kwargs)
+
+    def request(self, metodo, url, params=None, data=None, json=None, **kwargs):
+        if self.modo == "directo":
+            return self._enviar(metodo, url, params=params, data=data, json=json, **kwargs)
+
+        url_canonica = canonizar_url(url, params)
+        cuerpo = requests.Request(metodo, url_canonica, data=data, json=json).prepare().body or b""
+        if isinstance(cuerpo, str):
+            cuerpo = cuerpo.encode("utf-8")
+        clave = clave_request(metodo, url_canonica, cuerpo)
+
+        if self.modo == "reproducir":
+            grabada = self.almacen.leer(clave)
+            if grabada is None:
+                self._contar("faltantes")
+                raise GrabacionFaltante(f"No hay grabación para {metodo} {url_canonica}")
+            self._contar("reproducidas")
+            return armar_respuesta(grabada[0], grabada[1])
+
+        respuesta = self._enviar(metodo, url, params=params, data=data, json=json, **kwargs)
+        self.almacen.guardar(
+            clave, metodo, url_canonica, respuesta.status_code,
+            {k: v for k, v in respuesta.headers.items()
+             if k.lower() not in ("content-encoding", "content-length", "transfer-encoding", "set-cookie")},
+            respuesta.content
+        )
+        self._contar("grabadas")
+        return respuesta
+
+    def _enviar(self, metodo, url, **kwargs):
+        kwargs = {k: v for k, v in kwargs.items() if v is not None}
+        if metodo == "GET":
+            return self.sesion.get(url, **kwargs)
+        if metodo == "POST":
+            return self.sesion.post(url, **kwargs)
+        return self.sesion.request(metodo, url, **kwargs)
+
+
+def armar_respuesta(entrada, cuerpo):
+    """
+    Arma un requests.Response a partir de una grabación.
+    """
+    respuesta = requests.Response()
+    respuesta.status_code = entrada["status"]
+    respuesta.headers = CaseInsensitiveDict(entrada.get("headers", {}))
+    respuesta._content = cuerpo
+    respuesta.url = entrada["url"]
+    respuesta.encoding = requests.utils.get_encoding_from_headers(respuesta.headers) or "utf-8"
+    respuesta.reason = "Grabada"
+    return respuesta
+
+
+def envolver_sesion(sesion, modo=None, directorio=None):
+    """
+    Devuelve la sesión tal cual en modo "directo" (sin costo extra)
+    o envuelta en una SesionGrabable en los otros modos.
+    """
+    modo = modo or SCRAPER_HTTP_MODO
+    if modo == "directo":
+        return sesion
+    return SesionGrabable(sesion, modo, directorio)
+
+
+# =========================================================
+# CAPTURAS DE PÁGINAS (SELENIUM)
+# =========================================================
+def obtener_page_source(clave, cargar, modo=None, directorio=None):
+    """
+    Equivalente a la grabación HTTP para los scrapers con Selenium.
+
+    `clave` identifica la página (normalmente la URL) y
+    `cargar` es una función que maneja el navegador y devuelve
+    driver.page_source.
+
+    - directo:    llama a cargar()
+    - grabar:     llama a cargar() y guarda el HTML
+    - reproducir: devuelve el HTML guardado sin abrir el navegador
+    """
+    modo = modo or SCRAPER_HTTP_MODO
+    if modo == "directo":
+        return cargar()
+
+    almacen = AlmacenGrabaciones(directorio or SCRAPER_GRABACIONES_DIR)
+    clave_hash = clave_request("PAGE", clave)
+
+    if modo == "reproducir":
+        grabada = almacen.leer(clave_hash)
+        if grabada is None:
+            raise GrabacionFaltante(f"No hay captura para {clave}")
+        return grabada[1].decode("utf-8")
+
+    html = cargar()
+    almacen.guardar(clave_hash, "PAGE", clave, 200, {"Content-Type": "text/html; charset=utf-8"}, html.encode("utf-8"))
+    return html
@@ -0,0 +1,224 @@
+import os
+import sqlite3
+import threading
+import time
+from datetime import date, datetime
+
+# =========================================================
+# HISTORIAL DE PRECIOS
+# =========================================================
+# Cada corrida pisa productos_<tienda>.json, así que no queda
+# historia para saber cuándo cambió un precio. Este módulo
+# guarda en un SQLite local, solo agregando filas:
+#
+#   (storeRut, idWeb, timestamp) → precio, moneda
+#
+# y SOLO cuando el precio cambió respecto del último guardado.
+# Los scrapers lo alimentan al terminar (guardar_historial).
+#
+# Las tablas son WITHOUT ROWID con clave primaria
+# (store_rut, id_web, ts): los precios de un producto quedan
+# contiguos y ordenados por fecha en el B-tree, así "último
+# precio" y "precio a una fecha" son una sola búsqueda
+# O(log n) aunque haya decenas de millones de filas.
+# La tabla "ultimos" tiene el precio vigente de cada producto
+# (para detectar cambios sin recorrer la historia).
+#
+#   SCRAPER_HISTORIAL=0 → no se guarda historial
+
+# SRC_DIR:
+# Carpeta src del proyecto
+SRC_DIR = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+SCRAPER_HISTORIAL_DIR = os.getenv("SCRAPER_HISTORIAL_DIR", os.path.join(SRC_DIR, "Historial"))
+SCRAPER_HISTORIAL = os.getenv("SCRAPER_HISTORIAL", "1") != "0"
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS precios (
+    store_rut INTEGER NOT NULL,
+    id_web INTEGER NOT NULL,
+    ts INTEGER NOT NULL,
+    precio REAL NOT NULL,
+    moneda TEXT NOT NULL,
+    PRIMARY KEY (store_rut, id_web, ts)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS precios_por_fecha ON precios (store_rut, ts);
+CREATE TABLE IF NOT EXISTS ultimos (
+    store_rut INTEGER NOT NULL,
+    id_web INTEGER NOT NULL,
+    ts INTEGER NOT NULL,
+    precio REAL NOT NULL,
+    moneda TEXT NOT NULL,
+    PRIMARY KEY (store_rut, id_web)
+) WITHOUT ROWID;
+"""
+
+
+def a_timestamp(fecha):
+    """
+    Acepta epoch (int/float), datetime, date o texto ISO
+    ("2025-03-01", "2025-03-01T10:00") y devuelve epoch en segundos.
+    """
+    if fecha is None:
+        return int(time.time())
+    if isinstance(fecha, (int, float)):
+        return int(fecha)
+    if isinstance(fecha, str):
+        fecha = datetime.fromisoformat(fecha)
+    if isinstance(fecha, datetime):
+        return int(fecha.timestamp())
+    if isinstance(fecha, date):
+        return int(datetime(fecha.year, fecha.month, fecha.day).timestamp())
+    raise TypeError(f"Fecha no soportada: {fecha!r}")
+
+
+class HistorialPrecios:
+    """
+    Acceso al historial. Seguro entre hilos (una conexión con lock).
+    """
+
+    def __init__(self, ruta=None):
+        if ruta is None:
+            os.makedirs(SCRAPER_HISTORIAL_DIR, exist_ok=True)
+            ruta = os.path.join(SCRAPER_HISTORIAL_DIR, "precios.sqlite")
+        self.ruta = ruta
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(ruta, check_same_thread=False, timeout=60)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(ESQUEMA)
+
+    # -----------------------------------------------------
+    # ESCRITURA
+    # -----------------------------------------------------
+    def registrar(self, productos, ts=None):
+        """
+        Agrega los precios que cambiaron (o que no existían).
+        Los productos sin idWeb o sin precio se ignoran.
+        Devuelve la cantidad de filas agregadas.
+        """
+        ts = a_timestamp(ts)
+        filas = {}
+        for p in productos:
+            if p.get("idWeb") is None or p.get("productPrice") is None or p.get("storeRut") is None:
+                continue
+            clave = (int(p["storeRut"]), int(p["idWeb"]))
+            filas[clave] = (float(p["productPrice"]), p.get("moneda") or "UYU")
+
+        with self._lock, self._db:
+            tiendas = {rut for rut, _ in filas}
+            vigentes = {}
+            for rut in tiendas:
+                vigentes.update(
+                    ((rut, id_web), (precio, moneda))
+                    for id_web, precio, moneda in self._db.execute(
+                        "SELECT id_web, precio, moneda FROM ultimos WHERE store_rut = ?", (rut,)
+                    )
+                )
+
+            nuevas = [
+                (rut, id_web, ts, precio, moneda)
+                for (rut, id_web), (precio, moneda) in filas.items()
+                if vigentes.get((rut, id_web)) != (precio, moneda)
+            ]
+            # OR IGNORE: dos registros en el mismo segundo
+            self._db.executemany("INSERT OR IGNORE INTO precios VALUES (?, ?, ?, ?, ?)", nuevas)
+            self._db.executemany("INSERT OR REPLACE INTO ultimos VALUES (?, ?, ?, ?, ?)", nuevas)
+        return len(nuevas)
+
+    # -----------------------------------------------------
+    # CONSULTAS
+    # -----------------------------------------------------
+    def ultimo_precio(self, store_rut, id_web):
+        """
+        Devuelve (timestamp, precio, moneda) o None.
+        """
+        with self._lock:
+            return self._db.execute(
+                "SELECT ts, precio, moneda FROM ultimos WHERE store_rut = ? AND id_web = ?",
+                (int(store_rut), int(id_web))
+            ).fetchone()
+
+    def precio_en(self, store_rut, id_web, fecha):
+        """
+        Precio vigente en una fecha: (timestamp, precio, moneda)
+        del último cambio anterior o igual a la fecha, o None.
+        """
+        with self._lock:
+            return self._db.execute(
+                "SELECT ts, precio, moneda FROM precios "
+                "WHERE store_rut = ? AND id_web = ? AND ts <= ? ORDER BY ts DESC LIMIT 1",
+                (int(store_rut), int(id_web), a_timestamp(fecha))
+            ).fetchone()
+
+    def historia(self, store_rut, id_web, desde=None, hasta=None):
+        """
+        Cambios de precio de un producto: [(timestamp, precio, moneda)].
+        """
+        with self._lock:
+            return self._db.execute(
+                "SELECT ts, precio, moneda FROM precios "
+                "WHERE store_rut = ? AND id_web = ? AND ts >= ? AND ts <= ? ORDER BY ts",
+                (int(store_rut), int(id_web), a_timestamp(desde or 0), a_timestamp(hasta))
+            ).fetchall()
+
+    def cambio_desde(self, store_rut, id_web, fecha):
+        """
+        Cambio de precio de un producto desde una fecha:
+        {"antes", "ahora", "diferencia", "porcentaje"} o None si
+        no hay precio a esa fecha.
+        """
+        antes = self.precio_en(store_rut, id_web, fecha)
+        ahora = self.ultimo_precio(store_rut, id_web)
+        if antes is None or ahora is None:
+            return None
+        diferencia = ahora[1] - antes[1]
+        return {
+            "antes": antes[1],
+            "ahora": ahora[1],
+            "diferencia": round(diferencia, 2),
+            "porcentaje": round(100 * diferencia / antes[1], 2) if antes[1] else None
+        }
+
+    def cambios_desde(self, store_rut, fecha):
+        """
+        Productos de una tienda cuyo precio cambió desde una fecha:
+        [(id_web, precio a la fecha o None, precio actual)].
+        Usa el índice (store_rut, ts): solo recorre los cambios
+        posteriores a la fecha.
+        """
+        ts = a_timestamp(fecha)
+        with self._lock:
+            return self._db.execute(
+                "SELECT c.id_web, "
+                "  (SELECT p.precio FROM precios p WHERE p.store_rut = c.store_rut "
+                "   AND p.id_web = c.id_web AND p.ts <= ? ORDER BY p.ts DESC LIMIT 1), "
+                "  u.precio "
+                "FROM (SELECT DISTINCT store_rut, id_web FROM precios WHERE store_rut = ? AND ts > ?) c "
+                "JOIN ultimos u ON u.store_rut = c.store_rut AND u.id_web = c.id_web",
+                (ts, int(store_rut), ts)
+            ).fetchall()
+
+    def cerrar(self):
+        with self._lock:
+            self._db.close()
+
+
+def guardar_historial(productos, ts=None):
+    """
+    Agrega al historial los precios de una corrida. Un error
+    acá no tiene que tirar abajo el scraper: solo se avisa.
+    """
+    if not SCRAPER_HISTORIAL:
+        return 0
+    try:
+        historial = HistorialPrecios()
+        try:
+            nuevas = historial.registrar(productos, ts)
+        finally:
+            historial.cerrar()
+    except (sqlite3.Error, OSError, ValueError, TypeError) as e:
+        print(f"⚠️ No se pudo guardar el historial de precios: {e}")
+        return 0
+    print(f"📈 Historial de precios: {nuevas} precios nuevos o cambiados")
+    return nuevas
@@ -0,0 +1,541 @@
+import atexit
+import json
+import os
+import re
+import tempfile
+import time
+from datetime import datetime
+from threading import Lock
+from urllib.parse import urlsplit
+
+# =========================================================
+# MÉTRICAS DE EJECUCIÓN
+# =========================================================
+# Registro en memoria de contadores, histogramas y fases que
+# pueden usar todos los scrapers y el PostProducts. Cada
+# operación es un incremento en un dict bajo un lock, así que
+# se puede llamar por request sin costo apreciable.
+#
+# Al terminar el proceso se escriben:
+# - Metricas/<run_id>/<proceso>.json → reporte de la ejecución
+# - Metricas/<proceso>.prom          → textfile para Prometheus
+#                                      (node_exporter textfile collector)
+#
+# pipeline.py / runScrappers.py generan un run_id común
+# (SCRAPER_RUN_ID) y al final consolidan los reportes de
+# todos los procesos en Metricas/<run_id>/run.json.
+
+# SRC_DIR:
+# Carpeta src del proyecto
+SRC_DIR = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+SCRAPER_METRICAS_DIR = os.getenv("SCRAPER_METRICAS_DIR", os.path.join(SRC_DIR, "Metricas"))
+
+# "0" desactiva la escritura de reportes (las métricas se
+# siguen acumulando en memoria)
+SCRAPER_METRICAS = os.getenv("SCRAPER_METRICAS", "1") != "0"
+
+# Límites (en segundos) de los buckets de los histogramas
+BUCKETS_SEGUNDOS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+# Histogramas que miden otra escala (también en segundos):
+# nombre → límites de sus buckets
+BUCKETS_POR_METRICA = {
+    # Antigüedad de los productos que salen de una visita
+    # anterior (Comun/planificador.py): de 1 hora a 30 días
+    "refresco_antiguedad": (3600, 6 * 3600, 12 * 3600, 86400, 2 * 86400, 4 * 86400, 7 * 86400,
+                            14 * 86400, 30 * 86400)
+}
+
+# Prefijo de todas las métricas exportadas a Prometheus
+PREFIJO = "scraper_"
+
+# Funciones (fase, evento) que se llaman al entrar ("inicio") y
+# salir ("fin") de cada fase. Vacía salvo que se active algún
+# perfilado (ver Comun/perfilado.py).
+OBSERVADORES_FASE = []
+
+# Otros módulos que llevan sus propios contadores (por ejemplo
+# Comun/descartes.py) se suman al reporte con:
+# - FUENTES:   funciones que devuelven [(nombre, etiquetas, valor)]
+#              que se reportan como contadores
+# - SECCIONES: nombre → función que devuelve una sección extra
+#              del reporte JSON
+FUENTES = []
+SECCIONES = {}
+
+
+# =========================================================
+# REGISTRO
+# =========================================================
+def _clave(nombre, etiquetas):
+    return nombre, tuple(sorted((k, str(v)) for k, v in etiquetas.items()))
+
+
+class Histograma:
+    """
+    Histograma acumulado al estilo Prometheus.
+    """
+
+    __slots__ = ("limites", "buckets", "suma", "cantidad")
+
+    def __init__(self, limites=BUCKETS_SEGUNDOS):
+        self.limites = limites
+        self.buckets = [0] * len(limites)
+        self.suma = 0.0
+        self.cantidad = 0
+
+    def observar(self, valor):
+        self.suma += valor
+        self.cantidad += 1
+        for i, limite in enumerate(self.limites):
+            if valor <= limite:
+                self.buckets[i] += 1
+                break
+
+    def percentil(self, p):
+        """
+        Cota superior del bucket donde cae el percentil p (0-100).
+        None si no hay observaciones o si cae más allá del último
+        bucket (JSON no admite Infinity).
+        """
+        if not self.cantidad:
+            return None
+        objetivo = self.cantidad * p / 100
+        acumulado = 0
+        for limite, n in zip(self.limites, self.buckets):
+            acumulado += n
+            if acumulado >= objetivo:
+                return limite
+        return None
+
+
+class Fase:
+    """
+    Mide el tiempo de pared y los productos de una fase
+    (descubrimiento, listado, detalle, import...).
+    """
+
+    def __init__(self, registro, nombre):
+        self.registro = registro
+        self.nombre = nombre
+        self.inicio = None
+        self.segundos = 0.0
+        self.productos = 0
+        self._lock = Lock()
+
+    def sumar(self, cantidad=1):
+        with self._lock:
+            self.productos += cantidad
+
+    def __enter__(self):
+        for observador in OBSERVADORES_FASE:
+            observador(self.nombre, "inicio")
+        self.inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.segundos += time.perf_counter() - self.inicio
+        self.registro._cerrar_fase(self)
+        for observador in OBSERVADORES_FASE:
+            observador(self.nombre, "fin")
+        return False
+
+
+class Metricas:
+    """
+    Registro de métricas de un proceso (un scraper o el poster).
+    """
+
+    def __init__(self):
+        self.proceso = None
+        self.inicio = time.time()
+        self.contadores = {}
+        self.histogramas = {}
+        self.fases = {}
+        self._lock = Lock()
+
+    def contar(self, nombre, valor=1, **etiquetas):
+        clave = _clave(nombre, etiquetas)
+        with self._lock:
+            self.contadores[clave] = self.contadores.get(clave, 0) + valor
+
+    def observar(self, nombre, valor, **etiquetas):
+        clave = _clave(nombre, etiquetas)
+        with self._lock:
+            histograma = self.histogramas.get(clave)
+            if histograma is None:
+                histograma = self.histogramas[clave] = Histograma(BUCKETS_POR_METRICA.get(nombre, BUCKETS_SEGUNDOS))
+            histograma.observar(valor)
+
+    def fase(self, nombre):
+        return Fase(self, nombre)
+
+    def _cerrar_fase(self, fase):
+        with self._lock:
+            acumulada = self.fases.setdefault(fase.nombre, {"segundos": 0.0, "productos": 0})
+            acumulada["segundos"] += fase.segundos
+            acumulada["productos"] += fase.productos
+
+    # -----------------------------------------------------
+    # SALIDA
+    # -----------------------------------------------------
+    def _contadores(self):
+        """
+        Contadores propios más los de las FUENTES externas.
+        """
+        with self._lock:
+            contadores = dict(self.contadores)
+        for fuente in FUENTES:
+            for nombre, etiquetas, valor in fuente():
+                clave = _clave(nombre, etiquetas)
+                contadores[clave] = contadores.get(clave, 0) + valor
+        return sorted(contadores.items())
+
+    def reporte(self):
+        """
+        Devuelve el reporte de la ejecución como dict (serializable).
+        """
+        contadores = [
+            {"nombre": n, "etiquetas": dict(e), "valor": v}
+            for (n, e), v in self._contadores()
+        ]
+        with self._lock:
+            histogramas = [
+                {
+                    "nombre": n,
+                    "etiquetas": dict(e),
+                    "cantidad": h.cantidad,
+                    "suma": round(h.suma, 4),
+                    "promedio": round(h.suma / h.cantidad, 4) if h.cantidad else None,
+                    "p50": h.percentil(50),
+                    "p95": h.percentil(95),
+                    "buckets": dict(zip(map(str, h.limites), h.buckets))
+                }
+                for (n, e), h in sorted(self.histogramas.items())
+            ]
+            fases = {
+                nombre: {
+                    "segundos": round(f["segundos"], 3),
+                    "productos": f["productos"],
+                    "productos_por_segundo": round(f["productos"] / f["segundos"], 2) if f["segundos"] else None
+                }
+                for nombre, f in self.fases.items()
+            }
+
+        reporte = {
+            "proceso": self.proceso,
+            "run_id": run_id(),
+            "inicio": datetime.fromtimestamp(self.inicio).isoformat(timespec="seconds"),
+            "segundos": round(time.time() - self.inicio, 3),
+            "fases": fases,
+            "totales": _totales(contadores),
+            "contadores": contadores,
+            "histogramas": histogramas
+        }
+        for nombre, seccion in SECCIONES.items():
+            reporte[nombre] = seccion()
+        return reporte
+
+    def texto_prometheus(self):
+        """
+        Devuelve las métricas en el formato de texto de Prometheus.
+        """
+        proceso = {"proceso": self.proceso or "desconocido"}
+        lineas = []
+        declaradas = set()
+
+        def declarar(nombre, tipo):
+            if nombre not in declaradas:
+                declaradas.add(nombre)
+                lineas.append(f"# TYPE {nombre} {tipo}")
+
+        for (nombre, etiquetas), valor in self._contadores():
+            metrica = f"{PREFIJO}{nombre}_total"
+            declarar(metrica, "counter")
+            lineas.append(f"{metrica}{_etiquetas(proceso, etiquetas)} {valor}")
+
+        with self._lock:
+
+            for (nombre, etiquetas), h in sorted(self.histogramas.items()):
+                metrica = f"{PREFIJO}{nombre}_segundos"
+                declarar(metrica, "histogram")
+                acumulado = 0
+                for limite, n in zip(h.limites, h.buckets):
+                    acumulado += n
+                    lineas.append(f"{metrica}_bucket{_etiquetas(proceso, etiquetas, le=limite)} {acumulado}")
+                lineas.append(f"{metrica}_bucket{_etiquetas(proceso, etiquetas, le='+Inf')} {h.cantidad}")
+                lineas.append(f"{metrica}_sum{_etiquetas(proceso, etiquetas)} {h.suma:.6f}")
+                lineas.append(f"{metrica}_count{_etiquetas(proceso, etiquetas)} {h.cantidad}")
+
+            for nombre, f in sorted(self.fases.items()):
+                etiquetas = (("fase", nombre),)
+                declarar(f"{PREFIJO}fase_segundos", "gauge")
+                lineas.append(f"{PREFIJO}fase_segundos{_etiquetas(proceso, etiquetas)} {f['segundos']:.3f}")
+                declarar(f"{PREFIJO}fase_productos", "gauge")
+                lineas.append(f"{PREFIJO}fase_productos{_etiquetas(proceso, etiquetas)} {f['productos']}")
+
+        declarar(f"{PREFIJO}ultima_ejecucion_timestamp", "gauge")
+        lineas.append(f"{PREFIJO}ultima_ejecucion_timestamp{_etiquetas(proceso, ())} {int(time.time())}")
+        return "\n".join(lineas) + "\n"
+
+
+def _etiquetas(proceso, etiquetas, **extra):
+    pares = list(proceso.items()) + list(etiquetas) + [(k, str(v)) for k, v in extra.items()]
+    return "{" + ",".join(f'{k}="{_escapar(v)}"' for k, v in pares) + "}"
+
+
+def _escapar(valor):
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _totales(contadores):
+    """
+    Suma cada contador sin etiquetas (requests, bytes, ...).
+    """
+    totales = {}
+    for c in contadores:
+        totales[c["nombre"]] = totales.get(c["nombre"], 0) + c["valor"]
+    return totales
+
+
+# Registro global del proceso
+METRICAS = Metricas()
+
+
+def contar(nombre, valor=1, **etiquetas):
+    METRICAS.contar(nombre, valor, **etiquetas)
+
+
+def observar(nombre, valor, **etiquetas):
+    METRICAS.observar(nombre, valor, **etiquetas)
+
+
+def fase(nombre):
+    """
+    Uso:
+        with fase("detalle") as f:
+            ...
+            f.sumar()   # por cada producto
+    """
+    return METRICAS.fase(nombre)
+
+
+# =========================================================
+# INSTRUMENTACIÓN HTTP
+# =========================================================
+# Segmentos de la ruta que se conservan en la etiqueta
+# "endpoint". Slugs e ids (con guiones o dígitos) se
+# reemplazan por "*" para no crear una serie por producto.
+_SEGMENTO_FIJO = re.compile(r"^[A-Za-z_.]{1,24}$")
+
+
+def endpoint_de(url):
+    """
+    Devuelve (host, endpoint) con la ruta normalizada.
+    Ej: /api/catalog_system/pub/products/search/almacen → /api/catalog_system/pub/products/search/almacen
+        /leche-entera-1l/p                              → /*/p
+    """
+    partes = urlsplit(url)
+    segmentos = [
+        s if _SEGMENTO_FIJO.match(s) else "*"
+        for s in partes.path.split("/") if s
+    ][:6]
+    return partes.netloc.lower(), "/" + "/".join(segmentos)
+
+
+def registrar_respuesta(respuesta, *args, **kwargs):
+    """
+    Hook "response" de requests: cuenta el request, los bytes
+    recibidos y la latencia por host y endpoint.
+
+    Los bytes salen solo del Content-Length (lo que viajó, antes
+    de descomprimir). El hook corre antes de que requests lea el
+    cuerpo: tocar .content acá leería y guardaría en memoria
+    incluso las respuestas con stream=True. Las respuestas sin
+    Content-Length (chunked) se cuentan aparte.
+    """
+    try:
+        host, endpoint = endpoint_de(respuesta.request.url)
+        contar("requests", host=host, endpoint=endpoint, status=respuesta.status_code)
+        largo = respuesta.headers.get("Content-Length")
+        if largo is not None:
+            contar("bytes", int(largo), host=host)
+        else:
+            contar("respuestas_sin_largo", host=host)
+        observar("latencia", respuesta.elapsed.total_seconds(), host=host, endpoint=endpoint)
+    except Exception:
+        # Las métricas nunca deben cortar un scraper
+        pass
+    return respuesta
+
+
+def instrumentar_sesion(sesion):
+    """
+    Agrega el hook de métricas a una sesión requests/cloudscraper
+    o a una SesionPool. Devuelve la misma sesión.
+    """
+    hooks = getattr(sesion, "hooks", None)
+    if isinstance(hooks, dict):
+        hooks.setdefault("response", []).append(registrar_respuesta)
+    elif isinstance(hooks, list):
+        hooks.append(registrar_respuesta)
+    return sesion
+
+
+# =========================================================
+# REPORTES
+# =========================================================
+def run_id():
+    return os.getenv("SCRAPER_RUN_ID") or datetime.fromtimestamp(METRICAS.inicio).strftime("%Y%m%d-%H%M%S")
+
+
+def asegurar_run_id():
+    """
+    Define SCRAPER_RUN_ID si no existe (lo heredan los subprocesos).
+    Devuelve (run_id, True si se creó acá).
+    """
+    if os.getenv("SCRAPER_RUN_ID"):
+        return os.environ["SCRAPER_RUN_ID"], False
+    os.environ["SCRAPER_RUN_ID"] = datetime.now().strftime("%Y%m%d-%H%M%S")
+    return os.environ["SCRAPER_RUN_ID"], True
+
+
+def _escribir_atomico(ruta, texto):
+    carpeta = os.path.dirname(ruta)
+    os.makedirs(carpeta, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=carpeta, suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(texto)
+    os.replace(tmp, ruta)
+
+
+def escribir_reporte():
+    """
+    Escribe el reporte JSON y el textfile de Prometheus del proceso.
+    """
+    if not SCRAPER_METRICAS or not METRICAS.proceso:
+        return None
+    try:
+        ruta = os.path.join(SCRAPER_METRICAS_DIR, run_id(), f"{METRICAS.proceso}.json")
+        _escribir_atomico(ruta, json.dumps(METRICAS.reporte(), ensure_ascii=False, indent=2))
+        _escribir_atomico(
+            os.path.join(SCRAPER_METRICAS_DIR, f"{METRICAS.proceso}.prom"),
+            METRICAS.texto_prometheus()
+        )
+        return ruta
+    except OSError as e:
+        print(f"⚠️ No se pudo escribir el reporte de métricas: {e}")
+        return None
+
+
+def iniciar_metricas(proceso):
+    """
+    Nombra el proceso y programa la escritura del reporte al salir.
+    """
+    if METRICAS.proceso is None:
+        atexit.register(escribir_reporte)
+    METRICAS.proceso = proceso
+
+
+# Procesos que solo lanzan a los demás
+ORQUESTADORES = ("pipeline", "runscrappers")
+
+
+def consolidar_reportes(id_run=None):
+    """
+    Junta los reportes de todos los procesos de un run en
+    Metricas/<run_id>/run.json y lo compara con el run anterior.
+    Devuelve el reporte consolidado (o None si no hay reportes).
+    """
+    id_run = id_run or run_id()
+    carpeta = os.path.join(SCRAPER_METRICAS_DIR, id_run)
+    if not os.path.isdir(carpeta):
+        return None
+
+    procesos = {}
+    for archivo in sorted(os.listdir(carpeta)):
+        if archivo.endswith(".json") and archivo != "run.json":
+            try:
+                with open(os.path.join(carpeta, archivo), "r", encoding="utf-8") as f:
+                    reporte = json.load(f)
+            except (OSError, ValueError):
+                continue
+            procesos[reporte["proceso"]] = {
+                "segundos": reporte["segundos"],
+                "fases": reporte["fases"],
+                "totales": reporte["totales"]
+            }
+            if reporte.get("descartes"):
+                procesos[reporte["proceso"]]["descartes"] = reporte["descartes"]["motivos"]
+
+    if not procesos:
+        return None
+
+    # Fase que más tiempo de pared ocupó en cada proceso
+    for datos in procesos.values():
+        if datos["fases"]:
+            datos["fase_dominante"] = max(datos["fases"], key=lambda n: datos["fases"][n]["segundos"])
+
+    # Los orquestadores duran lo mismo que todo el run,
+    # no cuentan para el proceso dominante
+    candidatos = [p for p in procesos if p not in ORQUESTADORES] or list(procesos)
+
+    consolidado = {
+        "run_id": id_run,
+        "proceso_dominante": max(candidatos, key=lambda p: procesos[p]["segundos"]),
+        "procesos": procesos,
+        "regresiones": _comparar_con_anterior(id_run, procesos)
+    }
+    _escribir_atomico(os.path.join(carpeta, "run.json"), json.dumps(consolidado, ensure_ascii=False, indent=2))
+    return consolidado
+
+
+# Caída de productos/segundo (respecto del run anterior)
+# a partir de la cual una fase se marca como regresión
+UMBRAL_REGRESION = 0.8
+
+
+def _comparar_con_anterior(id_run, procesos):
+    anteriores = sorted(
+        d for d in os.listdir(SCRAPER_METRICAS_DIR)
+        if d < id_run and os.path.isfile(os.path.join(SCRAPER_METRICAS_DIR, d, "run.json"))
+    )
+    if not anteriores:
+        return []
+
+    with open(os.path.join(SCRAPER_METRICAS_DIR, anteriores[-1], "run.json"), "r", encoding="utf-8") as f:
+        anterior = json.load(f)
+
+    regresiones = []
+    for proceso, datos in procesos.items():
+        fases_anteriores = anterior["procesos"].get(proceso, {}).get("fases", {})
+        for nombre, f in datos["fases"].items():
+            antes = fases_anteriores.get(nombre, {}).get("productos_por_segundo")
+            ahora = f["productos_por_segundo"]
+            if antes and ahora is not None and ahora < antes * UMBRAL_REGRESION:
+                regresiones.append({
+                    "proceso": proceso,
+                    "fase": nombre,
+                    "run_anterior": anteriores[-1],
+                    "productos_por_segundo_antes": antes,
+                    "productos_por_segundo_ahora": ahora
+                })
+    return regresiones
+
+
+def imprimir_consolidado(consolidado):
+    if not consolidado:
+        return
+    print(f"\n⏱️ MÉTRICAS DEL RUN {consolidado['run_id']}")
+    for proceso, datos in sorted(consolidado["procesos"].items(), key=lambda x: -x[1]["segundos"]):
+        fases = ", ".join(
+            f"{n} {f['segundos']:.0f}s ({f['productos_por_segundo'] or 0:.1f} prod/s)"
+            for n, f in datos["fases"].items()
+        )
+        print(f" - {proceso}: {datos['segundos']:.0f}s | {fases or 'sin fases'}")
+    for r in consolidado["regresiones"]:
+        print(
+            f"⚠️ Regresión en {r['proceso']}/{r['fase']}: "
+            f"{r['productos_por_segundo_antes']} → {r['productos_por_segundo_ahora']} prod/s"
+        )
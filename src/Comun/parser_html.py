@@ -0,0 +1,201 @@
+import os
+
+from bs4 import BeautifulSoup
+import soupsieve
+
+# =========================================================
+# ADAPTADOR DE PARSER HTML
+# =========================================================
+# Los scrapers parsean listados y páginas de detalle con
+# selectores CSS. Este módulo permite elegir el motor sin
+# tocar los scrapers:
+#
+# - "html.parser": BeautifulSoup con el parser de Python puro
+# - "lxml":        BeautifulSoup con lxml (si está instalado)
+# - "selectolax":  selectolax/lexbor, en C (si está instalado)
+# - "auto":        el más rápido que esté instalado
+#
+# Se elige con la variable de entorno SCRAPER_PARSER_HTML. Por
+# defecto es html.parser (el de siempre): lxml y selectolax
+# solo se comparan contra páginas sintéticas
+# (Benchmarks/benchParserHtml.py), así que se activan a mano
+# hasta validarlos con páginas grabadas de producción.
+#
+# Los selectores se compilan UNA vez (Selector) en lugar de
+# reinterpretar el texto CSS en cada select_one por tarjeta.
+
+SCRAPER_PARSER_HTML = os.getenv("SCRAPER_PARSER_HTML", "html.parser")
+
+try:
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:
+    LexborHTMLParser = None
+
+try:
+    import lxml  # noqa: F401
+    LXML_DISPONIBLE = True
+except ImportError:
+    LXML_DISPONIBLE = False
+
+
+def backends_disponibles():
+    """
+    Devuelve los motores que se pueden usar en esta instalación.
+    """
+    disponibles = ["html.parser"]
+    if LXML_DISPONIBLE:
+        disponibles.append("lxml")
+    if LexborHTMLParser is not None:
+        disponibles.append("selectolax")
+    return disponibles
+
+
+# Motores ya resueltos (se resuelve una vez por nombre pedido)
+_resueltos = {}
+
+
+def resolver_backend(backend=None):
+    """
+    Traduce "auto" al mejor motor instalado y valida
+    que el pedido exista. Si no está instalado, cae a html.parser.
+    """
+    pedido = backend or SCRAPER_PARSER_HTML
+    if pedido in _resueltos:
+        return _resueltos[pedido]
+
+    disponibles = backends_disponibles()
+    if pedido == "auto":
+        resuelto = disponibles[-1]
+    elif pedido not in disponibles:
+        print(f"⚠️ Parser HTML '{pedido}' no disponible, se usa html.parser")
+        resuelto = "html.parser"
+    else:
+        resuelto = pedido
+
+    _resueltos[pedido] = resuelto
+    return resuelto
+
+
+# =========================================================
+# SELECTORES COMPILADOS
+# =========================================================
+class Selector:
+    """
+    Selector CSS compilado una sola vez.
+    Para BeautifulSoup se compila con soupsieve; selectolax
+    recibe el texto (lexbor lo compila internamente).
+    """
+
+    def __init__(self, css):
+        self.css = css
+        self._compilado = None
+
+    @property
+    def compilado(self):
+        if self._compilado is None:
+            self._compilado = soupsieve.compile(self.css)
+        return self._compilado
+
+    def __repr__(self):
+        return f"Selector({self.css!r})"
+
+
+def _css(selector):
+    return selector if isinstance(selector, Selector) else Selector(selector)
+
+
+# =========================================================
+# NODOS
+# =========================================================
+class NodoSoup:
+    """
+    Nodo de BeautifulSoup con la interfaz común.
+    """
+
+    __slots__ = ("tag",)
+
+    def __init__(self, tag):
+        self.tag = tag
+
+    def select(self, selector):
+        return [NodoSoup(t) for t in _css(selector).compilado.select(self.tag)]
+
+    def select_one(self, selector):
+        tag = _css(selector).compilado.select_one(self.tag)
+        return NodoSoup(tag) if tag is not None else None
+
+    def texto(self, strip=True):
+        return self.tag.get_text(strip=strip)
+
+    def contenido(self):
+        """
+        Texto crudo del nodo (por ejemplo el JSON de un <script>).
+        """
+        return self.tag.string
+
+    def attr(self, nombre, defecto=None):
+        return self.tag.get(nombre, defecto)
+
+    def padre(self, nombre_tag):
+        tag = self.tag.find_parent(nombre_tag)
+        return NodoSoup(tag) if tag is not None else None
+
+
+class NodoLexbor:
+    """
+    Nodo de selectolax con la interfaz común.
+    """
+
+    __slots__ = ("nodo",)
+
+    def __init__(self, nodo):
+        self.nodo = nodo
+
+    def select(self, selector):
+        return [NodoLexbor(n) for n in self.nodo.css(_css(selector).css)]
+
+    def select_one(self, selector):
+        nodo = self.nodo.css_first(_css(selector).css)
+        return NodoLexbor(nodo) if nodo is not None else None
+
+    def texto(self, strip=True):
+        return self.nodo.text(strip=strip)
+
+    def contenido(self):
+        return self.nodo.text(deep=True)
+
+    def attr(self, nombre, defecto=None):
+        valor = self.nodo.attributes.get(nombre)
+        return defecto if valor is None else valor
+
+    def padre(self, nombre_tag):
+        nodo = self.nodo.parent
+        while nodo is not None and nodo.tag != nombre_tag:
+            nodo = nodo.parent
+        return NodoLexbor(nodo) if nodo is not None else None
+
+
+def parsear(html, backend=None):
+    """
+    Parsea un HTML y devuelve el nodo raíz con la interfaz común:
+    select, select_one, texto, contenido, attr, padre.
+    """
+    backend = resolver_backend(backend)
+
+    if backend == "selectolax":
+        return NodoLexbor(LexborHTMLParser(html).root)
+
+    return NodoSoup(BeautifulSoup(html, backend))
+
+
+# Selector del bloque Schema.org de las páginas de producto
+SELECTOR_JSON_LD = Selector('script[type="application/ld+json"]')
+
+
+def extraer_json_ld(html, backend=None):
+    """
+    Devuelve el texto del primer <script type="application/ld+json">
+    de la página, o None si no tiene.
+    """
+    script = parsear(html, backend).select_one(SELECTOR_JSON_LD)
+    return script.contenido() if script is not None else None
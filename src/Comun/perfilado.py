@@ -0,0 +1,257 @@
+import argparse
+import atexit
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+
+from Comun import metricas
+
+# =========================================================
+# PERFILADO OPCIONAL
+# =========================================================
+# Para saber en qué se va el tiempo de una corrida lenta
+# (esperas de red, parseo HTML, JSON, locks...).
+#
+# Se activa por variable de entorno o por argumento en
+# cualquier punto de entrada (scrapers, runScrappers,
+# pipeline, PostProducts). Los argumentos se pasan a las
+# variables de entorno, así los subprocesos los heredan.
+#
+#   SCRAPER_PERFIL / --perfil:
+#     - "cprofile": cProfile de todo el proceso → <proceso>.prof
+#                   (se abre con snakeviz, pstats, etc)
+#     - "muestreo": muestreador propio de todas las pilas de
+#                   todos los hilos → <proceso>.collapsed
+#                   (formato "a;b;c N" para flamegraph.pl o speedscope)
+#   SCRAPER_PERFIL_INTERVALO / --perfil-intervalo:
+#     milisegundos entre muestras (por defecto 10)
+#   SCRAPER_TRACEMALLOC / --tracemalloc:
+#     snapshot de memoria al entrar y salir de cada fase
+#     de Comun/metricas.py → tracemalloc/<proceso>-NN-<fase>.txt
+#
+# Todo se escribe en Perfiles/<run_id>/.
+# Con todo apagado no se instala nada: costo cero.
+
+SCRAPER_PERFILES_DIR = os.getenv(
+    "SCRAPER_PERFILES_DIR",
+    os.path.join(metricas.SRC_DIR, "Perfiles")
+)
+
+MODOS_PERFIL = ("cprofile", "muestreo")
+
+# Líneas de cada snapshot de tracemalloc
+TOP_TRACEMALLOC = 25
+
+# Profundidad máxima de las pilas muestreadas
+PROFUNDIDAD_MAXIMA = 64
+
+
+def _argumentos():
+    """
+    Lee los argumentos de perfilado de sys.argv (ignora el resto)
+    y los pasa a variables de entorno.
+    """
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument("--perfil", choices=MODOS_PERFIL)
+    parser.add_argument("--perfil-intervalo", type=float)
+    parser.add_argument("--tracemalloc", action="store_true")
+    args, _ = parser.parse_known_args(sys.argv[1:])
+
+    if args.perfil:
+        os.environ["SCRAPER_PERFIL"] = args.perfil
+    if args.perfil_intervalo:
+        os.environ["SCRAPER_PERFIL_INTERVALO"] = str(args.perfil_intervalo)
+    if args.tracemalloc:
+        os.environ["SCRAPER_TRACEMALLOC"] = "1"
+
+
+def _carpeta():
+    carpeta = os.path.join(SCRAPER_PERFILES_DIR, metricas.run_id())
+    os.makedirs(carpeta, exist_ok=True)
+    return carpeta
+
+
+# =========================================================
+# MUESTREADOR DE PILAS
+# =========================================================
+def _nombre_hilo(hilo):
+    """
+    "ThreadPoolExecutor-0_3" → "ThreadPoolExecutor-0", así los
+    hilos de un mismo pool se suman en la misma pila.
+    """
+    nombre = hilo.name if hilo else "?"
+    return nombre.rsplit("_", 1)[0] if nombre.startswith("ThreadPoolExecutor") else nombre
+
+
+def _marco(frame, con_linea=False):
+    codigo = frame.f_code
+    modulo = os.path.splitext(os.path.basename(codigo.co_filename))[0]
+    if con_linea:
+        return f"{modulo}:{codigo.co_name}:{frame.f_lineno}"
+    return f"{modulo}:{codigo.co_name}"
+
+
+class Muestreador:
+    """
+    Cada `intervalo` segundos toma la pila de todos los hilos
+    y cuenta cuántas veces aparece cada una.
+    """
+
+    def __init__(self, intervalo):
+        self.intervalo = intervalo
+        self.pilas = Counter()
+        self.muestras = 0
+        self._parar = threading.Event()
+        self._hilo = threading.Thread(target=self._correr, name="muestreador", daemon=True)
+
+    def iniciar(self):
+        self._hilo.start()
+
+    def _correr(self):
+        propio = threading.get_ident()
+        while not self._parar.wait(self.intervalo):
+            hilos = {h.ident: h for h in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == propio:
+                    continue
+                # Solo el marco de arriba lleva número de línea, así
+                # las llamadas desde distintas líneas se agrupan
+                pila = [_marco(frame, con_linea=True)]
+                frame = frame.f_back
+                while frame is not None and len(pila) < PROFUNDIDAD_MAXIMA:
+                    pila.append(_marco(frame))
+                    frame = frame.f_back
+                pila.append(_nombre_hilo(hilos.get(ident)))
+                self.pilas[";".join(reversed(pila))] += 1
+            self.muestras += 1
+
+    def detener(self, ruta):
+        self._parar.set()
+        self._hilo.join(timeout=1)
+        with open(ruta, "w", encoding="utf-8") as f:
+            for pila, cantidad in self.pilas.most_common():
+                f.write(f"{pila} {cantidad}\n")
+
+
+# =========================================================
+# TRACEMALLOC POR FASE
+# =========================================================
+class SnapshotsMemoria:
+    """
+    Observador de fases de Comun/metricas.py: guarda un snapshot
+    de tracemalloc en cada borde de fase, con la diferencia
+    respecto del snapshot anterior.
+    """
+
+    def __init__(self, proceso):
+        self.proceso = proceso
+        self.numero = 0
+        self.anterior = None
+        self._lock = threading.Lock()
+        tracemalloc.start(10)
+
+    def __call__(self, fase, evento):
+        with self._lock:
+            self.numero += 1
+            snapshot = tracemalloc.take_snapshot().filter_traces((
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            ))
+            actual, pico = tracemalloc.get_traced_memory()
+
+            carpeta = os.path.join(_carpeta(), "tracemalloc")
+            os.makedirs(carpeta, exist_ok=True)
+            ruta = os.path.join(carpeta, f"{self.proceso}-{self.numero:02d}-{fase}-{evento}.txt")
+            with open(ruta, "w", encoding="utf-8") as f:
+                f.write(f"# {fase} {evento}: actual {actual / 1e6:.1f} MB, pico {pico / 1e6:.1f} MB\n")
+                f.write("\n# Mayores asignaciones\n")
+                for stat in snapshot.statistics("lineno")[:TOP_TRACEMALLOC]:
+                    f.write(f"{stat}\n")
+                if self.anterior is not None:
+                    f.write("\n# Diferencia con el snapshot anterior\n")
+                    for stat in snapshot.compare_to(self.anterior, "lineno")[:TOP_TRACEMALLOC]:
+                        f.write(f"{stat}\n")
+            self.anterior = snapshot
+
+
+# =========================================================
+# PUNTO DE ENTRADA
+# =========================================================
+_iniciado = False
+
+
+def iniciar_perfilado(proceso):
+    """
+    Activa el perfilado pedido (si hay alguno) para este proceso.
+    Se llama al inicio de cada punto de entrada.
+    """
+    global _iniciado
+    _argumentos()
+
+    modo = os.getenv("SCRAPER_PERFIL", "")
+    memoria = os.getenv("SCRAPER_TRACEMALLOC", "0") == "1"
+    if _iniciado or not (modo or memoria):
+        return
+    _iniciado = True
+
+    if memoria:
+        metricas.OBSERVADORES_FASE.append(SnapshotsMemoria(proceso))
+
+    if modo == "cprofile":
+        import cProfile
+        import pstats
+
+        perfil = cProfile.Profile()
+        perfiles_hilos = []
+
+        # Hasta Python 3.11 cProfile mide solo el hilo donde se
+        # activa: cada hilo nuevo arranca su propio perfil y al
+        # final se suman. Desde 3.12 un perfil cubre todos los hilos.
+        if sys.version_info < (3, 12):
+            def perfilar_hilo(*_):
+                sys.setprofile(None)
+                perfil_hilo = cProfile.Profile()
+                perfiles_hilos.append(perfil_hilo)
+                perfil_hilo.enable()
+
+            threading.setprofile(perfilar_hilo)
+
+        perfil.enable()
+
+        def guardar():
+            perfil.disable()
+            threading.setprofile(None)
+            estadisticas = pstats.Stats(perfil)
+            for perfil_hilo in list(perfiles_hilos):
+                try:
+                    estadisticas.add(perfil_hilo)
+                except (TypeError, ValueError):
+                    # Hilo sin llamadas registradas
+                    pass
+            ruta = os.path.join(_carpeta(), f"{proceso}.prof")
+            estadisticas.dump_stats(ruta)
+            print(f"🔬 Perfil cProfile: {ruta}")
+
+        atexit.register(guardar)
+
+    elif modo == "muestreo":
+        intervalo = float(os.getenv("SCRAPER_PERFIL_INTERVALO", "10")) / 1000
+        muestreador = Muestreador(intervalo)
+        muestreador.iniciar()
+        inicio = time.time()
+
+        def guardar():
+            ruta = os.path.join(_carpeta(), f"{proceso}.collapsed")
+            muestreador.detener(ruta)
+            print(
+                f"🔬 Pilas muestreadas: {ruta} "
+                f"({muestreador.muestras} muestras en {time.time() - inicio:.0f}s)"
+            )
+
+        atexit.register(guardar)
+
+    elif modo:
+        print(f"⚠️ Modo de perfil desconocido: {modo} (opciones: {', '.join(MODOS_PERFIL)})")
@@ -0,0 +1,388 @@
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from urllib.parse import urlsplit
+
+from Comun import metricas
+
+# =========================================================
+# PLANIFICADOR DE REFRESCO POR PRODUCTO
+# =========================================================
+# Pedir la página de detalle de TODOS los productos en cada
+# corrida es lo más caro de Géant y Tienda Inglesa, y la
+# mayoría no cambia entre corridas (los campos fijos —nombre,
+# marca, imagen, descripción— casi nunca; el precio a veces).
+#
+# El planificador guarda, por (storeRut, idWeb), la historia de
+# cambios de corridas anteriores y le asigna a cada producto un
+# intervalo de refresco según su volatilidad:
+# - si cambió desde la visita anterior, el intervalo se achica
+#   (FACTOR_CAMBIO), hasta INTERVALO_MINIMO_HORAS
+# - si no cambió, se agranda (FACTOR_ESTABLE), hasta
+#   INTERVALO_MAXIMO_HORAS
+#
+# En cada corrida solo se piden los productos vencidos, dentro
+# de un presupuesto de requests por tienda (los más atrasados
+# primero). Los que no se piden salen en el JSON con los datos
+# de su última visita, así el import sigue viendo el catálogo
+# completo. Los listados baratos (Tata, Disco, Devoto) siguen
+# corriendo completos.
+#
+# Ninguna URL queda afuera para siempre:
+# - las nuevas que no entran en el cupo se anotan como
+#   postergadas y en las corridas siguientes tienen prioridad
+#   sobre las recién aparecidas (las más viejas primero)
+# - las de productos sin idWeb no tienen historia: se anotan
+#   y se piden siempre, fuera del presupuesto
+# - si falla el pedido de una URL conocida, sale la última
+#   visita
+# El resumen informa qué parte del catálogo salió de visitas
+# anteriores y cuán vieja es.
+#
+#   SCRAPER_REFRESCO / --refresco:
+#     - "planificado" (por defecto)
+#     - "completo": se pide todo (la historia se sigue guardando)
+
+# SRC_DIR:
+# Carpeta src del proyecto
+SRC_DIR = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+SCRAPER_PLANIFICACION_DIR = os.getenv("SCRAPER_PLANIFICACION_DIR", os.path.join(SRC_DIR, "Planificacion"))
+
+MODOS_REFRESCO = ("planificado", "completo")
+
+# Intervalo de un producto visto por primera vez
+INTERVALO_INICIAL_HORAS = 24
+
+# Límites del intervalo de refresco
+INTERVALO_MINIMO_HORAS = 6
+INTERVALO_MAXIMO_HORAS = 24 * 14
+
+# Multiplicadores del intervalo después de cada visita
+FACTOR_CAMBIO = 0.5
+FACTOR_ESTABLE = 1.5
+
+# Parte del presupuesto reservada para URLs nunca vistas
+# (productos nuevos), que compiten con los vencidos
+FRACCION_NUEVOS = 0.2
+
+# Decisiones para cada URL
+PEDIR = "pedir"
+REUTILIZAR = "reutilizar"
+POSTERGAR = "postergar"
+
+# Motivo de una URL anotada en urls_pendientes sin historia
+# de producto (la otra es POSTERGAR)
+SIN_ID = "sin_id"
+
+# Campos que casi nunca cambian
+CAMPOS_ESTATICOS = ("productName", "productBrand", "productImageUrl", "productDescription", "urlProduct")
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS productos (
+    store_rut INTEGER NOT NULL,
+    id_web INTEGER NOT NULL,
+    url TEXT NOT NULL,
+    huella_precio TEXT NOT NULL,
+    huella_estatica TEXT NOT NULL,
+    producto TEXT NOT NULL,
+    ultima_visita REAL NOT NULL,
+    ultimo_cambio REAL NOT NULL,
+    intervalo_horas REAL NOT NULL,
+    visitas INTEGER NOT NULL,
+    cambios_precio INTEGER NOT NULL,
+    cambios_estaticos INTEGER NOT NULL,
+    PRIMARY KEY (store_rut, id_web)
+);
+CREATE INDEX IF NOT EXISTS productos_url ON productos (store_rut, url);
+CREATE TABLE IF NOT EXISTS urls_pendientes (
+    store_rut INTEGER NOT NULL,
+    url TEXT NOT NULL,
+    motivo TEXT NOT NULL,
+    desde REAL NOT NULL,
+    PRIMARY KEY (store_rut, url)
+);
+"""
+
+
+def modo_refresco():
+    """
+    Lee --refresco de sys.argv (lo pasa a SCRAPER_REFRESCO
+    para los subprocesos) y devuelve el modo.
+    """
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument("--refresco", choices=MODOS_REFRESCO)
+    args, _ = parser.parse_known_args(sys.argv[1:])
+    if args.refresco:
+        os.environ["SCRAPER_REFRESCO"] = args.refresco
+    modo = os.getenv("SCRAPER_REFRESCO", "planificado")
+    return modo if modo in MODOS_REFRESCO else "planificado"
+
+
+def _clave_url(url):
+    """
+    La URL sin esquema ni host: la misma página se reconoce
+    aunque cambie el dominio (mirror, servidor local).
+    """
+    partes = urlsplit(url)
+    return partes.path + ("?" + partes.query if partes.query else "")
+
+
+def _huella(valores):
+    texto = json.dumps(valores, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha1(texto.encode("utf-8")).hexdigest()[:16]
+
+
+def huellas(producto):
+    """
+    Devuelve (huella del precio, huella de los campos fijos).
+    """
+    return (
+        _huella([producto.get("productPrice"), producto.get("moneda")]),
+        _huella([producto.get(c) for c in CAMPOS_ESTATICOS])
+    )
+
+
+class Planificador:
+    """
+    Decide qué URLs de detalle se piden en esta corrida y
+    registra lo que se obtuvo. Seguro entre hilos.
+
+        planificador = Planificador("geant", GEANT_RUT, presupuesto=5000)
+        decision = planificador.decidir(url)      # PEDIR / REUTILIZAR / POSTERGAR
+        planificador.ultimo(url)                  # producto de la última visita
+        planificador.registrar(url, producto)     # después de pedirlo
+        planificador.guardar()                    # al final de la corrida
+    """
+
+    def __init__(self, tienda, store_rut, presupuesto=None, modo=None, directorio=None):
+        directorio = directorio or SCRAPER_PLANIFICACION_DIR
+        os.makedirs(directorio, exist_ok=True)
+        self.ruta = os.path.join(directorio, f"{tienda}.sqlite")
+        self.store_rut = store_rut
+        self.modo = modo or modo_refresco()
+        self.ahora = time.time()
+
+        self._db = sqlite3.connect(self.ruta, check_same_thread=False)
+        self._db.executescript(ESQUEMA)
+
+        # url → fila de la última visita
+        self._conocidos = {}
+        for fila in self._db.execute(
+            "SELECT url, id_web, huella_precio, huella_estatica, producto, ultima_visita, "
+            "intervalo_horas FROM productos WHERE store_rut = ?", (store_rut,)
+        ):
+            url, id_web, h_precio, h_estatica, producto, visita, intervalo = fila
+            self._conocidos[_clave_url(url)] = {
+                "id_web": id_web, "huella_precio": h_precio, "huella_estatica": h_estatica,
+                "producto": producto, "ultima_visita": visita, "intervalo_horas": intervalo
+            }
+
+        # URLs sin historia anotadas en corridas anteriores:
+        # postergadas (las más viejas primero) y sin idWeb
+        postergadas = []
+        self._sin_id = set()
+        for url, motivo in self._db.execute(
+            "SELECT url, motivo FROM urls_pendientes WHERE store_rut = ? ORDER BY desde", (store_rut,)
+        ):
+            if motivo == SIN_ID:
+                self._sin_id.add(url)
+            elif url not in self._conocidos:
+                postergadas.append(url)
+
+        self._lock = threading.Lock()
+        self._visitas = []
+        self._sin_id_visitadas = []
+        self._postergadas = []
+        self.decisiones = {PEDIR: 0, REUTILIZAR: 0, POSTERGAR: 0}
+
+        # Antigüedad (horas) de los productos que salen de una
+        # visita anterior: reutilizados y pedidos que fallaron
+        self._antiguedades = []
+
+        # Reparto del presupuesto: los vencidos más atrasados
+        # (atraso / intervalo) tienen lugar asegurado; una parte
+        # queda para URLs nuevas, por orden de llegada
+        vencidos = sorted(
+            (url for url, c in self._conocidos.items() if self._atraso(c) >= 1),
+            key=lambda url: -self._atraso(self._conocidos[url])
+        )
+        # Las postergadas en corridas anteriores se llevan primero
+        # el cupo de nuevas
+        if presupuesto is None or self.modo == "completo":
+            self._permitidos = set(vencidos)
+            self._cupo_nuevos = None
+            self._reservadas = set()
+        else:
+            cupo_vencidos = presupuesto - int(presupuesto * FRACCION_NUEVOS)
+            self._permitidos = set(vencidos[:cupo_vencidos])
+            cupo_nuevos = presupuesto - len(self._permitidos)
+            self._reservadas = set(postergadas[:cupo_nuevos])
+            self._cupo_nuevos = cupo_nuevos - len(self._reservadas)
+        self.vencidos = len(vencidos)
+        self.postergadas_antes = len(postergadas)
+
+    def _atraso(self, conocido):
+        horas = (self.ahora - conocido["ultima_visita"]) / 3600
+        return horas / conocido["intervalo_horas"]
+
+    def decidir(self, url):
+        with self._lock:
+            decision = self._decidir(url)
+            self.decisiones[decision] += 1
+        metricas.contar("refresco", decision=decision)
+        return decision
+
+    def _decidir(self, url):
+        url = _clave_url(url)
+        conocido = self._conocidos.get(url)
+        if conocido is None:
+            if self._cupo_nuevos is None or url in self._sin_id or url in self._reservadas:
+                return PEDIR
+            if self._cupo_nuevos > 0:
+                self._cupo_nuevos -= 1
+                return PEDIR
+            self._postergadas.append(url)
+            return POSTERGAR
+        if self.modo == "completo" or url in self._permitidos:
+            return PEDIR
+        return REUTILIZAR
+
+    def ultimo(self, url):
+        """
+        Producto de la última visita de una URL, o None si no es
+        conocida. Cuenta su antigüedad para el resumen.
+        """
+        conocido = self._conocidos.get(_clave_url(url))
+        if conocido is None:
+            return None
+        segundos = self.ahora - conocido["ultima_visita"]
+        with self._lock:
+            self._antiguedades.append(segundos / 3600)
+        metricas.observar("refresco_antiguedad", segundos)
+        return json.loads(conocido["producto"])
+
+    def registrar(self, url, producto):
+        """
+        Anota la visita de una URL que se pidió en esta corrida.
+        Los productos sin idWeb no se planifican: su URL se anota
+        para pedirla siempre.
+        """
+        if not producto:
+            return
+        with self._lock:
+            if producto.get("idWeb") is None:
+                self._sin_id_visitadas.append(url)
+            else:
+                self._visitas.append((url, producto))
+
+    def guardar(self):
+        """
+        Actualiza la historia y los intervalos con las visitas
+        de esta corrida.
+        """
+        with self._lock:
+            visitas, self._visitas = self._visitas, []
+            sin_id, self._sin_id_visitadas = self._sin_id_visitadas, []
+            postergadas, self._postergadas = self._postergadas, []
+
+        cambios = 0
+        with self._db:
+            # Las postergadas que llevan más de INTERVALO_MAXIMO_HORAS
+            # sin aparecer (productos dados de baja) no reservan más cupo
+            self._db.execute(
+                "DELETE FROM urls_pendientes WHERE store_rut = ? AND motivo = ? AND desde < ?",
+                (self.store_rut, POSTERGAR, self.ahora - INTERVALO_MAXIMO_HORAS * 3600)
+            )
+            # Las postergadas conservan la fecha de la primera vez
+            self._db.executemany(
+                "INSERT OR IGNORE INTO urls_pendientes VALUES (?, ?, ?, ?)",
+                [(self.store_rut, url, POSTERGAR, self.ahora) for url in postergadas]
+            )
+            self._db.executemany(
+                "INSERT OR REPLACE INTO urls_pendientes VALUES (?, ?, ?, ?)",
+                [(self.store_rut, _clave_url(url), SIN_ID, self.ahora) for url in sin_id]
+            )
+            self._db.executemany(
+                "DELETE FROM urls_pendientes WHERE store_rut = ? AND url = ?",
+                [(self.store_rut, _clave_url(url)) for url, _ in visitas]
+            )
+
+            for url, producto in visitas:
+                h_precio, h_estatica = huellas(producto)
+                fila = self._db.execute(
+                    "SELECT huella_precio, huella_estatica, ultimo_cambio, intervalo_horas, visitas, "
+                    "cambios_precio, cambios_estaticos FROM productos WHERE store_rut = ? AND id_web = ?",
+                    (self.store_rut, producto["idWeb"])
+                ).fetchone()
+
+                if fila is None:
+                    ultimo_cambio = self.ahora
+                    intervalo = INTERVALO_INICIAL_HORAS
+                    n_visitas, c_precio, c_estaticos = 1, 0, 0
+                else:
+                    ant_precio, ant_estatica, ultimo_cambio, intervalo, n_visitas, c_precio, c_estaticos = fila
+                    cambio_precio = ant_precio != h_precio
+                    cambio_estatico = ant_estatica != h_estatica
+                    n_visitas += 1
+                    c_precio += cambio_precio
+                    c_estaticos += cambio_estatico
+                    if cambio_precio or cambio_estatico:
+                        cambios += 1
+                        ultimo_cambio = self.ahora
+                        intervalo = max(INTERVALO_MINIMO_HORAS, intervalo * FACTOR_CAMBIO)
+                    else:
+                        intervalo = min(INTERVALO_MAXIMO_HORAS, intervalo * FACTOR_ESTABLE)
+
+                self._db.execute(
+                    "INSERT OR REPLACE INTO productos VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (self.store_rut, producto["idWeb"], url, h_precio, h_estatica,
+                     json.dumps(producto, ensure_ascii=False), self.ahora, ultimo_cambio,
+                     intervalo, n_visitas, c_precio, c_estaticos)
+                )
+
+        metricas.contar("refresco_cambios", cambios)
+        return cambios
+
+    def resumen(self):
+        antiguedades = self._antiguedades
+        return {
+            "modo": self.modo,
+            "conocidos": len(self._conocidos),
+            "vencidos": self.vencidos,
+            "postergadas_antes": self.postergadas_antes,
+            "de_visitas_anteriores": len(antiguedades),
+            "antiguedad_media_horas": sum(antiguedades) / len(antiguedades) if antiguedades else 0,
+            "antiguedad_maxima_horas": max(antiguedades, default=0),
+            **self.decisiones
+        }
+
+    def imprimir_resumen(self, guardados=None):
+        """
+        `guardados`: productos del JSON final, para informar qué
+        parte salió de visitas anteriores.
+        """
+        r = self.resumen()
+        print(
+            f"🗓️ Refresco {r['modo']}: {r[PEDIR]} pedidos, {r[REUTILIZAR]} reutilizados de la "
+            f"última visita ({r['vencidos']} de {r['conocidos']} conocidos estaban vencidos)"
+        )
+        if r["de_visitas_anteriores"]:
+            parte = f" ({r['de_visitas_anteriores'] / guardados:.0%} del JSON)" if guardados else ""
+            print(
+                f"🕰️ {r['de_visitas_anteriores']} productos salen de visitas anteriores{parte}: "
+                f"antigüedad media {r['antiguedad_media_horas']:.1f} h, máxima {r['antiguedad_maxima_horas']:.1f} h"
+            )
+        if r[POSTERGAR]:
+            print(
+                f"⚠️ COBERTURA: {r[POSTERGAR]} productos nuevos postergados por presupuesto no salen en "
+                f"este JSON; tienen prioridad en la próxima corrida"
+            )
+
+    def cerrar(self):
+        self._db.close()
@@ -0,0 +1,305 @@
+import os
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+import requests
+
+from Comun import descartes, metricas
+
+# =========================================================
+# REINTENTOS Y CORTACIRCUITOS POR HOST
+# =========================================================
+# Un error transitorio (503, conexión cortada, timeout) no
+# tiene que costar una categoría entera ni un producto.
+# SesionConReintentos envuelve la sesión de un scraper:
+#
+# - reintenta los requests idempotentes (GET; POST solo si se
+#   pide con idempotente=True) ante 429/5xx, desafíos de
+#   Cloudflare, timeouts y errores de conexión
+# - espera con backoff exponencial y jitter completo:
+#   azar(0, min(ESPERA_MAXIMA, ESPERA_BASE × 2^intento)),
+#   o lo que diga el header Retry-After (hasta RETRY_AFTER_MAXIMO)
+# - lleva un cortacircuitos por host: después de
+#   FALLAS_PARA_ABRIR fallas seguidas el host se PAUSA (los
+#   requests esperan en lugar de gastar la frontera contra un
+#   sitio caído). Al vencer la pausa pasa un solo request de
+#   prueba: si anda se cierra, si no la pausa se duplica (hasta
+#   PAUSA_MAXIMA). Después de MAX_APERTURAS pausas seguidas sin
+#   éxito los requests fallan enseguida con CircuitoAbierto.
+#
+# Va por fuera de Comun/concurrencia.py: cada intento toma su
+# turno, pero las esperas entre intentos no ocupan lugar.
+#
+#   SCRAPER_REINTENTOS: intentos por request (1 = sin reintentos)
+
+# Intentos por request (el primero incluido)
+INTENTOS = int(os.getenv("SCRAPER_REINTENTOS", "3"))
+
+# Backoff exponencial (segundos)
+ESPERA_BASE = 0.5
+ESPERA_MAXIMA = 20
+
+# Tope para un Retry-After del servidor (segundos)
+RETRY_AFTER_MAXIMO = 60
+
+# Status que se reintentan
+STATUS_REINTENTABLES = (429, 500, 502, 503, 504)
+
+# Fallas seguidas de un host que abren el circuito
+FALLAS_PARA_ABRIR = 10
+
+# Pausa del host al abrir el circuito (se duplica en cada
+# apertura seguida, hasta PAUSA_MAXIMA)
+PAUSA_INICIAL = 15
+PAUSA_MAXIMA = 240
+
+# Pausas seguidas sin un request exitoso antes de dar el host por caído
+MAX_APERTURAS = 6
+
+# Estados del cortacircuitos
+CERRADO = "cerrado"
+ABIERTO = "abierto"
+SEMIABIERTO = "semiabierto"
+CAIDO = "caido"
+
+
+class CircuitoAbierto(requests.exceptions.ConnectionError):
+    """
+    El host se dio por caído (MAX_APERTURAS pausas seguidas).
+    """
+
+
+# =========================================================
+# CORTACIRCUITOS
+# =========================================================
+class Cortacircuitos:
+    """
+    Estado de un host. Seguro entre hilos.
+    """
+
+    def __init__(self, host):
+        self.host = host
+        self.estado = CERRADO
+        self.fallas_seguidas = 0
+        self.aperturas_seguidas = 0
+        self.pausa = PAUSA_INICIAL
+        self.reabre = 0.0
+        self._sondeando = False
+        self._cond = threading.Condition()
+        self.estadisticas = {"reintentos": 0, "agotados": 0, "aperturas": 0, "segundos_pausado": 0.0}
+
+    def esperar(self):
+        """
+        Bloquea mientras el host está pausado. Devuelve True si
+        este request es la prueba del estado semiabierto.
+        """
+        with self._cond:
+            while True:
+                if self.estado == CAIDO:
+                    raise CircuitoAbierto(f"{self.host} no responde (circuito abierto)")
+                if self.estado == CERRADO:
+                    return False
+                ahora = time.monotonic()
+                if self.estado == ABIERTO and ahora >= self.reabre:
+                    self.estado = SEMIABIERTO
+                if self.estado == SEMIABIERTO and not self._sondeando:
+                    self._sondeando = True
+                    return True
+                espera = self.reabre - ahora if self.estado == ABIERTO else 1.0
+                self._cond.wait(max(0.05, espera))
+
+    def exito(self, sonda=False):
+        with self._cond:
+            self.fallas_seguidas = 0
+            if sonda:
+                self._sondeando = False
+            if self.estado != CERRADO:
+                print(f"✅ {self.host}: responde de nuevo, circuito cerrado")
+                metricas.contar("circuito", host=self.host, evento="cierre")
+                self.estado = CERRADO
+                self.aperturas_seguidas = 0
+                self.pausa = PAUSA_INICIAL
+                self._cond.notify_all()
+
+    def falla(self, sonda=False):
+        with self._cond:
+            self.fallas_seguidas += 1
+            if sonda:
+                self._sondeando = False
+            if (sonda and self.estado == SEMIABIERTO) or (
+                self.estado == CERRADO and self.fallas_seguidas >= FALLAS_PARA_ABRIR
+            ):
+                self._abrir()
+            self._cond.notify_all()
+
+    def _abrir(self):
+        self.aperturas_seguidas += 1
+        self.estadisticas["aperturas"] += 1
+        metricas.contar("circuito", host=self.host, evento="apertura")
+        if self.aperturas_seguidas > MAX_APERTURAS:
+            self.estado = CAIDO
+            print(f"⛔ {self.host}: sin respuesta después de {MAX_APERTURAS} pausas, se abandona")
+            return
+        self.estado = ABIERTO
+        self.reabre = time.monotonic() + self.pausa
+        self.estadisticas["segundos_pausado"] += self.pausa
+        print(f"⏸️ {self.host}: {self.fallas_seguidas} fallas seguidas, pausa de {self.pausa:.0f}s")
+        self.pausa = min(PAUSA_MAXIMA, self.pausa * 2)
+
+    def resumen(self):
+        with self._cond:
+            return {"estado": self.estado, **self.estadisticas}
+
+
+_cortacircuitos = {}
+_cortacircuitos_lock = threading.Lock()
+
+
+def cortacircuitos_de(url):
+    host = urlsplit(url).netloc.lower()
+    with _cortacircuitos_lock:
+        cortacircuitos = _cortacircuitos.get(host)
+        if cortacircuitos is None:
+            cortacircuitos = _cortacircuitos[host] = Cortacircuitos(host)
+        return cortacircuitos
+
+
+# =========================================================
+# POLÍTICA
+# =========================================================
+def motivo_reintento(respuesta=None, error=None):
+    """
+    Motivo por el que se reintenta, o None si el resultado es
+    definitivo (éxito o un error que no cambia reintentando).
+    """
+    if error is not None:
+        if isinstance(error, CircuitoAbierto):
+            return None
+        if isinstance(error, requests.exceptions.Timeout):
+            return "timeout"
+        if isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.ChunkedEncodingError)):
+            return "conexion"
+        return None
+    if descartes.es_cloudflare(respuesta):
+        return "cloudflare"
+    if respuesta.status_code in STATUS_REINTENTABLES:
+        return f"http_{respuesta.status_code}"
+    return None
+
+
+def segundos_retry_after(respuesta):
+    """
+    Segundos que pide el header Retry-After (número o fecha
+    HTTP), o None.
+    """
+    valor = respuesta.headers.get("Retry-After") if respuesta is not None else None
+    if not valor:
+        return None
+    try:
+        segundos = float(valor)
+    except ValueError:
+        try:
+            segundos = parsedate_to_datetime(valor).timestamp() - time.time()
+        except (TypeError, ValueError):
+            return None
+    return max(0.0, min(RETRY_AFTER_MAXIMO, segundos))
+
+
+def espera_backoff(intento):
+    """
+    Jitter completo: azar entre 0 y la espera exponencial.
+    """
+    return random.uniform(0, min(ESPERA_MAXIMA, ESPERA_BASE * 2 ** intento))
+
+
+# =========================================================
+# SESIÓN CON REINTENTOS
+# =========================================================
+class SesionConReintentos:
+    """
+    Envoltorio de una sesión (requests, cloudscraper o las
+    envolturas de Comun): get() y post() pasan por la política
+    de reintentos y el cortacircuitos del host. Cualquier otro
+    atributo va a la sesión original.
+
+    Si se agotan los intentos se devuelve la última respuesta
+    (el scraper la verifica como siempre) o se relanza la
+    última excepción.
+    """
+
+    def __init__(self, sesion, intentos=None):
+        self.sesion = sesion
+        self.intentos = max(1, intentos or INTENTOS)
+
+    def __getattr__(self, nombre):
+        return getattr(self.sesion, nombre)
+
+    def get(self, url, **kwargs):
+        return self._pedir(self.sesion.get, url, True, **kwargs)
+
+    def post(self, url, idempotente=False, **kwargs):
+        return self._pedir(self.sesion.post, url, idempotente, **kwargs)
+
+    def _pedir(self, metodo, url, idempotente, **kwargs):
+        cortacircuitos = cortacircuitos_de(url)
+        intentos = self.intentos if idempotente else 1
+
+        for intento in range(intentos):
+            sonda = cortacircuitos.esperar()
+            respuesta, error = None, None
+            try:
+                respuesta = metodo(url, **kwargs)
+            except Exception as e:
+                error = e
+
+            motivo = motivo_reintento(respuesta, error)
+            if motivo is None:
+                # Resultado definitivo: el host respondió (o el
+                # error no es de red, como una grabación faltante)
+                cortacircuitos.exito(sonda)
+                if error is not None:
+                    raise error
+                return respuesta
+
+            cortacircuitos.falla(sonda)
+            if intento == intentos - 1:
+                with cortacircuitos._cond:
+                    cortacircuitos.estadisticas["agotados"] += 1
+                metricas.contar("reintentos_agotados", host=cortacircuitos.host, motivo=motivo)
+                if error is not None:
+                    raise error
+                return respuesta
+
+            with cortacircuitos._cond:
+                cortacircuitos.estadisticas["reintentos"] += 1
+            metricas.contar("reintentos", host=cortacircuitos.host, motivo=motivo)
+            espera = segundos_retry_after(respuesta)
+            time.sleep(espera if espera is not None else espera_backoff(intento))
+
+
+def con_reintentos(sesion, intentos=None):
+    return SesionConReintentos(sesion, intentos)
+
+
+# =========================================================
+# RESUMEN
+# =========================================================
+def resumen():
+    with _cortacircuitos_lock:
+        cortacircuitos = list(_cortacircuitos.values())
+    return {c.host: c.resumen() for c in cortacircuitos}
+
+
+def imprimir_resumen():
+    for host, datos in resumen().items():
+        if datos["reintentos"] or datos["aperturas"]:
+            print(
+                f"🔁 {host}: {datos['reintentos']} reintentos, {datos['agotados']} agotados, "
+                f"{datos['aperturas']} pausas ({datos['segundos_pausado']:.0f}s), circuito {datos['estado']}"
+            )
+
+
+metricas.SECCIONES["reintentos"] = resumen
@@ -0,0 +1,74 @@
+import importlib.util
+import os
+import sys
+
+# =========================================================
+# REGISTRO DE SCRAPERS
+# =========================================================
+# Los scrapers son scripts sueltos dentro de Jobs/ (y Cloud/),
+# no paquetes. Este registro permite cargarlos como módulos
+# desde otros procesos (benchmarks, workers, etc).
+
+# SRC_DIR:
+# Carpeta src del proyecto
+SRC_DIR = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+# key   → nombre corto del scraper
+# value → archivo (relativo a src) y función principal
+SCRAPERS = {
+    "geant": {
+        "archivo": os.path.join("Jobs", "Geant", "scrapperGeant.py"),
+        "main": "ejecutar_scrapper_geant"
+    },
+    "tata": {
+        "archivo": os.path.join("Jobs", "Tata", "ScrapperTata.py"),
+        "main": "ejecutar_scrapper_masivo"
+    },
+    "tienda": {
+        "archivo": os.path.join("Jobs", "TiendaInglesa", "ScrapperTienda.py"),
+        "main": "main"
+    },
+    "disco": {
+        "archivo": os.path.join("Jobs", "Disco", "scrapperDisco.py"),
+        "main": "ejecutar_scraper_disco"
+    },
+    "devoto": {
+        "archivo": os.path.join("Jobs", "Devoto", "ScrapperDevoto.py"),
+        "main": "ejecutar_scraper_disco"
+    }
+}
+
+
+def cargar_scraper(nombre):
+    """
+    Importa el script de un scraper y devuelve el módulo.
+
+    El módulo queda registrado en sys.modules con el nombre
+    del archivo (ej: "scrapperGeant"), así se puede volver a
+    importar o pasar a otros procesos.
+    """
+    if nombre not in SCRAPERS:
+        raise KeyError(f"Scraper desconocido: {nombre}")
+
+    ruta = os.path.join(SRC_DIR, SCRAPERS[nombre]["archivo"])
+    nombre_modulo = os.path.splitext(os.path.basename(ruta))[0]
+
+    if nombre_modulo in sys.modules:
+        return sys.modules[nombre_modulo]
+
+    spec = importlib.util.spec_from_file_location(nombre_modulo, ruta)
+    modulo = importlib.util.module_from_spec(spec)
+    sys.modules[nombre_modulo] = modulo
+    try:
+        spec.loader.exec_module(modulo)
+    except Exception:
+        del sys.modules[nombre_modulo]
+        raise
+    return modulo
+
+
+def funcion_principal(nombre):
+    """
+    Devuelve la función principal de un scraper ya cargado.
+    """
+    return getattr(cargar_scraper(nombre), SCRAPERS[nombre]["main"])
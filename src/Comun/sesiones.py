@@ -0,0 +1,349 @@
+import asyncio
+import importlib.util
+import os
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.cookies import RequestsCookieJar
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+from Comun import metricas
+
+# =========================================================
+# SESIONES HTTP REUTILIZABLES
+# =========================================================
+# Un requests.get suelto abre una conexión nueva (TCP + TLS)
+# en cada llamada. Estas sesiones mantienen un pool de
+# conexiones abiertas por host, dimensionado según la
+# cantidad de hilos del scraper.
+#
+# El pool por defecto de requests guarda 10 conexiones por
+# host: con más hilos, cada conexión que vuelve con el pool
+# lleno se cierra y el próximo request abre otra. Cada
+# SesionPool reporta cuántas conexiones abrió para cuántos
+# requests (sección "conexiones" de Comun/metricas.py).
+#
+# SesionHttp2 es la alternativa opcional con HTTP/2 (httpx):
+# muchos requests simultáneos comparten pocas conexiones
+# (streams multiplexados). Necesita `pip install "httpx[http2]"`;
+# si el servidor no negocia HTTP/2 se usa HTTP/1.1.
+#
+#   SCRAPER_HTTP2: "1" usa HTTP/2 solo en las páginas de
+#   detalle de Géant y Tienda Inglesa, y solo con el renovador
+#   de clearance activo (Comun/clearance.py); "0" por defecto
+
+SCRAPER_HTTP2 = os.getenv("SCRAPER_HTTP2", "0") == "1"
+
+_pools = []
+_pools_lock = threading.Lock()
+
+
+def _accept_encoding():
+    """
+    Devuelve el header Accept-Encoding a enviar.
+    Se agrega brotli solo si hay un decodificador instalado,
+    porque urllib3 no puede descomprimirlo sin él.
+    """
+    try:
+        import brotli  # noqa: F401
+        return "gzip, deflate, br"
+    except ImportError:
+        try:
+            import brotlicffi  # noqa: F401
+            return "gzip, deflate, br"
+        except ImportError:
+            return "gzip, deflate"
+
+
+class SesionPool:
+    """
+    Sesión HTTP segura entre hilos con un pool de conexiones compartido.
+
+    requests.Session no garantiza ser segura entre hilos,
+    así que cada hilo usa su propia Session. Todas montan el
+    MISMO HTTPAdapter, cuyo pool (urllib3) sí es seguro entre
+    hilos, por lo que las conexiones se reutilizan entre todos.
+    También comparten headers y cookies. Los headers no se
+    modifican en el lugar (requests los recorre mientras otro
+    hilo los cambiaría): se cambian con reemplazar_headers().
+
+    - fabrica: crea la Session de cada hilo (ej: una de
+               cloudscraper); por defecto requests.Session
+    - adapter: el adapter compartido, si el de requests no
+               sirve (ej: el CipherSuiteAdapter de cloudscraper).
+               Se arma con adapter_pool()
+    """
+
+    def __init__(self, max_workers, headers=None, timeout=20, nombre=None, fabrica=None, adapter=None):
+        self.nombre = nombre or "sesion"
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.headers = CaseInsensitiveDict({"Accept-Encoding": _accept_encoding()})
+        self.headers.update(headers or {})
+        self.cookies = RequestsCookieJar()
+        self.fabrica = fabrica or requests.Session
+        self.adapter = adapter or adapter_pool(max_workers)
+        self.inicio = time.time()
+
+        # Hooks "response" que se agregan a la sesión de cada hilo
+        # (ej: Comun.metricas.instrumentar_sesion)
+        self.hooks = []
+
+        self._local = threading.local()
+
+        with _pools_lock:
+            _pools.append(self)
+
+    def _sesion(self):
+        sesion = getattr(self._local, "sesion", None)
+        if sesion is None:
+            sesion = self.fabrica()
+            sesion.headers = self.headers
+            sesion.cookies = self.cookies
+            sesion.mount("https://", self.adapter)
+            sesion.mount("http://", self.adapter)
+            sesion.hooks["response"].extend(self.hooks)
+            self._local.sesion = sesion
+        elif sesion.headers is not self.headers:
+            # reemplazar_headers() cambió el diccionario compartido
+            sesion.headers = self.headers
+        return sesion
+
+    def reemplazar_headers(self, headers):
+        """
+        Arma un diccionario nuevo y lo cambia de una vez: los
+        hilos que estén usando el anterior lo terminan de leer
+        sin que cambie.
+        """
+        self.headers = CaseInsensitiveDict(headers)
+
+    def get(self, url, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        return self._sesion().get(url, **kwargs)
+
+    def post(self, url, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        return self._sesion().post(url, **kwargs)
+
+    def cerrar(self):
+        self.adapter.close()
+
+    # -----------------------------------------------------
+    # ESTADÍSTICAS DEL POOL
+    # -----------------------------------------------------
+    def resumen(self):
+        """
+        Conexiones abiertas contra requests enviados, sumando
+        los pools de todos los hosts.
+        """
+        pools = self.adapter.poolmanager.pools
+        nuevas = requests_enviados = 0
+        for clave in pools.keys():
+            pool = pools.get(clave)
+            if pool is not None:
+                nuevas += pool.num_connections
+                requests_enviados += pool.num_requests
+        segundos = max(time.time() - self.inicio, 1e-9)
+        return {
+            "pool_maxsize": self.max_workers,
+            "requests": requests_enviados,
+            "conexiones_nuevas": nuevas,
+            "reuso": round(1 - nuevas / requests_enviados, 4) if requests_enviados else None,
+            "conexiones_por_segundo": round(nuevas / segundos, 2)
+        }
+
+    def imprimir_resumen(self):
+        r = self.resumen()
+        if not r["requests"]:
+            return
+        print(
+            f"🔌 Conexiones {self.nombre}: {r['conexiones_nuevas']} nuevas para {r['requests']} requests "
+            f"(reuso {r['reuso']:.1%}, {r['conexiones_por_segundo']}/s, pool de {r['pool_maxsize']})"
+        )
+
+
+# =========================================================
+# HTTP/2 (OPCIONAL)
+# =========================================================
+def http2_disponible():
+    return all(importlib.util.find_spec(m) is not None for m in ("httpx", "h2"))
+
+
+class SesionHttp2:
+    """
+    Sesión HTTP/2 segura entre hilos sobre httpx, con la
+    misma interfaz que SesionPool: get(), post(), headers y
+    cookies compartidos, hooks "response" y resumen().
+
+    Devuelve requests.Response y lanza las excepciones de
+    requests, así el resto de Comun (métricas, reintentos,
+    concurrencia, grabación) no nota la diferencia.
+
+    Las conexiones las maneja un httpx.AsyncClient en un hilo
+    propio (event loop): el cliente HTTP/2 sincrónico de
+    httpcore no es seguro con muchos hilos (dos hilos pueden
+    mandar sus streams fuera de orden y el servidor corta la
+    conexión). Los hilos del scraper esperan su resultado.
+
+    - max_conexiones: conexiones por host (con HTTP/2 alcanza
+                      con pocas; cada una lleva muchos streams)
+    - ssl_context:    contexto TLS propio (ej: con los cifrados
+                      de cloudscraper)
+    - cookies:        frasco compartido con otra sesión (ej: la
+                      SesionPool del mismo sitio)
+    """
+
+    def __init__(self, max_conexiones, headers=None, timeout=20, nombre=None, ssl_context=None, verify=True,
+                 cookies=None):
+        import httpx
+
+        self._httpx = httpx
+        self._loop = asyncio.new_event_loop()
+        threading.Thread(target=self._loop.run_forever, name=f"http2-{nombre}", daemon=True).start()
+        self.nombre = nombre or "sesion"
+        self.max_workers = max_conexiones
+        self.timeout = timeout
+        self.headers = CaseInsensitiveDict({"Accept-Encoding": _accept_encoding()})
+        self.headers.update(headers or {})
+        # httpx usa este mismo frasco (no una copia)
+        self.cookies = cookies if cookies is not None else RequestsCookieJar()
+        self.hooks = []
+        self.cliente = httpx.AsyncClient(
+            http2=True,
+            verify=ssl_context or verify,
+            cookies=self.cookies,
+            timeout=timeout,
+            follow_redirects=True,
+            limits=httpx.Limits(max_connections=max_conexiones, max_keepalive_connections=max_conexiones)
+        )
+        self.inicio = time.time()
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.conexiones = 0
+        self.por_version = {}
+
+        with _pools_lock:
+            _pools.append(self)
+
+    def reemplazar_headers(self, headers):
+        """
+        Igual que SesionPool.reemplazar_headers().
+        """
+        self.headers = CaseInsensitiveDict(headers)
+
+    def get(self, url, **kwargs):
+        return self._pedir("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self._pedir("POST", url, **kwargs)
+
+    def _pedir(self, metodo, url, params=None, data=None, json=None, headers=None, timeout=None,
+               allow_redirects=True, **_):
+        httpx = self._httpx
+        enviados = dict(self.headers)
+        enviados.update(headers or {})
+        pedido = self.cliente.request(
+            metodo, url, params=params, data=data, json=json, headers=enviados,
+            timeout=timeout or self.timeout, follow_redirects=allow_redirects,
+            extensions={"trace": self._trazar}
+        )
+        try:
+            # El timeout lo aplica httpx
+            r = asyncio.run_coroutine_threadsafe(pedido, self._loop).result()
+        except httpx.ConnectTimeout as e:
+            raise requests.exceptions.ConnectTimeout(str(e)) from e
+        except httpx.TimeoutException as e:
+            raise requests.exceptions.ReadTimeout(str(e)) from e
+        except httpx.TooManyRedirects as e:
+            raise requests.exceptions.TooManyRedirects(str(e)) from e
+        except httpx.TransportError as e:
+            raise requests.exceptions.ConnectionError(str(e)) from e
+
+        with self._lock:
+            self.requests += 1
+            self.por_version[r.http_version] = self.por_version.get(r.http_version, 0) + 1
+
+        respuesta = _a_respuesta_requests(r, metodo, enviados)
+        for hook in self.hooks:
+            respuesta = hook(respuesta) or respuesta
+        return respuesta
+
+    async def _trazar(self, evento, info):
+        if evento == "connection.connect_tcp.complete":
+            with self._lock:
+                self.conexiones += 1
+
+    def cerrar(self):
+        asyncio.run_coroutine_threadsafe(self.cliente.aclose(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+
+    def resumen(self):
+        with self._lock:
+            segundos = max(time.time() - self.inicio, 1e-9)
+            return {
+                "pool_maxsize": self.max_workers,
+                "requests": self.requests,
+                "conexiones_nuevas": self.conexiones,
+                "reuso": round(1 - self.conexiones / self.requests, 4) if self.requests else None,
+                "conexiones_por_segundo": round(self.conexiones / segundos, 2),
+                "por_version": dict(self.por_version)
+            }
+
+    def imprimir_resumen(self):
+        r = self.resumen()
+        if not r["requests"]:
+            return
+        print(
+            f"🔌 Conexiones {self.nombre}: {r['conexiones_nuevas']} nuevas para {r['requests']} requests "
+            f"(reuso {r['reuso']:.1%}, {r['conexiones_por_segundo']}/s, hasta {r['pool_maxsize']}) | "
+            f"{r['por_version']}"
+        )
+
+
+def _a_respuesta_requests(r, metodo, headers):
+    """
+    httpx.Response → requests.Response (ya leída).
+    """
+    pedido = requests.PreparedRequest()
+    pedido.method = metodo
+    pedido.url = str(r.request.url)
+    pedido.headers = CaseInsensitiveDict(headers)
+
+    respuesta = requests.Response()
+    respuesta.status_code = r.status_code
+    respuesta.reason = r.reason_phrase
+    respuesta.headers = CaseInsensitiveDict(r.headers.multi_items())
+    respuesta._content = r.content
+    respuesta.encoding = get_encoding_from_headers(respuesta.headers)
+    respuesta.url = str(r.url)
+    respuesta.elapsed = r.elapsed
+    respuesta.request = pedido
+    return respuesta
+
+
+def adapter_pool(max_workers, clase=HTTPAdapter, **kwargs):
+    """
+    Adapter con `max_workers` conexiones por host.
+    pool_block: si están todas ocupadas se espera, en lugar de
+    abrir conexiones que se cierran al volver.
+    """
+    return clase(pool_connections=4, pool_maxsize=max_workers, pool_block=True, **kwargs)
+
+
+def crear_sesion(max_workers, headers=None, timeout=20, nombre=None):
+    """
+    Crea una SesionPool con un pool de `max_workers` conexiones por host.
+    """
+    return SesionPool(max_workers, headers=headers, timeout=timeout, nombre=nombre)
+
+
+def resumen():
+    with _pools_lock:
+        pools = list(_pools)
+    return {s.nombre: s.resumen() for s in pools}
+
+
+metricas.SECCIONES["conexiones"] = resumen
@@ -2,10 +2,24 @@ from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.action_chains import ActionChains
-from bs4 import BeautifulSoup
 import time
 import json
 import os
+import sys
+
+# SRC_DIR:
+# Carpeta src, para poder importar los módulos compartidos de Comun
+SRC_DIR = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+from Comun import descartes
+from Comun.checkpoint import Checkpoint
+from Comun.grabacion import obtener_page_source
+from Comun.historial_precios import guardar_historial
+from Comun.metricas import fase, iniciar_metricas
+from Comun.perfilado import iniciar_perfilado
+from Comun.parser_html import Selector, parsear
 
 # =========================================================
 # CONFIGURACIÓN GENERAL
@@ -41,6 +55,13 @@ os.makedirs(JSON_DIR, exist_ok=True)
 # Ruta completa del archivo final con todos los productos
 OUTPUT_JSON = os.path.join(JSON_DIR, "productos_disco.json")
 
+# Selectores CSS de las tarjetas (se compilan una sola vez)
+SELECTOR_ITEM = Selector("div.product-item")
+SELECTOR_LINK = Selector("h3 a")
+SELECTOR_PRECIO = Selector("span.val")
+SELECTOR_MARCA = Selector("div.prod-cats a")
+SELECTOR_IMAGEN = Selector("figure img")
+
 # =========================================================
 # SELENIUM SETUP
 # =========================================================
@@ -50,7 +71,16 @@ options.add_argument("--window-size=1920,1080")
 options.add_argument("--disable-gpu")
 options.add_argument("--no-sandbox")
 
-driver = webdriver.Chrome(options=options)
+# El navegador se abre recién cuando se necesita:
+# reproduciendo capturas grabadas no hace falta Chrome
+driver = None
+
+
+def obtener_driver():
+    global driver
+    if driver is None:
+        driver = webdriver.Chrome(options=options)
+    return driver
 
 # =========================================================
 # FUNCIÓN: SCROLL INFINITO
@@ -60,12 +90,12 @@ def scroll_hasta_el_final():
     same_count_times = 0
 
     while True:
-        items = driver.find_elements(By.CSS_SELECTOR, "div.product-item")
+        items = obtener_driver().find_elements(By.CSS_SELECTOR, "div.product-item")
         current_count = len(items)
 
         print(f"   ⏳ Productos cargados: {current_count}")
 
-        driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+        obtener_driver().execute_script("window.scrollTo(0, document.body.scrollHeight);")
         time.sleep(1.5)
 
         if current_count == last_count:
@@ -83,26 +113,38 @@ def scroll_hasta_el_final():
 # =========================================================
 def extraer_productos_categoria(nombre_categoria, url):
     print(f"🔍 {nombre_categoria.upper()} – cargando productos...")
-    driver.get(url)
-    time.sleep(3)
 
-    scroll_hasta_el_final()
+    def cargar_pagina():
+        navegador = obtener_driver()
+        navegador.get(url)
+        time.sleep(3)
+
+        scroll_hasta_el_final()
+        return navegador.page_source
+
+    # Con SCRAPER_HTTP_MODO=grabar/reproducir el HTML final
+    # (ya scrolleado) se guarda o se lee de disco
+    # La fase "carga" es el tiempo del navegador (carga + scroll);
+    # el resto de "listado" es el parseo
+    with fase("carga"):
+        html = obtener_page_source(url, cargar_pagina)
 
-    soup = BeautifulSoup(driver.page_source, "html.parser")
+    soup = parsear(html)
     productos = []
 
-    items = soup.select("div.product-item")
+    items = soup.select(SELECTOR_ITEM)
     print(f"📦 {nombre_categoria}: {len(items)} productos encontrados")
 
     for item in items:
         try:
-            link = item.select_one("h3 a")["href"]
-            nombre = item.select_one("h3 a").text.strip()
-            precio = item.select_one("span.val").text.strip()
-            marca_tag = item.select_one("div.prod-cats a")
-            marca = marca_tag.text.strip() if marca_tag else None
-            img_tag = item.select_one("figure img")
-            img = img_tag["src"] if img_tag else None
+            link_tag = item.select_one(SELECTOR_LINK)
+            link = link_tag.attr("href")
+            nombre = link_tag.texto(strip=False).strip()
+            precio = item.select_one(SELECTOR_PRECIO).texto(strip=False).strip()
+            marca_tag = item.select_one(SELECTOR_MARCA)
+            marca = marca_tag.texto(strip=False).strip() if marca_tag else None
+            img_tag = item.select_one(SELECTOR_IMAGEN)
+            img = img_tag.attr("src") if img_tag else None
 
             productos.append({
                 "idWeb": int(link.split("/")[-1]),
@@ -116,7 +158,9 @@ def extraer_productos_categoria(nombre_categoria, url):
                 "productImageUrl": img,
                 "categoryName": nombre_categoria.capitalize()
             })
-        except:
+        except Exception:
+            # Tarjeta sin link, precio o id legible
+            descartes.descartar(descartes.ERROR_PARSEO, url)
             continue
 
     return productos
@@ -126,22 +170,43 @@ def extraer_productos_categoria(nombre_categoria, url):
 # =========================================================
 def ejecutar_scraper_disco():
     inicio = time.time()
+    iniciar_metricas("disco")
+    iniciar_perfilado("disco")
     todos = []
 
+    # Checkpoint por categoría: con --resume no se vuelven a
+    # cargar en el navegador las categorías ya terminadas
+    checkpoint = Checkpoint("disco")
+
     for cat, url in CATEGORIAS.items():
-        productos = extraer_productos_categoria(cat, url)
+        productos = checkpoint.leer_estado(f"categoria:{cat}")
+        if productos is not None:
+            print(f"♻️ {cat}: {len(productos)} productos del checkpoint")
+            todos.extend(productos)
+            continue
+
+        with fase("listado") as f_listado:
+            productos = extraer_productos_categoria(cat, url)
+            f_listado.sumar(len(productos))
         todos.extend(productos)
 
+        checkpoint.guardar_estado(f"categoria:{cat}", productos)
+        checkpoint.volcar()
+
     with open(OUTPUT_JSON, "w", encoding="utf-8") as f:
         json.dump(todos, f, ensure_ascii=False, indent=4)
+    guardar_historial(todos)
+    checkpoint.terminar()
 
-    driver.quit()
+    if driver is not None:
+        driver.quit()
 
     duracion = (time.time() - inicio) / 60
     print("\n✅ DISCO FINALIZADO")
     print(f"⏱️ Tiempo total: {duracion:.2f} minutos")
     print(f"📄 Archivo: {OUTPUT_JSON}")
     print(f"📊 Total productos: {len(todos)}")
+    descartes.imprimir_resumen()
 
 # =========================================================
 # ENTRY POINT
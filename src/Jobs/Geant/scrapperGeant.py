@@ -1,9 +1,28 @@
-import cloudscraper
-from bs4 import BeautifulSoup
 import json
 import time
 import os
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait
+from threading import Thread
+
+# SRC_DIR:
+# Carpeta src, para poder importar los módulos compartidos de Comun
+SRC_DIR = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+from Comun import descartes, reintentos
+from Comun.checkpoint import CURSOR_TERMINADO, Checkpoint
+from Comun.clearance import Clearance
+from Comun.concurrencia import SesionLimitada, limitar_sesion
+from Comun.frontera import FronteraUrls
+from Comun.grabacion import envolver_sesion
+from Comun.historial_precios import guardar_historial
+from Comun.metricas import fase, iniciar_metricas, instrumentar_sesion
+from Comun.perfilado import iniciar_perfilado
+from Comun.parser_html import extraer_json_ld
+from Comun.planificador import PEDIR, REUTILIZAR, Planificador
+from Comun.reintentos import con_reintentos
 
 # =========================================================
 # CONFIGURACIÓN GENERAL DEL SCRAPER GÉANT
@@ -16,9 +35,33 @@ GEANT_RUT = 213458920015
 # URL base del sitio web de Géant
 BASE_URL = "https://www.geant.com.uy"
 
-# Cantidad máxima de hilos para descargar detalles de productos
-# Más hilos = más velocidad, pero más carga al sitio
-MAX_WORKERS = 15
+# Requests simultáneos al sitio (Comun/concurrencia.py):
+# arrancan en CONCURRENCIA_INICIAL y el controlador los sube
+# o baja según la latencia y los bloqueos, hasta MAX_WORKERS
+# (la cantidad de hilos que descargan detalles)
+CONCURRENCIA_INICIAL = 4
+MAX_WORKERS = 30
+
+# Máximo de páginas de detalle por corrida (0 = sin límite)
+# Ver Comun/planificador.py: se piden primero los productos
+# más atrasados y el resto sale con los datos de su última visita
+PRESUPUESTO_DETALLE = int(os.getenv("GEANT_PRESUPUESTO_DETALLE", "0"))
+
+# Cantidad de hilos que recorren shards de categorías
+MAX_WORKERS_DESCUBRIMIENTO = 6
+
+# VTEX no devuelve resultados más allá de este offset (_from)
+# para una misma búsqueda. Las categorías más grandes se
+# parten en shards (subcategorías o rangos de precio) que
+# entren debajo de este límite.
+LIMITE_OFFSET_VTEX = 2500
+
+# Rango de precios inicial para partir por precio. Lo que
+# cuesta más va en un shard aparte, abierto: P:[PRECIO_MAXIMO TO *]
+PRECIO_MAXIMO = 100000
+
+# Debajo de este ancho de rango de precio ya no se parte más
+ANCHO_MINIMO_PRECIO = 1
 
 # Categorías del sitio que se van a recorrer
 # Cada categoría se consulta vía API interna de Géant
@@ -35,8 +78,24 @@ CATEGORIAS = [
 ]
 
 # cloudscraper:
-# Se usa en lugar de requests para evitar bloqueos tipo Cloudflare
-scraper = cloudscraper.create_scraper()
+# Se usa en lugar de requests para evitar bloqueos tipo Cloudflare.
+# El clearance se guarda entre corridas y lo renueva un solo
+# hilo (Comun/clearance.py)
+clearance = Clearance("geant", MAX_WORKERS)
+# Todos los requests (descubrimiento y detalle) comparten el
+# controlador de concurrencia y la política de reintentos
+scraper, concurrencia = limitar_sesion(
+    envolver_sesion(instrumentar_sesion(clearance.sesion)),
+    "geant", CONCURRENCIA_INICIAL, MAX_WORKERS
+)
+scraper = con_reintentos(scraper)
+# Las páginas de detalle van por HTTP/2 si SCRAPER_HTTP2=1
+# (clearance.sesion_detalle); si no, es la misma sesión
+scraper_detalle = scraper
+if clearance.sesion_detalle is not clearance.sesion:
+    scraper_detalle = con_reintentos(SesionLimitada(
+        envolver_sesion(instrumentar_sesion(clearance.sesion_detalle)), concurrencia
+    ))
 
 # =========================================================
 # CONFIGURACIÓN DE RUTAS Y ARCHIVOS
@@ -57,6 +116,10 @@ JSON_DIR = os.path.join(JOBS_DIR, "JsonProducts")
 # Crea la carpeta si no existe
 os.makedirs(JSON_DIR, exist_ok=True)
 
+# Shards que llegaron a LIMITE_OFFSET_VTEX sin terminar
+# (no se pudieron partir más): les faltan productos
+shards_truncados = []
+
 # OUTPUT_JSON:
 # Ruta completa del archivo final con todos los productos
 OUTPUT_JSON = os.path.join(JSON_DIR, "productos_geant.json")
@@ -70,7 +133,7 @@ def extraer_detalle_producto(url_relativa, nombre_categoria):
     y extrae la información desde el JSON de Schema.org.
 
     Devuelve un diccionario con los datos del producto
-    o None si ocurre algún error.
+    o None si se descarta (el motivo queda en Comun/descartes).
     """
 
     # Construye la URL completa del producto
@@ -78,18 +141,17 @@ def extraer_detalle_producto(url_relativa, nombre_categoria):
 
     try:
         # Descarga el HTML de la página del producto
-        res = scraper.get(url_completa, timeout=15)
-
-        # Parsea el HTML
-        soup = BeautifulSoup(res.text, "html.parser")
+        res = descartes.verificar_respuesta(scraper_detalle.get(url_completa, timeout=15))
 
-        # Busca el script JSON-LD donde está la info estructurada
-        script_tag = soup.find("script", {"type": "application/ld+json"})
-        if not script_tag:
+        # Parsea el HTML y busca el script JSON-LD
+        # donde está la info estructurada
+        json_ld = extraer_json_ld(res.text)
+        if not json_ld:
+            descartes.descartar(descartes.SIN_JSON_LD, url_completa)
             return None
 
         # Carga el JSON embebido en la página
-        data = json.loads(script_tag.string)
+        data = json.loads(json_ld)
 
         # A veces el JSON viene como lista
         # Buscamos el objeto cuyo @type sea "Product"
@@ -113,6 +175,7 @@ def extraer_detalle_producto(url_relativa, nombre_categoria):
 
         # Si no hay precio, se descarta el producto
         if not precio_final:
+            descartes.descartar(descartes.SIN_PRECIO, url_completa)
             return None
 
         # Devuelve el producto en formato estándar
@@ -131,19 +194,46 @@ def extraer_detalle_producto(url_relativa, nombre_categoria):
             "categoryName": nombre_categoria.capitalize()
         }
 
-    except:
-        # Cualquier error (timeout, parsing, JSON inválido, etc)
+    except Exception as e:
+        # Timeout, Cloudflare, JSON inválido, etc
+        descartes.descartar_excepcion(e, url_completa)
         return None
 
 
+# =========================================================
+# FUNCIÓN: filas_por_categoria
+# =========================================================
+def filas_por_categoria(producto, categorias):
+    """
+    Una fila por cada categoría en que aparece el producto
+    (como cuando cada categoría pedía su propio detalle): el
+    detalle se descarga una sola vez y se copia cambiando
+    categoryName.
+    """
+    if not categorias:
+        return [producto]
+    return [dict(producto, categoryName=categoria.capitalize()) for categoria in categorias]
+
+
 # =========================================================
 # FUNCIÓN: obtener_todas_las_urls
 # =========================================================
-def obtener_todas_las_urls(categoria):
+def obtener_todas_las_urls(categoria, frontera=None, path=None, fq=None, checkpoint=None):
     """
     Consulta la API interna de Géant para una categoría
     y obtiene las URLs de todos los productos.
 
+    Con `path` (por ejemplo "Almacen/desayuno") y `fq`
+    (por ejemplo ["P:[0 TO 150]"]) se recorre solo un shard
+    de la categoría.
+
+    Si se pasa una frontera, cada página encontrada se
+    agrega en el momento, así la fase de detalle puede
+    empezar sin esperar a que termine la categoría.
+
+    Con un checkpoint se guardan las URLs y el offset de
+    cada página, y al reanudar se sigue desde ese offset.
+
     Devuelve una lista de tuplas:
     (url_producto, categoria)
     """
@@ -154,80 +244,383 @@ def obtener_todas_las_urls(categoria):
     _from = 0
     _to = 49
 
+    clave_cursor = f"cursor:{path or categoria}|{'&'.join(fq or [])}"
+    if checkpoint is not None:
+        cursor = checkpoint.leer_estado(clave_cursor, 0)
+        if cursor == CURSOR_TERMINADO:
+            return urls_encontradas
+        _from, _to = cursor, cursor + 49
+
+    # Pasa a True cuando el shard se recorrió entero
+    completo = False
+
     while True:
+        # VTEX no pagina más allá de este offset: el shard queda
+        # incompleto (no se marca terminado)
+        if _from >= LIMITE_OFFSET_VTEX:
+            print(f"⚠️ {path or categoria} {fq or ''} llegó al límite de paginación, quedan productos sin ver")
+            shards_truncados.append({"categoria": categoria, "path": path or categoria, "fq": fq})
+            break
+
         # Endpoint interno de búsqueda de productos
-        api_url = f"{BASE_URL}/api/catalog_system/pub/products/search/{categoria}"
-        params = {"_from": _from, "_to": _to}
+        api_url, params = armar_busqueda(path or categoria, fq)
+        params.update({"_from": _from, "_to": _to})
 
         try:
-            res = scraper.get(api_url, params=params, timeout=10)
+            res = descartes.verificar_respuesta(scraper.get(api_url, params=params, timeout=10))
             items = res.json()
 
             # Si no hay productos, se termina
             if not items:
+                completo = True
                 break
 
             # Extrae las URLs relativas de cada producto
-            for item in items:
-                if item.get("linkText"):
-                    urls_encontradas.append((f"/{item['linkText']}/p", categoria))
+            urls_pagina = [
+                f"/{item['linkText']}/p"
+                for item in items if item.get("linkText")
+            ]
+            urls_encontradas.extend((url, categoria) for url in urls_pagina)
+
+            # Las entrega a la frontera apenas se descubren
+            if frontera is not None:
+                frontera.agregar_varias(urls_pagina, categoria)
+            if checkpoint is not None:
+                for url in urls_pagina:
+                    checkpoint.agregar_frontera(url, categoria)
 
             # Si vinieron menos de 50, no hay más páginas
             if len(items) < 50:
+                completo = True
                 break
 
             # Avanza la paginación
             _from += 50
             _to += 50
+            if checkpoint is not None:
+                checkpoint.guardar_estado(clave_cursor, _from)
 
-        except:
-            # Error de red o API
+        except Exception as e:
+            # Error de red o API que sobrevivió a los reintentos:
+            # se corta el shard
+            descartes.descartar_excepcion(e, f"{api_url}?_from={_from}", tipo="pagina")
             break
 
+    # Un shard cortado por error queda con su último offset
+    # para volver a intentarlo al reanudar
+    if checkpoint is not None and completo:
+        checkpoint.guardar_estado(clave_cursor, CURSOR_TERMINADO)
+
     return urls_encontradas
 
 
 # =========================================================
-# FUNCIÓN PRINCIPAL DEL SCRAPER
+# SHARDING DE CATEGORÍAS GRANDES
 # =========================================================
-def ejecutar_scrapper_geant():
-    print(f"--- INICIANDO SCRAPER GÉANT ---")
-    start_time = time.time()
+def armar_busqueda(path, fq=None):
+    """
+    Devuelve (url, params) de la búsqueda del catálogo
+    para un path de categorías y filtros fq opcionales.
+    """
+    api_url = f"{BASE_URL}/api/catalog_system/pub/products/search/{path}"
+    params = {}
 
-    todas_las_urls = []
+    # Con más de un nivel hay que indicar que todo el path son categorías
+    niveles = path.count("/") + 1
+    if niveles > 1:
+        params["map"] = ",".join(["c"] * niveles)
 
-    # -----------------------------------------------------
-    # FASE 1: OBTENCIÓN DE URLs DE PRODUCTOS
-    # -----------------------------------------------------
-    print(f"🔍 Escaneando categorías: {CATEGORIAS}...")
+    if fq:
+        params["fq"] = list(fq)
 
-    # Se usan 3 hilos para recorrer categorías en paralelo
-    with ThreadPoolExecutor(max_workers=3) as executor:
-        resultados = executor.map(obtener_todas_las_urls, CATEGORIAS)
+    return api_url, params
 
-        for lista in resultados:
-            todas_las_urls.extend(lista)
 
-    total_encontrados = len(todas_las_urls)
-    print(f"📦 Total de productos encontrados: {total_encontrados}")
+def contar_resultados(path, fq=None):
+    """
+    Devuelve la cantidad total de productos de una búsqueda,
+    leyendo el header "resources" (ej: "0-0/3412") de VTEX.
+    """
+    api_url, params = armar_busqueda(path, fq)
+    params.update({"_from": 0, "_to": 0})
 
-    # -----------------------------------------------------
-    # FASE 2: EXTRACCIÓN DE DETALLES DE PRODUCTOS
-    # -----------------------------------------------------
-    total_resultados = []
-    print(f"🚀 Extrayendo detalles con {MAX_WORKERS} hilos...")
+    # Un desafío o un 5xx no trae el header: mejor fallar que
+    # suponer que la búsqueda entra sin partir
+    res = descartes.verificar_respuesta(scraper.get(api_url, params=params, timeout=10))
+    recursos = res.headers.get("resources", "")
+
+    if "/" not in recursos:
+        return None
+    return int(recursos.rsplit("/", 1)[1])
+
+
+def obtener_subcategorias(path):
+    """
+    Devuelve los paths de las subcategorías directas de `path`,
+    usando el árbol de categorías de las facetas de VTEX.
+    """
+    niveles = path.count("/") + 1
+    res = scraper.get(
+        f"{BASE_URL}/api/catalog_system/pub/facets/search/{path}",
+        params={"map": ",".join(["c"] * niveles)},
+        timeout=10
+    )
+    arbol = res.json().get("CategoriesTrees", [])
+
+    # Baja por el árbol hasta el nodo de `path`
+    nodos = arbol
+    for _ in range(niveles - 1):
+        nodos = [hijo for nodo in nodos for hijo in nodo.get("Children", [])]
+
+    hijos = [hijo for nodo in nodos for hijo in nodo.get("Children", [])]
+
+    return [
+        hijo["Link"].strip("/")
+        for hijo in hijos if hijo.get("Link")
+    ]
+
+
+def partir_en_shards(categoria, path, total, rango=None):
+    """
+    Parte una búsqueda en shards que entren debajo de
+    LIMITE_OFFSET_VTEX, recursivamente:
+    1. por subcategorías, mientras haya
+    2. por rangos de precio, partiendo el rango a la mitad
+       (más un shard abierto para lo que pasa de PRECIO_MAXIMO)
+
+    Devuelve una lista de shards {"categoria", "path", "fq", "total"}.
+    """
+    fq = [f"P:[{rango[0]} TO {rango[1]}]"] if rango else None
+
+    if total is None or total <= LIMITE_OFFSET_VTEX:
+        return [{"categoria": categoria, "path": path, "fq": fq, "total": total}]
 
-    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
-        futures = [
-            executor.submit(extraer_detalle_producto, url, cat)
-            for url, cat in todas_las_urls
+    # 1. Subcategorías (solo mientras no se filtró por precio)
+    if rango is None:
+        try:
+            subcategorias = obtener_subcategorias(path)
+        except Exception:
+            subcategorias = []
+
+        if subcategorias:
+            shards = []
+            for sub in subcategorias:
+                # Una subcategoría que no se pudo contar se recorre
+                # entera, sin arrastrar a las demás
+                try:
+                    total_sub = contar_resultados(sub)
+                except Exception as e:
+                    print(f"⚠️ No se pudo contar {sub}: {e}")
+                    total_sub = None
+                shards.extend(partir_en_shards(categoria, sub, total_sub))
+            return shards
+
+        fq_abierto = [f"P:[{PRECIO_MAXIMO} TO *]"]
+        try:
+            total_abierto = contar_resultados(path, fq_abierto)
+        except Exception as e:
+            print(f"⚠️ No se pudo contar {path} {fq_abierto}: {e}")
+            total_abierto = None
+        # Los precios > PRECIO_MAXIMO no se parten más
+        abierto = [] if total_abierto == 0 else [
+            {"categoria": categoria, "path": path, "fq": fq_abierto, "total": total_abierto}
         ]
+        return abierto + partir_en_shards(categoria, path, total, (0, PRECIO_MAXIMO))
+
+    # 2. Rango de precio partido a la mitad
+    desde, hasta = rango
+    if hasta - desde <= ANCHO_MINIMO_PRECIO:
+        print(f"⚠️ {path} {fq} no se puede partir más ({total} productos)")
+        return [{"categoria": categoria, "path": path, "fq": fq, "total": total}]
+
+    medio = round((desde + hasta) / 2, 2)
+    shards = []
+    for sub_rango in ((desde, medio), (round(medio + 0.01, 2), hasta)):
+        sub_fq = [f"P:[{sub_rango[0]} TO {sub_rango[1]}]"]
+        try:
+            total_sub = contar_resultados(path, sub_fq)
+        except Exception as e:
+            print(f"⚠️ No se pudo contar {path} {sub_fq}: {e}")
+            total_sub = None
+        shards.extend(partir_en_shards(categoria, path, total_sub, sub_rango))
+    return shards
+
+
+def planificar_categoria(categoria):
+    """
+    Devuelve (total_anunciado, shards) de una categoría.
+    Si falla la consulta, la categoría se recorre entera.
+    """
+    try:
+        total = contar_resultados(categoria)
+        return total, partir_en_shards(categoria, categoria, total)
+    except Exception as e:
+        print(f"⚠️ No se pudo planificar {categoria}: {e}")
+        return None, [{"categoria": categoria, "path": categoria, "fq": None, "total": None}]
+
+
+def descubrir_urls(frontera, totales_anunciados, checkpoint=None):
+    """
+    Planifica las categorías y recorre todos sus shards en
+    paralelo alimentando la frontera. Al terminar la cierra.
+    Guarda en `totales_anunciados` el total que informa el
+    sitio para cada categoría.
+    """
+    try:
+        with fase("descubrimiento") as f_descubrimiento, \
+                ThreadPoolExecutor(max_workers=3) as executor_planes, \
+                ThreadPoolExecutor(max_workers=MAX_WORKERS_DESCUBRIMIENTO) as executor_shards:
+
+            planes = {
+                executor_planes.submit(planificar_categoria, cat): cat
+                for cat in CATEGORIAS
+            }
+
+            futures_shards = []
+            for future in as_completed(planes):
+                total, shards = future.result()
+                totales_anunciados[planes[future]] = total
+
+                if len(shards) > 1:
+                    print(f"🧩 {planes[future]}: {total} productos en {len(shards)} shards")
+
+                futures_shards.extend(
+                    executor_shards.submit(
+                        obtener_todas_las_urls,
+                        shard["categoria"], frontera, shard["path"], shard["fq"], checkpoint
+                    )
+                    for shard in shards
+                )
+
+            wait(futures_shards)
+            f_descubrimiento.sumar(len(frontera))
+
+        if checkpoint is not None:
+            checkpoint.guardar_estado("totales", totales_anunciados)
+            # Con shards truncados el descubrimiento se repite al
+            # reanudar (los terminados no se vuelven a pedir)
+            if not shards_truncados:
+                checkpoint.guardar_estado("descubrimiento", CURSOR_TERMINADO)
+    finally:
+        frontera.cerrar()
+
+
+def imprimir_cobertura(frontera, totales_anunciados):
+    """
+    Muestra, por categoría, los productos únicos encontrados
+    contra el total que anuncia el sitio.
+    """
+    encontrados = frontera.conteo_por_categoria()
+
+    print("\n📊 COBERTURA POR CATEGORÍA")
+    for categoria in CATEGORIAS:
+        total = totales_anunciados.get(categoria)
+        cantidad = encontrados.get(categoria, 0)
+        if total:
+            print(f" - {categoria}: {cantidad}/{total} ({100 * cantidad / total:.1f}%)")
+        else:
+            print(f" - {categoria}: {cantidad}/? (total no disponible)")
+
+    for shard in shards_truncados:
+        print(f" ⚠️ TRUNCADO {shard['path']} {shard['fq'] or ''}: llegó a {LIMITE_OFFSET_VTEX} productos sin terminar")
+
+
+# =========================================================
+# FUNCIÓN PRINCIPAL DEL SCRAPER
+# =========================================================
+def ejecutar_scrapper_geant():
+    print(f"--- INICIANDO SCRAPER GÉANT ---")
+    start_time = time.time()
+    iniciar_metricas("geant")
+    iniciar_perfilado("geant")
+    clearance.iniciar(BASE_URL)
+
+    # La frontera deduplica las URLs entre categorías:
+    # un producto que aparece en "Almacen" y en "Bebes"
+    # se descarga una sola vez
+    frontera = FronteraUrls()
+
+    # (url, producto): al final cada producto sale una vez por
+    # cada categoría en que apareció (filas_por_categoria)
+    resultados = []
+
+    # Total de productos que anuncia el sitio por categoría
+    totales_anunciados = {}
+
+    # Checkpoint periódico: con --resume se recupera la frontera
+    # y los detalles ya descargados de una corrida cortada
+    checkpoint = Checkpoint("geant")
+    completados = checkpoint.resultados()
+    resultados.extend(completados.items())
+    for url, categoria, _ in checkpoint.frontera():
+        frontera.agregar(url, categoria)
+    if completados:
+        print(f"♻️ {len(completados)} productos ya descargados en el checkpoint")
+
+    # Solo se piden los detalles vencidos según la historia de
+    # cambios de cada producto (Comun/planificador.py)
+    planificador = Planificador("geant", GEANT_RUT, presupuesto=PRESUPUESTO_DETALLE or None)
+    for url, res in completados.items():
+        planificador.registrar(url, res)
+
+    # -----------------------------------------------------
+    # FASE 1 y 2 EN PARALELO:
+    # - las categorías se parten en shards que se recorren
+    #   en paralelo y alimentan la frontera
+    # - hasta MAX_WORKERS hilos descargan detalles a medida
+    #   que aparecen URLs nuevas (los requests en vuelo los
+    #   limita el controlador de concurrencia)
+    # -----------------------------------------------------
+    print(f"🔍 Escaneando categorías: {CATEGORIAS}...")
+    print(f"🚀 Extrayendo detalles con hasta {MAX_WORKERS} hilos (concurrencia inicial {CONCURRENCIA_INICIAL})...")
+
+    if checkpoint.leer_estado("descubrimiento") == CURSOR_TERMINADO:
+        # El descubrimiento ya había terminado: no se repite
+        totales_anunciados.update(checkpoint.leer_estado("totales", {}))
+        frontera.cerrar()
+    else:
+        Thread(target=descubrir_urls, args=(frontera, totales_anunciados, checkpoint), daemon=True).start()
+
+    with fase("detalle") as f_detalle, ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+
+        # Se envía cada URL nueva apenas entra a la frontera,
+        # con la primera categoría en que apareció (las demás se
+        # agregan al guardar, cuando el descubrimiento terminó).
+        # Las que ya tienen resultado en el checkpoint no se piden,
+        # y las que no están vencidas se reutilizan.
+        futures = {}
+        for url, cats in frontera:
+            if url in completados:
+                continue
+            decision = planificador.decidir(url)
+            if decision == PEDIR:
+                futures[executor.submit(extraer_detalle_producto, url, cats[0])] = url
+            elif decision == REUTILIZAR:
+                resultados.append((url, planificador.ultimo(url)))
+
+        total_encontrados = len(futures)
+        resumen = frontera.resumen()
+        print(f"📦 Total de productos encontrados: {total_encontrados}")
+        print(
+            f"♻️ URLs repetidas entre categorías: {resumen['ahorradas']} "
+            f"requests ahorrados ({resumen['multi_categoria']} productos "
+            f"en más de una categoría)"
+        )
+        imprimir_cobertura(frontera, totales_anunciados)
 
         # Procesa resultados a medida que terminan
         for i, f in enumerate(as_completed(futures), 1):
             res = f.result()
             if res:
-                total_resultados.append(res)
+                resultados.append((futures[f], res))
+                f_detalle.sumar()
+                checkpoint.guardar_resultado(futures[f], res)
+                planificador.registrar(futures[f], res)
+            else:
+                # Si el pedido falla, sale la última visita (si la hay)
+                anterior = planificador.ultimo(futures[f])
+                if anterior:
+                    resultados.append((futures[f], anterior))
 
             # Log de progreso cada 100 productos
             if i % 100 == 0 or i == total_encontrados:
@@ -236,14 +629,29 @@ def ejecutar_scrapper_geant():
     # -----------------------------------------------------
     # GUARDADO DEL ARCHIVO FINAL
     # -----------------------------------------------------
+    total_resultados = [
+        fila for url, producto in resultados
+        for fila in filas_por_categoria(producto, frontera.categorias(url))
+    ]
     with open(OUTPUT_JSON, "w", encoding="utf-8") as f:
         json.dump(total_resultados, f, ensure_ascii=False, indent=4)
+    guardar_historial(total_resultados)
+    planificador.guardar()
+    checkpoint.terminar()
+    clearance.detener()
 
     duracion = (time.time() - start_time) / 60
 
     print(f"\n✅ GÉANT FINALIZADO EN {duracion:.2f} MINUTOS")
     print(f"📄 Archivo generado: {OUTPUT_JSON}")
-    print(f"📊 Total guardados: {len(total_resultados)} productos.")
+    print(f"📊 Total guardados: {len(total_resultados)} filas ({len(resultados)} productos distintos).")
+    planificador.imprimir_resumen(len(resultados))
+    concurrencia.imprimir_resumen()
+    clearance.sesion.imprimir_resumen()
+    if clearance.sesion_detalle is not clearance.sesion:
+        clearance.sesion_detalle.imprimir_resumen()
+    reintentos.imprimir_resumen()
+    descartes.imprimir_resumen()
 
 
 # =========================================================
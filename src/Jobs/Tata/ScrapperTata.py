@@ -1,9 +1,27 @@
-import requests
 import json
+import math
 import time
 import os
+import sys
+import unicodedata
 from concurrent.futures import ThreadPoolExecutor
 
+# SRC_DIR:
+# Carpeta src, para poder importar los módulos compartidos de Comun
+SRC_DIR = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+from Comun import descartes, reintentos
+from Comun.cache import guardar_cache, leer_cache
+from Comun.concurrencia import limitar_sesion
+from Comun.grabacion import envolver_sesion
+from Comun.historial_precios import guardar_historial
+from Comun.metricas import fase, iniciar_metricas, instrumentar_sesion
+from Comun.perfilado import iniciar_perfilado
+from Comun.reintentos import con_reintentos
+from Comun.sesiones import crear_sesion
+
 # =========================================================
 # CONFIGURACIÓN GENERAL DEL SCRAPER TATA
 # =========================================================
@@ -11,6 +29,66 @@ from concurrent.futures import ThreadPoolExecutor
 TATA_RUT = "210003270017"
 MAX_WORKERS = 10
 
+# Endpoint GraphQL de la tienda
+GRAPHQL_URL = "https://www.tata.com.uy/api/graphql"
+
+# Endpoint de facetas de búsqueda (se usa para descubrir el árbol de categorías)
+FACETS_URL = "https://www.tata.com.uy/api/io/_v/api/intelligent-search/facets"
+
+# Productos por página de ProductsQuery
+PAGE_SIZE = 50
+
+# Límite GLOBAL de requests simultáneos a la API, sumando
+# todas las categorías que corren en paralelo
+# (Comun/concurrencia.py): arranca en CONCURRENCIA_INICIAL y
+# el controlador lo sube o baja según la latencia y los
+# bloqueos, hasta MAX_REQUESTS_SIMULTANEOS
+CONCURRENCIA_INICIAL = 4
+MAX_REQUESTS_SIMULTANEOS = 20
+
+# Qué se le pide a la API en cada página:
+# - "completa":   solo operationName, el servidor usa su query
+#                 persistida completa (comportamiento original)
+# - "minima":     se envía QUERY_MINIMA con solo los campos que
+#                 lee nodo_a_producto (páginas más chicas)
+# - "persistida": se envía el hash de una query persistida
+#                 registrada con la selección mínima
+TATA_QUERY_MODO = os.getenv("TATA_QUERY_MODO", "completa")
+TATA_QUERY_HASH = os.getenv("TATA_QUERY_HASH", "")
+
+# Selección mínima de campos de ProductsQuery
+QUERY_MINIMA = """
+query ProductsQuery($first: Int!, $after: String, $sort: StoreSort!, $term: String!, $selectedFacets: [IStoreSelectedFacet!]!) {
+  search(first: $first, after: $after, sort: $sort, term: $term, selectedFacets: $selectedFacets) {
+    products {
+      pageInfo { totalCount }
+      edges {
+        node {
+          slug
+          name
+          gtin
+          brand { name }
+          image { url }
+          offers { priceCurrency offers { price } }
+        }
+      }
+    }
+  }
+}
+"""
+
+# Máximo de productos que la plataforma deja recorrer
+# paginando una misma búsqueda (después de este offset
+# las páginas vienen vacías)
+LIMITE_PAGINACION = 2500
+
+# Horas que se reutiliza el árbol de categorías descubierto
+TATA_CACHE_TTL_HORAS = float(os.getenv("TATA_CACHE_TTL_HORAS", "24"))
+
+# Departamentos que se scrapean.
+# Las subcategorías ya no hace falta mantenerlas: se descubren
+# desde las facetas al arrancar. Las listas de abajo solo se
+# usan como respaldo si el descubrimiento falla.
 CATEGORIAS = {
     "Almacen": [
         "Desayuno",
@@ -51,107 +129,355 @@ os.makedirs(JSON_DIR, exist_ok=True)
 # Archivo final con todos los productos
 OUTPUT_JSON = os.path.join(JSON_DIR, "productos_tata.json")
 
+# Caché del árbol de categorías (fuera de JsonProducts,
+# porque PostProducts importa todos los .json de esa carpeta)
+CACHE_CATEGORIAS = os.path.join(BASE_DIR, "cache_categorias_tata.json")
+
 
 
 # =========================================================
-# FUNCIÓN: extraer_categoria
+# ESTADO GLOBAL (COMPARTIDO ENTRE HILOS)
 # =========================================================
-def extraer_categoria(categoria_padre, subcategoria_slug=None):
 
-    productos_categoria = []
-    page_size = 50
-    after = 0
+# Sesión con pool de conexiones reutilizadas hacia www.tata.com.uy
+# (evita un handshake TCP+TLS nuevo por cada página).
+# El controlador de concurrencia limita los requests en vuelo
+# entre todos los hilos; los errores transitorios se
+# reintentan (Comun/reintentos.py)
+sesion, concurrencia = limitar_sesion(
+    envolver_sesion(instrumentar_sesion(crear_sesion(
+        max(MAX_WORKERS, MAX_REQUESTS_SIMULTANEOS),
+        headers={"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64)"},
+        timeout=20,
+        nombre="tata"
+    ))),
+    "tata", CONCURRENCIA_INICIAL, MAX_REQUESTS_SIMULTANEOS
+)
+sesion = con_reintentos(sesion)
+
+# Pool donde se descargan las páginas 2..N de cada categoría.
+# Es distinto del pool de categorías para que un hilo de
+# categoría pueda esperar sus páginas sin bloquear el pool.
+executor_paginas = ThreadPoolExecutor(max_workers=MAX_REQUESTS_SIMULTANEOS)
 
-    nombre_log = (
-        f"{categoria_padre} → {subcategoria_slug}"
-        if subcategoria_slug else categoria_padre
-    )
 
-    print(f"🚀 [Hilo Iniciado] Extrayendo: {nombre_log}")
+# =========================================================
+# FUNCIÓN: armar_variables
+# =========================================================
+def armar_variables(categoria_padre, subcategoria_slug, after, facetas=None):
+    """
+    Arma las variables de ProductsQuery para una página.
+
+    `facetas` es una lista de pares (key, value), por ejemplo
+    [("category-1", "almacen"), ("category-2", "desayuno")].
+    Si se pasa, reemplaza al filtro por categoría/subcategoría.
+    """
+    selected_facets = [
+        {"key": "channel", "value": "{\"salesChannel\":\"4\",\"regionId\":\"U1cjdGF0YXV5bW9udGV2aWRlbw==\"}"},
+        {"key": "locale", "value": "es-UY"}
+    ]
+
+    if facetas:
+        selected_facets[0:0] = [{"key": k, "value": v} for k, v in facetas]
+    elif subcategoria_slug:
+        selected_facets.insert(0, {"key": "category-2", "value": subcategoria_slug})
+    else:
+        selected_facets.insert(0, {"key": "category-1", "value": categoria_padre})
+
+    return {
+        "first": PAGE_SIZE,
+        "after": str(after),
+        "sort": "score_desc",
+        "term": "",
+        "selectedFacets": selected_facets
+    }
 
-    while True:
-        url = "https://www.tata.com.uy/api/graphql"
 
-        selected_facets = [
-            {"key": "channel", "value": "{\"salesChannel\":\"4\",\"regionId\":\"U1cjdGF0YXV5bW9udGV2aWRlbw==\"}"},
-            {"key": "locale", "value": "es-UY"}
-        ]
+# =========================================================
+# FUNCIÓN: armar_parametros
+# =========================================================
+def armar_parametros(variables):
+    """
+    Arma los parámetros GET de ProductsQuery según TATA_QUERY_MODO.
+    """
+    params = {
+        "operationName": "ProductsQuery",
+        "variables": json.dumps(variables, separators=(",", ":"))
+    }
+
+    if TATA_QUERY_MODO == "minima":
+        params["query"] = " ".join(QUERY_MINIMA.split())
+    elif TATA_QUERY_MODO == "persistida" and TATA_QUERY_HASH:
+        params["extensions"] = json.dumps(
+            {"persistedQuery": {"version": 1, "sha256Hash": TATA_QUERY_HASH}},
+            separators=(",", ":")
+        )
+
+    return params
 
-        if subcategoria_slug:
-            selected_facets.insert(0, {"key": "category-2", "value": subcategoria_slug})
-        else:
-            selected_facets.insert(0, {"key": "category-1", "value": categoria_padre})
-
-        variables = {
-            "first": page_size,
-            "after": str(after),
-            "sort": "score_desc",
-            "term": "",
-            "selectedFacets": selected_facets
-        }
 
-        params = {
-            "operationName": "ProductsQuery",
-            "variables": json.dumps(variables)
-        }
+# =========================================================
+# FUNCIÓN: consultar_pagina
+# =========================================================
+def consultar_pagina(categoria_padre, subcategoria_slug, after, facetas=None):
+    """
+    Descarga una página de ProductsQuery a partir del offset `after`.
 
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64)"
-        }
+    Devuelve (edges, total_count).
+    Si la API no devuelve datos de búsqueda, devuelve ([], 0).
+    """
+    variables = armar_variables(categoria_padre, subcategoria_slug, after, facetas)
+    params = armar_parametros(variables)
 
-        try:
-            response = requests.get(
-                url,
-                params=params,
-                headers=headers,
-                timeout=20
-            )
+    response = descartes.verificar_respuesta(sesion.get(GRAPHQL_URL, params=params))
 
-            data = response.json()
+    data = response.json()
 
-            search_data = data.get('data', {}).get('search', {})
-            if not search_data:
-                break
+    search_data = data.get('data', {}).get('search', {})
+    if not search_data:
+        return [], 0
 
-            edges = search_data.get('products', {}).get('edges', [])
-            total_count = search_data.get('products', {}).get('pageInfo', {}).get('totalCount', 0)
+    edges = search_data.get('products', {}).get('edges', [])
+    total_count = search_data.get('products', {}).get('pageInfo', {}).get('totalCount', 0)
 
-            if not edges:
-                break
+    return edges, total_count
 
-            for edge in edges:
-                node = edge.get('node', {})
-                offers = node.get('offers', {}).get('offers', [{}])[0]
 
-                link = node.get("slug")
-                product_url = f"https://www.tata.com.uy/{link}/p" if link else None
+# =========================================================
+# FUNCIÓN: nodo_a_producto
+# =========================================================
+def nodo_a_producto(node, categoria_padre):
+    """
+    Convierte un nodo de ProductsQuery al formato estándar de producto.
+    """
+    offers = node.get('offers', {}).get('offers', [{}])[0]
+
+    link = node.get("slug")
+    product_url = f"https://www.tata.com.uy/{link}/p" if link else None
+
+    return {
+        "idWeb": int(node['gtin']) if node.get('gtin') else None,
+        "productName": node.get('name'),
+        "productDescription": node.get('name'),
+        "productBrand": node.get('brand', {}).get('name'),
+        "productPrice": offers.get('price'),
+        "moneda": node.get('offers', {}).get('priceCurrency', 'UYU'),
+        "storeRut": TATA_RUT,
+        "urlProduct": product_url,
+        "productImageUrl": node.get('image', [{}])[0].get('url'),
+        "categoryName": categoria_padre   # 👈 SIEMPRE categoría padre
+    }
 
-                productos_categoria.append({
-                    "idWeb": int(node['gtin']) if node.get('gtin') else None,
-                    "productName": node.get('name'),
-                    "productDescription": node.get('name'),
-                    "productBrand": node.get('brand', {}).get('name'),
-                    "productPrice": offers.get('price'),
-                    "moneda": node.get('offers', {}).get('priceCurrency', 'UYU'),
-                    "storeRut": TATA_RUT,
-                    "urlProduct": product_url,
-                    "productImageUrl": node.get('image', [{}])[0].get('url'),
-                    "categoryName": categoria_padre   # 👈 SIEMPRE categoría padre
-                })
 
-            if len(productos_categoria) >= total_count:
-                break
+# =========================================================
+# FUNCIÓN: extraer_categoria
+# =========================================================
+def extraer_categoria(categoria_padre, subcategoria_slug=None, facetas=None):
+    """
+    Descarga todos los productos de una categoría (o subcategoría).
+    Con `facetas` se descarga un shard del árbol descubierto.
+
+    1. Pide la primera página, que trae pageInfo.totalCount
+    2. Calcula todos los offsets restantes
+    3. Los pide en paralelo bajo el límite global de requests
+
+    Las páginas se procesan en orden y se termina ante una
+    página vacía o cuando ya se juntaron totalCount productos.
+    Una página que falla después de los reintentos se descarta
+    y se sigue con la próxima: los offsets ya se conocen.
+    """
+    productos_categoria = []
 
-            after += page_size
-            time.sleep(0.2)
+    if facetas:
+        nombre_log = " → ".join([categoria_padre] + [v for k, v in facetas if k != "category-1"])
+    elif subcategoria_slug:
+        nombre_log = f"{categoria_padre} → {subcategoria_slug}"
+    else:
+        nombre_log = categoria_padre
 
-        except Exception as e:
-            print(f"❌ Error en {nombre_log}: {e}")
+    print(f"🚀 [Hilo Iniciado] Extrayendo: {nombre_log}")
+
+    try:
+        edges, total_count = consultar_pagina(categoria_padre, subcategoria_slug, 0, facetas)
+    except Exception as e:
+        print(f"❌ Error en {nombre_log}: {e}")
+        descartes.descartar_excepcion(e, f"{nombre_log} (after=0)", tipo="pagina")
+        edges, total_count = [], 0
+
+    # Offsets de todas las páginas que faltan
+    futures = [
+        executor_paginas.submit(consultar_pagina, categoria_padre, subcategoria_slug, after, facetas)
+        for after in range(PAGE_SIZE, total_count, PAGE_SIZE)
+    ] if edges else []
+
+    pagina = 0
+    while edges:
+        for edge in edges:
+            productos_categoria.append(
+                nodo_a_producto(edge.get('node', {}), categoria_padre)
+            )
+
+        # Corte de seguridad: ya están todos los productos
+        if len(productos_categoria) >= total_count or pagina >= len(futures):
             break
 
+        edges = None
+        while edges is None and pagina < len(futures):
+            try:
+                edges, _ = futures[pagina].result()
+            except Exception as e:
+                print(f"❌ Error en {nombre_log}: {e}")
+                descartes.descartar_excepcion(e, f"{nombre_log} (after={(pagina + 1) * PAGE_SIZE})", tipo="pagina")
+            pagina += 1
+
+    # Si se cortó antes, no se esperan las páginas pendientes
+    for future in futures[pagina:]:
+        future.cancel()
+
     print(f"✅ [Hilo Finalizado] {nombre_log}: {len(productos_categoria)} items.")
     return productos_categoria
 
+# =========================================================
+# DESCUBRIMIENTO DEL ÁRBOL DE CATEGORÍAS
+# =========================================================
+
+def normalizar_nombre(texto):
+    """
+    Pasa a minúsculas y quita tildes y guiones,
+    para comparar "Almacén" con "almacen".
+    """
+    texto = unicodedata.normalize("NFKD", texto or "")
+    texto = "".join(c for c in texto if not unicodedata.combining(c))
+    return texto.lower().replace("-", " ").strip()
+
+
+def consultar_facetas(facetas):
+    """
+    Consulta las facetas de búsqueda filtrando por `facetas`
+    (lista de pares key/value) y devuelve los valores del
+    siguiente nivel de categoría:
+    [{"value": slug, "name": nombre, "quantity": cantidad}, ...]
+    """
+    nivel = f"category-{len(facetas) + 1}"
+    path = "/".join(f"{k}/{v}" for k, v in facetas)
+
+    res = sesion.get(f"{FACETS_URL}/{path}", params={"locale": "es-UY"})
+    data = res.json()
+
+    valores = []
+    for faceta in data.get("facets", []):
+        for valor in faceta.get("values", []):
+            if valor.get("key") == nivel and valor.get("value"):
+                valores.append({
+                    "value": valor["value"],
+                    "name": valor.get("name") or valor["value"],
+                    "quantity": int(valor.get("quantity") or 0)
+                })
+    return valores
+
+
+def departamentos_permitidos(departamentos):
+    """
+    Filtra las facetas de primer nivel a los departamentos de
+    CATEGORIAS. Devuelve [(nombre en CATEGORIAS, faceta)].
+    """
+    permitidas = {normalizar_nombre(c): c for c in CATEGORIAS}
+    elegidos = []
+    for depto in departamentos:
+        nombre = permitidas.get(normalizar_nombre(depto["name"])) \
+            or permitidas.get(normalizar_nombre(depto["value"]))
+        if nombre:
+            elegidos.append((nombre, depto))
+    return elegidos
+
+
+def descubrir_shards(limite_shard, departamentos):
+    """
+    Recorre el árbol de categorías desde las facetas y lo parte
+    en shards de como máximo `limite_shard` productos.
+    `departamentos` sale de departamentos_permitidos (las
+    facetas raíz se piden una sola vez).
+
+    Una categoría más grande que el límite se reemplaza por sus
+    subcategorías (y así recursivamente). Si no tiene hijos, se
+    deja entera aunque supere el límite.
+
+    Devuelve una lista de shards:
+    {"categoria": departamento, "facetas": [[key, value], ...], "cantidad": n}
+    """
+    shards = []
+
+    def partir(departamento, facetas, cantidad):
+        hijos = consultar_facetas(facetas) if cantidad > limite_shard else []
+
+        if not hijos:
+            shards.append({"categoria": departamento, "facetas": facetas, "cantidad": cantidad})
+            return
+
+        for hijo in hijos:
+            partir(departamento, facetas + [[f"category-{len(facetas) + 1}", hijo["value"]]], hijo["quantity"])
+
+    for nombre, depto in departamentos:
+        partir(nombre, [["category-1", depto["value"]]], depto["quantity"])
+
+    return shards
+
+
+def calcular_limite_shard(total_productos):
+    """
+    Tamaño máximo de shard: lo que reparte el total en
+    MAX_WORKERS partes parejas, sin pasar LIMITE_PAGINACION.
+    """
+    parejo = math.ceil(total_productos / MAX_WORKERS) if total_productos else LIMITE_PAGINACION
+    return max(PAGE_SIZE, min(LIMITE_PAGINACION, parejo))
+
+
+def obtener_shards():
+    """
+    Devuelve los shards a recorrer, ordenados de mayor a menor
+    (los grandes arrancan primero y no quedan colas largas).
+
+    Usa el árbol cacheado si no venció. Si el descubrimiento
+    falla, arma los shards desde la lista fija CATEGORIAS.
+    """
+    shards = leer_cache(CACHE_CATEGORIAS, TATA_CACHE_TTL_HORAS * 3600)
+
+    if shards is None:
+        try:
+            # Solo cuentan los departamentos que se recorren
+            departamentos = departamentos_permitidos(consultar_facetas([]))
+            total = sum(d["quantity"] for _, d in departamentos)
+            shards = descubrir_shards(calcular_limite_shard(total), departamentos)
+            if shards:
+                guardar_cache(CACHE_CATEGORIAS, shards)
+                print(f"🌳 Árbol de categorías descubierto: {len(shards)} shards")
+        except Exception as e:
+            print(f"⚠️ No se pudo descubrir el árbol de categorías: {e}")
+            shards = None
+    else:
+        print(f"🌳 Árbol de categorías desde caché: {len(shards)} shards")
+
+    if not shards:
+        print("⚠️ Usando la lista fija de categorías")
+        shards = []
+        for categoria, subcategorias in CATEGORIAS.items():
+            if subcategorias:
+                for sub in subcategorias:
+                    shards.append({"categoria": categoria, "facetas": [["category-2", sub]], "cantidad": 0})
+            else:
+                shards.append({"categoria": categoria, "facetas": [["category-1", categoria]], "cantidad": 0})
+
+    # Hojas sin subcategorías más grandes que lo que se puede
+    # paginar: lo que pasa del límite no se alcanza
+    for shard in shards:
+        if shard["cantidad"] > LIMITE_PAGINACION:
+            print(
+                f"⚠️ TRUNCADO {shard['categoria']} {shard['facetas']}: {shard['cantidad']} productos, "
+                f"se recorren {LIMITE_PAGINACION} (faltan {shard['cantidad'] - LIMITE_PAGINACION})"
+            )
+
+    return sorted(shards, key=lambda s: s["cantidad"], reverse=True)
+
 # =========================================================
 # FUNCIÓN: DEDUPLICAR POR GTIN
 # =========================================================
@@ -170,24 +496,27 @@ def ejecutar_scrapper_masivo():
 
     todos_los_productos = []
     start_time = time.time()
-
-    futures = []
-
-    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
-        for categoria, subcategorias in CATEGORIAS.items():
-
-            if subcategorias:
-                for sub in subcategorias:
-                    futures.append(
-                        executor.submit(extraer_categoria, categoria, sub)
-                    )
-            else:
-                futures.append(
-                    executor.submit(extraer_categoria, categoria)
-                )
+    iniciar_metricas("tata")
+    iniciar_perfilado("tata")
+
+    with fase("descubrimiento"):
+        shards = obtener_shards()
+
+    with fase("listado") as f_listado, ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        futures = [
+            executor.submit(
+                extraer_categoria,
+                shard["categoria"],
+                None,
+                [tuple(f) for f in shard["facetas"]]
+            )
+            for shard in shards
+        ]
 
         for future in futures:
-            todos_los_productos.extend(future.result())
+            productos = future.result()
+            todos_los_productos.extend(productos)
+            f_listado.sumar(len(productos))
 
     # 🔥 DEDUPLICADO FINAL
     total_antes = len(todos_los_productos)
@@ -196,6 +525,7 @@ def ejecutar_scrapper_masivo():
 
     with open(OUTPUT_JSON, "w", encoding="utf-8") as f:
         json.dump(todos_los_productos, f, ensure_ascii=False, indent=4)
+    guardar_historial(todos_los_productos)
 
     total_time = time.time() - start_time
 
@@ -203,6 +533,10 @@ def ejecutar_scrapper_masivo():
     print(f"📦 Productos antes deduplicar: {total_antes}")
     print(f"📦 Productos finales únicos: {total_despues}")
     print(f"📂 Archivo generado: {OUTPUT_JSON}")
+    concurrencia.imprimir_resumen()
+    sesion.imprimir_resumen()
+    reintentos.imprimir_resumen()
+    descartes.imprimir_resumen()
 
 # =========================================================
 # PUNTO DE ENTRADA
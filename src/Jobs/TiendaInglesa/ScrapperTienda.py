@@ -1,5 +1,3 @@
-import cloudscraper
-from bs4 import BeautifulSoup
 import re
 import json
 import sys
@@ -7,7 +5,25 @@ import time
 import random
 import os
 from concurrent.futures import ThreadPoolExecutor
-from threading import Lock
+from functools import partial
+
+# SRC_DIR:
+# Carpeta src, para poder importar los módulos compartidos de Comun
+SRC_DIR = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+from Comun import descartes, reintentos
+from Comun.checkpoint import CURSOR_TERMINADO, Checkpoint
+from Comun.clearance import Clearance
+from Comun.concurrencia import SesionLimitada, limitar_sesion
+from Comun.grabacion import envolver_sesion
+from Comun.historial_precios import guardar_historial
+from Comun.metricas import fase, iniciar_metricas, instrumentar_sesion
+from Comun.perfilado import iniciar_perfilado
+from Comun.parser_html import Selector, extraer_json_ld, parsear
+from Comun.planificador import PEDIR, REUTILIZAR, Planificador
+from Comun.reintentos import con_reintentos
 
 # =========================================================
 # CONFIGURACIÓN GENERAL – TIENDA INGLESA
@@ -26,7 +42,21 @@ BASE_URL = "https://www.tiendainglesa.com.uy"
 MAX_WORKERS_CATEGORIAS = 10
 
 # Cantidad de hilos para extraer detalle de productos
-MAX_WORKERS_DETALLES = 15
+MAX_WORKERS_DETALLES = 30
+
+# Requests simultáneos al sitio (Comun/concurrencia.py):
+# arrancan en CONCURRENCIA_INICIAL y el controlador los sube
+# o baja según la latencia y los bloqueos, hasta
+# MAX_WORKERS_DETALLES
+CONCURRENCIA_INICIAL = 4
+
+# Pausa aleatoria antes de cada detalle (mínimo, máximo en segundos)
+DELAY_DETALLE = (1.5, 3)
+
+# Máximo de páginas de detalle por corrida (0 = sin límite)
+# Ver Comun/planificador.py: se piden primero los productos
+# más atrasados y el resto sale con los datos de su última visita
+PRESUPUESTO_DETALLE = int(os.getenv("TIENDA_PRESUPUESTO_DETALLE", "0"))
 
 # =========================================================
 # CONFIGURACIÓN DE RUTAS
@@ -54,16 +84,41 @@ OUTPUT_JSON = os.path.join(JSON_DIR, "productos_tienda_inglesa.json")
 # ESTADO GLOBAL (COMPARTIDO ENTRE HILOS)
 # =========================================================
 
-# cloudscraper evita bloqueos tipo Cloudflare
-scraper = cloudscraper.create_scraper()
+# cloudscraper evita bloqueos tipo Cloudflare. El clearance se
+# guarda entre corridas y lo renueva un solo hilo
+# (Comun/clearance.py)
+clearance = Clearance("tienda", MAX_WORKERS_DETALLES)
+# Listado y detalle comparten el controlador de concurrencia
+# y la política de reintentos
+scraper, concurrencia = limitar_sesion(
+    envolver_sesion(instrumentar_sesion(clearance.sesion)),
+    "tienda", CONCURRENCIA_INICIAL, MAX_WORKERS_DETALLES
+)
+scraper = con_reintentos(scraper)
+# Las páginas de detalle van por HTTP/2 si SCRAPER_HTTP2=1
+# (clearance.sesion_detalle); si no, es la misma sesión
+scraper_detalle = scraper
+if clearance.sesion_detalle is not clearance.sesion:
+    scraper_detalle = con_reintentos(SesionLimitada(
+        envolver_sesion(instrumentar_sesion(clearance.sesion_detalle)), concurrencia
+    ))
+
+# Pool donde se descargan las páginas 2..N de cada categoría
+# (el controlador de concurrencia limita cuántas van a la vez).
+# Es distinto del pool de categorías para que un hilo de
+# categoría pueda esperar sus páginas sin bloquear el pool.
+executor_paginas = ThreadPoolExecutor(max_workers=MAX_WORKERS_DETALLES)
 
 # Diccionario global:
 # key   → URL del producto
 # value → info básica (nombre + categorías)
+# Lo escribe solo el hilo principal: cada categoría arma su
+# propio mapa y se fusiona al terminar (fusionar_productos)
 productos_map = {}
 
-# Lock para evitar conflictos entre hilos
-map_lock = Lock()
+# Selectores CSS (se compilan una sola vez)
+SELECTOR_BREADCRUMB = Selector("div#TXTBREADCRUMB")
+SELECTOR_NOMBRE_PRODUCTO = Selector("span.card-product-name")
 
 # =========================================================
 # FUNCIONES AUXILIARES
@@ -85,6 +140,30 @@ def limpiar_url_producto(url):
     return url
 
 
+def agregar_producto(mapa, url, nombre_lista, categoria):
+    """
+    Agrega un producto a un mapa de descubrimiento.
+    Si ya estaba, solo se suma la categoría.
+    """
+    info = mapa.get(url)
+    if info is None:
+        mapa[url] = {"nombre_lista": nombre_lista, "categorias": {categoria}}
+    else:
+        info["categorias"].add(categoria)
+
+
+def fusionar_productos(destino, encontrados):
+    """
+    Suma al mapa `destino` los productos de una categoría,
+    uniendo las categorías de las URLs repetidas.
+    """
+    for url, info in encontrados.items():
+        if url not in destino:
+            destino[url] = info
+        else:
+            destino[url]["categorias"] |= info["categorias"]
+
+
 def obtener_estado_paginacion(soup):
     """
     Extrae información de paginación desde el breadcrumb.
@@ -93,9 +172,9 @@ def obtener_estado_paginacion(soup):
     - último producto
     - total de productos
     """
-    breadcrumb_tag = soup.select_one("div#TXTBREADCRUMB")
+    breadcrumb_tag = soup.select_one(SELECTOR_BREADCRUMB)
     if breadcrumb_tag:
-        text = breadcrumb_tag.get_text()
+        text = breadcrumb_tag.texto(strip=False)
         match = re.search(r'\((\d+)\s*-\s*(\d+)\s*de\s*(\d+)\)', text)
         if match:
             return int(match.group(1)), int(match.group(2)), int(match.group(3))
@@ -141,13 +220,44 @@ def get_categories():
 # FASE 2: LISTADO DE PRODUCTOS POR CATEGORÍA
 # =========================================================
 
-def scrape_category_products(cat):
+def leer_pagina_categoria(api_path, page):
+    """
+    Pide una página del listado de una categoría.
+    Devuelve el estado de paginación (primero, último, total)
+    y la lista de (URL limpia, nombre en el listado).
+    """
+    res = descartes.verificar_respuesta(scraper.get(f"{api_path}{page}", timeout=20))
+    soup = parsear(res.text)
+
+    productos = []
+    for span in soup.select(SELECTOR_NOMBRE_PRODUCTO):
+        link_tag = span.padre('a')
+        if not link_tag or not link_tag.attr("href"):
+            continue
+        productos.append((limpiar_url_producto(BASE_URL + link_tag.attr("href")), span.texto(strip=True)))
+
+    return obtener_estado_paginacion(soup), productos
+
+
+def scrape_category_products(cat, checkpoint=None):
     """
     Recorre una categoría completa y obtiene las URLs
     de todos los productos que contiene.
+
+    1. Pide la primera página, cuyo breadcrumb trae el total
+    2. Calcula cuántas páginas faltan
+    3. Las pide en paralelo bajo el límite de requests al sitio
+
+    Devuelve su propio mapa {url: info básica}, sin tocar el
+    global: los hilos de categorías no comparten nada mientras
+    parsean y el hilo principal fusiona los resultados.
+
+    Con un checkpoint se guarda cada página leída y al
+    reanudar se sigue desde la primera página sin leer.
     """
     nombre_cat = cat["nombre"]
     base_url = cat["url"]
+    encontrados = {}
 
     try:
         url_parts = base_url.split('/')
@@ -156,49 +266,56 @@ def scrape_category_products(cat):
 
         search_pattern = f"busqueda?0,0,*%3A*,{category_id},0,0,,,false,,,,"
         api_path = f"{BASE_URL}/supermercado/categoria/{category_path}/{search_pattern}"
-    except:
-        return
+    except Exception as e:
+        descartes.descartar_excepcion(e, base_url, tipo="categoria")
+        return encontrados
 
+    clave_cursor = f"cursor:{nombre_cat}"
     page = 0
-    while True:
-        try:
-            res = scraper.get(f"{api_path}{page}", timeout=20)
-            soup = BeautifulSoup(res.text, "html.parser")
-
-            inicio, fin, total = obtener_estado_paginacion(soup)
-
-            product_links = soup.select("span.card-product-name")
-            if not product_links:
-                break
+    if checkpoint is not None:
+        page = checkpoint.leer_estado(clave_cursor, 0)
+        if page == CURSOR_TERMINADO:
+            return encontrados
 
-            # Bloque crítico protegido por lock
-            with map_lock:
-                for span in product_links:
-                    link_tag = span.find_parent('a')
-                    if not link_tag or not link_tag.get("href"):
-                        continue
+    def registrar(productos):
+        for url_limpia, nombre_lista in productos:
+            agregar_producto(encontrados, url_limpia, nombre_lista, nombre_cat)
+            if checkpoint is not None:
+                checkpoint.agregar_frontera(url_limpia, nombre_cat, {"nombre_lista": nombre_lista})
 
-                    raw_url = BASE_URL + link_tag.get("href")
-                    url_limpia = limpiar_url_producto(raw_url)
-
-                    # Si el producto es nuevo, se agrega
-                    if url_limpia not in productos_map:
-                        productos_map[url_limpia] = {
-                            "nombre_lista": span.get_text(strip=True),
-                            "categorias": {nombre_cat}
-                        }
-                    else:
-                        # Si ya existe, se suma la categoría
-                        productos_map[url_limpia]["categorias"].add(nombre_cat)
-
-            if fin >= total or total == 0:
-                break
-
-            page += 1
-            time.sleep(0.3)
-
-        except:
-            break
+    try:
+        (inicio, fin, total), productos = leer_pagina_categoria(api_path, page)
+    except Exception as e:
+        # Error que sobrevivió a los reintentos: la categoría
+        # queda con su página para volver a intentarla al reanudar
+        descartes.descartar_excepcion(e, f"{api_path}{page}", tipo="pagina")
+        return encontrados
+    registrar(productos)
+
+    # Páginas que faltan según el total del breadcrumb
+    por_pagina = fin - inicio + 1
+    futures = [
+        executor_paginas.submit(leer_pagina_categoria, api_path, p)
+        for p in range(page + 1, -(-total // por_pagina))
+    ] if productos and por_pagina > 0 and fin < total else []
+
+    # Se procesan en orden: el cursor avanza hasta la primera
+    # página que falla y las siguientes se leen igual
+    completa = True
+    for p, future in enumerate(futures, page + 1):
+        try:
+            _, productos = future.result()
+        except Exception as e:
+            descartes.descartar_excepcion(e, f"{api_path}{p}", tipo="pagina")
+            completa = False
+            continue
+        registrar(productos)
+        if checkpoint is not None and completa:
+            checkpoint.guardar_estado(clave_cursor, p + 1)
+
+    if checkpoint is not None and completa:
+        checkpoint.guardar_estado(clave_cursor, CURSOR_TERMINADO)
+    return encontrados
 
 # =========================================================
 # FASE 3: DETALLE DE PRODUCTO
@@ -210,17 +327,16 @@ def extract_product_detail(url, info_basica):
     la información detallada desde Schema.org.
     """
     # Delay aleatorio para evitar bloqueos
-    time.sleep(random.uniform(1.5, 3))
+    time.sleep(random.uniform(*DELAY_DETALLE))
 
     try:
-        res = scraper.get(url, timeout=40)
-        soup = BeautifulSoup(res.text, "html.parser")
-
-        script_tag = soup.find("script", {"type": "application/ld+json"})
-        if not script_tag:
+        res = descartes.verificar_respuesta(scraper_detalle.get(url, timeout=40))
+        json_ld = extraer_json_ld(res.text)
+        if not json_ld:
+            descartes.descartar(descartes.SIN_JSON_LD, url)
             return None
 
-        data = json.loads(script_tag.string)
+        data = json.loads(json_ld)
 
         if isinstance(data, list):
             p = next((i for i in data if i.get("@type") == "Product"), {})
@@ -230,7 +346,11 @@ def extract_product_detail(url, info_basica):
         gtin = p.get("gtin13") or p.get("gtin")
         price = p.get("offers", {}).get("price")
 
-        if not gtin or not price:
+        if not gtin:
+            descartes.descartar(descartes.SIN_GTIN, url)
+            return None
+        if not price:
+            descartes.descartar(descartes.SIN_PRECIO, url)
             return None
 
         return {
@@ -247,10 +367,14 @@ def extract_product_detail(url, info_basica):
             if isinstance(p.get("image"), list)
             else p.get("image"),
             "urlProduct":  f"{BASE_URL}/p.producto?"+p.get("productId"),
+            # El idWeb es el id del sitio: el GTIN va aparte para
+            # emparejar con otras tiendas (Comun/emparejamiento.py)
+            "gtin": str(gtin),
             "categoryName": next(iter(info_basica["categorias"]))
         }
 
-    except:
+    except Exception as e:
+        descartes.descartar_excepcion(e, url)
         return None
 
 # =========================================================
@@ -259,31 +383,68 @@ def extract_product_detail(url, info_basica):
 
 def main():
     start_time = time.time()
-
-    # Fase 1: categorías
-    categorias = get_categories()
-    if not categorias:
-        print("❌ No se encontraron categorías")
-        return
-
-    print(f"🚀 Escaneando {len(categorias)} categorías...")
-    with ThreadPoolExecutor(max_workers=MAX_WORKERS_CATEGORIAS) as executor:
-        executor.map(scrape_category_products, categorias)
+    iniciar_metricas("tienda")
+    iniciar_perfilado("tienda")
+    clearance.iniciar(BASE_URL)
+
+    # Checkpoint periódico: con --resume se recupera la frontera,
+    # las páginas ya leídas y los detalles ya descargados
+    checkpoint = Checkpoint("tienda")
+    completados = checkpoint.resultados()
+    for url, categoria, datos in checkpoint.frontera():
+        agregar_producto(productos_map, url, (datos or {}).get("nombre_lista", ""), categoria)
+
+    if checkpoint.leer_estado("descubrimiento") != CURSOR_TERMINADO:
+        # Fase 1: categorías
+        with fase("categorias"):
+            categorias = get_categories()
+        if not categorias:
+            print("❌ No se encontraron categorías")
+            return
+
+        print(f"🚀 Escaneando {len(categorias)} categorías...")
+        with fase("listado") as f_listado:
+            with ThreadPoolExecutor(max_workers=MAX_WORKERS_CATEGORIAS) as executor:
+                for encontrados in executor.map(partial(scrape_category_products, checkpoint=checkpoint), categorias):
+                    fusionar_productos(productos_map, encontrados)
+            f_listado.sumar(len(productos_map))
+        checkpoint.guardar_estado("descubrimiento", CURSOR_TERMINADO)
 
     print(f"📦 Productos únicos detectados: {len(productos_map)}")
+    if completados:
+        print(f"♻️ {len(completados)} productos ya descargados en el checkpoint")
+
+    # Solo se piden los detalles vencidos según la historia de
+    # cambios de cada producto (Comun/planificador.py)
+    planificador = Planificador("tienda", RUT_FIJO, presupuesto=PRESUPUESTO_DETALLE or None)
+    for url, res in completados.items():
+        planificador.registrar(url, res)
 
     # Fase 2: detalle de productos
-    resultados = []
-    with ThreadPoolExecutor(max_workers=MAX_WORKERS_DETALLES) as executor:
-        futures = [
-            executor.submit(extract_product_detail, url, info)
-            for url, info in productos_map.items()
-        ]
+    resultados = [completados[url] for url in productos_map if url in completados]
+    with fase("detalle") as f_detalle, ThreadPoolExecutor(max_workers=MAX_WORKERS_DETALLES) as executor:
+        futures = {}
+        for url, info in productos_map.items():
+            if url in completados:
+                continue
+            decision = planificador.decidir(url)
+            if decision == PEDIR:
+                futures[executor.submit(extract_product_detail, url, info)] = url
+            elif decision == REUTILIZAR:
+                resultados.append(planificador.ultimo(url))
 
         for i, future in enumerate(futures, 1):
             res = future.result()
             if res:
                 resultados.append(res)
+                f_detalle.sumar()
+                checkpoint.guardar_resultado(futures[future], res)
+                planificador.registrar(futures[future], res)
+            else:
+                # Si el pedido falla, sale la última visita (si la hay)
+                anterior = planificador.ultimo(futures[future])
+                if anterior:
+                    resultados.append(anterior)
 
             # Barra de progreso en consola
             sys.stdout.write(
@@ -295,9 +456,20 @@ def main():
     print(f"\n💾 Guardando archivo en {OUTPUT_JSON}")
     with open(OUTPUT_JSON, "w", encoding="utf-8") as f:
         json.dump(resultados, f, ensure_ascii=False, indent=4)
+    guardar_historial(resultados)
+    planificador.guardar()
+    checkpoint.terminar()
+    clearance.detener()
 
     print(f"✨ Finalizado en {(time.time() - start_time)/60:.2f} minutos")
     print(f"📄 Productos guardados: {len(resultados)}")
+    planificador.imprimir_resumen(len(resultados))
+    concurrencia.imprimir_resumen()
+    clearance.sesion.imprimir_resumen()
+    if clearance.sesion_detalle is not clearance.sesion:
+        clearance.sesion_detalle.imprimir_resumen()
+    reintentos.imprimir_resumen()
+    descartes.imprimir_resumen()
 
 # =========================================================
 # PUNTO DE ENTRADA
@@ -1,8 +1,22 @@
+import argparse
 import json
 import os
+import sys
 import requests
 import time
 import shutil
+from concurrent.futures import ThreadPoolExecutor
+from itertools import count
+
+# SRC_DIR:
+# Carpeta src, para poder importar los módulos compartidos de Comun
+SRC_DIR = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+from Comun.almacenamiento import cliente_gcs, iterar_productos, mover_objeto
+from Comun.metricas import contar, fase, iniciar_metricas, observar
+from Comun.perfilado import iniciar_perfilado
 
 # =========================================================
 # CONFIGURACIÓN GENERAL
@@ -53,6 +67,25 @@ HEADERS = {
     "X-API-KEY": API_KEY
 }
 
+# =========================================================
+# MODO CONSUMIDOR DE CLOUD STORAGE
+# =========================================================
+# Con --bucket (o POST_GCS_BUCKET) en lugar de leer
+# Jobs/JsonProducts se importan los objetos que los jobs en la
+# nube dejan en gs://<bucket>/pendientes/. Cada objeto se lee
+# en streaming y al terminar se mueve a procesados/ (o a
+# fallidos/ si algún batch falló o no se pudo leer), así varios
+# jobs pueden entregar a un mismo importador.
+POST_GCS_BUCKET = os.getenv("POST_GCS_BUCKET", "")
+
+PREFIJO_PENDIENTES = "pendientes/"
+PREFIJO_PROCESADOS = "procesados/"
+PREFIJO_FALLIDOS = "fallidos/"
+
+# Objetos que se descargan e importan a la vez
+# (es también la cantidad de POSTs simultáneos a la API)
+DESCARGAS_CONCURRENTES = 4
+
 # =========================================================
 # FUNCIÓN: limpiar_carpeta
 # =========================================================
@@ -117,8 +150,13 @@ def enviar_batch(batch, numero):
     Si falla:
     - guarda el batch en disco
     - devuelve False
+
+    El tiempo de cada batch queda en la métrica "post_batch".
     """
 
+    inicio = time.perf_counter()
+    resultado = "error"
+
     try:
         # Envío HTTP POST a la API
         res = requests.post(
@@ -130,6 +168,7 @@ def enviar_batch(batch, numero):
 
         # Si la API responde OK
         if res.status_code in (200, 201):
+            resultado = "ok"
             print(f"✅ Batch {numero} enviado correctamente ({len(batch)} productos)")
             return True
         else:
@@ -155,18 +194,147 @@ def enviar_batch(batch, numero):
 
         return False
 
+    finally:
+        observar("post_batch", time.perf_counter() - inicio, resultado=resultado)
+        contar("post_productos", len(batch), resultado=resultado)
+
+
+# =========================================================
+# FUNCIÓN: enviar_productos
+# =========================================================
+def enviar_productos(productos, numeros, f_import, totales=None):
+    """
+    Recorre los productos (lista o iterador) de a BATCH_SIZE
+    y envía cada batch. `numeros` da el número de cada batch
+    (un itertools.count compartido entre hilos).
+    Los contadores se van acumulando en `totales`
+    ({"enviados", "fallidos", "batches"}), así quien llama
+    sabe hasta dónde llegó si la lectura se corta a mitad.
+    Devuelve (enviados, fallidos).
+    """
+    if totales is None:
+        totales = {}
+    for clave in ("enviados", "fallidos", "batches"):
+        totales.setdefault(clave, 0)
+
+    def enviar(batch):
+        if enviar_batch(batch, next(numeros)):
+            totales["enviados"] += len(batch)
+            f_import.sumar(len(batch))
+        else:
+            totales["fallidos"] += len(batch)
+        totales["batches"] += 1
+
+    batch = []
+
+    for producto in productos:
+        batch.append(producto)
+        if len(batch) < BATCH_SIZE:
+            continue
+        enviar(batch)
+        batch = []
+
+        # Pausa entre envíos
+        time.sleep(SLEEP_SECONDS)
+
+    if batch:
+        enviar(batch)
+
+    return totales["enviados"], totales["fallidos"]
+
+
+# =========================================================
+# FUNCIÓN: procesar_objeto
+# =========================================================
+def procesar_objeto(blob, prefijo, numeros, f_import):
+    """
+    Importa un objeto del bucket en streaming y lo mueve a
+    procesados/ o fallidos/. Devuelve (enviados, fallidos),
+    contando lo enviado aunque la lectura falle a mitad.
+    """
+    print(f"☁️ Importando gs://{blob.bucket.name}/{blob.name}...")
+    totales = {}
+    try:
+        enviados, fallidos = enviar_productos(iterar_productos(blob), numeros, f_import, totales)
+        ok = fallidos == 0
+    except Exception as e:
+        # Objeto corrupto, JSON inválido, error de descarga...
+        # Lo ya enviado queda enviado; el objeto va a fallidos/
+        enviados, fallidos, ok = totales.get("enviados", 0), totales.get("fallidos", 0), False
+        print(
+            f"❌ Error leyendo {blob.name} después de {totales.get('batches', 0)} batches "
+            f"({enviados} enviados, {fallidos} fallidos): {e}"
+        )
+
+    destino = PREFIJO_PROCESADOS if ok else PREFIJO_FALLIDOS
+    try:
+        nombre_nuevo = mover_objeto(blob, prefijo, destino)
+        print(f"{'✅' if ok else '⚠️'} {blob.name} → {nombre_nuevo} ({enviados} enviados, {fallidos} fallidos)")
+    except Exception as e:
+        print(f"⚠️ No se pudo mover {blob.name}: {e}")
+
+    contar("post_objetos", resultado="ok" if ok else "error")
+    return enviados, fallidos
+
+
+# =========================================================
+# FUNCIÓN: consumir_bucket
+# =========================================================
+def consumir_bucket(bucket, prefijo=PREFIJO_PENDIENTES, descargas=DESCARGAS_CONCURRENTES):
+    """
+    Importa todos los objetos de gs://<bucket>/<prefijo>,
+    varios a la vez.
+    """
+    blobs = [
+        b for b in cliente_gcs().list_blobs(bucket, prefix=prefijo)
+        if not b.name.endswith("/")
+    ]
+    if not blobs:
+        print(f"❌ No hay objetos en gs://{bucket}/{prefijo}")
+        return
+
+    print(f"📦 {len(blobs)} objetos pendientes en gs://{bucket}/{prefijo}")
+
+    numeros = count(1)
+    with fase("import") as f_import, ThreadPoolExecutor(max_workers=descargas) as executor:
+        resultados = list(executor.map(
+            lambda b: procesar_objeto(b, prefijo, numeros, f_import), blobs
+        ))
+
+    print("\n📊 Resumen:")
+    print(f"   - Objetos: {len(blobs)}")
+    print(f"   - Válidos enviados: {sum(r[0] for r in resultados)}")
+    print(f"   - Fallidos: {sum(r[1] for r in resultados)}")
+    print(f"   - Archivos de batches fallidos guardados en: {BATCH_DIR}")
+    print("✨ Proceso finalizado")
+
 
 # =========================================================
 # FUNCIÓN PRINCIPAL
 # =========================================================
 def main():
+    parser = argparse.ArgumentParser(description="Envía los productos a la API")
+    parser.add_argument("--bucket", default=POST_GCS_BUCKET, help="Importar desde Cloud Storage")
+    parser.add_argument("--prefijo", default=PREFIJO_PENDIENTES)
+    parser.add_argument("--descargas", type=int, default=DESCARGAS_CONCURRENTES)
+    # --perfil / --tracemalloc los lee Comun/perfilado.py
+    args, _ = parser.parse_known_args()
+
     print("🚀 Iniciando procesamiento de JSONs...")
+    iniciar_metricas("postproducts")
+    iniciar_perfilado("postproducts")
 
     # Limpia la carpeta de batches al inicio
     limpiar_carpeta(BATCH_DIR)
 
+    if args.bucket:
+        consumir_bucket(args.bucket, args.prefijo, args.descargas)
+        return
+
     # Carga todos los productos desde los JSON
-    productos = cargar_jsons(JSON_DIR)
+    with fase("carga_json") as f_carga:
+        productos = cargar_jsons(JSON_DIR)
+        f_carga.sumar(len(productos))
     total = len(productos)
 
     # Si no hay productos, se corta el proceso
@@ -176,25 +344,9 @@ def main():
 
     print(f"📦 Total de productos cargados: {total}")
 
-    batch_num = 1
-    enviados = 0
-    fallidos = 0
-
     # Recorre los productos de a BATCH_SIZE
-    for i in range(0, total, BATCH_SIZE):
-        batch = productos[i:i + BATCH_SIZE]
-
-        exito = enviar_batch(batch, batch_num)
-
-        if exito:
-            enviados += len(batch)
-        else:
-            fallidos += len(batch)
-
-        batch_num += 1
-
-        # Pausa entre envíos
-        time.sleep(SLEEP_SECONDS)
+    with fase("import") as f_import:
+        enviados, fallidos = enviar_productos(productos, count(1), f_import)
 
     # Resumen final
     print("\n📊 Resumen:")
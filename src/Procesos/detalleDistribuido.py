@@ -0,0 +1,422 @@
+import argparse
+import json
+import os
+import secrets
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from threading import Thread
+
+# SRC_DIR:
+# Carpeta src, para poder importar los módulos compartidos de Comun
+SRC_DIR = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+from Comun import descartes
+from Comun.cola_trabajo import (
+    FALLIDO, HECHO, LEASE_SEGUNDOS, PENDIENTE, SCRAPER_COLA_TOKEN, TOMADO, crear_cola, servir_cola
+)
+from Comun.frontera import FronteraUrls
+from Comun.historial_precios import guardar_historial
+from Comun.metricas import asegurar_run_id, fase, iniciar_metricas
+from Comun.perfilado import iniciar_perfilado
+from Comun.scrapers import cargar_scraper
+
+# =========================================================
+# DETALLE DISTRIBUIDO ENTRE VARIOS PROCESOS / MÁQUINAS
+# =========================================================
+# La fase de detalle (una página por producto) es la que más
+# tarda y un solo proceso queda limitado por su pool de hilos
+# y su IP. Este script la reparte:
+#
+# - coordinar: descubre las URLs del scraper, las encola en
+#   una cola de trabajo (Comun/cola_trabajo.py), lanza N
+#   workers locales y al final une sus resultados en el
+#   OUTPUT_JSON del scraper.
+# - worker: toma lotes de la cola con un lease, descarga y
+#   parsea cada producto y agrega los resultados a su propio
+#   shard NDJSON (<salida>/<scraper>-<worker>.ndjson).
+#   Si un worker muere, sus leases vencen y otro los retoma.
+# - unir: junta los shards (por ejemplo después de copiar los
+#   de otras máquinas) en el OUTPUT_JSON.
+#
+# Uso en una máquina:
+#   python Procesos/detalleDistribuido.py coordinar --scraper geant --workers 4
+# Con workers en otras máquinas, el coordinador sirve la cola
+# (en la interfaz de --host, con el secreto de
+# SCRAPER_COLA_TOKEN en las dos puntas):
+#   SCRAPER_COLA_TOKEN=... python Procesos/detalleDistribuido.py coordinar --scraper geant --workers 2 \
+#       --servir 8765 --host 0.0.0.0
+#   SCRAPER_COLA_TOKEN=... python Procesos/detalleDistribuido.py worker --scraper geant \
+#       --cola http://coordinador:8765 --id nodo2-0
+# (los shards de las otras máquinas se copian a la carpeta de
+# salida del coordinador y se corre "unir")
+
+# Carpeta de trabajo por defecto (cola + shards)
+COLAS_DIR = os.getenv("SCRAPER_COLAS_DIR", os.path.join(SRC_DIR, "Colas"))
+
+# Ítems que toma un worker en cada lease
+LOTE = 20
+
+# Hilos de descarga de cada worker
+HILOS_WORKER = 8
+
+# Segundos entre consultas cuando la cola está vacía
+ESPERA_COLA_VACIA = 1
+
+# Veces que el coordinador relanza un worker local que murió
+MAX_RELANZAMIENTOS = 3
+
+
+# =========================================================
+# ADAPTADORES POR SCRAPER
+# =========================================================
+# descubrir(modulo, encolar) → llama a encolar([(url, datos)])
+#                             a medida que aparecen URLs. Puede
+#                             devolver {url: [categorías]} si un
+#                             producto sale una vez por categoría
+#                             (se guarda junto a los shards y lo
+#                             usa unir_shards)
+# detalle(modulo, url, datos) → producto o None
+
+def descubrir_geant(modulo, encolar):
+    frontera = FronteraUrls()
+    totales = {}
+    Thread(target=modulo.descubrir_urls, args=(frontera, totales), daemon=True).start()
+
+    urls = []
+    lote = []
+    for url, cats in frontera:
+        # Se encola con la primera categoría en que apareció
+        urls.append(url)
+        lote.append((url, {"categoria": cats[0]}))
+        if len(lote) >= LOTE:
+            encolar(lote)
+            lote = []
+    encolar(lote)
+    modulo.imprimir_cobertura(frontera, totales)
+
+    # Recién ahora se conocen todas las categorías de cada URL
+    return {url: frontera.categorias(url) for url in urls}
+
+
+def detalle_geant(modulo, url, datos):
+    return modulo.extraer_detalle_producto(url, datos["categoria"])
+
+
+def descubrir_tienda(modulo, encolar):
+    with fase("categorias"):
+        categorias = modulo.get_categories()
+    if not categorias:
+        print("❌ No se encontraron categorías")
+        return
+
+    # Cada categoría devuelve su mapa y se fusionan en
+    # modulo.productos_map; las categorías de cada producto se
+    # conocen recién al terminar todas
+    with fase("listado") as f_listado:
+        with ThreadPoolExecutor(max_workers=modulo.MAX_WORKERS_CATEGORIAS) as executor:
+            for encontrados in executor.map(modulo.scrape_category_products, categorias):
+                modulo.fusionar_productos(modulo.productos_map, encontrados)
+        f_listado.sumar(len(modulo.productos_map))
+
+    encolar([
+        (url, {"nombre_lista": info["nombre_lista"], "categorias": sorted(info["categorias"])})
+        for url, info in modulo.productos_map.items()
+    ])
+
+
+def detalle_tienda(modulo, url, datos):
+    return modulo.extract_product_detail(url, datos)
+
+
+ADAPTADORES = {
+    "geant": {"descubrir": descubrir_geant, "detalle": detalle_geant},
+    "tienda": {"descubrir": descubrir_tienda, "detalle": detalle_tienda}
+}
+
+
+def cargar(nombre, base_url=None):
+    """
+    Carga el módulo del scraper. Con base_url se apunta a otro
+    host (un mirror o el servidor local de Benchmarks).
+    """
+    modulo = cargar_scraper(nombre)
+    if base_url:
+        modulo.BASE_URL = base_url.rstrip("/")
+        if hasattr(modulo, "DELAY_DETALLE"):
+            modulo.DELAY_DETALLE = (0, 0)
+    return modulo
+
+
+def iniciar_clearance(modulo):
+    """
+    Carga o renueva el clearance del scraper y arranca su
+    renovador, como hace el main de cada scraper.
+    """
+    if hasattr(modulo, "clearance"):
+        modulo.clearance.iniciar(modulo.BASE_URL)
+
+
+def detener_clearance(modulo):
+    if hasattr(modulo, "clearance"):
+        modulo.clearance.detener()
+
+
+# =========================================================
+# WORKER
+# =========================================================
+def ruta_shard(salida, scraper, worker):
+    return os.path.join(salida, f"{scraper}-{worker}.ndjson")
+
+
+def ruta_categorias(salida, scraper):
+    return os.path.join(salida, f"{scraper}-categorias.json")
+
+
+def ejecutar_worker(args):
+    iniciar_metricas(f"{args.scraper}-{args.id}")
+    iniciar_perfilado(f"{args.scraper}-{args.id}")
+
+    modulo = cargar(args.scraper, args.base_url)
+    detalle = ADAPTADORES[args.scraper]["detalle"]
+    cola = crear_cola(args.cola)
+    iniciar_clearance(modulo)
+
+    os.makedirs(args.salida, exist_ok=True)
+    shard = ruta_shard(args.salida, args.scraper, args.id)
+    procesados = 0
+
+    def procesar(item):
+        _, url, datos = item
+        return detalle(modulo, url, datos)
+
+    with fase("detalle") as f_detalle, \
+            ThreadPoolExecutor(max_workers=args.hilos) as executor, \
+            open(shard, "a", encoding="utf-8") as f:
+
+        while True:
+            items = cola.tomar(args.id, args.lote, args.lease)
+            if not items:
+                if cola.terminada():
+                    break
+                # Quedan leases de otros workers (o el
+                # descubrimiento sigue): se espera
+                time.sleep(ESPERA_COLA_VACIA)
+                continue
+
+            hechos = []
+            for item, future in [(i, executor.submit(procesar, i)) for i in items]:
+                try:
+                    producto = future.result()
+                except Exception as e:
+                    # Los scrapers ya atrapan sus errores; esto
+                    # es un fallo del worker: el ítem vuelve a la cola
+                    cola.fallar(args.id, [item[0]], e)
+                    continue
+
+                # Un None es un descarte (queda en Comun/descartes),
+                # no se reintenta
+                if producto:
+                    f.write(json.dumps({"url": item[1], "producto": producto}, ensure_ascii=False) + "\n")
+                    f_detalle.sumar()
+                hechos.append(item[0])
+
+            # El shard queda en disco antes de marcar los ítems
+            # como hechos: si el worker muere en el medio, el
+            # lote se repite y unir() descarta los duplicados
+            f.flush()
+            os.fsync(f.fileno())
+            cola.completar(args.id, hechos)
+
+            procesados += len(hechos)
+            print(f"⏳ [{args.id}] {procesados} procesados")
+
+    detener_clearance(modulo)
+    print(f"✅ [{args.id}] Worker terminado: {procesados} procesados → {shard}")
+    descartes.imprimir_resumen()
+
+
+# =========================================================
+# UNIÓN DE SHARDS
+# =========================================================
+def unir_shards(salida, scraper, output_json, modulo=None):
+    """
+    Junta los shards NDJSON de un scraper (sin URLs repetidas),
+    escribe el OUTPUT_JSON y alimenta el historial de precios,
+    como al final de cada scraper. Si el descubrimiento guardó
+    las categorías de cada URL y el scraper tiene
+    filas_por_categoria, cada producto sale una vez por
+    categoría. Devuelve la cantidad de filas.
+    """
+    productos = {}
+    for archivo in sorted(os.listdir(salida)):
+        if not (archivo.startswith(f"{scraper}-") and archivo.endswith(".ndjson")):
+            continue
+        with open(os.path.join(salida, archivo), "r", encoding="utf-8") as f:
+            for linea in f:
+                try:
+                    fila = json.loads(linea)
+                except ValueError:
+                    # Última línea cortada de un worker que murió
+                    continue
+                productos.setdefault(fila["url"], fila["producto"])
+
+    filas = list(productos.values())
+    ruta = ruta_categorias(salida, scraper)
+    if hasattr(modulo, "filas_por_categoria") and os.path.exists(ruta):
+        with open(ruta, "r", encoding="utf-8") as f:
+            categorias = json.load(f)
+        filas = [
+            fila for url, producto in productos.items()
+            for fila in modulo.filas_por_categoria(producto, categorias.get(url))
+        ]
+
+    with open(output_json, "w", encoding="utf-8") as f:
+        json.dump(filas, f, ensure_ascii=False, indent=4)
+    guardar_historial(filas)
+    return len(filas)
+
+
+def ejecutar_unir(args):
+    modulo = cargar(args.scraper)
+    output_json = args.output or modulo.OUTPUT_JSON
+    total = unir_shards(args.salida, args.scraper, output_json, modulo)
+    print(f"📄 {total} productos unidos en {output_json}")
+
+
+# =========================================================
+# COORDINADOR
+# =========================================================
+def lanzar_worker(args, worker):
+    comando = [
+        sys.executable, os.path.abspath(__file__), "worker",
+        "--scraper", args.scraper, "--cola", args.cola, "--id", worker,
+        "--salida", args.salida, "--hilos", str(args.hilos),
+        "--lote", str(args.lote), "--lease", str(args.lease)
+    ]
+    if args.base_url:
+        comando += ["--base-url", args.base_url]
+    return subprocess.Popen(comando)
+
+
+def ejecutar_coordinador(args):
+    start_time = time.time()
+    asegurar_run_id()
+    iniciar_metricas(f"{args.scraper}-coordinador")
+    iniciar_perfilado(f"{args.scraper}-coordinador")
+
+    modulo = cargar(args.scraper, args.base_url)
+    output_json = args.output or modulo.OUTPUT_JSON
+
+    # Corrida nueva: se descartan la cola y los shards anteriores
+    os.makedirs(args.salida, exist_ok=True)
+    for archivo in os.listdir(args.salida):
+        if archivo.endswith(".ndjson") or archivo.startswith("cola.sqlite") or archivo.endswith("-categorias.json"):
+            os.remove(os.path.join(args.salida, archivo))
+
+    cola = crear_cola(args.cola)
+    if args.servir:
+        token = SCRAPER_COLA_TOKEN
+        if not token:
+            # Sin secreto configurado se genera uno para esta corrida
+            token = secrets.token_urlsafe(24)
+            print(f"🔑 SCRAPER_COLA_TOKEN no definido, los workers remotos deben usar: {token}")
+        servir_cola(cola, args.servir, host=args.host, token=token)
+        print(f"🌐 Cola servida en {args.host}:{args.servir} para workers remotos")
+
+    # El clearance se obtiene antes de lanzar los workers, así
+    # ellos lo leen de disco en lugar de renovarlo cada uno
+    iniciar_clearance(modulo)
+
+    # Los workers arrancan antes que el descubrimiento:
+    # van tomando URLs a medida que se encolan
+    workers = {f"w{i}": lanzar_worker(args, f"w{i}") for i in range(args.workers)}
+    relanzamientos = 0
+    print(f"🚀 {args.workers} workers locales sobre {args.cola}")
+
+    encoladas = []
+
+    def encolar(items):
+        if items:
+            encoladas.append(cola.encolar(items))
+
+    with fase("descubrimiento"):
+        categorias = ADAPTADORES[args.scraper]["descubrir"](modulo, encolar)
+    if categorias is not None:
+        with open(ruta_categorias(args.salida, args.scraper), "w", encoding="utf-8") as f:
+            json.dump(categorias, f, ensure_ascii=False)
+    cola.cerrar()
+    print(f"📦 {sum(encoladas)} URLs encoladas")
+
+    # Espera a que la cola se vacíe
+    while not cola.terminada():
+        resumen = cola.resumen()
+        print(
+            f"⏳ Pendientes: {resumen.get(PENDIENTE, 0)} | En curso: {resumen.get(TOMADO, 0)} | "
+            f"Hechos: {resumen.get(HECHO, 0)} | Fallidos: {resumen.get(FALLIDO, 0)}"
+        )
+        for worker, proceso in list(workers.items()):
+            if proceso.poll() not in (None, 0) and relanzamientos < MAX_RELANZAMIENTOS:
+                print(f"⚠️ El worker {worker} murió (código {proceso.returncode}), se relanza")
+                workers[worker] = lanzar_worker(args, worker)
+                relanzamientos += 1
+        if all(p.poll() is not None for p in workers.values()) and not args.servir:
+            # Sin workers vivos no hay quién vacíe la cola
+            print("❌ No quedan workers vivos")
+            break
+        time.sleep(2)
+
+    for proceso in workers.values():
+        proceso.wait()
+    detener_clearance(modulo)
+
+    with fase("union") as f_union:
+        total = unir_shards(args.salida, args.scraper, output_json, modulo)
+        f_union.sumar(total)
+
+    resumen = cola.resumen()
+    print(f"\n✅ DETALLE DISTRIBUIDO FINALIZADO EN {(time.time() - start_time) / 60:.2f} MINUTOS")
+    print(f"📄 Archivo generado: {output_json}")
+    print(f"📊 Total guardados: {total} filas ({resumen.get(FALLIDO, 0)} URLs fallidas)")
+
+
+# =========================================================
+# PUNTO DE ENTRADA
+# =========================================================
+def main():
+    parser = argparse.ArgumentParser(description="Detalle de productos repartido entre workers")
+    sub = parser.add_subparsers(dest="comando", required=True)
+
+    for nombre in ("coordinar", "worker", "unir"):
+        p = sub.add_parser(nombre)
+        p.add_argument("--scraper", required=True, choices=sorted(ADAPTADORES))
+        p.add_argument("--salida", help="Carpeta de la cola y los shards (default Colas/<scraper>)")
+        if nombre != "unir":
+            p.add_argument("--cola", help="URL de la cola (default sqlite en la carpeta de salida)")
+            p.add_argument("--hilos", type=int, default=HILOS_WORKER)
+            p.add_argument("--lote", type=int, default=LOTE)
+            p.add_argument("--lease", type=float, default=LEASE_SEGUNDOS)
+            p.add_argument("--base-url", help="Host alternativo (mirror o servidor local)")
+        if nombre != "worker":
+            p.add_argument("--output", help="JSON final (default el OUTPUT_JSON del scraper)")
+        if nombre == "coordinar":
+            p.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+            p.add_argument("--servir", type=int, help="Puerto para servir la cola a workers remotos")
+            p.add_argument("--host", default="127.0.0.1", help="Interfaz donde se sirve la cola")
+        if nombre == "worker":
+            p.add_argument("--id", required=True)
+
+    # --perfil / --tracemalloc / --resume los leen los módulos de Comun
+    args, _ = parser.parse_known_args()
+    args.salida = args.salida or os.path.join(COLAS_DIR, args.scraper)
+    if getattr(args, "cola", None) is None and args.comando != "unir":
+        args.cola = "sqlite://" + os.path.abspath(os.path.join(args.salida, "cola.sqlite"))
+
+    {"coordinar": ejecutar_coordinador, "worker": ejecutar_worker, "unir": ejecutar_unir}[args.comando](args)
+
+
+if __name__ == "__main__":
+    main()
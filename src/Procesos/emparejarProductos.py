@@ -0,0 +1,102 @@
+import argparse
+import csv
+import glob
+import json
+import os
+import sys
+import time
+
+# SRC_DIR:
+# Carpeta src, para poder importar los módulos compartidos de Comun
+SRC_DIR = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+from Comun.emparejamiento import emparejar, resumen_grupos
+
+# =========================================================
+# TABLA DE GRUPOS DE PRODUCTOS ENTRE TIENDAS
+# =========================================================
+# Lee los catálogos scrapeados (Jobs/JsonProducts/*.json),
+# empareja el mismo producto entre tiendas
+# (Comun/emparejamiento.py) y escribe la tabla de grupos:
+#
+#   grupo, storeRut, idWeb, productName, productBrand,
+#   productPrice, gtin, metodo, puntaje
+#
+# La salida va a Emparejamiento/ (NO a JsonProducts: PostProducts
+# importa todo lo que hay ahí).
+#
+# Uso:
+#   python Procesos/emparejarProductos.py
+#   python Procesos/emparejarProductos.py --formato json --solo-multitienda
+
+# Catálogos de entrada
+JSON_DIR = os.path.join(SRC_DIR, "Jobs", "JsonProducts")
+
+# Carpeta de salida de la tabla de grupos
+EMPAREJAMIENTO_DIR = os.getenv("SCRAPER_EMPAREJAMIENTO_DIR", os.path.join(SRC_DIR, "Emparejamiento"))
+
+COLUMNAS = [
+    "grupo", "storeRut", "idWeb", "productName", "productBrand",
+    "productPrice", "gtin", "metodo", "puntaje"
+]
+
+
+def cargar_catalogos(carpeta):
+    productos = []
+    for ruta in sorted(glob.glob(os.path.join(carpeta, "*.json"))):
+        with open(ruta, "r", encoding="utf-8") as f:
+            datos = json.load(f)
+        print(f"📄 {os.path.basename(ruta)}: {len(datos)} productos")
+        productos.extend(datos)
+    return productos
+
+
+def guardar_tabla(filas, formato, carpeta):
+    os.makedirs(carpeta, exist_ok=True)
+    ruta = os.path.join(carpeta, f"grupos_productos.{formato}")
+    if formato == "csv":
+        with open(ruta, "w", encoding="utf-8", newline="") as f:
+            escritor = csv.DictWriter(f, fieldnames=COLUMNAS)
+            escritor.writeheader()
+            escritor.writerows(filas)
+    else:
+        with open(ruta, "w", encoding="utf-8") as f:
+            json.dump(filas, f, ensure_ascii=False, indent=2)
+    return ruta
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Empareja productos entre tiendas")
+    parser.add_argument("--entrada", default=JSON_DIR, help="Carpeta con los productos_*.json")
+    parser.add_argument("--salida", default=EMPAREJAMIENTO_DIR)
+    parser.add_argument("--formato", choices=("csv", "json"), default="csv")
+    parser.add_argument("--solo-multitienda", action="store_true",
+                        help="Solo los grupos con productos de más de una tienda")
+    args = parser.parse_args()
+
+    productos = cargar_catalogos(args.entrada)
+    if not productos:
+        print("⚠️ No hay productos para emparejar")
+        return
+
+    inicio = time.perf_counter()
+    filas = emparejar(productos)
+    segundos = time.perf_counter() - inicio
+
+    resumen = resumen_grupos(filas)
+    print(
+        f"🔗 {resumen['productos']} productos → {resumen['grupos']} grupos "
+        f"({resumen['grupos_multitienda']} con más de una tienda) en {segundos:.1f}s | "
+        f"por método: {resumen['por_metodo']}"
+    )
+
+    if args.solo_multitienda:
+        filas = [f for f in filas if f["metodo"] != "unico"]
+    ruta = guardar_tabla(filas, args.formato, args.salida)
+    print(f"💾 Tabla de grupos guardada en {ruta}")
+
+
+if __name__ == "__main__":
+    main()
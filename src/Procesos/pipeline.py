@@ -6,6 +6,18 @@ from datetime import datetime
 # ================= CONFIGURACIÓN =================
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Carpeta src, para poder importar los módulos compartidos de Comun
+SRC_DIR = os.path.abspath(os.path.join(BASE_DIR, ".."))
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+from Comun.metricas import (
+    asegurar_run_id, consolidar_reportes, escribir_reporte,
+    fase, iniciar_metricas, imprimir_consolidado
+)
+from Comun.checkpoint import reanudacion_pedida
+from Comun.perfilado import iniciar_perfilado
 PYTHON_EXECUTABLE = sys.executable  # Usa el mismo Python del entorno
 
 SCRIPTS = [
@@ -41,12 +53,14 @@ def ejecutar_script(script):
     inicio = datetime.now()
 
     try:
-        result = subprocess.run(
-            [PYTHON_EXECUTABLE, script_path],
-            stdout=sys.stdout,
-            stderr=sys.stderr,
-            check=False
-        )
+        # Cada script es una fase del reporte del pipeline
+        with fase(script["name"].lower().replace(" ", "_")):
+            result = subprocess.run(
+                [PYTHON_EXECUTABLE, script_path],
+                stdout=sys.stdout,
+                stderr=sys.stderr,
+                check=False
+            )
 
         fin = datetime.now()
         duracion = (fin - inicio).total_seconds()
@@ -66,6 +80,17 @@ def ejecutar_script(script):
 def main():
     print("🧠 PIPELINE DE SCRAPING + IMPORTACIÓN")
     print(f"📅 Inicio: {datetime.now()}")
+
+    # Todos los subprocesos escriben su reporte de métricas
+    # bajo el mismo run_id
+    run_id, _ = asegurar_run_id()
+    iniciar_metricas("pipeline")
+    iniciar_perfilado("pipeline")
+
+    # --resume se pasa a los scrapers por SCRAPER_REANUDAR
+    if reanudacion_pedida():
+        print("♻️ Los scrapers continúan desde sus checkpoints")
+    print(f"🆔 Run: {run_id}")
     print("=" * 50)
 
     resultados = {}
@@ -86,6 +111,9 @@ def main():
         estado = "OK" if ok else "ERROR"
         print(f" - {nombre}: {estado}")
 
+    escribir_reporte()
+    imprimir_consolidado(consolidar_reportes(run_id))
+
     print(f"\n🏁 Fin del pipeline: {datetime.now()}")
 
 
@@ -34,6 +34,19 @@ JSON_DIR = os.path.join(JOBS_DIR, "JsonProductos")
 # - evita problemas de versiones
 PYTHON_EXECUTABLE = sys.executable
 
+# SRC_DIR:
+# Carpeta src, para poder importar los módulos compartidos de Comun
+SRC_DIR = os.path.abspath(os.path.join(BASE_DIR, ".."))
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+from Comun.metricas import (
+    asegurar_run_id, consolidar_reportes, escribir_reporte,
+    fase, iniciar_metricas, imprimir_consolidado
+)
+from Comun.checkpoint import reanudacion_pedida
+from Comun.perfilado import iniciar_perfilado
+
 # =========================================================
 # FUNCIÓN: ejecutar_scrapper
 # =========================================================
@@ -70,12 +83,14 @@ def ejecutar_scrapper(scrapper_dir):
     try:
         # Ejecuta el scrapper como un proceso externo
         # Es equivalente a correrlo desde la terminal
-        result = subprocess.run(
-            [PYTHON_EXECUTABLE, script_path],
-            stdout=sys.stdout,   # muestra la salida normal en pantalla
-            stderr=sys.stderr,   # muestra errores en pantalla
-            check=False          # NO lanza excepción si falla
-        )
+        # (cada scrapper es una fase del reporte de métricas)
+        with fase(os.path.basename(scrapper_dir)):
+            result = subprocess.run(
+                [PYTHON_EXECUTABLE, script_path],
+                stdout=sys.stdout,   # muestra la salida normal en pantalla
+                stderr=sys.stderr,   # muestra errores en pantalla
+                check=False          # NO lanza excepción si falla
+            )
 
         # Guarda el momento en que termina
         fin = datetime.now()
@@ -104,6 +119,16 @@ def main():
     print("🧠 ORQUESTADOR DE SCRAPPERS")
     print(f"📂 Jobs: {JOBS_DIR}")
 
+    # Si no lo lanzó el pipeline, este proceso define el run_id
+    # y consolida las métricas al final
+    run_id, run_propio = asegurar_run_id()
+    iniciar_metricas("runscrappers")
+    iniciar_perfilado("runscrappers")
+
+    # --resume se pasa a los scrapers por SCRAPER_REANUDAR
+    if reanudacion_pedida():
+        print("♻️ Los scrapers continúan desde sus checkpoints")
+
     # Verifica que la carpeta Jobs exista
     if not os.path.exists(JOBS_DIR):
         print("❌ Carpeta Jobs no encontrada")
@@ -145,6 +170,10 @@ def main():
         estado = "OK" if ok else "ERROR"
         print(f" - {scrapper}: {estado}")
 
+    escribir_reporte()
+    if run_propio:
+        imprimir_consolidado(consolidar_reportes(run_id))
+
     print("\n🏁 Orquestación finalizada")
 
 
@@ -0,0 +1,26 @@
+import os
+import sys
+
+import pytest
+
+# SRC_DIR:
+# Carpeta src, para importar Comun, Procesos y los servidores
+# locales de Benchmarks
+SRC_DIR = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+from Benchmarks.servidorGcsLocal import iniciar_servidor_gcs
+
+
+@pytest.fixture(scope="session")
+def servidor_gcs():
+    """
+    GCS local (Benchmarks/servidorGcsLocal.py) para toda la
+    sesión: Comun.almacenamiento crea un solo storage.Client
+    por proceso, apuntado al STORAGE_EMULATOR_HOST del momento.
+    """
+    servidor = iniciar_servidor_gcs()
+    os.environ["STORAGE_EMULATOR_HOST"] = servidor.url_base
+    yield servidor
+    servidor.shutdown()
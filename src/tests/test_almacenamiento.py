@@ -0,0 +1,47 @@
+import gzip
+import json
+
+import pytest
+
+from Benchmarks.benchSubidaGcs import producto_sintetico
+from Comun.almacenamiento import SubidaNdjsonGz
+
+BUCKET = "bucket-subidas"
+
+# Mínimo de GCS para un chunk resumable: con varios chunks el
+# error cae con parte del objeto ya enviada
+CHUNK = 256 * 1024
+
+
+def productos(cantidad, categoria="almacen"):
+    return [producto_sintetico(i, categoria) for i in range(cantidad)]
+
+
+def test_subida_completa_se_lee_igual(servidor_gcs):
+    esperados = productos(5000)
+    with SubidaNdjsonGz(BUCKET, "pendientes/completa.ndjson.gz", chunk_size=CHUNK) as subida:
+        for producto in esperados:
+            subida.escribir(producto)
+
+    contenido, _ = servidor_gcs.almacen.leer(BUCKET, "pendientes/completa.ndjson.gz")
+    leidos = [json.loads(linea) for linea in gzip.decompress(contenido).splitlines()]
+    assert subida.productos == len(esperados)
+    assert leidos == esperados
+
+
+def test_subida_abortada_no_deja_objeto(servidor_gcs):
+    # Productos con texto poco comprimible para que se manden
+    # varios chunks antes del error
+    esperados = [dict(p, productDescription=str(hash((i, "x"))) * 20) for i, p in enumerate(productos(20000))]
+
+    with pytest.raises(RuntimeError):
+        with SubidaNdjsonGz(BUCKET, "pendientes/abortada.ndjson.gz", chunk_size=CHUNK) as subida:
+            for i, producto in enumerate(esperados):
+                subida.escribir(producto)
+                if i == len(esperados) - 1:
+                    raise RuntimeError("el job se cortó")
+
+    enviados = [s["datos"] for s in servidor_gcs.almacen.sesiones.values() if s["bucket"] == BUCKET]
+    assert enviados and len(enviados[0]) >= CHUNK, "la subida tendría que haber mandado chunks"
+    assert servidor_gcs.almacen.leer(BUCKET, "pendientes/abortada.ndjson.gz") is None
+    assert not [n for (b, n) in servidor_gcs.almacen.objetos if b == BUCKET and "abortada" in n]
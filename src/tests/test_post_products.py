@@ -0,0 +1,68 @@
+import gzip
+import json
+import threading
+from itertools import count
+
+import pytest
+
+from Benchmarks.benchConsumidorGcs import ApiLocal
+from Benchmarks.benchSubidaGcs import producto_sintetico
+from Comun.almacenamiento import cliente_gcs
+from Comun.metricas import fase
+from Procesos import PostProducts
+
+BUCKET = "bucket-consumidor"
+
+
+@pytest.fixture
+def api(monkeypatch, tmp_path):
+    """
+    API local de benchConsumidorGcs, con PostProducts apuntado
+    a ella y sin pausa entre batches.
+    """
+    api = ApiLocal()
+    threading.Thread(target=api.serve_forever, daemon=True).start()
+    monkeypatch.setattr(PostProducts, "API_URL", api.url)
+    monkeypatch.setattr(PostProducts, "SLEEP_SECONDS", 0)
+    monkeypatch.setattr(PostProducts, "BATCH_SIZE", 10)
+    monkeypatch.setattr(PostProducts, "BATCH_DIR", str(tmp_path))
+    yield api
+    api.shutdown()
+
+
+def subir(nombre, contenido):
+    bucket = cliente_gcs().bucket(BUCKET)
+    bucket.blob(nombre).upload_from_string(contenido)
+    return bucket.get_blob(nombre)
+
+
+def test_objeto_corrupto_va_a_fallidos_con_lo_enviado(servidor_gcs, api):
+    productos = [producto_sintetico(i, "almacen") for i in range(2000)]
+    ndjson = "".join(json.dumps(p, ensure_ascii=False) + "\n" for p in productos).encode("utf-8")
+    comprimido = gzip.compress(ndjson)
+    # gzip cortado a la mitad: las primeras líneas se leen bien
+    # y después la descompresión falla
+    blob = subir("pendientes/cortado.ndjson.gz", comprimido[: len(comprimido) // 2])
+
+    with fase("import") as f_import:
+        enviados, fallidos = PostProducts.procesar_objeto(blob, PostProducts.PREFIJO_PENDIENTES, count(1), f_import)
+
+    assert 0 < enviados < len(productos)
+    assert enviados == len(api.ids)
+    assert enviados % PostProducts.BATCH_SIZE == 0
+    assert fallidos == 0
+    assert servidor_gcs.almacen.leer(BUCKET, "pendientes/cortado.ndjson.gz") is None
+    assert servidor_gcs.almacen.leer(BUCKET, "fallidos/cortado.ndjson.gz") is not None
+
+
+def test_objeto_completo_va_a_procesados(servidor_gcs, api):
+    productos = [producto_sintetico(i, "bebidas") for i in range(25)]
+    ndjson = "".join(json.dumps(p, ensure_ascii=False) + "\n" for p in productos).encode("utf-8")
+    blob = subir("pendientes/completo.ndjson.gz", gzip.compress(ndjson))
+
+    with fase("import") as f_import:
+        enviados, fallidos = PostProducts.procesar_objeto(blob, PostProducts.PREFIJO_PENDIENTES, count(1), f_import)
+
+    assert (enviados, fallidos) == (len(productos), 0)
+    assert sorted(api.ids) == sorted(p["idWeb"] for p in productos)
+    assert servidor_gcs.almacen.leer(BUCKET, "procesados/completo.ndjson.gz") is not None
@@ -0,0 +1,73 @@
+import time
+
+import pytest
+import requests
+
+from Benchmarks.servidorLocal import Fallas, clave_request, iniciar_servidor
+from Comun import reintentos
+
+# Respuesta fija del servidor local cuando no hay falla
+FIXTURES = {clave_request("GET", "/ping", ""): {"status": 200, "body": "pong"}}
+
+
+@pytest.fixture(autouse=True)
+def cortacircuitos_nuevos(monkeypatch):
+    monkeypatch.setattr(reintentos, "_cortacircuitos", {})
+
+
+@pytest.fixture
+def servidor():
+    servidores = []
+
+    def iniciar(fallas):
+        servidor = iniciar_servidor(fallas=fallas, fixtures=FIXTURES)
+        servidores.append(servidor)
+        return servidor
+
+    yield iniciar
+    for servidor in servidores:
+        servidor.shutdown()
+
+
+def test_429_respeta_retry_after(servidor):
+    # Rate limit durante el primer medio segundo: el primer
+    # intento recibe 429 y el reintento espera el Retry-After
+    local = servidor(Fallas(status_error=429, retry_after=1, caida=(0, 0.5)))
+    sesion = reintentos.con_reintentos(requests.Session(), intentos=3)
+
+    inicio = time.monotonic()
+    respuesta = sesion.get(f"{local.url_base}/ping")
+
+    assert respuesta.status_code == 200
+    assert time.monotonic() - inicio >= 1.0
+    assert local.estadisticas.get("falla:error") == 1
+    assert reintentos.resumen()[local.url_base.split("//")[1]]["reintentos"] == 1
+
+
+def test_cortacircuitos_abre_y_semiabre(servidor, monkeypatch):
+    monkeypatch.setattr(reintentos, "FALLAS_PARA_ABRIR", 3)
+    monkeypatch.setattr(reintentos, "PAUSA_INICIAL", 0.3)
+    local = servidor(Fallas(p_error=1.0, retry_after=0))
+    url = f"{local.url_base}/ping"
+    sesion = reintentos.con_reintentos(requests.Session(), intentos=1)
+    cortacircuitos = reintentos.cortacircuitos_de(url)
+
+    for _ in range(3):
+        assert sesion.get(url).status_code == 503
+    assert cortacircuitos.estado == reintentos.ABIERTO
+
+    # La sonda espera la pausa, vuelve a fallar y el circuito
+    # se abre otra vez con el doble de pausa
+    inicio = time.monotonic()
+    assert sesion.get(url).status_code == 503
+    assert time.monotonic() - inicio >= 0.25
+    assert cortacircuitos.estado == reintentos.ABIERTO
+    assert cortacircuitos.estadisticas["aperturas"] == 2
+
+    # El sitio vuelve: la siguiente sonda cierra el circuito
+    local.fallas.p_error = 0.0
+    inicio = time.monotonic()
+    assert sesion.get(url).status_code == 200
+    assert time.monotonic() - inicio >= 0.5
+    assert cortacircuitos.estado == reintentos.CERRADO
+    assert local.estadisticas.get("falla:error") == 4